@@ -195,6 +195,69 @@ class Api:
             # CORRECCION: El nombre de la funcion en JS es habilitarUI
             self._enviar_js("habilitarUI()")
 
+    def procesar_lote(self, data):
+        """
+        Valida e inicia varias ediciones de El Mercurio en una sola corrida.
+        data = {"trabajos": [{"url": ..., "paginas": ..., "columnas": ...}, ...]}
+        """
+        self.cancel_event.clear()
+        print("Lote recibido:", data)
+
+        try:
+            trabajos = []
+            for item in data.get("trabajos", []):
+                url = item.get("url", "").strip()
+                if not url:
+                    return {'success': False, 'message': 'Error: Todas las ediciones necesitan URL.'}
+                trabajos.append((url, int(item.get("paginas", "0")), int(str(item.get("columnas", "7")).strip())))
+
+            if not trabajos:
+                return {'success': False, 'message': 'Error: El lote no tiene ediciones.'}
+
+            thread = threading.Thread(
+                target=self._run_proceso_lote,
+                args=(trabajos,),
+                daemon=True
+            )
+            thread.start()
+            return {'success': True, 'message': f'Lote de {len(trabajos)} ediciones iniciado.'}
+
+        except ValueError:
+            return {'success': False, 'message': 'Error: Páginas y columnas deben ser números.'}
+        except Exception as e:
+            return {'success': False, 'message': f'Error inesperado: {e}'}
+
+    def _run_proceso_lote(self, trabajos):
+        try:
+            resultado = main.orquestador_lote(
+                trabajos,
+                self.cancel_event,
+                self.enable_cleanup,
+                self._actualizar_progreso_ui
+            )
+
+            if self.cancel_event.is_set() or resultado is None:
+                self._enviar_js("actualizarMensajeUI('⛔ Proceso cancelado por el usuario.', 'warning')")
+            else:
+                fallidas = [e["edicion"] for e in resultado["ediciones"] if e["estado"] == "error"]
+                canceladas = [e["edicion"] for e in resultado["ediciones"] if e["estado"] == "cancelada"]
+                if fallidas or canceladas:
+                    detalle = [f"errores en: {', '.join(fallidas)}"] if fallidas else []
+                    detalle += [f"canceladas: {', '.join(canceladas)}"] if canceladas else []
+                    msg = f"⚠️ Lote completado con {' | '.join(detalle)}"
+                    self._enviar_js(f"actualizarMensajeUI('{msg}', 'warning')")
+                else:
+                    self._enviar_js("actualizarMensajeUI('✅ Lote completado con éxito!', 'success')")
+
+        except Exception as e:
+            msg = f"Error inesperado: {e}"
+            msg_safe = msg.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ')
+            self._enviar_js(f"actualizarMensajeUI('{msg_safe}', 'error')")
+
+        finally:
+            self._enviar_js("ocultarProgreso()")
+            self._enviar_js("habilitarUI()")
+
     # --- Lógica de Negocio: Macal ---
 
     def ejecutar_macal(self):
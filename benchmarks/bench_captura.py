@@ -0,0 +1,147 @@
+# bench_captura.py
+# BENCHMARK DE CAPTURA DEL textLayer: div por div ("dom") vs un solo execute_script ("bulk")
+#
+# Usa una página guardada del visor (fixtures/textlayer_pagina.html).
+# Sin --chrome, un driver falso sirve el HTML y cobra una latencia fija por
+# cada llamada a WebDriver (--rtt-ms), que es lo que domina en el visor real:
+# "dom" hace 2 llamadas por div y "bulk" una sola. Con --chrome se abre el
+# fixture en un Chrome headless real y se ejecuta el JS de verdad.
+# En ambos casos se verifica que los dos motores entreguen los mismos fragmentos.
+#
+#   python benchmarks/bench_captura.py
+#   python benchmarks/bench_captura.py --rtt-ms 5 --repeticiones 3
+#   python benchmarks/bench_captura.py --chrome
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import threading
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+import paso1_copy
+
+FIXTURE = os.path.join(RAIZ, "benchmarks", "fixtures", "textlayer_pagina.html")
+
+logger = logging.getLogger("bench_captura")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+class DivFixture:
+    def __init__(self, driver, style, texto):
+        self._driver, self._style, self._texto = driver, style, texto
+
+    def get_attribute(self, nombre):
+        self._driver._viaje()
+        return self._style if nombre == "style" else None
+
+    @property
+    def text(self):
+        self._driver._viaje()
+        return self._texto
+
+
+class CapaFixture:
+    def __init__(self, driver, divs):
+        self._driver, self._divs = driver, divs
+
+    def find_element(self, by, valor):
+        self._driver._viaje()
+        return self
+
+    def find_elements(self, by, valor):
+        self._driver._viaje()
+        return [DivFixture(self._driver, style, texto) for style, texto in self._divs]
+
+
+class DriverFixture:
+    """WebDriver mínimo sobre el HTML guardado: cada llamada cuesta rtt segundos."""
+
+    def __init__(self, ruta_html, rtt_s):
+        with open(ruta_html, encoding="utf-8") as f:
+            sopa = BeautifulSoup(f.read(), "html.parser")
+        capa = sopa.select_one("#viewer .textLayer")
+        self.divs = [(div.get("style", ""), div.get_text()) for div in capa.find_all("div")]
+        self.rtt_s = rtt_s
+        self.llamadas = 0
+
+    def _viaje(self):
+        self.llamadas += 1
+        if self.rtt_s:
+            time.sleep(self.rtt_s)
+
+    def execute_script(self, script, *args):
+        # Solo entiende JS_SNAPSHOT_TEXTLAYER: lo replica con los mismos regex
+        self._viaje()
+        salida = []
+        for style, texto in self.divs:
+            texto = texto.strip()
+            if not texto:
+                continue
+            top, left, font = (re.search(p, style) for p in (paso1_copy.RE_TOP, paso1_copy.RE_LEFT, paso1_copy.RE_FONT_SIZE))
+            salida.append([texto, float(top.group(1)) if top else None,
+                           float(left.group(1)) if left else None, float(font.group(1)) if font else 0.0])
+        return salida
+
+    def visor(self):
+        return CapaFixture(self, self.divs)
+
+
+def _chrome():
+    driver, perfil = paso1_copy._crear_driver(logger, headless=True)
+    driver.get("file://" + FIXTURE.replace(os.sep, "/"))
+    return driver, perfil
+
+
+def medir(driver, visor, modo, repeticiones):
+    paso1_copy.MODO_CAPTURA = modo
+    cancel_event = threading.Event()
+    tiempos, fragmentos = [], None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fragmentos = paso1_copy.capture_text_from_textlayer(driver, visor, logger, cancel_event)
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), fragmentos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de captura del textLayer (dom vs bulk)")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Latencia por llamada del driver falso")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--chrome", action="store_true", help="Usar un Chrome headless real")
+    args = parser.parse_args()
+
+    if args.chrome:
+        driver, perfil = _chrome()
+        visor = driver.find_element(By.ID, "viewer")
+    else:
+        driver = DriverFixture(FIXTURE, args.rtt_ms / 1000)
+        visor = driver.visor()
+
+    try:
+        resultados = {}
+        for modo in ("dom", "bulk"):
+            llamadas_antes = getattr(driver, "llamadas", 0)
+            segundos, fragmentos = medir(driver, visor, modo, args.repeticiones)
+            llamadas = (getattr(driver, "llamadas", 0) - llamadas_antes) // args.repeticiones
+            resultados[modo] = fragmentos
+            detalle = f" | {llamadas} llamadas al driver" if not args.chrome else ""
+            print(f"{modo:>5}: {segundos * 1000:8.1f} ms | {len(fragmentos)} fragmentos{detalle}")
+    finally:
+        if args.chrome:
+            paso1_copy._cerrar_driver(driver, perfil)
+
+    iguales = resultados["dom"] == resultados["bulk"]
+    print(f"Fragmentos idénticos: {'sí' if iguales else 'NO'}")
+    return 0 if iguales else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
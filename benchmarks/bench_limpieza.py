@@ -0,0 +1,167 @@
+# bench_limpieza.py
+# BENCHMARK DE LA LIMPIEZA DE paso2 (limpiar_encabezados + limpieza): versión base vs actual
+#
+# La versión base es paso2_copy.py del primer commit del repo (se lee con
+# `git show`), así que la comparación no depende de copias guardadas a mano.
+# Ambas corren sobre el mismo corpus sintético (generado con semilla fija) y
+# se verifica que la salida sea idéntica byte a byte.
+# Con --regenerar se reescriben los fixtures de tests/fixtures/paso2 con la
+# salida de la versión base (tests/test_limpieza.py los compara con la actual).
+#
+#   python benchmarks/bench_limpieza.py
+#   python benchmarks/bench_limpieza.py --paginas 600 --repeticiones 5
+#   python benchmarks/bench_limpieza.py --regenerar
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import subprocess
+import importlib.util
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import paso2_copy
+
+FIXTURES = os.path.join(RAIZ, "tests", "fixtures", "paso2")
+PAGINAS_FIXTURE = 12
+CASOS_FIXTURE = 400
+
+PALABRAS = ("casa depto ubicado comuna Santiago rol 1234 mínimo $ 45.000.000 - $45.000 fojas inscrita "
+            "Conservador Bienes Raíces N° Nº Departamento Depto Piso Of Bodega 12:30 12: 30 9:05 horas .. "
+            "... Secretaría juan@x.cl , . ; : Rol [CODE:1612] [CODE:1640] 1616] Valparaíso "
+            "ECONÓMICOS CLASIFICADOS").split(" ")
+ENCABEZADOS = ("LUNES 3 DE MARZO DE 2025\n", "Sábado 15 de junio de 2024\n", "1611 JUDICIALES\n",
+               "1612 REMATES\n", "ECONÓMICOS CLASIFICADOS\n", "ECONÓMICOS  CLASIFICADOS\n",
+               "1635 PERSONAS BUSCADAS Y COSAS PERDIDAS\n", "EL MERCURIO DE VALPARAÍSO\n", "")
+INICIOS = ("REMATE", "EXTRACTO", "Ante 3° JUZGADO CIVIL de Santiago", "JUEZ PARTIDOR DON PEDRO",
+           "VIGÉSIMO JUZGADO", "[CODE:1612]", "LICITACIÓN REMATE", "JUEZ ÁRBITRO", "Remate.")
+CIERRES = ("Secretaría.", "La Actuaria", "El Actuario", "Secretario(a)", "juan@x.cl", "+56 2 1234 5678",
+           "fin.", "fin")
+
+# Alfabeto de los casos cortos: lo que disparan las uniones de líneas y la limpieza
+PIEZAS = ("a", "Z", "9", "12", "-", "\n", "\n\n", " ", "  ", "\t", "@", ":", ",", ".", "..", "$", "N°",
+          "Depto", "Of", "Rol", "[CODE:", "1616]", "DE:", "é", "ſ", "ı", "_", "x@y.cl", "---", "Página",
+          "1612", "REMATES", "\x1c")
+
+logger = logging.getLogger("bench_limpieza")
+
+
+def generar_corpus(paginas: int, semilla: int = 0) -> str:
+    """TXT de extracción con la forma del de paso1 (--- Página n ---, encabezados, avisos)."""
+    rng = random.Random(semilla)
+    salida = []
+    for n in range(1, paginas + 1):
+        salida.append(f"--- Página {n} ---\n\n{n}\n")
+        salida.append(rng.choice(ENCABEZADOS))
+        if n == 1:
+            salida.append("1616 REMATES DE PROPIEDADES\n[CODE:1616]\n")
+        for _ in range(40):
+            lineas = [rng.choice(INICIOS)]
+            for _ in range(rng.randint(3, 12)):
+                linea = " ".join(rng.choice(PALABRAS) for _ in range(rng.randint(2, 10)))
+                sufijo = rng.random()
+                if sufijo < 0.1:
+                    linea += " remat-"
+                elif sufijo < 0.15:
+                    linea += " contacto:"
+                elif sufijo < 0.2:
+                    linea += " juan."
+                lineas.append(linea)
+            # Algunos avisos quedan pegados al siguiente (firma y REMATE en la misma línea)
+            union = " " if rng.random() < 0.2 else "\n"
+            salida.append("\n".join(lineas) + "\n" + rng.choice(CIERRES) + union)
+            if rng.random() < 0.3:
+                salida.append("\n")
+        salida.append("\n\n")
+    return "".join(salida)
+
+
+def generar_casos(cantidad: int, semilla: int = 0, piezas=PIEZAS, largo_max: int = 30) -> list:
+    """Textos cortos al azar: cubren bordes (uniones solapadas, códigos partidos, espacios raros)."""
+    rng = random.Random(semilla)
+    return ["".join(rng.choice(piezas) for _ in range(rng.randint(0, largo_max))) for _ in range(cantidad)]
+
+
+def _git(*args) -> str:
+    return subprocess.run(["git", *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout
+
+
+def cargar_base(nombre: str = "paso2_copy.py", revision: str = None):
+    """Importa un módulo del repo tal como estaba en `revision` (por defecto el primer commit)."""
+    revision = revision or _git("rev-list", "--max-parents=0", "HEAD").split()[0]
+    codigo = _git("show", f"{revision}:{nombre}")
+    modulo_nombre = os.path.splitext(nombre)[0] + "_base"
+    spec = importlib.util.spec_from_loader(modulo_nombre, loader=None)
+    modulo = importlib.util.module_from_spec(spec)
+    exec(compile(codigo, f"{revision[:7]}:{nombre}", "exec"), modulo.__dict__)
+    return modulo
+
+
+def limpiar(modulo, texto: str) -> str:
+    return modulo.limpieza(modulo.limpiar_encabezados(texto, threading.Event()))
+
+
+def medir(funcion, repeticiones: int):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def escribir(nombre: str, contenido) -> None:
+    ruta = os.path.join(FIXTURES, nombre)
+    # newline="" para que el fixture guarde los \n tal cual en cualquier sistema
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        if isinstance(contenido, str):
+            f.write(contenido)
+        else:
+            json.dump(contenido, f, ensure_ascii=False, indent=0)
+    print(f"  {os.path.relpath(ruta, RAIZ)}")
+
+
+def regenerar(base) -> None:
+    os.makedirs(FIXTURES, exist_ok=True)
+    corpus = generar_corpus(PAGINAS_FIXTURE)
+    escribir("corpus.txt", corpus)
+    escribir("limpio.txt", limpiar(base, corpus))
+    escribir("casos_limpieza.json", [{"texto": t, "limpio": limpiar(base, t)} for t in generar_casos(CASOS_FIXTURE)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la limpieza de paso2 (base vs actual)")
+    parser.add_argument("--paginas", type=int, default=300, help="Páginas del corpus sintético")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--regenerar", action="store_true", help="Reescribir los fixtures con la versión base")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    base = cargar_base()
+    if args.regenerar:
+        print("Fixtures regenerados con la versión base:")
+        regenerar(base)
+        return 0
+
+    corpus = generar_corpus(args.paginas)
+    print(f"Corpus: {args.paginas} páginas, {len(corpus) / 1e6:.1f} MB")
+    resultados = {}
+    for etiqueta, modulo in (("base", base), ("actual", paso2_copy)):
+        segundos, resultados[etiqueta] = medir(lambda: limpiar(modulo, corpus), args.repeticiones)
+        print(f"{etiqueta:>6}: {segundos * 1000:8.1f} ms")
+
+    casos = generar_casos(5000, semilla=1)
+    difieren = sum(limpiar(base, t) != limpiar(paso2_copy, t) for t in casos)
+    iguales = resultados["base"] == resultados["actual"] and not difieren
+    print(f"Salida idéntica (corpus + {len(casos)} casos cortos): {'sí' if iguales else f'NO ({difieren} casos)'}")
+    return 0 if iguales else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# bench_preextractor.py
+# REPORTE DE preextractor: cuántos remates se saltan la API y si esos registros están bien
+#
+# Compara preextractor.py del commit que lo agregó (atajo con registro_completo:
+# bastaba con tener todos los campos) con el actual (registro_confiable: además
+# una sola dirección que no sea la del tribunal y montos que cuadren). Por versión cuenta:
+#   - remates que se saltan la API y, de esos, los que tienen un registro
+#     revisado igual al local (correctos) y los demás (erróneos),
+#   - direcciones llenadas y las que no son la esperada (p. ej. la del juzgado).
+# Por defecto usa tests/fixtures/preextractor/remates.json, donde "registro" es
+# el registro revisado a mano (null si el remate debe ir a la API) y "direccion"
+# la dirección esperada. Sale con 1 si la versión actual se salta la API con un
+# registro erróneo o llena una dirección errónea.
+#
+#   python benchmarks/bench_preextractor.py
+#   python benchmarks/bench_preextractor.py --entrada remates_separados.json
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+from bench_limpieza import RAIZ, _git, cargar_base
+
+import preextractor
+
+FIXTURE = os.path.join(RAIZ, "tests", "fixtures", "preextractor", "remates.json")
+
+
+def cargar_base_preextractor():
+    """preextractor.py del commit que lo agregó."""
+    agregado = _git("log", "--diff-filter=A", "--format=%H", "--", "preextractor.py").split()[-1]
+    return cargar_base("preextractor.py", agregado)
+
+
+def registro_local(modulo, texto: str):
+    """El registro con el que la versión cargada se salta la API, o None."""
+    campos = modulo.extraer(texto)
+    if hasattr(modulo, "registro_confiable"):
+        return modulo.registro_confiable(texto, campos)
+    return modulo.registro_completo(campos)
+
+
+def medir(modulo, remates: list) -> dict:
+    saltan = correctos = llenas = erroneas = 0
+    for remate in remates:
+        registro = registro_local(modulo, remate["remate"])
+        if registro is not None:
+            saltan += 1
+            correctos += registro == remate.get("registro")
+        direccion = modulo.extraer(remate["remate"]).get("direccion")
+        llenas += direccion is not None
+        erroneas += "direccion" in remate and direccion != remate["direccion"]
+    return {"saltan": saltan, "correctos": correctos, "llenas": llenas, "erroneas": erroneas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remates que se saltan la API y si sus registros están bien")
+    parser.add_argument("--entrada", help="JSON con remates (id_remate, remate[, registro y direccion esperados])")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    with open(args.entrada or FIXTURE, encoding="utf-8") as f:
+        remates = json.load(f)
+    revisados = sum(1 for r in remates if "registro" in r)
+    print(f"{len(remates)} remates ({revisados} con registro revisado)")
+    resultados = {}
+    for etiqueta, modulo in (("base", cargar_base_preextractor()), ("actual", preextractor)):
+        r = resultados[etiqueta] = medir(modulo, remates)
+        print(f"{etiqueta:>6}: {r['saltan']:3} se saltan la API ({r['saltan'] / len(remates):.0%}), "
+              f"{r['correctos']} correctos y {r['saltan'] - r['correctos']} erróneos | "
+              f"{r['llenas']:3} direcciones llenas, {r['erroneas']} erróneas")
+    if not revisados:
+        print("Sin registros revisados: no se verifica la salida.")
+        return 0
+    actual = resultados["actual"]
+    return 0 if actual["saltan"] == actual["correctos"] and not actual["erroneas"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# bench_prompt_tokens.py
+# BENCHMARK OFFLINE DE TOKENS DE ENTRADA DE paso3: prompt original vs reglas como prefijo de sistema
+#
+# No llama a la API. Arma los mensajes de cada remate con tres versiones de
+# paso3_copy.py: la anterior al commit que agregó INSTRUCCIONES_SISTEMA (reglas +
+# texto en un solo mensaje de usuario), la de ese commit (reglas como mensaje de
+# sistema fijo) y la actual (además, pistas de preextractor, y los remates que
+# preextractor.registro_confiable acepta no llevan prompt) y cuenta:
+#   - tokens de entrada por remate,
+#   - prefijo idéntico entre solicitudes consecutivas, que es lo que la caché
+#     de prompts de OpenAI puede reutilizar (desde 1024 tokens, en bloques de 128),
+#   - costo de entrada de la corrida con calcular_costo (la primera solicitud
+#     paga todo; las demás pagan el prefijo cacheable a precio de caché).
+# Cuenta solo el contenido de los mensajes (ni el formato de chat ni el schema).
+# Los tokens se cuentan con tiktoken si su codificación está disponible; si no,
+# con la misma estimación de 4 caracteres por token que usa el limitador de tasa.
+#
+#   python benchmarks/bench_prompt_tokens.py
+#   python benchmarks/bench_prompt_tokens.py --entrada remates_separados.json --modelo gpt-4.1-nano
+
+import os
+import sys
+import json
+import logging
+import argparse
+from types import SimpleNamespace
+
+from bench_limpieza import FIXTURES, _git, cargar_base
+
+import paso3_copy
+import preextractor
+
+MIN_TOKENS_CACHE = 1024
+BLOQUE_CACHE = 128
+MIN_CARACTERES_REMATE = 300
+
+
+def contador_tokens():
+    """(función texto -> tokens, descripción)."""
+    try:
+        import tiktoken
+        codificacion = tiktoken.get_encoding("o200k_base")
+        return (lambda texto: len(codificacion.encode(texto))), "tiktoken o200k_base"
+    except Exception:
+        return (lambda texto: len(texto) // 4), "estimación de 4 caracteres por token (sin tiktoken)"
+
+
+def remates_de_fixture() -> list:
+    """Remates del corpus de paso2 ya separado (tests/fixtures/paso2/separado_santiago.txt)."""
+    with open(os.path.join(FIXTURES, "separado_santiago.txt"), encoding="utf-8", newline="") as f:
+        bloques = f.read().split("\n\n")
+    return [{"id_remate": i, "remate": b} for i, b in enumerate(bloques, 1) if len(b) >= MIN_CARACTERES_REMATE]
+
+
+def commit_prefijo_sistema() -> str:
+    """Commit que sacó las reglas del prompt de usuario a INSTRUCCIONES_SISTEMA."""
+    return _git("log", "--reverse", "--format=%H", "-S", "INSTRUCCIONES_SISTEMA", "--", "paso3_copy.py").split()[0]
+
+
+def mensajes_de(modulo):
+    """Función texto -> mensajes de la versión de paso3 cargada."""
+    if hasattr(modulo, "generar_mensajes"):
+        return modulo.generar_mensajes
+    return lambda texto: [{"role": "user", "content": modulo.generar_prompt_remate(texto)}]
+
+
+def _texto_solicitud(mensajes) -> str:
+    return "".join(f"{m['role']}\n{m['content']}\n" for m in mensajes)
+
+
+def _prefijo_comun(a: str, b: str) -> str:
+    largo = min(len(a), len(b))
+    i = 0
+    while i < largo and a[i] == b[i]:
+        i += 1
+    return a[:i]
+
+
+def _cacheable(tokens_prefijo: int) -> int:
+    if tokens_prefijo < MIN_TOKENS_CACHE:
+        return 0
+    return tokens_prefijo // BLOQUE_CACHE * BLOQUE_CACHE
+
+
+def mensajes_actuales(texto):
+    """Mensajes de paso3 actual; None si el remate se resuelve sin la API."""
+    if preextractor.registro_confiable(texto, preextractor.extraer(texto)) is not None:
+        return None
+    return paso3_copy.generar_mensajes(texto)
+
+
+def medir(armar_mensajes, textos, contar, modelo) -> dict:
+    entrada = cacheados = locales = 0
+    costo = 0.0
+    anterior = None
+    for texto in textos:
+        mensajes = armar_mensajes(texto)
+        if mensajes is None:
+            locales += 1
+            continue
+        solicitud = _texto_solicitud(mensajes)
+        tokens = contar(solicitud)
+        en_cache = _cacheable(contar(_prefijo_comun(anterior, solicitud))) if anterior else 0
+        entrada += tokens
+        cacheados += en_cache
+        uso = SimpleNamespace(prompt_tokens=tokens, completion_tokens=0,
+                              prompt_tokens_details=SimpleNamespace(cached_tokens=en_cache))
+        costo += paso3_copy.calcular_costo(uso, modelo)
+        anterior = solicitud
+    return {"entrada": entrada / len(textos), "cacheados": cacheados / len(textos), "costo": costo,
+            "locales": locales}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens de entrada de paso3: prompt original vs prefijo de sistema")
+    parser.add_argument("--entrada", help="JSON de paso2 (remates_separados.json); por defecto el fixture de paso2")
+    parser.add_argument("--modelo", default="gpt-4o-mini", help="Modelo para los precios de calcular_costo")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if args.entrada:
+        with open(args.entrada, encoding="utf-8") as f:
+            remates = json.load(f)
+    else:
+        remates = remates_de_fixture()
+    textos = [r["remate_limpio"] for r in paso3_copy.funcion_limpieza_final(remates, None)]
+    contar, descripcion = contador_tokens()
+    commit = commit_prefijo_sistema()
+    versiones = (
+        ("antes", mensajes_de(cargar_base("paso3_copy.py", f"{commit}^"))),
+        ("prefijo", mensajes_de(cargar_base("paso3_copy.py", commit))),
+        ("actual", mensajes_actuales),
+    )
+    print(f"{len(textos)} remates | {descripcion} | precios de {args.modelo}")
+    resultados = {}
+    for etiqueta, armar in versiones:
+        r = resultados[etiqueta] = medir(armar, textos, contar, args.modelo)
+        print(f"{etiqueta:>7}: {r['entrada']:7.0f} tokens de entrada por remate | "
+              f"{r['cacheados']:6.0f} cacheables | {r['entrada'] - r['cacheados']:6.0f} a precio completo | "
+              f"costo de entrada USD {r['costo']:.4f} | {r['locales']} sin API")
+
+    for etiqueta in ("prefijo", "actual"):
+        cambio = resultados[etiqueta]["costo"] / resultados["antes"]["costo"] - 1
+        print(f"Costo de entrada {etiqueta} vs antes: {cambio:+.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# bench_separadores.py
+# BENCHMARK DE LA SEPARACIÓN DE REMATES DE paso2 (pre_separar_remates_fusionados + insertar_separadores)
+#
+# Compara la versión anterior a separadores.py (alternancia completa armada en
+# cada llamada) con la actual (claves compiladas una vez por región y búsqueda
+# solo en los inicios de remate). La del primer commit no sirve de base: con
+# región santiago falla antes de separar. El corpus es la salida de la limpieza
+# sobre el corpus sintético de bench_limpieza.py; se mide por región y se
+# verifica que los cortes sean idénticos.
+# Con --regenerar se reescriben los fixtures de separación en tests/fixtures/paso2.
+#
+#   python benchmarks/bench_separadores.py
+#   python benchmarks/bench_separadores.py --paginas 600 --repeticiones 5
+#   python benchmarks/bench_separadores.py --regenerar
+
+import os
+import sys
+import logging
+import argparse
+
+from bench_limpieza import (FIXTURES, CASOS_FIXTURE, _git, cargar_base, escribir, generar_casos,
+                            generar_corpus, limpiar, medir)
+
+import paso2_copy
+
+REGIONES = ("santiago", "iquique")
+
+# Piezas de los casos cortos: firmas, teléfonos y correos pegados a inicios de remate
+PIEZAS = ("Secretaría", "Secretario(a)", "La Actuaria", "El Actuario", "2 1234 5678", "+56 9 1234 5678",
+          "212345678", "a.b@x.cl", "x@y", "REMATE", "REMATES", "REMATE:", "JUEZ PARTIDOR DON PEDRO",
+          "JUEZ  PARTIDOR X", "CON FECHA 3 HORAS", "HORAS", " ", "  ", "\n", "\n\n", "x", "@", "1", "12",
+          "JUZGADO CIVIL", "12° JUZGADO CIVIL SAN", "VIGÉSIMO", "EXTRACTO", "Extracto", "PARTIDOR",
+          "LICITACIÓN REMATE. CONVENIO", "JUEZ ÁRBITRO A B", "DÉCIMO", "ÁRBITRO PARTIDOR IVÁN MOSCOSO", ".",
+          ",", "Secretaría.", "aSecretaría", "9", "\nExtracto", "\n Extracto de")
+
+
+def cargar_base_separadores():
+    """paso2_copy.py del commit anterior al que agregó separadores.py."""
+    agregado = _git("log", "--diff-filter=A", "--format=%H", "--", "separadores.py").split()[-1]
+    return cargar_base(revision=f"{agregado}^")
+
+
+def separar(modulo, texto: str, region: str) -> str:
+    return modulo.insertar_separadores(modulo.pre_separar_remates_fusionados(texto, region), region)
+
+
+def regenerar(base) -> None:
+    # Entrada: la salida de la limpieza ya guardada por bench_limpieza.py --regenerar
+    with open(os.path.join(FIXTURES, "limpio.txt"), encoding="utf-8", newline="") as f:
+        limpio = f.read()
+    for region in REGIONES:
+        escribir(f"separado_{region}.txt", separar(base, limpio, region))
+    casos = generar_casos(CASOS_FIXTURE, semilla=11, piezas=PIEZAS, largo_max=14)
+    escribir("casos_separadores.json", [{"texto": t, **{r: separar(base, t, r) for r in REGIONES}} for t in casos])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la separación de remates de paso2 (base vs actual)")
+    parser.add_argument("--paginas", type=int, default=300, help="Páginas del corpus sintético")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--regenerar", action="store_true", help="Reescribir los fixtures con la versión base")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    base = cargar_base_separadores()
+    if args.regenerar:
+        print("Fixtures regenerados con la versión base:")
+        regenerar(base)
+        return 0
+
+    limpio = limpiar(paso2_copy, generar_corpus(args.paginas))
+    print(f"Corpus limpio: {args.paginas} páginas, {len(limpio) / 1e6:.1f} MB")
+    iguales = True
+    for region in REGIONES:
+        resultados = {}
+        for etiqueta, modulo in (("base", base), ("actual", paso2_copy)):
+            segundos, resultados[etiqueta] = medir(lambda: separar(modulo, limpio, region), args.repeticiones)
+            print(f"{region:>8} {etiqueta:>6}: {segundos * 1000:8.1f} ms")
+        iguales &= resultados["base"] == resultados["actual"]
+
+    casos = generar_casos(5000, semilla=1, piezas=PIEZAS, largo_max=14)
+    difieren = sum(separar(base, t, r) != separar(paso2_copy, t, r) for t in casos for r in REGIONES)
+    iguales &= not difieren
+    print(f"Cortes idénticos (corpus + {len(casos)} casos cortos): {'sí' if iguales else f'NO ({difieren} casos)'}")
+    return 0 if iguales else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# bitacora.py
+# BITÁCORA JSONL DE PASO3 (resultados parciales, para reanudar)
+#
+# Cada remate terminado se agrega como una línea
+#     {"posicion": 3, "id_remate": 12, "registros": [...], "costo_usd": 0.0004}
+# donde posicion es su índice en la entrada (los id_remate pueden repetirse).
+# apenas llega su respuesta (write + flush + fsync), así un corte, una
+# cancelación o una tanda de 429 no tiran las llamadas ya pagadas. La primera
+# línea es un encabezado con la huella de la entrada: al reanudar con otra
+# entrada se empieza de cero. Una última línea a medio escribir (corte durante
+# el write) se descarta al reanudar.
+# El JSON final se arma leyendo la bitácora por offset, en el orden de la
+# entrada, sin cargarla entera.
+
+import os
+import json
+import hashlib
+from logger import get_logger
+
+logger = get_logger("bitacora", log_dir="logs", log_file="bitacora.log")
+
+VERSION = 2
+
+
+def huella(remates: list) -> str:
+    """Huella de la entrada de paso3 (id_remate + texto de cada remate)."""
+    material = json.dumps([[remate["id_remate"], remate["remate_limpio"]] for remate in remates], ensure_ascii=False)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+def _lineas(ruta: str):
+    """(offset, fin, objeto) por línea válida, hasta la primera que no se pueda leer."""
+    with open(ruta, "rb") as f:
+        offset = 0
+        for linea in f:
+            try:
+                objeto = json.loads(linea)
+            except ValueError:
+                return
+            if not linea.endswith(b"\n"):
+                return
+            yield offset, offset + len(linea), objeto
+            offset += len(linea)
+
+
+def iniciar(ruta: str, huella_entrada: str, reanudar: bool = False) -> set:
+    """
+    Deja la bitácora lista para agregar. Con reanudar y una bitácora de la
+    misma entrada, la conserva (cortando una línea final incompleta) y retorna
+    las posiciones ya hechas; si no, la crea vacía y retorna set().
+    """
+    if reanudar and os.path.exists(ruta):
+        hechos, fin, encabezado = set(), 0, None
+        for _, fin_linea, objeto in _lineas(ruta):
+            if encabezado is None:
+                encabezado = objeto
+                if encabezado.get("huella") != huella_entrada or encabezado.get("version") != VERSION:
+                    break
+            else:
+                hechos.add(objeto["posicion"])
+            fin = fin_linea
+        else:
+            if encabezado is not None:
+                if fin < os.path.getsize(ruta):
+                    logger.warning(f"✂️ Bitácora {ruta}: se descarta una línea final incompleta.")
+                    with open(ruta, "r+b") as f:
+                        f.truncate(fin)
+                logger.info(f"♻️ Reanudando desde {ruta}: {len(hechos)} remates ya procesados.")
+                return hechos
+        logger.warning(f"⚠️ La bitácora {ruta} es de otra entrada; se empieza de cero.")
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": VERSION, "huella": huella_entrada}) + "\n")
+    return set()
+
+
+def agregar(ruta: str, posicion: int, id_remate, registros: list, costo_usd: float = 0.0):
+    """Agrega el remate terminado de esa posición de la entrada y lo baja a disco antes de seguir."""
+    linea = json.dumps({"posicion": posicion, "id_remate": id_remate, "registros": registros, "costo_usd": costo_usd},
+                       ensure_ascii=False)
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(linea + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def registros_en_orden(ruta: str, total: int):
+    """
+    Recorre los registros de la bitácora en el orden de la entrada, posiciones
+    0..total-1 (una pasada para indexar offsets y una lectura por remate). Las
+    posiciones sin línea se saltan.
+    """
+    indice = {}
+    for n, (offset, _, objeto) in enumerate(_lineas(ruta)):
+        if n:
+            indice[objeto["posicion"]] = offset
+    with open(ruta, "rb") as f:
+        for posicion in range(total):
+            offset = indice.get(posicion)
+            if offset is None:
+                continue
+            f.seek(offset)
+            yield from json.loads(f.readline())["registros"]
@@ -0,0 +1,142 @@
+# cache_llm.py
+# CACHÉ PERSISTENTE DE RESPUESTAS DE OPENAI (extracción de remates, paso3)
+#
+# Los avisos de remate se republican varios días seguidos, así que el mismo
+# texto llega a paso3 en varias corridas. Cada respuesta parseada se guarda en
+# SQLite con sus tokens, bajo una clave de contenido:
+#     sha256(texto normalizado, modelo, versión del prompt, versión del esquema)
+# Cambiar el prompt, el esquema o el modelo invalida solo (la clave cambia).
+# Las entradas vencen a los TTL_DIAS y, sobre MAX_ENTRADAS, se desalojan las
+# usadas hace más tiempo (LRU).
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from logger import get_logger
+
+logger = get_logger("cache_llm", log_dir="logs", log_file="cache_llm.log")
+
+RUTA_CACHE = os.path.join("cache_llm", "respuestas.sqlite3")
+TTL_DIAS = 30
+MAX_ENTRADAS = 20_000
+
+_lock = threading.Lock()
+_inicializadas = set()
+
+
+def _conectar(ruta: str) -> sqlite3.Connection:
+    # Llamar con _lock tomado
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30)
+    if ruta not in _inicializadas:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                modelo TEXT,
+                datos TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                creado REAL NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                usos INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON respuestas (ultimo_uso)")
+        conexion.commit()
+        _inicializadas.add(ruta)
+    return conexion
+
+
+def clave(texto: str, modelo: str, version_prompt, version_esquema) -> str:
+    """Clave de contenido: el texto se normaliza (espacios) antes de hashear."""
+    texto_normalizado = " ".join((texto or "").split())
+    material = json.dumps([texto_normalizado, modelo, str(version_prompt), str(version_esquema)], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def leer(clave_cache: str, ruta: str = None, ttl_dias: float = None):
+    """
+    Retorna {"datos", "prompt_tokens", "completion_tokens"} si la clave está
+    en caché y no venció, o None. Marca la entrada como recién usada.
+    """
+    ttl = (ttl_dias if ttl_dias is not None else TTL_DIAS) * 86400
+    ahora = time.time()
+    try:
+        with _lock:
+            conexion = _conectar(ruta or RUTA_CACHE)
+            try:
+                fila = conexion.execute(
+                    "SELECT datos, prompt_tokens, completion_tokens, creado FROM respuestas WHERE clave = ?",
+                    (clave_cache,)
+                ).fetchone()
+                if fila is None:
+                    return None
+                if ahora - fila[3] > ttl:
+                    conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave_cache,))
+                    conexion.commit()
+                    return None
+                conexion.execute("UPDATE respuestas SET ultimo_uso = ?, usos = usos + 1 WHERE clave = ?",
+                                 (ahora, clave_cache))
+                conexion.commit()
+            finally:
+                conexion.close()
+        return {"datos": json.loads(fila[0]), "prompt_tokens": fila[1], "completion_tokens": fila[2]}
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"⚠️ No se pudo leer la caché LLM: {e}")
+        return None
+
+
+def guardar(clave_cache: str, datos: dict, prompt_tokens: int = 0, completion_tokens: int = 0,
+            modelo: str = None, ruta: str = None):
+    """Guarda (o reemplaza) la respuesta parseada de una llamada."""
+    ahora = time.time()
+    try:
+        with _lock:
+            conexion = _conectar(ruta or RUTA_CACHE)
+            try:
+                conexion.execute(
+                    "INSERT OR REPLACE INTO respuestas "
+                    "(clave, modelo, datos, prompt_tokens, completion_tokens, creado, ultimo_uso, usos) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (clave_cache, modelo, json.dumps(datos, ensure_ascii=False),
+                     int(prompt_tokens or 0), int(completion_tokens or 0), ahora, ahora)
+                )
+                conexion.commit()
+            finally:
+                conexion.close()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ No se pudo guardar en la caché LLM: {e}")
+
+
+def desalojar(ttl_dias: float = None, max_entradas: int = None, ruta: str = None) -> int:
+    """
+    Borra las entradas vencidas y, si quedan más de max_entradas, las usadas
+    hace más tiempo. Retorna cuántas se borraron.
+    """
+    ttl = (ttl_dias if ttl_dias is not None else TTL_DIAS) * 86400
+    limite = max_entradas if max_entradas is not None else MAX_ENTRADAS
+    try:
+        with _lock:
+            conexion = _conectar(ruta or RUTA_CACHE)
+            try:
+                borradas = conexion.execute("DELETE FROM respuestas WHERE creado < ?",
+                                            (time.time() - ttl,)).rowcount
+                borradas += conexion.execute(
+                    "DELETE FROM respuestas WHERE clave IN ("
+                    "SELECT clave FROM respuestas ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?)",
+                    (limite,)
+                ).rowcount
+                conexion.commit()
+            finally:
+                conexion.close()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ No se pudo desalojar la caché LLM: {e}")
+        return 0
+
+    if borradas:
+        logger.info(f"🧹 Caché LLM: {borradas} entradas desalojadas.")
+    return borradas
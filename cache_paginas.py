@@ -0,0 +1,138 @@
+# cache_paginas.py
+# CACHÉ EN DISCO DE FRAGMENTOS DEL textLayer (Santiago)
+#
+# Guarda, por edición (URL) y página, la lista cruda de fragmentos
+# (text, top, left, font_size) que consume paso1_copy.procesar_fragmentos.
+# Formato columnar comprimido (.npz): los textos van concatenados en UTF-8
+# con un arreglo de offsets y las coordenadas en float32.
+
+import os
+import hashlib
+import numpy as np
+from logger import get_logger
+
+logger = get_logger("cache_paginas", log_dir="logs", log_file="cache_paginas.log")
+
+CARPETA_CACHE = "cache_paginas"
+LIMITE_CACHE_MB = 200
+
+
+def _clave_edicion(url: str) -> str:
+    url_normalizada = url.strip().split("#", 1)[0].rstrip("/")
+    return hashlib.sha1(url_normalizada.encode("utf-8")).hexdigest()[:16]
+
+
+def _ruta_pagina(url: str, page_num: int) -> str:
+    return os.path.join(CARPETA_CACHE, _clave_edicion(url), f"pagina_{page_num}.npz")
+
+
+def leer_pagina(url: str, page_num: int):
+    """
+    Retorna la lista de fragmentos cacheada para (url, página) o None si no existe.
+    """
+    ruta = _ruta_pagina(url, page_num)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with np.load(ruta, allow_pickle=False) as datos:
+            texto = datos["texto"].tobytes().decode("utf-8")
+            offsets = datos["offsets"].tolist()
+            tops = datos["top"].tolist()
+            lefts = datos["left"].tolist()
+            font_sizes = datos["font_size"].tolist()
+    except Exception as e:
+        logger.warning(f"⚠️ Entrada de caché ilegible ({ruta}): {e}. Se descarta.")
+        _eliminar(ruta)
+        return None
+
+    # Marca de uso para la política de desalojo (LRU por mtime)
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+    return [
+        {'text': texto[offsets[i]:offsets[i + 1]], 'top': tops[i], 'left': lefts[i], 'font_size': font_sizes[i]}
+        for i in range(len(tops))
+    ]
+
+
+def guardar_pagina(url: str, page_num: int, fragmentos: list):
+    """
+    Guarda los fragmentos de una página. Las páginas vacías no se cachean.
+    """
+    if not fragmentos:
+        return
+    ruta = _ruta_pagina(url, page_num)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    textos = [f['text'] for f in fragmentos]
+    offsets = [0]
+    for t in textos:
+        offsets.append(offsets[-1] + len(t))
+
+    try:
+        np.savez_compressed(
+            ruta,
+            texto=np.frombuffer("".join(textos).encode("utf-8"), dtype=np.uint8),
+            offsets=np.array(offsets, dtype=np.int64),
+            top=np.array([f['top'] for f in fragmentos], dtype=np.float32),
+            left=np.array([f['left'] for f in fragmentos], dtype=np.float32),
+            font_size=np.array([f['font_size'] for f in fragmentos], dtype=np.float32),
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo escribir la caché ({ruta}): {e}")
+        return
+
+    desalojar()
+
+
+def paginas_cacheadas(url: str, paginas: int) -> set:
+    """Páginas de 1..paginas que ya están en caché para la edición."""
+    return {p for p in range(1, paginas + 1) if os.path.exists(_ruta_pagina(url, p))}
+
+
+def invalidar_edicion(url: str):
+    """Elimina todas las páginas cacheadas de una edición (refresco forzado)."""
+    carpeta = os.path.join(CARPETA_CACHE, _clave_edicion(url))
+    if not os.path.isdir(carpeta):
+        return
+    for nombre in os.listdir(carpeta):
+        _eliminar(os.path.join(carpeta, nombre))
+    logger.info(f"🧹 Caché invalidada para: {url}")
+
+
+def desalojar(limite_mb: float = None):
+    """
+    Mantiene la carpeta de caché bajo el límite de tamaño eliminando primero
+    las páginas usadas hace más tiempo.
+    """
+    limite = (limite_mb if limite_mb is not None else LIMITE_CACHE_MB) * 1024 * 1024
+    entradas = []
+    for raiz, _, archivos in os.walk(CARPETA_CACHE):
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((st.st_mtime, st.st_size, ruta))
+
+    total = sum(tam for _, tam, _ in entradas)
+    if total <= limite:
+        return
+
+    for _, tam, ruta in sorted(entradas):
+        if total <= limite:
+            break
+        if _eliminar(ruta):
+            total -= tam
+            logger.debug(f"🗑️ Desalojada de caché: {ruta}")
+
+
+def _eliminar(ruta: str) -> bool:
+    try:
+        os.remove(ruta)
+        return True
+    except OSError:
+        return False
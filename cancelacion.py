@@ -0,0 +1,38 @@
+# cancelacion.py
+# EVENTOS DE CANCELACIÓN ANIDADOS
+#
+# El cancel_event de la app cancela todo. Algunas partes necesitan además
+# detener solo su propio trabajo (una edición del lote, el productor de
+# páginas de paso1) sin tocar el evento global: EventoCancelacion se comporta
+# como un threading.Event que también se da por activo cuando lo está su padre.
+
+import time
+import threading
+
+INTERVALO_PADRE_S = 0.2
+
+
+class EventoCancelacion(threading.Event):
+    """
+    threading.Event con padre opcional: is_set() es True si se llamó a set()
+    sobre este evento o si el padre está activo. clear() solo limpia el propio.
+    wait() también vuelve si se activa el padre (lo revisa cada INTERVALO_PADRE_S).
+    """
+
+    def __init__(self, padre=None):
+        super().__init__()
+        self.padre = padre
+
+    def is_set(self) -> bool:
+        return super().is_set() or (self.padre is not None and self.padre.is_set())
+
+    def wait(self, timeout=None) -> bool:
+        if self.padre is None:
+            return super().wait(timeout)
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            restante = INTERVALO_PADRE_S if limite is None else min(INTERVALO_PADRE_S, limite - time.monotonic())
+            if restante <= 0:
+                return False
+            super().wait(restante)
+        return True
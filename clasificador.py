@@ -0,0 +1,107 @@
+# clasificador.py
+# CLASIFICACIÓN DE REMATES POR TIPO DE BIEN (inmueble / vehículo / mueble), EN LOTE
+#
+# Todos los párrafos se pasan a mayúsculas y se unen en un solo texto. Cada
+# palabra clave se busca una vez en ese texto (las que no aparecen se descartan
+# con un `in`, el resto con una expresión de palabra completa que empieza por
+# un literal, que el motor de re busca rápido) y sus coincidencias se asignan
+# a los párrafos por offset en bloque (numpy.searchsorted + unique).
+# Las frases neutras ("POLICÍA LOCAL", "CASA DE MARTILLO") y las frases
+# largas se buscan primero; las palabras que ya cubrieron no se cuentan otra
+# vez (así "MUEBLES" dentro de "BIENES MUEBLES" suma una sola vez).
+
+import re
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+
+SEPARADOR = "\n\n"
+_NEUTRA = None                      # categoría interna de las frases neutras
+REVISAR_CANCELACION_CADA = 10       # palabras clave
+
+
+@lru_cache(maxsize=None)
+def _patrones(categorias: tuple, neutras: tuple) -> list:
+    """
+    [(literal, patrón, categoría, clave, n° de palabras)] con las frases neutras primero y
+    después todas las palabras clave, las más largas primero. En las frases,
+    cada palabra después de la primera va en un grupo (para marcarla ocupada).
+    """
+    entradas = [(frase, _NEUTRA) for frase in neutras]
+    entradas += sorted(
+        ((palabra, nombre) for nombre, palabras in categorias for palabra in palabras),
+        key=lambda e: -len(e[0]),
+    )
+
+    patrones = []
+    for frase, categoria in entradas:
+        palabras = frase.upper().split()
+        clave = " ".join(palabras)
+        # Palabra completa, con plural opcional en la última palabra. El "no hay
+        # letra antes" va después del primer literal para no perder la búsqueda rápida
+        primera = re.escape(palabras[0])
+        patron = re.compile(
+            primera + rf"(?<!\w{primera})"
+            + "".join(rf"\s+({re.escape(p)})" for p in palabras[1:])
+            + r"(?:ES|S)?(?!\w)"
+        )
+        patrones.append((palabras[0], patron, categoria, clave, len(palabras)))
+    return patrones
+
+
+def clasificar_lote(textos: list, categorias: dict, neutras=(), cancel_event=None) -> list:
+    """
+    Clasifica cada texto según la categoría con más palabras clave (en empate
+    gana la que va primero en `categorias`; sin ninguna, categoria=None).
+
+    Retorna, por texto y en el mismo orden:
+        {"categoria": "inmueble", "puntajes": {"inmueble": 3, "vehiculo": 0, ...},
+         "evidencia": {"inmueble": {"CASA": 2, "LOTE": 1}}}
+    o None si se canceló.
+    """
+    patrones = _patrones(tuple((nombre, tuple(palabras)) for nombre, palabras in categorias.items()), tuple(neutras))
+
+    mayusculas = [texto.upper() for texto in textos]
+    largos = np.fromiter((len(texto) + len(SEPARADOR) for texto in mayusculas), dtype=np.int64, count=len(mayusculas))
+    inicios = np.concatenate(([0], np.cumsum(largos)[:-1])) if len(largos) else largos
+    corpus = SEPARADOR.join(mayusculas)
+
+    ocupadas = set()   # inicios de palabra ya cubiertos por una frase contada
+    evidencia = [None] * len(textos)
+    for n, (literal, patron, categoria, clave, n_palabras) in enumerate(patrones, 1):
+        if cancel_event is not None and n % REVISAR_CANCELACION_CADA == 0 and cancel_event.is_set():
+            return None
+        if literal not in corpus:
+            continue
+
+        if n_palabras > 1:
+            posiciones = []
+            for m in patron.finditer(corpus):
+                if m.start() in ocupadas:
+                    continue
+                posiciones.append(m.start())
+                ocupadas.update(m.start(g) for g in range(n_palabras))
+        else:
+            posiciones = [m.start() for m in patron.finditer(corpus)]
+            if ocupadas:
+                posiciones = [p for p in posiciones if p not in ocupadas]
+        if categoria is _NEUTRA or not posiciones:
+            continue
+
+        parrafos, veces = np.unique(np.searchsorted(inicios, posiciones, side="right") - 1, return_counts=True)
+        for indice, cantidad in zip(parrafos.tolist(), veces.tolist()):
+            if evidencia[indice] is None:
+                evidencia[indice] = {}
+            evidencia[indice].setdefault(categoria, Counter())[clave] += cantidad
+
+    resultados = []
+    for conteo in evidencia:
+        conteo = conteo or {}
+        puntajes = {nombre: sum(conteo[nombre].values()) if nombre in conteo else 0 for nombre in categorias}
+        mejor = max(puntajes, key=puntajes.get) if puntajes else None
+        resultados.append({
+            "categoria": mejor if mejor is not None and puntajes[mejor] > 0 else None,
+            "puntajes": puntajes,
+            "evidencia": {nombre: dict(palabras) for nombre, palabras in conteo.items()},
+        })
+    return resultados
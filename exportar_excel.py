@@ -0,0 +1,179 @@
+# exportar_excel.py
+# EXPORTACIÓN A EXCEL EN STREAMING (openpyxl write_only)
+#
+# Las filas se escriben de a una en un libro write_only, que no arma la hoja en
+# memoria: se puede pasar un generador (p.ej. bitacora.registros_en_orden) sin
+# juntar la lista completa ni pasar por pd.json_normalize + DataFrame.
+# Como el encabezado sale primero, las columnas se fijan de antemano: para los
+# remates vienen del esquema de paso3 (columnas_desde_esquema), los demás
+# writers (Macal, House Pricing) pasan su propia lista. Los dict anidados se
+# aplanan con punto, igual que json_normalize ("comentario.link_zoom").
+
+import os
+import math
+import tempfile
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from logger import get_logger
+
+logger = get_logger("exportar_excel", log_dir="logs", log_file="exportar_excel.log")
+
+HOJA_POR_DEFECTO = "Sheet1"  # el nombre que dejaba df.to_excel
+ANCHO_MAXIMO = 60
+
+
+def columnas_desde_esquema(esquema: dict, prefijo: str = "") -> list:
+    """
+    Columnas aplanadas de un JSON schema de objeto, en el orden de sus
+    propiedades: los objetos anidados se expanden como "padre.hijo".
+    """
+    columnas = []
+    for nombre, definicion in esquema.get("properties", {}).items():
+        if definicion.get("type") == "object" and "properties" in definicion:
+            columnas.extend(columnas_desde_esquema(definicion, f"{prefijo}{nombre}."))
+        else:
+            columnas.append(f"{prefijo}{nombre}")
+    return columnas
+
+
+def columnas_de(filas: list, preferidas: list = ()) -> list:
+    """
+    Columnas de filas ya en memoria: primero las preferidas que aparezcan y
+    luego el resto en orden alfabético (el orden que usaba Macal).
+    """
+    presentes = set()
+    for fila in filas:
+        presentes.update(aplanar(fila))
+    primeras = [col for col in preferidas if col in presentes]
+    return primeras + sorted(presentes.difference(primeras))
+
+
+def aplanar(fila: dict, prefijo: str = "") -> dict:
+    """Aplana dict anidados con claves "padre.hijo" (como pd.json_normalize)."""
+    plana = {}
+    for clave, valor in fila.items():
+        if isinstance(valor, dict) and valor:
+            plana.update(aplanar(valor, f"{prefijo}{clave}."))
+        else:
+            plana[f"{prefijo}{clave}"] = valor
+    return plana
+
+
+def _valor_celda(valor):
+    """Lleva un valor a algo que openpyxl acepte (NaN vacío, listas a texto, sin caracteres de control)."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, (list, tuple, dict, set)):
+        valor = str(valor)
+    if isinstance(valor, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", valor)
+    return valor
+
+
+def anchos_por_contenido(filas: list, columnas: list, tope: int = ANCHO_MAXIMO) -> dict:
+    """Ancho por columna según el texto más largo (encabezado incluido), con tope."""
+    anchos = {col: len(str(col)) for col in columnas}
+    for fila in filas:
+        plana = aplanar(fila)
+        for col in columnas:
+            valor = plana.get(col)
+            if valor is not None:
+                anchos[col] = max(anchos[col], len(str(valor)))
+    return {col: min(ancho + 2, tope) for col, ancho in anchos.items()}
+
+
+def _escribir_hoja(libro, nombre: str, filas, columnas: list, anchos: dict = None,
+                   links=(), cancel_event=None):
+    """Filas escritas, o None si se canceló a mitad de la hoja."""
+    hoja = libro.create_sheet(nombre)
+    for col, ancho in (anchos or {}).items():
+        if col in columnas:
+            hoja.column_dimensions[_letra(columnas.index(col))].width = ancho
+
+    hoja.append(columnas)
+    indices_link = {i for i, col in enumerate(columnas) if col in links}
+    total = 0
+    for fila in filas:
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        plana = aplanar(fila)
+        valores = [_valor_celda(plana.get(col)) for col in columnas]
+        for i in indices_link:
+            if isinstance(valores[i], str) and valores[i].startswith("http"):
+                celda = WriteOnlyCell(hoja, value=valores[i])
+                celda.hyperlink = valores[i]
+                celda.style = "Hyperlink"
+                valores[i] = celda
+        hoja.append(valores)
+        total += 1
+    return total
+
+
+def _letra(indice: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _descartar(libro) -> None:
+    # libro.save es lo que cierra las hojas write_only y borra sus temporales:
+    # se guarda en un archivo temporal que se elimina enseguida.
+    descriptor, ruta_temporal = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        libro.save(ruta_temporal)
+    finally:
+        os.remove(ruta_temporal)
+
+
+def escribir_hojas(ruta: str, hojas: list, cancel_event=None):
+    """
+    Escribe un libro con varias hojas. Cada hoja es un dict con
+        nombre, filas (iterable de dict), columnas,
+        y opcionales anchos ({col: ancho}) y links (columnas con URLs clickeables).
+    Los anchos van antes de las filas (write_only no permite volver atrás).
+    Retorna {nombre_hoja: filas_escritas}, o None si se canceló: en ese caso el
+    libro no se guarda (no queda un Excel a medias en ruta).
+    """
+    libro = Workbook(write_only=True)
+    escritas = {}
+    for hoja in hojas:
+        escritas[hoja["nombre"]] = _escribir_hoja(
+            libro, hoja["nombre"], hoja["filas"], hoja["columnas"],
+            anchos=hoja.get("anchos"), links=hoja.get("links", ()), cancel_event=cancel_event
+        )
+        if escritas[hoja["nombre"]] is None:
+            break
+    if cancel_event is not None and cancel_event.is_set():
+        logger.info(f"🛑 Exportación cancelada: no se guarda {ruta}")
+        _descartar(libro)
+        return None
+    if not escritas:
+        libro.create_sheet(HOJA_POR_DEFECTO)
+    libro.save(ruta)
+    logger.debug(f"📗 {ruta}: " + ", ".join(f"{nombre}={n}" for nombre, n in escritas.items()))
+    return escritas
+
+
+def escribir_filas(ruta: str, filas, columnas: list, hoja: str = HOJA_POR_DEFECTO, cancel_event=None):
+    """
+    Escribe una sola hoja fila a fila. Las claves fuera de columnas se ignoran.
+    Retorna cuántas filas escribió, o None si se canceló (sin guardar).
+    """
+    escritas = escribir_hojas(ruta, [{"nombre": hoja, "filas": filas, "columnas": columnas}], cancel_event)
+    return None if escritas is None else escritas[hoja]
+
+
+def columnas_remates(esquema_remate: dict, extras: list = ()) -> list:
+    """
+    Columnas del Excel de remates: id_remate, las del esquema de la IA, los
+    extras (p.ej. edicion/url_edicion del modo lote) y remate_texto al final.
+    """
+    return ["id_remate", *columnas_desde_esquema(esquema_remate), *extras, "remate_texto"]
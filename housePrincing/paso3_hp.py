@@ -3,9 +3,9 @@
 #  Extrae todos la data del JSON y la organiza en hojas separadas (Resumen, Construcciones, Roles, Deudas, Comparables).
 ############################################################################################################################
 
-import pandas as pd
 import os
 from logger import get_logger
+import exportar_excel
 
 # Configurar logger
 logger = get_logger("paso3_excel", log_dir="logs", log_file="paso3_excel.log")
@@ -200,57 +200,29 @@ def generar_excel(lista_datos, cancel_event, nombre_archivo="reporte_final.xlsx"
                     "Link Publicacion": comp.get("link_publicacion", "")
                 })
 
-    # --- CREACIÓN DE DATAFRAMES ---
-    logger.info("💾 Transformando listas a DataFrames...")
-    df_main = pd.DataFrame(data_main)
-    df_constr = pd.DataFrame(data_constr)
-    df_roles = pd.DataFrame(data_roles)
-    df_deudas = pd.DataFrame(data_deudas)
-    df_comps = pd.DataFrame(data_comps)
-    
-    logger.debug(f"   📊 [Resumen] Dimensiones: {df_main.shape}")
-    logger.debug(f"   📊 [Construcciones] Dimensiones: {df_constr.shape}")
-    logger.debug(f"   📊 [Roles Asociados] Dimensiones: {df_roles.shape}")
-    logger.debug(f"   📊 [Deudas TGR (Solo Princ.)] Dimensiones: {df_deudas.shape}")
-    logger.debug(f"   📊 [Comparables] Dimensiones: {df_comps.shape}")
+    # --- ARMADO DE HOJAS ---
+    hojas = [
+        ("Resumen General", data_main),
+        ("Comparables Mercado", data_comps),
+        ("Detalle Construcciones", data_constr),
+        ("Roles Asociados", data_roles),
+        ("Deudas TGR", data_deudas),
+    ]
+    for nombre_hoja, filas in hojas:
+        logger.debug(f"   📊 [{nombre_hoja}] Filas: {len(filas)}")
+    if not data_main:
+        logger.warning("   ⚠️ La hoja 'Resumen General' está vacía.")
 
     try:
         logger.info(f"✍️ Escribiendo archivo físico: {nombre_archivo}")
-        with pd.ExcelWriter(nombre_archivo, engine='openpyxl') as writer:
-            
-            # 1. Resumen
-            if not df_main.empty:
-                logger.debug("   -> Escribiendo hoja 'Resumen General'...")
-                df_main.to_excel(writer, sheet_name="Resumen General", index=False)
-                _ajustar_columnas(writer, "Resumen General", df_main, cancel_event)
-            else:
-                logger.warning("   ⚠️ Dataframe 'Resumen General' está vacío.")
-            
-            # 2. Comparables
-            if not df_comps.empty:
-                logger.debug("   -> Escribiendo hoja 'Comparables Mercado'...")
-                df_comps.to_excel(writer, sheet_name="Comparables Mercado", index=False)
-                _ajustar_columnas(writer, "Comparables Mercado", df_comps, cancel_event)
-            else:
-                logger.debug("   ℹ️ No hay comparables para escribir.")
-
-            # 3. Construcciones
-            if not df_constr.empty:
-                logger.debug("   -> Escribiendo hoja 'Detalle Construcciones'...")
-                df_constr.to_excel(writer, sheet_name="Detalle Construcciones", index=False)
-                _ajustar_columnas(writer, "Detalle Construcciones", df_constr, cancel_event)
-            
-            # 4. Roles Asociados
-            if not df_roles.empty:
-                logger.debug("   -> Escribiendo hoja 'Roles Asociados'...")
-                df_roles.to_excel(writer, sheet_name="Roles Asociados", index=False)
-                _ajustar_columnas(writer, "Roles Asociados", df_roles, cancel_event)
-
-            # 5. Deudas TGR
-            if not df_deudas.empty:
-                logger.debug("   -> Escribiendo hoja 'Deudas TGR'...")
-                df_deudas.to_excel(writer, sheet_name="Deudas TGR", index=False)
-                _ajustar_columnas(writer, "Deudas TGR", df_deudas, cancel_event)
+        escritas = exportar_excel.escribir_hojas(
+            nombre_archivo,
+            [_hoja(nombre_hoja, filas) for nombre_hoja, filas in hojas if filas],
+            cancel_event
+        )
+        if escritas is None:
+            logger.warning("🛑 Proceso cancelado por usuario durante la escritura del Excel.")
+            return False
 
         logger.success(f"✅ Excel completo generado exitosamente: {nombre_archivo}")
         return True
@@ -259,39 +231,16 @@ def generar_excel(lista_datos, cancel_event, nombre_archivo="reporte_final.xlsx"
         logger.error(f"❌ Error FATAL al guardar Excel completo: {e}", exc_info=True)
         return False
 
-def _ajustar_columnas(writer, sheet_name, df, cancel_event):
-    """Función auxiliar para auto-ajustar el ancho de columnas"""
-    logger.debug(f"   🎨 Ajustando formato (Ancho/Links) en: {sheet_name}")
-    worksheet = writer.sheets[sheet_name]
-    
-    for idx, col in enumerate(df.columns):
-        if cancel_event.is_set(): return
-        
-        try:
-            # Calculamos ancho basado en el contenido
-            max_len_data = df[col].astype(str).map(len).max() if not df[col].empty else 0
-            max_len = max(max_len_data, len(str(col))) + 2
-            max_len = min(max_len, 60) # Tope máximo para no hacer columnas kilométricas
-            
-            worksheet.column_dimensions[chr(65 + idx)].width = max_len
-        except Exception as e:
-            logger.debug(f"      ⚠️ No se pudo ajustar ancho col {col}: {e}")
-            pass
-        
-        # Detección de Links para formato azul y clickable
-        if "Link" in str(col):
-            col_letter = chr(65 + idx)
-            # Iteramos sobre las celdas de esa columna (empezando desde fila 2 porque 1 es header)
-            count_links = 0
-            for row_idx in range(2, len(df) + 2):
-                cell = worksheet[f"{col_letter}{row_idx}"]
-                val = cell.value
-                
-                # Si el valor empieza con http, lo hacemos clickable y azul
-                if val and str(val).startswith("http"):
-                    cell.hyperlink = val
-                    cell.style = "Hyperlink" # Estilo nativo de Excel (Azul + Subrayado)
-                    count_links += 1
-            
-            if count_links > 0:
-                logger.debug(f"      🔗 {count_links} hipervínculos formateados en columna {col}")
\ No newline at end of file
+def _hoja(nombre_hoja, filas):
+    """Hoja para exportar_excel: columnas en el orden de las filas, ancho según contenido y Links clickeables"""
+    columnas = list(filas[0].keys())
+    links = [col for col in columnas if "Link" in col]
+    if links:
+        logger.debug(f"      🔗 Columnas con hipervínculos en {nombre_hoja}: {links}")
+    return {
+        "nombre": nombre_hoja,
+        "filas": filas,
+        "columnas": columnas,
+        "anchos": exportar_excel.anchos_por_contenido(filas, columnas),
+        "links": links,
+    }
@@ -9,6 +9,7 @@ import re
 import backoff
 from logger import get_logger
 import os
+import exportar_excel
 
 logger = get_logger("macal", log_dir="logs", log_file="macal.log")
 
@@ -141,7 +142,7 @@ def update_excel_with_new_properties(output_filename: str, new_data: list, id_fi
     df_new = pd.DataFrame(new_data)
 
     if not os.path.exists(output_filename):
-        df_new.to_excel(output_filename, index=False, engine='openpyxl')
+        exportar_excel.escribir_filas(output_filename, new_data, list(df_new.columns))
         logger.info(f"Archivo creado con {len(df_new)} propiedades nuevas.")
         return df_new
 
@@ -165,7 +166,7 @@ def update_excel_with_new_properties(output_filename: str, new_data: list, id_fi
         df_new_unique_aligned = df_new_unique.reindex(columns=all_cols)
 
         df_final = pd.concat([df_existing_aligned, df_new_unique_aligned], ignore_index=True)
-        df_final.to_excel(output_filename, index=False, engine='openpyxl')
+        exportar_excel.escribir_filas(output_filename, df_final.to_dict("records"), list(df_final.columns))
 
         logger.info(f"Archivo actualizado con {len(df_new_unique)} propiedades nuevas (total: {len(df_final)}).")
         return df_final
@@ -308,10 +309,8 @@ def run_extractor_macal(search_url: str, details_url: str, output_folder: str, c
             'disponibilidad', 'mandante', 'liquidador', 'rol_de_avaluo','rol_causa', 'uso_de_suelo',
             'url_propiedad'
         ]
-        final_columns_ordered = [col for col in preferred_order if col in df.columns]
-        remaining_columns = sorted([col for col in df.columns if col not in final_columns_ordered])
-        
-        df = df[final_columns_ordered + remaining_columns]
+        columnas = exportar_excel.columnas_de(extracted_data, preferred_order)
+        df = df[columnas]
 
         # --- CAMBIO: Generar nombre de archivo con fecha y hora ---
         # Si output_folder viene vacía, usa la carpeta actual
@@ -326,7 +325,7 @@ def run_extractor_macal(search_url: str, details_url: str, output_folder: str, c
         filename = f"propiedades_macal_{timestamp}.xlsx"
         full_path = os.path.join(output_folder, filename)
 
-        df.to_excel(full_path, index=False, engine='openpyxl')
+        exportar_excel.escribir_filas(full_path, extracted_data, columnas)
         logger.info(f"Archivo guardado exitosamente: '{full_path}'")
         # ----------------------------------------------------------
         
@@ -5,8 +5,15 @@ import sys
 import os
 from valpoOCR import paso1_regional, paso2_5_regional, paso2_regional, paso3_regional
 import uuid
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from logger import get_logger
+import metricas
+import exportar_excel
+import cancelacion
 
 # --- Bloque para limpieza de archivos finales ---
 import shutil
@@ -29,11 +36,19 @@ def cleanup_temp_files(logger, cancel_event, enable_cleanup: bool = True):
         
         "remates_separados_descartados.json",
         "remates_valparaiso_temp_descartados.json",
+        "remates_separados_revision.json",
+        "remates_valparaiso_temp_revision.json",
 
 
         "remates_valpo_ocr.txt",
         "remates_valpo_temp_descartados.json"
     ]
+
+    # Si paso3 quedó a medias se conserva su entrada, para reanudar con
+    # "python -m remates run ia --input remates_separados.json --resume"
+    if os.path.exists(paso3_copy.ruta_progreso("remates_final")):
+        archivos_a_eliminar.remove("remates_separados.json")
+        logger.info("♻️ El paso 3 quedó a medias: se conserva remates_separados.json para reanudar.")
     
     carpetas_a_eliminar = [
         "temp_cortes_valpo",
@@ -66,43 +81,77 @@ def cleanup_temp_files(logger, cancel_event, enable_cleanup: bool = True):
         except Exception as e:
             logger.warning(f"No se pudo eliminar carpeta {carpeta}: {e}")
 
+REGIONES = {
+    "mercuriovalpo.cl": "valparaiso",
+    "mercurioantofagasta.cl": "antofagasta",
+    "australtemuco.cl": "temuco",
+    "estrellaiquique.cl": "iquique"
+}
+DOMINIOS_REGIONALES = ["mercuriovalpo.cl", "mercurioantofagasta.cl", "elsur.cl", "australtemuco.cl", "estrellaiquique.cl"]
+
+
+def detectar_region(url):
+    """'santiago', la región del diario regional, o None si la URL no es de un diario soportado."""
+    if "digital.elmercurio.com" in url:
+        return "santiago"
+    if any(domain in url for domain in DOMINIOS_REGIONALES):
+        return next((r for k, r in REGIONES.items() if k in url), "concepcion")
+    return None
+
+
 # --- FLUJO 1: EL MERCURIO SANTIAGO (Tu flujo actual) ---
-def flujo_el_mercurio_santiago(url, paginas, columnas, cancel_event, progress_callback, logger):
+def flujo_el_mercurio_santiago(url, paginas, columnas, cancel_event, progress_callback, logger, carpeta_trabajo="",
+                               politica_revision="interactiva", headless=False, workers=None):
     """
     Lógica específica para digital.elmercurio.com (Santiago)
     Usa paso1_copy (Selenium + Capa Texto) y paso2_copy (Regex Santiago).
+    Los archivos intermedios van a carpeta_trabajo (por defecto, el directorio actual).
+    headless y workers (sesiones de Chrome en paralelo) van a paso1_copy.iterar_paginas.
     """
     logger.info("🔵 Iniciando flujo específico: El Mercurio (Santiago)")
     
-    # --- PASO 1: Extracción Web ---
-    logger.info("=" * 20 + " INICIANDO PASO 1: EXTRACCIÓN WEB (SANTIAGO) " + "=" * 20)
+    # --- PASO 1 + 2 EN STREAMING: Extracción Web y Limpieza ---
+    # El navegador corre en un hilo aparte; cada página terminada pasa de inmediato
+    # a la limpieza/separación mientras el navegador avanza a la siguiente.
+    logger.info("=" * 20 + " INICIANDO PASO 1+2: EXTRACCIÓN WEB Y LIMPIEZA (SANTIAGO) " + "=" * 20)
     progress_callback(5, 'Etapa 1: Extrayendo datos web (Santiago)...')
     
-    # Llama a tu extractor original
-    # CORRECCION: Se pasa cancel_event a la funcion
-    ruta_txt_bruto = paso1_copy.run_extractor(url, paginas, columnas, cancel_event)
-    
-    if not ruta_txt_bruto:
-        logger.error("PASO 1 (Santiago) FALLÓ - No se generó archivo TXT.")
-        raise Exception("La extracción web de Santiago falló.")
-    
-    logger.info(f"PASO 1 completado. Archivo generado: {ruta_txt_bruto}")
-
-    # --- PASO 2: Limpieza y Separación ---
-    logger.info("=" * 20 + " INICIANDO PASO 2: LIMPIEZA DE TEXTO (SANTIAGO) " + "=" * 20)
-    progress_callback(33.3, 'Etapa 2: Limpiando y separando texto...')
-    
-    ruta_json_separado = paso2_copy.procesar_remates(cancel_event, ruta_txt_bruto, region="santiago")
+    ruta_txt_bruto = os.path.join(carpeta_trabajo, "remates_extraidos.txt")
+    paginas_stream = paso1_copy.iterar_paginas(url, paginas, columnas, cancel_event, workers=workers,
+                                               output_file=ruta_txt_bruto, headless=headless)
+
+    def con_progreso(stream):
+        for page_num, texto in stream:
+            progress_callback(5 + 28.3 * page_num / paginas, f'Etapa 1-2: Página {page_num}/{paginas} extraída y limpiada...')
+            yield page_num, texto
+
+    with metricas.etapa("paso1_2"):
+        ruta_json_separado = paso2_copy.procesar_remates(
+            cancel_event,
+            "santiago",
+            archivo_final=os.path.join(carpeta_trabajo, "remates_separados.json"),
+            paginas=con_progreso(paginas_stream),
+            carpeta_trabajo=carpeta_trabajo,
+            politica_revision=politica_revision
+        )
     
     return ruta_json_separado, ruta_txt_bruto
 
 
 # --- FLUJO 2: EL MERCURIO REGIONAL (Valparaiso, Antofagasta y Concepcion) ---
-def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, logger, region):
+def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, logger, region, carpeta_trabajo="",
+                               politica_revision="interactiva", guardar_imagenes=None, headless=False):
     """
     Lógica compartida para diarios regionales (Valparaíso, Antofagasta y Concepcion).
-    Recibe el parámetro 'region' para diferenciar configuraciones.
+    Recibe el parámetro 'region' para diferenciar configuraciones. Con
+    carpeta_trabajo, las imágenes, recortes y textos intermedios van ahí en vez
+    de las carpetas temp_* del directorio actual. Las columnas pasan de un paso
+    a otro en memoria; con guardar_imagenes (modo debug) también quedan en disco.
+    Con headless, el Chrome del paso 1 corre sin ventana.
     """
+    def temporal(nombre_por_defecto):
+        return os.path.join(carpeta_trabajo, nombre_por_defecto) if carpeta_trabajo else nombre_por_defecto
+
     logger.info(f"🟢 Iniciando flujo regional: El Mercurio de {region.capitalize()}")
     
     # --- PASO 1: Extracción Web ---
@@ -110,7 +159,11 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
     progress_callback(5, f'Etapa 1: Descargando páginas ({region})...')
     
     # CORRECCIÓN: Pasar cancel_event
-    lista_imagenes, ruta_txt_debug = paso1_regional.run_extractor_ocr(url, paginas, region, cancel_event)
+    with metricas.etapa("paso1") as m:
+        lista_imagenes, ruta_txt_debug = paso1_regional.run_extractor_ocr(
+            url, paginas, region, cancel_event, output_dir=temporal("temp_img_valpo"), headless=headless
+        )
+        m.contar(items=len(lista_imagenes or []))
     
     if cancel_event.is_set(): return None, None
     if not lista_imagenes:
@@ -121,7 +174,11 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
     progress_callback(20, f'Etapa 2: Separando columnas ({region})...')
     
     # CORRECCIÓN: procesar_remates_valpo ya recibía cancel_event, pero aseguramos que lo use bien internamente
-    diccionario_cols = paso2_regional.procesar_remates_valpo(cancel_event, lista_imagenes, region)
+    with metricas.etapa("paso2"):
+        diccionario_cols = paso2_regional.procesar_remates_valpo(
+            cancel_event, lista_imagenes, region, output_folder=temporal("temp_cortes_regional"),
+            guardar_imagenes=guardar_imagenes
+        )
     
     if cancel_event.is_set(): return None, None
     if not diccionario_cols:
@@ -132,7 +189,11 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
     progress_callback(30, 'Etapa 2.5: Filtrando sección Remates...')
     
     # CORRECCIÓN: Pasar cancel_event
-    diccionario_cols_limpio = paso2_5_regional.ejecutar_filtrado(diccionario_cols, region, cancel_event)
+    with metricas.etapa("paso2_5"):
+        diccionario_cols_limpio = paso2_5_regional.ejecutar_filtrado(
+            diccionario_cols, region, cancel_event, output_folder=temporal("temp_filtrados_valpo"),
+            guardar_imagenes=guardar_imagenes
+        )
     
     if cancel_event.is_set(): return None, None
     if not diccionario_cols_limpio:
@@ -144,7 +205,13 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
     
     # CORRECCIÓN: Pasar cancel_event
     logger.info(f"OCR REGION: {region}")
-    ruta_txt_ocr = paso3_regional.orquestador_ocr_valpo(diccionario_cols_limpio, cancel_event, region)
+    with metricas.etapa("paso3_ocr"):
+        ruta_txt_ocr = paso3_regional.orquestador_ocr_valpo(
+            diccionario_cols_limpio, cancel_event, region,
+            output_folder=temporal("temp_tiras_valpo"),
+            ruta_txt_salida=temporal(f"remates_{region}_ocr.txt"),
+            guardar_imagenes=guardar_imagenes
+        )
     
     if cancel_event.is_set(): return None, None
     
@@ -154,12 +221,15 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
     logger.info("=" * 20 + " PASO 4: LIMPIEZA Y ESTRUCTURACIÓN " + "=" * 20)
     progress_callback(75, 'Etapa 4: Limpiando texto y revisión humana...')
 
-    ruta_json_final = paso2_copy.procesar_remates(
-        cancel_event,
-        region,
-        ruta_txt_ocr, 
-        archivo_final=f"remates_{region}_temp.json" 
-    )
+    with metricas.etapa("paso2_texto"):
+        ruta_json_final = paso2_copy.procesar_remates(
+            cancel_event,
+            region,
+            ruta_txt_ocr, 
+            archivo_final=temporal(f"remates_{region}_temp.json"),
+            carpeta_trabajo=carpeta_trabajo,
+            politica_revision=politica_revision
+        )
 
     if not ruta_json_final:
         logger.warning("⚠️ El usuario canceló o no se generó el JSON final.")
@@ -169,7 +239,15 @@ def flujo_el_mercurio_regional(url, paginas, cancel_event, progress_callback, lo
 
 
 # --- ORQUESTADOR PRINCIPAL (Dispatcher) ---
-def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup, progress_callback):
+def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup, progress_callback,
+                          politica_revision="interactiva", modo_ia="sincrono", headless=False, workers=None):
+    """
+    Corre una edición de punta a punta. Con politica_revision "auto" o
+    "auto_reporte" no abre ninguna ventana (ver remates.py) y no abre el Excel al final.
+    modo_ia="batch" usa la Batch API de OpenAI en el paso 3 (para backfills).
+    headless corre Chrome sin ventana (cron/CI); workers son las sesiones de
+    Chrome en paralelo de Santiago (None = paso1_copy.WORKERS_PARALELOS).
+    """
     logger = get_logger("main", log_dir="logs", log_file="orquestador.log")
 
     logger.info("===== INICIO DEL PROCESO CENTRALIZADO =====")
@@ -178,28 +256,32 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
     ruta_json_separado = None
     ruta_txt_bruto = None
     region = "santiago"
-    
-    regions = {
-        "mercuriovalpo.cl": "valparaiso",
-        "mercurioantofagasta.cl": "antofagasta",
-        "australtemuco.cl": "temuco",
-        "estrellaiquique.cl": "iquique"
-    }
+    estado_corrida = "error"
+
+    # Nombre base de los archivos de salida (JSON, Excel y métricas de la corrida)
+    fecha_str = datetime.now().strftime("%d-%m-%Y")
+    uuid_str = uuid.uuid4().hex[:6]
+    metricas.iniciar_corrida(url=url, paginas=paginas, columnas=columnas)
 
     try:
         # 1. ENRUTAMIENTO INTELIGENTE
-        if "digital.elmercurio.com" in url:
+        region_url = detectar_region(url)
+        if region_url == "santiago":
             # ---> Flujo Santiago
             ruta_json_separado, ruta_txt_bruto = flujo_el_mercurio_santiago(
-                url, paginas, columnas, cancel_event, progress_callback, logger
+                url, paginas, columnas, cancel_event, progress_callback, logger,
+                politica_revision=politica_revision, headless=headless, workers=workers
             )
         
-        elif any(domain in url for domain in ["mercuriovalpo.cl", "mercurioantofagasta.cl", "elsur.cl", "australtemuco.cl", "estrellaiquique.cl"]):
+        elif region_url:
 
-            region = next((r for k, r in regions.items() if k in url), "concepcion")
+            region = region_url
             
             ruta_json_separado, ruta_txt_bruto = flujo_el_mercurio_regional(
-                url, paginas, cancel_event, progress_callback, logger, region
+                url, paginas, cancel_event, progress_callback, logger, region,
+                politica_revision=politica_revision,
+                guardar_imagenes=not enable_cleanup,  # modo desarrollo: recortes y tiras quedan en disco
+                headless=headless
             )
             
             if not ruta_json_separado:
@@ -209,7 +291,7 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
         else:
             logger.error(f"URL no reconocida: {url}")
             raise Exception(
-                f"La URL no corresponde a un diario soportado. Regiones soportadas: {', '.join(regions.keys())}."
+                f"La URL no corresponde a un diario soportado. Regiones soportadas: {', '.join(REGIONES.keys())}."
             )
 
 
@@ -228,11 +310,13 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
         progress_callback(66.6, 'Etapa 3: Analizando con IA...')
         
         # paso3_copy es el procesador de IA
-        ruta_json_final, ruta_excel_final = paso3_copy.run_processor(
-            cancel_event, 
-            ruta_json_separado, 
-            progress_callback
-        )
+        with metricas.etapa("paso3"):
+            ruta_json_final, ruta_excel_final = paso3_copy.run_processor(
+                cancel_event, 
+                ruta_json_separado, 
+                progress_callback,
+                modo=modo_ia
+            )
         
         if cancel_event.is_set():
             logger.warning("Proceso cancelado por el usuario durante el paso 3.")
@@ -245,8 +329,6 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
 
             # Prefijo para diferenciar en el nombre del archivo
             prefix = region.upper()
-            fecha_str = datetime.now().strftime("%d-%m-%Y")
-            uuid_str = uuid.uuid4().hex[:6]
             base_name = f"remates_{prefix}_{fecha_str}-{uuid_str}"
 
             nuevo_json = os.path.join("outputs", f"{base_name}.json")
@@ -257,6 +339,9 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
                 os.rename(ruta_json_final, nuevo_json)
             if os.path.exists(ruta_excel_final):
                 os.rename(ruta_excel_final, nuevo_excel)
+            ruta_reporte = paso2_copy.ruta_reporte_revision(ruta_json_separado)
+            if os.path.exists(ruta_reporte):
+                os.replace(ruta_reporte, os.path.join("outputs", f"{base_name}_revision.json"))
 
             # Eliminar temporales (si aplica)
             for tmp_file in [ruta_txt_bruto, ruta_json_separado]:
@@ -275,12 +360,14 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
             logger.info(f"PASO 3 completado.")
             logger.info(f"Archivos finales guardados en 'outputs':\n  - {nuevo_json}\n  - {nuevo_excel}")
             
-            # Intentar abrir el Excel automáticamente al finalizar
-            try:
-                os.startfile(nuevo_excel)
-            except:
-                pass
-
+            # Intentar abrir el Excel automáticamente al finalizar (solo con alguien mirando)
+            if politica_revision == "interactiva":
+                try:
+                    os.startfile(nuevo_excel)
+                except:
+                    pass
+
+            estado_corrida = "ok"
             logger.info("🎉 ¡PROCESO FINALIZADO CON ÉXITO! 🎉")
         else:
             logger.error("PASO 3 FALLÓ - No se generaron archivos finales")
@@ -291,9 +378,262 @@ def orquestador_con_datos(url, paginas, columnas, cancel_event, enable_cleanup,
         # Re-lanzamos la excepción para que app.py pueda mostrar el mensaje de error en la UI
         raise e
     finally:
+        # Métricas de la corrida (también si falló o se canceló)
+        try:
+            metricas.anotar(region=region, estado="cancelado" if cancel_event.is_set() else estado_corrida)
+            ruta_metricas = metricas.guardar(
+                os.path.join("outputs", f"remates_{region.upper()}_{fecha_str}-{uuid_str}_metricas.json")
+            )
+            logger.info(f"📊 Métricas de la corrida: {ruta_metricas}")
+        except Exception as e:
+            logger.warning(f"No se pudieron guardar las métricas: {e}")
+
         # CORRECCION: Se pasa cancel_event a cleanup_temp_files
         cleanup_temp_files(logger, cancel_event, enable_cleanup)
         logger.info("===== FIN DEL PROCESO =====\n")
+
+
+# --- MODO LOTE: VARIAS EDICIONES EN UNA CORRIDA ---
+# Cada edición corre en su propio hilo y en su propia carpeta de trabajo
+# (temp_lote/NN_region/), así las descargas, el OCR y la IA de distintas
+# ediciones avanzan en paralelo. Solo las ventanas de revisión humana se
+# muestran de a una (paso2_copy.TURNO_REVISION). Cada edición tiene además su
+# propio evento de cancelación (hijo del global): cerrar la ventana de revisión
+# de una edición cancela esa edición y no las demás.
+CARPETA_LOTE = "temp_lote"
+MAX_EDICIONES_CONCURRENTES = 3
+
+
+def _normalizar_campo(valor):
+    return re.sub(r"\W+", " ", str(valor or "")).strip().upper()
+
+
+def deduplicar_propiedades(propiedades):
+    """
+    Quita las propiedades repetidas entre ediciones (el mismo aviso sale varios
+    días y en varios diarios). Dos registros son el mismo remate si coinciden
+    en texto + dirección + nombre, o en causa + tribunal + dirección + fecha.
+    Se conserva la primera aparición (el orden de los trabajos).
+    """
+    vistos = set()
+    unicas = []
+    for propiedad in propiedades:
+        direccion = _normalizar_campo(propiedad.get("direccion"))
+        claves = [("texto", _normalizar_campo(propiedad.get("remate_texto")), direccion,
+                   _normalizar_campo(propiedad.get("nombre_propiedad")))]
+        causa = _normalizar_campo(propiedad.get("causa"))
+        if causa and direccion:
+            claves.append(("causa", causa, _normalizar_campo(propiedad.get("tribunal")), direccion,
+                           _normalizar_campo(propiedad.get("fecha_remate"))))
+
+        if any(clave in vistos for clave in claves):
+            continue
+        vistos.update(claves)
+        unicas.append(propiedad)
+    return unicas
+
+
+def _procesar_edicion(trabajo, cancel_event, progress_callback, logger, politica_revision="interactiva",
+                      modo_ia="sincrono", headless=False):
+    """
+    Corre una edición del lote de punta a punta (extracción, limpieza, revisión
+    humana e IA) dentro de su carpeta de trabajo. cancel_event es el de la
+    edición. Retorna las propiedades extraídas, o None si se canceló.
+    """
+    url, paginas, columnas = trabajo["url"], trabajo["paginas"], trabajo["columnas"]
+    region, etiqueta, carpeta = trabajo["region"], trabajo["etiqueta"], trabajo["carpeta"]
+    os.makedirs(carpeta, exist_ok=True)
+    logger.info(f"📰 [{etiqueta}] Iniciando edición: {url} ({paginas} páginas)")
+
+    # Todo lo que registre la edición (también sus hilos worker) queda bajo lote.<etiqueta>
+    with metricas.contexto(f"lote.{etiqueta}"), metricas.etapa(f"lote.{etiqueta}"):
+        if region == "santiago":
+            ruta_json_separado, _ = flujo_el_mercurio_santiago(
+                url, paginas, columnas, cancel_event, progress_callback, logger, carpeta_trabajo=carpeta,
+                politica_revision=politica_revision, headless=headless
+            )
+        else:
+            ruta_json_separado, _ = flujo_el_mercurio_regional(
+                url, paginas, cancel_event, progress_callback, logger, region, carpeta_trabajo=carpeta,
+                politica_revision=politica_revision, headless=headless
+            )
+
+        if cancel_event.is_set() or not ruta_json_separado:
+            return None
+
+        progress_callback(66.6, 'Etapa 3: Analizando con IA...')
+        with metricas.etapa("paso3"):
+            ruta_json_final, _ = paso3_copy.run_processor(
+                cancel_event,
+                ruta_json_separado,
+                progress_callback,
+                output_prefix=os.path.join(carpeta, "remates_final"),
+                modo=modo_ia
+            )
+
+    if cancel_event.is_set():
+        return None
+    if not ruta_json_final:
+        raise Exception("El procesamiento con IA (Paso 3) falló.")
+
+    trabajo["reporte_revision"] = paso2_copy.ruta_reporte_revision(ruta_json_separado)
+    with open(ruta_json_final, "r", encoding="utf-8") as f:
+        propiedades = json.load(f)
+    for propiedad in propiedades:
+        propiedad["edicion"] = etiqueta
+        propiedad["url_edicion"] = url
+
+    logger.info(f"✅ [{etiqueta}] Edición terminada: {len(propiedades)} propiedades.")
+    return propiedades
+
+
+def orquestador_lote(trabajos, cancel_event, enable_cleanup, progress_callback,
+                     max_concurrentes: int = MAX_EDICIONES_CONCURRENTES, politica_revision="interactiva",
+                     modo_ia="sincrono", headless=False):
+    """
+    Procesa varias ediciones en una sola corrida. `trabajos` es una lista de
+    (url, paginas, columnas). Las ediciones corren en paralelo (hasta
+    max_concurrentes) y sus resultados se unen, sin duplicados, en un solo
+    outputs/remates_LOTE_<fecha>-<id>.json/.xlsx.
+
+    Retorna {"json", "excel", "ediciones": [{"url", "edicion", "estado", "propiedades", "error"}]}
+    o None si se canceló el lote (o todas sus ediciones). Una edición que falla
+    o se cancela no detiene a las demás; su estado queda "error" o "cancelada".
+    politica_revision, modo_ia y headless funcionan igual que en orquestador_con_datos.
+    """
+    logger = get_logger("main", log_dir="logs", log_file="orquestador.log")
+
+    logger.info("===== INICIO DEL PROCESO EN LOTE =====")
+    logger.info(f"Ediciones recibidas: {len(trabajos)} | Concurrencia: {max_concurrentes}")
+
+    fecha_str = datetime.now().strftime("%d-%m-%Y")
+    uuid_str = uuid.uuid4().hex[:6]
+    base_name = f"remates_LOTE_{fecha_str}-{uuid_str}"
+    metricas.iniciar_corrida(lote=[{"url": u, "paginas": p, "columnas": c} for u, p, c in trabajos])
+
+    # 1. Validación y enrutamiento (antes de abrir ningún navegador)
+    ediciones = []
+    for indice, (url, paginas, columnas) in enumerate(trabajos, 1):
+        region = detectar_region(url)
+        if region is None:
+            raise Exception(
+                f"La URL no corresponde a un diario soportado: {url}. Regiones soportadas: {', '.join(REGIONES.keys())}."
+            )
+        etiqueta = f"{indice:02d}_{region}"
+        ediciones.append({
+            "url": url, "paginas": paginas, "columnas": columnas, "region": region,
+            "etiqueta": etiqueta, "carpeta": os.path.join(CARPETA_LOTE, f"{etiqueta}_{uuid_str}"),
+            "cancel_event": cancelacion.EventoCancelacion(cancel_event),
+        })
+
+    # El avance total es el promedio del avance de cada edición
+    avance = {e["etiqueta"]: 0.0 for e in ediciones}
+    lock_avance = threading.Lock()
+
+    def progreso_de(etiqueta):
+        def callback(porcentaje, mensaje):
+            with lock_avance:
+                avance[etiqueta] = porcentaje
+                total = sum(avance.values()) / len(avance)
+            progress_callback(round(total, 1), f"[{etiqueta}] {mensaje}")
+        return callback
+
+    resultados = {}
+    estado_corrida = "error"
+    try:
+        # 2. Ediciones en paralelo
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrentes, len(ediciones)))) as executor:
+            futuros = {
+                executor.submit(_procesar_edicion, e, e["cancel_event"], progreso_de(e["etiqueta"]), logger,
+                                politica_revision, modo_ia, headless): e
+                for e in ediciones
+            }
+            for futuro in as_completed(futuros):
+                edicion = futuros[futuro]
+                try:
+                    propiedades = futuro.result()
+                    if propiedades is None:
+                        logger.warning(f"🛑 [{edicion['etiqueta']}] Edición cancelada.")
+                        edicion["cancelada"] = True
+                    else:
+                        resultados[edicion["etiqueta"]] = propiedades
+                except Exception as e:
+                    logger.exception(f"❌ [{edicion['etiqueta']}] Error en la edición: {e}")
+                    edicion["error"] = str(e)
+
+        if cancel_event.is_set() or all(e.get("cancelada") for e in ediciones):
+            logger.warning("Proceso en lote cancelado por el usuario.")
+            return None
+
+        if not resultados:
+            raise Exception("Ninguna edición del lote terminó correctamente.")
+
+        # 3. Unión sin duplicados, en el orden de los trabajos
+        todas = [p for e in ediciones for p in (resultados.get(e["etiqueta"]) or [])]
+        propiedades = deduplicar_propiedades(todas)
+        logger.info(f"🧬 Unión del lote: {len(todas)} propiedades -> {len(propiedades)} sin duplicados.")
+        metricas.contar("lote.union", items=len(todas), unicas=len(propiedades))
+
+        # 4. Guardado
+        progress_callback(99, 'Uniendo ediciones y guardando archivos...')
+        os.makedirs("outputs", exist_ok=True)
+        nuevo_json = os.path.join("outputs", f"{base_name}.json")
+        nuevo_excel = os.path.join("outputs", f"{base_name}.xlsx")
+
+        with open(nuevo_json, "w", encoding="utf-8") as f:
+            json.dump(propiedades, f, ensure_ascii=False, indent=2)
+
+        if not propiedades:
+            logger.warning("El lote no generó propiedades, el archivo Excel estará vacío.")
+        columnas = exportar_excel.columnas_remates(
+            paso3_copy.REMATE_SCHEMA["properties"]["remates"]["items"], extras=["edicion", "url_edicion"])
+        exportar_excel.escribir_filas(nuevo_excel, propiedades, columnas)
+
+        for edicion in ediciones:
+            ruta_reporte = edicion.get("reporte_revision")
+            if ruta_reporte and os.path.exists(ruta_reporte):
+                os.replace(ruta_reporte, os.path.join("outputs", f"{base_name}_{edicion['etiqueta']}_revision.json"))
+
+        logger.info(f"Archivos finales del lote guardados en 'outputs':\n  - {nuevo_json}\n  - {nuevo_excel}")
+        if politica_revision == "interactiva":
+            try:
+                os.startfile(nuevo_excel)
+            except:
+                pass
+
+        estado_corrida = "ok" if len(resultados) == len(ediciones) else "parcial"
+        logger.info(f"🎉 ¡LOTE FINALIZADO ({estado_corrida.upper()})! 🎉")
+        return {
+            "json": nuevo_json,
+            "excel": nuevo_excel,
+            "ediciones": [{
+                "url": e["url"],
+                "edicion": e["etiqueta"],
+                "estado": "error" if "error" in e else "cancelada" if e.get("cancelada") else "ok",
+                "propiedades": len(resultados.get(e["etiqueta"]) or []),
+                "error": e.get("error"),
+            } for e in ediciones],
+        }
+
+    finally:
+        try:
+            metricas.anotar(estado="cancelado" if cancel_event.is_set() else estado_corrida)
+            ruta_metricas = metricas.guardar(os.path.join("outputs", f"{base_name}_metricas.json"))
+            logger.info(f"📊 Métricas del lote: {ruta_metricas}")
+        except Exception as e:
+            logger.warning(f"No se pudieron guardar las métricas: {e}")
+
+        if enable_cleanup:
+            for edicion in ediciones:
+                shutil.rmtree(edicion["carpeta"], ignore_errors=True)
+            try:
+                os.rmdir(CARPETA_LOTE)   # solo si quedó vacía (otro lote puede estar corriendo)
+            except OSError:
+                pass
+        else:
+            logger.info("Limpieza de archivos desactivada (modo desarrollo).")
+        logger.info("===== FIN DEL PROCESO EN LOTE =====\n")
+
 # --- Bloque para mantener funcionalidad CLI ---
 if __name__ == "__main__":
     # Dummy cancel event para pruebas CLI
@@ -0,0 +1,236 @@
+# metricas.py
+# MÉTRICAS ESTRUCTURADAS POR ETAPA (tiempo, items, bytes, llamadas externas)
+#
+# Uso en los módulos de cada paso:
+#
+#     with metricas.etapa("paso1") as m:          # etapa de primer nivel
+#         with metricas.etapa("login"):           # sub-paso -> "paso1.login"
+#             ...
+#         m.contar(items=len(paginas), bytes=n)
+#
+#     @metricas.medir("paso3.openai")             # decorador (nombre absoluto)
+#     def extraer_datos_remate(...): ...
+#
+#     metricas.llamada_externa("google_vision")   # se suma a la etapa activa del hilo
+#
+# Los nombres sin punto se anidan bajo la etapa activa del hilo; con punto son
+# absolutos (útil en hilos worker, que no heredan la pila del hilo principal).
+#
+# En un lote, cada edición corre dentro de un contexto que antepone su prefijo
+# a todas las rutas del hilo, con o sin punto:
+#
+#     with metricas.contexto("lote.01_santiago"):
+#         metricas.contar("paso1.espera_pagina")  # -> "lote.01_santiago.paso1.espera_pagina"
+#         executor.submit(metricas.heredar(worker), ...)  # el worker usa el mismo prefijo
+#
+# Al final de cada corrida main.py escribe el JSON en outputs/.
+
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+_lock = threading.Lock()
+_local = threading.local()
+_corrida = {"contexto": {}, "inicio": time.time(), "etapas": {}}
+
+
+def iniciar_corrida(**contexto):
+    """Reinicia el registro para una corrida nueva (url, región, páginas, etc.)."""
+    global _corrida
+    with _lock:
+        _corrida = {"contexto": dict(contexto), "inicio": time.time(), "etapas": {}}
+
+
+def _pila():
+    if not hasattr(_local, "pila"):
+        _local.pila = []
+    return _local.pila
+
+
+def _con_prefijo(ruta: str) -> str:
+    # Las rutas que ya traen el prefijo del contexto (las de la pila) quedan igual
+    prefijo = getattr(_local, "prefijo", None)
+    if not prefijo or ruta == prefijo or ruta.startswith(prefijo + "."):
+        return ruta
+    return f"{prefijo}.{ruta}"
+
+
+def _ruta(nombre: str) -> str:
+    pila = _pila()
+    if "." in nombre or not pila:
+        return _con_prefijo(nombre)
+    return f"{pila[-1]}.{nombre}"
+
+
+@contextmanager
+def contexto(prefijo: str):
+    """Antepone prefijo a todas las rutas que registre el hilo dentro del bloque."""
+    anterior = getattr(_local, "prefijo", None)
+    _local.prefijo = _con_prefijo(prefijo)
+    try:
+        yield
+    finally:
+        _local.prefijo = anterior
+
+
+def heredar(func):
+    """
+    Envuelve func para que corra con el prefijo de contexto del hilo que la
+    envuelve (para executor.submit / threading.Thread dentro de un contexto).
+    """
+    prefijo = getattr(_local, "prefijo", None)
+    if prefijo is None:
+        return func
+
+    @functools.wraps(func)
+    def envoltura(*args, **kwargs):
+        with contexto(prefijo):
+            return func(*args, **kwargs)
+    return envoltura
+
+
+def _registro(ruta: str) -> dict:
+    # Llamar con _lock tomado
+    reg = _corrida["etapas"].get(ruta)
+    if reg is None:
+        reg = {"ejecuciones": 0, "tiempo_s": 0.0, "tiempo_min_s": None, "tiempo_max_s": 0.0,
+               "items": 0, "bytes": 0, "errores": 0, "externas": {}, "contadores": {}}
+        _corrida["etapas"][ruta] = reg
+    return reg
+
+
+def _ruta_activa(ruta: str = None) -> str:
+    return _con_prefijo(ruta or (_pila()[-1] if _pila() else "sin_etapa"))
+
+
+def contar(ruta: str = None, items: int = 0, bytes: int = 0, **contadores):
+    """
+    Suma items/bytes y contadores libres (ej. tokens_entrada=...) a una etapa.
+    Sin ruta usa la etapa activa del hilo.
+    """
+    ruta = _ruta_activa(ruta)
+    with _lock:
+        reg = _registro(ruta)
+        reg["items"] += items
+        reg["bytes"] += bytes
+        for clave, n in contadores.items():
+            reg["contadores"][clave] = reg["contadores"].get(clave, 0) + n
+
+
+def llamada_externa(servicio: str, n: int = 1, ruta: str = None):
+    """Registra n llamadas a un servicio externo (selenium, tesseract, google_vision, openai...)."""
+    ruta = _ruta_activa(ruta)
+    with _lock:
+        reg = _registro(ruta)
+        reg["externas"][servicio] = reg["externas"].get(servicio, 0) + n
+
+
+def anotar(**contexto):
+    """Agrega datos de contexto a la corrida (región, estado final, etc.)."""
+    with _lock:
+        _corrida["contexto"].update(contexto)
+
+
+class _Etapa:
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def contar(self, items: int = 0, bytes: int = 0, **contadores):
+        contar(self.ruta, items=items, bytes=bytes, **contadores)
+
+    def llamada_externa(self, servicio: str, n: int = 1):
+        llamada_externa(servicio, n, self.ruta)
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Mide el tiempo de pared de un bloque y lo acumula en la etapa."""
+    ruta = _ruta(nombre)
+    pila = _pila()
+    pila.append(ruta)
+    t0 = time.perf_counter()
+    error = False
+    try:
+        yield _Etapa(ruta)
+    except BaseException:
+        error = True
+        raise
+    finally:
+        duracion = time.perf_counter() - t0
+        pila.pop()
+        with _lock:
+            reg = _registro(ruta)
+            reg["ejecuciones"] += 1
+            reg["tiempo_s"] += duracion
+            reg["tiempo_max_s"] = max(reg["tiempo_max_s"], duracion)
+            reg["tiempo_min_s"] = duracion if reg["tiempo_min_s"] is None else min(reg["tiempo_min_s"], duracion)
+            if error:
+                reg["errores"] += 1
+
+
+def medir(nombre: str):
+    """Decorador equivalente a envolver la función en `with etapa(nombre)`."""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            with etapa(nombre):
+                return func(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def envolver_llamadas(modulo, funciones, servicio: str):
+    """
+    Cuenta como llamada externa cada invocación de modulo.<funcion> (ej. las de
+    pytesseract), atribuida a la etapa activa del hilo que la hace.
+    """
+    for nombre in funciones:
+        original = getattr(modulo, nombre)
+        if getattr(original, "_metricas_servicio", None):
+            continue
+
+        @functools.wraps(original)
+        def envoltura(*args, __original=original, **kwargs):
+            llamada_externa(servicio)
+            return __original(*args, **kwargs)
+
+        envoltura._metricas_servicio = servicio
+        setattr(modulo, nombre, envoltura)
+
+
+def resumen() -> dict:
+    with _lock:
+        etapas = json.loads(json.dumps(_corrida["etapas"]))
+        contexto = dict(_corrida["contexto"])
+        inicio = _corrida["inicio"]
+
+    for reg in etapas.values():
+        reg["tiempo_s"] = round(reg["tiempo_s"], 4)
+        reg["tiempo_max_s"] = round(reg["tiempo_max_s"], 4)
+        if reg["tiempo_min_s"] is not None:
+            reg["tiempo_min_s"] = round(reg["tiempo_min_s"], 4)
+        if reg["items"] and reg["tiempo_s"] > 0:
+            reg["items_por_s"] = round(reg["items"] / reg["tiempo_s"], 3)
+        if reg["bytes"] and reg["tiempo_s"] > 0:
+            reg["mb_por_s"] = round(reg["bytes"] / reg["tiempo_s"] / (1024 * 1024), 3)
+
+    return {
+        "corrida": {
+            **contexto,
+            "inicio": datetime.fromtimestamp(inicio).isoformat(timespec="seconds"),
+            "duracion_s": round(time.time() - inicio, 3),
+        },
+        "etapas": dict(sorted(etapas.items())),
+    }
+
+
+def guardar(ruta_json: str) -> str:
+    """Escribe el resumen de la corrida en JSON. Retorna la ruta."""
+    os.makedirs(os.path.dirname(ruta_json) or ".", exist_ok=True)
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        json.dump(resumen(), f, indent=4, ensure_ascii=False)
+    return ruta_json
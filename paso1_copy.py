@@ -20,21 +20,692 @@ from selenium.common.exceptions import (
     ElementClickInterceptedException,
     WebDriverException,
 )
+import io
 import tempfile
 import shutil
+import requests
+import pdfplumber
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from collections import Counter
+import numpy as np
+import cache_paginas
+import cancelacion
+import metricas
+import sesiones
 
-# SE AGREGA cancel_event A LOS ARGUMENTOS
-def run_extractor(url: str, paginas: int, columnas: int, cancel_event):
-    from logger import get_logger, log_section, dbg
+# --------------------------------------------------------------------------
+# CAPTURA DE LA CAPA DE TEXTO (textLayer)
+# --------------------------------------------------------------------------
+# "bulk": un solo execute_script devuelve todos los fragmentos de la página.
+# "dom":  recorre div por div (2 round trips de WebDriver por fragmento).
+# "pdf":  descarga el PDF de la página y extrae el texto en Python (ver motor "pdf").
+MODO_CAPTURA = "bulk"
 
-    logger = get_logger("paso1", log_dir="logs", log_file="paso1.log")
-    logger.info("Ejecutando Paso 1...")
+RE_TOP = re.compile(r'top:\s*([\d\.]+)px')
+RE_LEFT = re.compile(r'left:\s*([\d\.]+)px')
+RE_FONT_SIZE = re.compile(r'font-size:\s*([\d\.]+)px')
 
-    # --------------------------------------------------------------------------
-    # CONFIGURACIÓN DEL NAVEGADOR
-    # --------------------------------------------------------------------------
+# Mismas expresiones que RE_TOP / RE_LEFT / RE_FONT_SIZE, evaluadas en el navegador.
+# Devuelve un array compacto [texto, top, left, font_size] por fragmento;
+# top/left quedan en null si el estilo no trae la coordenada en px.
+JS_SNAPSHOT_TEXTLAYER = r"""
+const layer = document.querySelector('#viewer .textLayer');
+if (!layer) { return null; }
+const reTop = /top:\s*([\d\.]+)px/;
+const reLeft = /left:\s*([\d\.]+)px/;
+const reFont = /font-size:\s*([\d\.]+)px/;
+const out = [];
+for (const div of layer.getElementsByTagName('div')) {
+    const text = (div.innerText || '').trim();
+    if (!text) { continue; }
+    const style = div.getAttribute('style') || '';
+    const top = reTop.exec(style);
+    const left = reLeft.exec(style);
+    const font = reFont.exec(style);
+    out.push([
+        text,
+        top ? parseFloat(top[1]) : null,
+        left ? parseFloat(left[1]) : null,
+        font ? parseFloat(font[1]) : 0.0
+    ]);
+}
+return out;
+"""
+
+
+def fragmentos_bulk(driver, logger):
+    """
+    Extrae todos los fragmentos del textLayer con un único execute_script.
+    Retorna la misma lista de dicts que fragmentos_desde_dom, o None si no hay capa.
+    """
+    try:
+        metricas.llamada_externa("selenium")
+        snapshot = driver.execute_script(JS_SNAPSHOT_TEXTLAYER)
+    except WebDriverException as e:
+        logger.error(f"   ❌ Error accediendo a textLayer (bulk): {e}")
+        return None
+
+    if snapshot is None:
+        logger.error("   ❌ Error accediendo a textLayer: no existe '#viewer .textLayer'.")
+        return None
+
+    logger.info(f"   🔍 [RAW] Fragmentos con texto en textLayer (bulk): {len(snapshot)}")
+
+    all_fragments = []
+    for i, (text, top, left, font_size) in enumerate(snapshot):
+        if top is None or left is None:
+            logger.warning(f"      ⚠️ Error parseando estilo de fragmento[{i}]: sin top/left en px")
+            continue
+        if i < 3:
+            logger.debug(f"      🔹 Muestra frag[{i}]: '{text[:20]}...' | T:{top} L:{left} FS:{font_size}")
+        all_fragments.append({'text': text, 'top': float(top), 'left': float(left), 'font_size': float(font_size)})
+    return all_fragments
+
+
+def fragmentos_desde_dom(viewer_div, logger, cancel_event):
+    """
+    Extracción clásica: lee style y texto de cada div del textLayer vía WebDriver.
+    """
+    try:
+        text_layer = viewer_div.find_element(By.CLASS_NAME, "textLayer")
+        divs = text_layer.find_elements(By.TAG_NAME, "div")
+        logger.info(f"   🔍 [RAW] Elementos 'div' encontrados en textLayer: {len(divs)}")
+        # get_attribute + .text por div
+        metricas.llamada_externa("selenium", 2 + 2 * len(divs))
+    except Exception as e:
+        logger.error(f"   ❌ Error accediendo a textLayer: {e}")
+        return None
+
+    all_fragments = []
+    for i, div in enumerate(divs):
+        if cancel_event.is_set(): return None
+
+        style = div.get_attribute('style')
+        text = div.text.strip()
+        if not text:
+            continue
+        try:
+            top = float(RE_TOP.search(style).group(1))
+            left = float(RE_LEFT.search(style).group(1))
+            font_size_match = RE_FONT_SIZE.search(style)
+            font_size = float(font_size_match.group(1)) if font_size_match else 0.0
+            
+            # Loguear solo los primeros 3 para verificar que el regex funciona
+            if i < 3: 
+                logger.debug(f"      🔹 Muestra div[{i}]: '{text[:20]}...' | T:{top} L:{left} FS:{font_size}")
+            
+            all_fragments.append({'text': text, 'top': top, 'left': left, 'font_size': font_size})
+
+        except (AttributeError, ValueError) as e:
+            logger.warning(f"      ⚠️ Error parseando estilo de div[{i}]: {e}")
+            continue
+    return all_fragments
+
+
+# --------------------------------------------------------------------------
+# MOTOR "pdf": TEXTO POSICIONADO DIRECTO DEL PDF (sin renderizado del DOM)
+# --------------------------------------------------------------------------
+# El visor en modo HD carga un PDF por página. Se toma la URL del recurso
+# (Performance API), se descarga con las cookies de la sesión y el texto se
+# extrae con pdfplumber; si la descarga falla, se pide getTextContent() a PDF.js.
+# Si el visor no pidió un PDF nuevo para la página, esa página sale del textLayer
+# (el PDF anterior solo se reutiliza si ya se vio que trae varias páginas).
+# Las coordenadas del PDF vienen en puntos: se escalan a px CSS (96/72) para
+# que los umbrales de columnas/fuentes sigan valiendo igual que con el textLayer.
+ESCALA_PDF_A_PX = 96 / 72
+ESPERA_PDF_S = 15
+
+# Devuelve, en orden cronológico, la primera URL de PDF cargada por el visor que
+# aún no fue asignada a una página (y la marca como asignada), o null.
+JS_SIGUIENTE_PDF = r"""
+window.__rematesPdfVistos = window.__rematesPdfVistos || [];
+const vistos = window.__rematesPdfVistos;
+for (const e of performance.getEntriesByType('resource')) {
+    const url = e.name;
+    if (!/\.pdf(\?|#|$)/i.test(url) || vistos.includes(url)) { continue; }
+    vistos.push(url);
+    return url;
+}
+return null;
+"""
+
+# getTextContent() de PDF.js en coordenadas de página (puntos, origen arriba-izquierda).
+# arguments: [numero_pagina, callback]. Resuelve [[texto, top, left, font_size], ...] o null.
+JS_TEXTCONTENT_PDFJS = r"""
+const done = arguments[arguments.length - 1];
+const app = window.PDFViewerApplication;
+const doc = app && app.pdfDocument;
+if (!doc) { done(null); return; }
+const num = doc.numPages > 1 ? Math.min(arguments[0], doc.numPages) : 1;
+doc.getPage(num).then(page => {
+    const vp = page.getViewport({scale: 1});
+    const [a, b, c, d, e, f] = vp.transform;
+    return page.getTextContent().then(tc => {
+        done(tc.items.filter(it => it.str && it.str.trim()).map(it => {
+            const [ta, tb, tc2, td, te, tf] = it.transform;
+            const x = a * te + c * tf + e;
+            const y = b * te + d * tf + f;
+            const fs = Math.hypot(a * tc2 + c * td, b * tc2 + d * td);
+            return [it.str.trim(), y - fs, x, fs];
+        }));
+    });
+}).catch(() => done(null));
+"""
+
+# Estado por hilo (cada worker tiene su propio navegador).
+_pdf_local = threading.local()
+
+
+def url_pdf_pagina_actual(driver, logger):
+    """
+    Espera a que el visor pida el PDF de la página actual y retorna su URL, o
+    None si no pidió uno nuevo. Si ya se descargó el PDF de la edición y trae
+    varias páginas (un único PDF multipágina), retorna esa URL sin esperar.
+    """
+    edicion_multipagina = getattr(_pdf_local, "edicion_multipagina", None)
+    if edicion_multipagina:
+        return edicion_multipagina
+    try:
+        return WebDriverWait(driver, ESPERA_PDF_S, poll_frequency=0.2).until(
+            lambda d: d.execute_script(JS_SIGUIENTE_PDF)
+        )
+    except TimeoutException:
+        return None
+
+
+@metricas.medir("paso1.descarga_pdf")
+def descargar_pdf(driver, url_pdf, logger):
+    """Descarga el PDF con las cookies y el User-Agent de la sesión autenticada."""
+    session = requests.Session()
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'])
+    headers = {
+        "User-Agent": driver.execute_script("return navigator.userAgent;"),
+        "Referer": driver.current_url,
+        "Accept": "application/pdf",
+    }
+    response = session.get(url_pdf, headers=headers, timeout=60)
+    metricas.contar(bytes=len(response.content), http=1)
+    metricas.llamada_externa("http")
+    if response.status_code != 200 or not response.content.startswith(b"%PDF"):
+        logger.warning(f"   ⚠️ Descarga de PDF inválida (Status {response.status_code}): {url_pdf}")
+        return None
+    logger.info(f"   📥 PDF descargado ({len(response.content) / 1024:.0f} KB).")
+    return response.content
+
+
+def paginas_pdf(contenido) -> int:
+    with pdfplumber.open(io.BytesIO(contenido)) as pdf:
+        return len(pdf.pages)
+
+
+def fragmentos_desde_pdf(contenido, page_num, logger):
+    """
+    Texto posicionado de una página PDF con pdfplumber, en el mismo formato de
+    fragmentos que el textLayer. Cada corrida de texto en una misma línea y con
+    la misma fuente queda como un fragmento, igual que los spans de PDF.js.
+    Un PDF de una sola página es el de la página actual; en uno multipágina se
+    toma page_num.
+    """
+    with pdfplumber.open(io.BytesIO(contenido)) as pdf:
+        indice = min(page_num, len(pdf.pages)) - 1 if len(pdf.pages) > 1 else 0
+        palabras = pdf.pages[indice].extract_words(
+            keep_blank_chars=True, use_text_flow=True, extra_attrs=["size"]
+        )
+
+    all_fragments = []
+    for w in palabras:
+        text = w['text'].strip()
+        if not text:
+            continue
+        all_fragments.append({
+            'text': text,
+            'top': float(w['top']) * ESCALA_PDF_A_PX,
+            'left': float(w['x0']) * ESCALA_PDF_A_PX,
+            'font_size': round(float(w['size']) * ESCALA_PDF_A_PX, 2),
+        })
+    logger.info(f"   🔍 [RAW] Fragmentos con texto en el PDF: {len(all_fragments)}")
+    return all_fragments
+
+
+def fragmentos_pdfjs(driver, page_num, logger):
+    """Alternativa sin descarga: getTextContent() del documento ya cargado en PDF.js."""
+    try:
+        driver.set_script_timeout(ESPERA_PDF_S)
+        metricas.llamada_externa("selenium")
+        items = driver.execute_async_script(JS_TEXTCONTENT_PDFJS, page_num)
+    except WebDriverException as e:
+        logger.debug(f"getTextContent no disponible: {e}")
+        return None
+    if not items:
+        return None
+    logger.info(f"   🔍 [RAW] Fragmentos desde PDF.js getTextContent: {len(items)}")
+    return [
+        {'text': text, 'top': top * ESCALA_PDF_A_PX, 'left': left * ESCALA_PDF_A_PX,
+         'font_size': round(fs * ESCALA_PDF_A_PX, 2)}
+        for text, top, left, fs in items
+    ]
+
+
+def fragmentos_pdf(driver, page_num, logger):
+    """
+    Motor "pdf": fragmentos de la página actual sin esperar el textLayer.
+    Retorna None si no se pudo (el llamador cae al textLayer).
+    """
+    url_pdf = url_pdf_pagina_actual(driver, logger)
+    if not url_pdf:
+        # Sin PDF nuevo no se reutiliza el anterior: sería el texto de otra página
+        logger.info(f"   📄 El visor no pidió un PDF para la página {page_num}. Se usa el textLayer.")
+        return None
+    try:
+        if getattr(_pdf_local, "ultima_url", None) == url_pdf and getattr(_pdf_local, "contenido", None):
+            contenido = _pdf_local.contenido
+        else:
+            contenido = descargar_pdf(driver, url_pdf, logger)
+            _pdf_local.ultima_url, _pdf_local.contenido = url_pdf, contenido
+            if contenido and paginas_pdf(contenido) > 1:
+                logger.info("   📄 El PDF trae la edición completa: se reutiliza para las páginas siguientes.")
+                _pdf_local.edicion_multipagina = url_pdf
+        if contenido:
+            fragmentos = fragmentos_desde_pdf(contenido, page_num, logger)
+            if fragmentos:
+                return fragmentos
+    except Exception as e:
+        logger.warning(f"   ⚠️ No se pudo leer el PDF de la página {page_num}: {e}")
+
+    return fragmentos_pdfjs(driver, page_num, logger)
+
+
+def saltar_pagina(driver, wait, url, page_num, logger, cancel_event):
+    """
+    Deja atrás una página que no se captura (caché o de otro worker), manteniendo
+    sincronizado el motor activo antes de avanzar.
+    """
+    if MODO_CAPTURA == "pdf":
+        # Consume la URL del PDF de esta página para que la siguiente reciba la suya
+        url_pdf_pagina_actual(driver, logger)
+    else:
+        esperar_textlayer(driver, wait, url, page_num, logger, cancel_event)
+
+
+# --------------------------------------------------------------------------
+# DETECCIÓN DE COLUMNAS (1-D)
+# --------------------------------------------------------------------------
+# Las columnas se calculan con k-means exacto en 1-D (programación dinámica
+# sobre el eje X ordenado): el mismo objetivo que KMeans, pero con el óptimo
+# global en vez de depender de la semilla. Si no se indica la cantidad de
+# columnas, se infiere donde los huecos ordenados entre coordenadas 'left'
+# caen de golpe (ratio >= RATIO_SALTO_COLUMNAS); un hueco solo cuenta si mide
+# al menos HUECO_MINIMO_COLUMNA_PX.
+HUECO_MINIMO_COLUMNA_PX = 12.0
+RATIO_SALTO_COLUMNAS = 2.5
+MAX_COLUMNAS = 15
+
+
+def _inferir_num_columnas(gaps):
+    """
+    Retorna (n_columnas, ratio) buscando el mayor salto entre huecos consecutivos
+    (ordenados de mayor a menor). ratio bajo = la página no tiene columnas claras.
+    """
+    orden = np.sort(gaps)[::-1][:MAX_COLUMNAS]
+    orden = orden[orden >= HUECO_MINIMO_COLUMNA_PX]
+    if orden.size == 0:
+        return 1, 0.0
+    siguientes = np.append(np.sort(gaps)[::-1][1:orden.size + 1], 0.0)[:orden.size]
+    ratios = orden / np.maximum(siguientes, 1e-9)
+    k = int(np.argmax(ratios))
+    return k + 2, float(ratios[k])
+
+
+def _kmeans_1d(x, n):
+    """
+    Centros de n grupos contiguos de x (ordenado) con suma de cuadrados mínima.
+    Trabaja sobre los valores distintos con su peso (los 'left' se repiten mucho).
+    """
+    valores, pesos = np.unique(x, return_counts=True)
+    m = valores.size
+    acum_w = np.concatenate(([0.0], np.cumsum(pesos, dtype=float)))
+    acum_x = np.concatenate(([0.0], np.cumsum(pesos * valores)))
+    acum_x2 = np.concatenate(([0.0], np.cumsum(pesos * valores * valores)))
+
+    def costo(i, j):
+        """Suma de cuadrados del grupo valores[i..j] (i <= j, arreglos de índices)."""
+        w = acum_w[j + 1] - acum_w[i]
+        s = acum_x[j + 1] - acum_x[i]
+        return np.maximum(acum_x2[j + 1] - acum_x2[i] - s * s / w, 0.0)
+
+    # mejor[j] = costo mínimo de v[0..j] en k grupos; inicio[k][j] = primer índice del último grupo.
+    # El inicio óptimo no retrocede al avanzar j, así que cada capa se resuelve por
+    # divide y vencerás (O(m log m) por capa, sin la matriz m x m de costos): se
+    # resuelve el j del medio de cada tramo y eso acota el inicio de sus dos mitades.
+    mejor = costo(np.zeros(m, dtype=int), np.arange(m))
+    inicios = []
+    for _ in range(n - 1):
+        previo = np.concatenate(([np.inf], mejor[:-1]))
+        mejor, inicio = np.empty(m), np.empty(m, dtype=int)
+        # tramos pendientes: j en [lo, hi] con el inicio óptimo en [opt_lo, opt_hi]
+        lo, hi = np.array([0]), np.array([m - 1])
+        opt_lo, opt_hi = np.array([0]), np.array([m - 1])
+        while lo.size:
+            medio = (lo + hi) // 2
+            cantidad = np.minimum(medio, opt_hi) - opt_lo + 1
+            tramo = np.repeat(np.arange(medio.size), cantidad)
+            desde = np.concatenate(([0], np.cumsum(cantidad)[:-1]))
+            i = opt_lo[tramo] + np.arange(tramo.size) - desde[tramo]
+            total = previo[i] + costo(i, medio[tramo])
+            minimo = np.minimum.reduceat(total, desde)
+            # primer índice que alcanza el mínimo de cada tramo (como argmin)
+            empates = np.flatnonzero(total == minimo[tramo])
+            _, primero = np.unique(tramo[empates], return_index=True)
+            arg = i[empates[primero]]
+            mejor[medio], inicio[medio] = minimo, arg
+            izq, der = lo < medio, medio < hi
+            lo, hi, opt_lo, opt_hi = (
+                np.concatenate((lo[izq], medio[der] + 1)),
+                np.concatenate((medio[izq] - 1, hi[der])),
+                np.concatenate((opt_lo[izq], arg[der])),
+                np.concatenate((arg[izq], opt_hi[der])),
+            )
+        inicios.append(inicio)
+
+    bordes = [m]
+    for inicio in reversed(inicios):
+        bordes.append(int(inicio[bordes[-1] - 1]))
+    bordes.append(0)
+    bordes.reverse()
+    return np.array([(acum_x[b] - acum_x[a]) / (acum_w[b] - acum_w[a]) for a, b in zip(bordes[:-1], bordes[1:])])
+
+
+def detectar_columnas_1d(left_coords, n_columnas, logger=None):
+    """
+    Agrupa las coordenadas 'left' en columnas. Retorna (centros, divisores) con el
+    mismo formato que entregaba KMeans: centros ordenados y divisores en el punto
+    medio entre centros.
+
+    Con n_columnas se usan siempre esas columnas; sin n_columnas se infieren.
+    """
+    x = np.sort(np.asarray(left_coords, dtype=float).ravel())
+    if x.size == 0:
+        raise ValueError("No hay coordenadas para detectar columnas.")
+
+    gaps = np.diff(x)
+    n_distintos = int(np.count_nonzero(gaps > 0)) + 1
+    n_inferido, ratio = _inferir_num_columnas(gaps)
+
+    if not n_columnas:
+        n = n_inferido
+    else:
+        n = int(n_columnas)
+        if n != n_inferido and ratio >= RATIO_SALTO_COLUMNAS and logger:
+            logger.debug(f"      La página parece tener {n_inferido} columnas (esperadas: {n}). Se usan las esperadas.")
+    n = max(1, min(n, n_distintos))
+
+    centros = [float(c) for c in _kmeans_1d(x, n)]
+    divisores = [(centros[i] + centros[i + 1]) / 2 for i in range(len(centros) - 1)]
+    return centros, divisores
+
+
+@metricas.medir("paso1.procesar_fragmentos")
+def procesar_fragmentos(all_fragments, columnas, logger, cancel_event):
+    """
+    Filtra por font-size, agrupa en columnas y arma el texto de la página.
+    Es independiente de cómo se obtuvieron los fragmentos (DOM o bulk).
+    """
+    NUM_COLUMNAS_ESPERADAS = columnas
+
+    if not all_fragments:
+        logger.warning("   ⚠️ No se extrajeron fragmentos válidos (all_fragments vacío).")
+        return ""
+
+    # 2. Filtro por font-size
+    logger.info("   ⚙️ [FILTRO] Analizando tamaños de fuente...")
+    if not any(f['font_size'] > 0 for f in all_fragments):
+        logger.warning("      ⚠️ No se detectaron font-sizes > 0. Usando todos los fragmentos.")
+        filtered_fragments = all_fragments
+    else:
+        font_size_counts = Counter(f['font_size'] for f in all_fragments if f['font_size'] > 0)
+        main_font_size = font_size_counts.most_common(1)[0][0]
+        logger.info(f"      🎯 Font-size principal detectado: {main_font_size}px")
+
+        filtered_fragments = []
+        for frag in all_fragments:
+            is_main_font = abs(frag['font_size'] - main_font_size) < 0.1
+            is_numeric_title = frag['text'].isdigit() 
+            if is_main_font or is_numeric_title:
+                filtered_fragments.append(frag)
+        
+        logger.info(f"      📉 Fragmentos tras filtro: {len(filtered_fragments)} (de {len(all_fragments)} originales)")
+
+    if len(filtered_fragments) < 2:
+        logger.warning("      ⚠️ Menos de 2 fragmentos tras filtrado. Retornando texto plano sin columnas.")
+        return "\n".join(f['text'] for f in filtered_fragments)
+
+    # 3. Detección de columnas (1-D sobre la coordenada 'left')
+    logger.info("   🧮 [COLUMNAS] Calculando columnas...")
+    try:
+        left_coords = np.array([f['left'] for f in filtered_fragments], dtype=float)
+        column_centers, dividers = detectar_columnas_1d(left_coords, NUM_COLUMNAS_ESPERADAS, logger)
+        
+        logger.info(f"      📍 Centros de columna detectados (X): {[round(c,1) for c in column_centers]}")
+        logger.info(f"      ✂️ Divisores calculados: {[round(d,1) for d in dividers]}")
+    except Exception as e:
+        logger.error(f"      ❌ Error detectando columnas: {e}. Retornando texto plano.")
+        return "\n".join(f['text'] for f in filtered_fragments)
+
+    # 4. Asignar fragmentos a columnas (índice = cantidad de divisores a la izquierda)
+    num_columns = len(column_centers)
+    columns = [[] for _ in range(num_columns)]
+    indices = np.searchsorted(np.asarray(dividers, dtype=float), left_coords, side='left')
+    for frag, col_index in zip(filtered_fragments, indices.tolist()):
+        columns[col_index].append(frag)
+    
+    distribucion = [len(c) for c in columns]
+    logger.info(f"      📦 Distribución de items por columna: {distribucion}")
+
+
+    # 5. Armar texto columna por columna
+    full_page_text = []
+    numeros_especiales = {"1300", "1640", "1309", "1312", "1315", "1320", "1321", "1316", "1612", "1616", "1630", "1635"}
+    remate_re = re.compile(r'^16\d{2}$') 
+
+    logger.info("   📝 [ENSAMBLAJE] Procesando texto columna por columna...")
+
+    for i, column in enumerate(columns):
+        if not column: continue
+        
+        column.sort(key=lambda f: f['top'])
+        
+        output_lines = []
+        capture = False       
+        seen_remate = False   
+        last_special_code = None
+        
+        logger.debug(f"      Processing Col {i+1} ({len(column)} items)...")
+
+        for frag in column:
+            s = frag['text'].strip()
+            UMBRAL_FONT_SIZE_TITULO = 10.0 
+            is_special_code = s in numeros_especiales
+            
+            if is_special_code and frag['font_size'] > UMBRAL_FONT_SIZE_TITULO:
+                last_special_code = s
+                s_marcado = f"[CODE:{s}]"
+                
+                if remate_re.match(s):   # es remate (16xx)
+                    logger.info(f"        🟢 [START] Código de inicio detectado: {s} (Col {i+1})")
+                    output_lines.append(s_marcado)
+                    capture = True
+                    seen_remate = True
+                else:
+                    logger.info(f"        🔴 [STOP] Código de fin/ruido detectado: {s} (Col {i+1})")
+                    capture = False
+                continue
+
+            if capture:
+                output_lines.append(s)
+
+        if not seen_remate and last_special_code:
+            logger.debug(f"      ⚠️ Columna {i+1} sin remates. Conservando solo código: {last_special_code}")
+            output_lines = [last_special_code]
+
+        # Normalizar
+        normalized = []
+        prev = None
+        for L in output_lines:
+            if prev is not None and prev.strip() == L.strip():
+                continue
+            normalized.append(L)
+            prev = L
+
+        texto_columna = "\n".join(normalized)
+        full_page_text.append(texto_columna)
+        logger.debug(f"      ✅ Columna {i+1} procesada: {len(normalized)} líneas útiles.")
+
+    final_text = "".join(full_page_text)
+    logger.info(f"   🏁 [FIN] Texto capturado total: {len(final_text)} caracteres.")
+    return final_text
+
+# --------------------------------------------------------------------------
+# NAVEGADOR Y NAVEGACIÓN DEL VISOR
+# --------------------------------------------------------------------------
+# Sesiones headless en paralelo que comparten las cookies de un único login.
+# 1 = modo secuencial clásico (un solo Chrome visible recorre todas las páginas).
+WORKERS_PARALELOS = 1
+
+DEBUG_SCREENSHOTS = True
+
+# Tiempo máximo para decidir si una sesión guardada (cookies) sigue logueada.
+ESPERA_VALIDAR_SESION_S = 10
+
+XPATH_SIGUIENTE = ("//a[.//div[contains(concat(' ', normalize-space(@class), ' '), ' next_arrow ') "
+                   "and .//i[contains(@class,'fa-angle-right')]]]")
+
+# --------------------------------------------------------------------------
+# SINCRONIZACIÓN CON EL VISOR
+# --------------------------------------------------------------------------
+# "observer": un MutationObserver en el navegador avisa (execute_async_script)
+#             cuando hay una capa de texto nueva, con contenido y sin cambios
+#             durante ESPERA_QUIETUD_MS.
+# "polling":  comportamiento anterior (sleeps fijos + staleness + 10× 0.5 s).
+MODO_ESPERA = "observer"
+ESPERA_QUIETUD_MS = 300
+ESPERA_MAX_MS = 30000
+ESPERA_HD_MS = 10000
+MIN_DIVS_TEXTLAYER = 10
+MARCA_CAPTURADA = "data-remates-leida"
+
+# arguments: [minDivs, quietudMs, maxMs, soloNueva, marca, callback]
+# Resuelve [ok, divs, ms]. Con soloNueva=true ignora la capa ya marcada como
+# leída (tanto si PDF.js la reemplaza como si reutiliza el div y cambia sus hijos).
+JS_ESPERAR_TEXTLAYER = r"""
+const [minDivs, quietudMs, maxMs, soloNueva, marca] = arguments;
+const done = arguments[arguments.length - 1];
+const t0 = performance.now();
+let quietud = null, limite = null, obs = null;
+
+function capa() {
+    const layer = document.querySelector('#viewer .textLayer');
+    if (!layer) { return null; }
+    if (soloNueva && layer.hasAttribute(marca)
+        && layer.firstElementChild && layer.firstElementChild.hasAttribute(marca)) {
+        return null;
+    }
+    return layer.childElementCount > minDivs ? layer : null;
+}
+function terminar(ok) {
+    if (obs) { obs.disconnect(); }
+    clearTimeout(quietud); clearTimeout(limite);
+    const layer = document.querySelector('#viewer .textLayer');
+    done([ok, layer ? layer.childElementCount : 0, Math.round(performance.now() - t0)]);
+}
+function revisar() {
+    clearTimeout(quietud);
+    if (capa()) { quietud = setTimeout(() => { if (capa()) { terminar(true); } }, quietudMs); }
+}
+obs = new MutationObserver(revisar);
+obs.observe(document.getElementById('viewer') || document.body,
+            {childList: true, subtree: true, characterData: true});
+limite = setTimeout(() => terminar(false), maxMs);
+revisar();
+"""
+
+# arguments: [marca, leida]. leida=false quita la marca.
+JS_MARCAR_TEXTLAYER = r"""
+const [marca, leida] = arguments;
+const layer = document.querySelector('#viewer .textLayer');
+for (const el of [layer, layer && layer.firstElementChild]) {
+    if (!el) { continue; }
+    if (leida) { el.setAttribute(marca, '1'); } else { el.removeAttribute(marca); }
+}
+"""
+
+# Los tiempos de espera por página (ms) van en un dict propio de cada
+# extracción ({page_num: ms}), así las ediciones de un lote no se pisan.
+_lock_tiempos = threading.Lock()
+
+
+def _pausa(segundos):
+    """Sleep fijo solo en MODO_ESPERA "polling"; con el observer la espera es por evento."""
+    if MODO_ESPERA == "polling":
+        time.sleep(segundos)
+
+
+def esperar_capa_estable(driver, logger, solo_nueva=True, max_ms=None):
+    """
+    Bloquea hasta que el textLayer (nuevo, si solo_nueva) tenga contenido y
+    deje de mutar. Retorna (ok, divs, ms).
+    """
+    max_ms = max_ms or ESPERA_MAX_MS
+    driver.set_script_timeout(max_ms / 1000 + 5)
+    try:
+        metricas.llamada_externa("selenium")
+        ok, divs, ms = driver.execute_async_script(
+            JS_ESPERAR_TEXTLAYER, MIN_DIVS_TEXTLAYER, ESPERA_QUIETUD_MS, max_ms, solo_nueva, MARCA_CAPTURADA
+        )
+    except WebDriverException as e:
+        logger.warning(f"   ⚠️ MutationObserver no disponible: {e}")
+        return False, 0, max_ms
+    return bool(ok), divs, ms
+
+
+def marcar_capa_leida(driver, leida=True):
+    """
+    Marca la capa actual para que la próxima espera solo acepte la página
+    siguiente (leida=False la desmarca).
+    """
+    try:
+        driver.execute_script(JS_MARCAR_TEXTLAYER, MARCA_CAPTURADA, leida)
+    except WebDriverException:
+        pass
+
+
+def anotar_espera(tiempos_espera, page_num, espera_ms):
+    if tiempos_espera is not None:
+        with _lock_tiempos:
+            tiempos_espera[page_num] = espera_ms
+
+
+def resumen_tiempos_espera(tiempos_espera, logger):
+    with _lock_tiempos:
+        tiempos = dict(tiempos_espera)
+    if not tiempos:
+        return
+    valores = list(tiempos.values())
+    logger.info(
+        f"⏱️ Espera por página ({MODO_ESPERA}): total {sum(valores) / 1000:.1f} s | "
+        f"promedio {sum(valores) / len(valores):.0f} ms | máx {max(valores):.0f} ms "
+        f"(pág. {max(tiempos, key=tiempos.get)}) | {len(valores)} páginas"
+    )
+
+
+def _crear_driver(logger, headless=False):
+    """
+    Crea un Chrome con perfil temporal único. Retorna (driver, ruta_perfil).
+    """
     chrome_options = Options()
 
     # 1. Definir una ruta DINÁMICA para el perfil temporal (Evita WinError 32)
@@ -46,7 +717,12 @@ def run_extractor(url: str, paginas: int, columnas: int, cancel_event):
     # 2. Asignar la ruta limpia a Chrome
     chrome_options.add_argument(f"--user-data-dir={clean_profile_path}")
     chrome_options.add_argument("--incognito")
-    chrome_options.add_argument("--start-maximized")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--disable-gpu")
+    else:
+        chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--log-level=3")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -55,416 +731,730 @@ def run_extractor(url: str, paginas: int, columnas: int, cancel_event):
     
     # Iniciar driver
     driver = webdriver.Chrome(service=service, options=chrome_options)
-    wait = WebDriverWait(driver, 30) # Aumentado a 30s por seguridad
+    return driver, clean_profile_path
+
+
+def _cerrar_driver(driver, clean_profile_path):
+    try:
+        driver.quit()
+    except Exception:
+        pass
     
-    load_dotenv()
-    URL = url
-    EMAIL = os.getenv("USUARIO") 
-    PASSWORD = os.getenv("PASSWORD") 
-    PAGINAS_A_PROCESAR = paginas
-    COLUMNAS = columnas
-    OUTPUT_FILE = "remates_extraidos.txt"
-    DEBUG_SCREENSHOTS = True
+    # Limpiar carpeta temporal si se creó correctamente
+    try:
+        if os.path.exists(clean_profile_path):
+            shutil.rmtree(clean_profile_path)
+    except:
+        pass
 
-    def modo_predeterminado():
-        marco_horizontal = "═" * 50
-        logger.info(f"\n{marco_horizontal}\n")
-        logger.info("Empezando el proceso de extracción de remates judiciales...")
-        logger.info(f"Datos de entrada:\n URL: {URL}, \n Usuario: {EMAIL}, \n Páginas a procesar: {PAGINAS_A_PROCESAR} \n Columnas: {COLUMNAS}")
 
-    modo_predeterminado()
+def guardar_screenshot(driver, path: str, logger):
+    if not DEBUG_SCREENSHOTS:
+        return
+    try:
+        driver.save_screenshot(path)
+        logger.info(f"Screenshot guardado: {path}")
+    except Exception as e:
+        logger.warning(f"No se pudo guardar screenshot ({path}): {e}")
 
-    def guardar_screenshot(path: str):
-        try:
-            driver.save_screenshot(path)
-            logger.info(f"Screenshot guardado: {path}")
-        except Exception as e:
-            logger.warning(f"No se pudo guardar screenshot ({path}): {e}")
 
-    def click_siguiente_pagina(driver, wait):
-        if cancel_event.is_set(): return # Check de cancelación
-        xpath_next = ("//a[.//div[contains(concat(' ', normalize-space(@class), ' '), ' next_arrow ') "
-                      "and .//i[contains(@class,'fa-angle-right')]]]")
-        
-        # Espera de seguridad para el viewer
-        try: wait.until(EC.presence_of_element_located((By.ID, "viewer")))
-        except: pass
-
-        current_text_layer = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
-        dbg(logger, "textLayer actual referenciado para staleness_of.")
-        next_anchor = wait.until(EC.element_to_be_clickable((By.XPATH, xpath_next)))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_anchor)
-        dbg(logger, "Siguiente anchor localizado y llevado a viewport.")
-        last_err = None
-        for attempt in range(3):
-            if cancel_event.is_set(): return
+def click_siguiente_pagina(driver, wait, logger, cancel_event):
+    if cancel_event.is_set(): return # Check de cancelación
+    
+    # Espera de seguridad para el viewer
+    try: wait.until(EC.presence_of_element_located((By.ID, "viewer")))
+    except: pass
 
-            try:
-                next_anchor.click()
-                dbg(logger, f"Click normal en 'siguiente' (intento {attempt+1}).")
-                break
-            except (ElementClickInterceptedException, StaleElementReferenceException, WebDriverException) as e:
-                last_err = e
-                dbg(logger, f"Click normal falló (intento {attempt+1}): {e}. Reintentando...")
-                time.sleep(0.4)
-                try:
-                    next_anchor = wait.until(EC.element_to_be_clickable((By.XPATH, xpath_next)))
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_anchor)
-                except Exception:
-                    pass
-        else:
-            try:
-                driver.execute_script("arguments[0].click();", next_anchor)
-                dbg(logger, "Fallback: click por JavaScript ejecutado.")
-            except Exception as e:
-                raise TimeoutException(f"No se pudo hacer click en siguiente: {last_err or e}")
-        wait.until(EC.staleness_of(current_text_layer))
-        dbg(logger, "textLayer anterior quedó stale (cambio de página detectado).")
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
-        dbg(logger, "textLayer nuevo presente.")
+    current_text_layer = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
+    logger.debug("textLayer actual referenciado para staleness_of.")
+    next_anchor = wait.until(EC.element_to_be_clickable((By.XPATH, XPATH_SIGUIENTE)))
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_anchor)
+    logger.debug("Siguiente anchor localizado y llevado a viewport.")
+    last_err = None
+    for attempt in range(3):
+        if cancel_event.is_set(): return
 
-    def try_keyboard_next(driver):
         try:
-            body = driver.find_element(By.TAG_NAME, "body")
-            body.send_keys(Keys.ARROW_RIGHT)
-            dbg(logger, "Enviado Keys.ARROW_RIGHT como fallback.")
+            next_anchor.click()
+            logger.debug(f"Click normal en 'siguiente' (intento {attempt+1}).")
+            break
+        except (ElementClickInterceptedException, StaleElementReferenceException, WebDriverException) as e:
+            last_err = e
+            logger.debug(f"Click normal falló (intento {attempt+1}): {e}. Reintentando...")
+            _pausa(0.4)
+            try:
+                next_anchor = wait.until(EC.element_to_be_clickable((By.XPATH, XPATH_SIGUIENTE)))
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_anchor)
+            except Exception:
+                pass
+    else:
+        try:
+            driver.execute_script("arguments[0].click();", next_anchor)
+            logger.debug("Fallback: click por JavaScript ejecutado.")
         except Exception as e:
-            dbg(logger, f"Fallback teclado no disponible: {e}")
+            raise TimeoutException(f"No se pudo hacer click en siguiente: {last_err or e}")
+    if MODO_ESPERA == "observer":
+        # La espera de la capa nueva la resuelve esperar_textlayer (MutationObserver)
+        return
+    wait.until(EC.staleness_of(current_text_layer))
+    logger.debug("textLayer anterior quedó stale (cambio de página detectado).")
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
+    logger.debug("textLayer nuevo presente.")
 
-    from collections import Counter
-    # Importamos el algoritmo de clustering
-    from sklearn.cluster import KMeans
-    import numpy as np
-    
-    
-    def capture_text_from_textlayer(viewer_div):
-        """
-        Versión con LOGS DE PROCESO para depuración detallada.
-        """
-        if cancel_event.is_set(): return ""
 
-        logger.info(f"📊 [DEBUG] Iniciando captura de texto. Columnas esperadas: {COLUMNAS}")
-        NUM_COLUMNAS_ESPERADAS = COLUMNAS  
+def try_keyboard_next(driver, logger):
+    try:
+        body = driver.find_element(By.TAG_NAME, "body")
+        body.send_keys(Keys.ARROW_RIGHT)
+        logger.debug("Enviado Keys.ARROW_RIGHT como fallback.")
+    except Exception as e:
+        logger.debug(f"Fallback teclado no disponible: {e}")
+
 
-        # 1. Extraer TODOS los fragmentos
-        all_fragments = []
+@metricas.medir("paso1.avance_pagina")
+def avanzar_pagina(driver, wait, logger, cancel_event):
+    """
+    Avanza una página (click en next_arrow, con fallback de teclado).
+    Retorna False si no se pudo avanzar.
+    """
+    from logger import log_section
+
+    log_section(logger, "NEXT_PAGE")
+    try:
+        logger.info("   ➡️ Avanzando a la siguiente página (click en next_arrow)...")
+        click_siguiente_pagina(driver, wait, logger, cancel_event)
+        logger.info("   ✅ Página avanzada correctamente.")
+        return True
+    except TimeoutException as te:
+        logger.warning(f"⚠️ Click 'siguiente' no funcionó: {te}. Fallback con teclado...")
+        try_keyboard_next(driver, logger)
+        if MODO_ESPERA == "observer":
+            ok, _, _ = esperar_capa_estable(driver, logger, solo_nueva=True)
+            if ok:
+                logger.info("   ✅ Fallback teclado avanzó de página.")
+                return True
+            logger.error("   ❌ No se pudo avanzar de página.")
+            return False
+        time.sleep(0.8)
         try:
-            text_layer = viewer_div.find_element(By.CLASS_NAME, "textLayer")
-            divs = text_layer.find_elements(By.TAG_NAME, "div")
-            logger.info(f"   🔍 [RAW] Elementos 'div' encontrados en textLayer: {len(divs)}")
-        except Exception as e:
-            logger.error(f"   ❌ Error accediendo a textLayer: {e}")
-            return ""
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
+            logger.info("   ✅ Fallback teclado avanzó de página.")
+            return True
+        except Exception:
+            logger.error("   ❌ No se pudo avanzar de página.")
+            return False
+    except Exception as e:
+        logger.error(f"⚠️ Error al avanzar de página: {e}")
+        return False
 
-        for i, div in enumerate(divs):
-            if cancel_event.is_set(): return ""
 
-            style = div.get_attribute('style')
-            text = div.text.strip()
-            if not text:
-                continue
-            try:
-                top = float(re.search(r'top:\s*([\d\.]+)px', style).group(1))
-                left = float(re.search(r'left:\s*([\d\.]+)px', style).group(1))
-                font_size_match = re.search(r'font-size:\s*([\d\.]+)px', style)
-                font_size = float(font_size_match.group(1)) if font_size_match else 0.0
-                
-                # Loguear solo los primeros 3 para verificar que el regex funciona
-                if i < 3: 
-                    logger.debug(f"      🔹 Muestra div[{i}]: '{text[:20]}...' | T:{top} L:{left} FS:{font_size}")
-                
-                all_fragments.append({'text': text, 'top': top, 'left': left, 'font_size': font_size})
+# Salto directo con PDF.js: solo si el documento cargado tiene esa página.
+# arguments: [numero_pagina, marca, descartar_pdfs]. Antes de saltar marca la
+# capa actual como leída para que la espera reconozca la capa de la página
+# destino y, con el motor "pdf", da por asignadas las URLs de PDF ya cargadas
+# (las de páginas anteriores): la siguiente que entregue JS_SIGUIENTE_PDF es la
+# que el visor pida después del salto.
+JS_IR_A_PAGINA = r"""
+const [num, marca, descartarPdfs] = arguments;
+const app = window.PDFViewerApplication;
+if (!app || !app.pdfDocument || app.pagesCount < num) { return false; }
+if (app.page === num) { return true; }
+const layer = document.querySelector('#viewer .textLayer');
+if (layer) {
+    layer.setAttribute(marca, '1');
+    if (layer.firstElementChild) { layer.firstElementChild.setAttribute(marca, '1'); }
+}
+if (descartarPdfs) {
+    window.__rematesPdfVistos = window.__rematesPdfVistos || [];
+    const vistos = window.__rematesPdfVistos;
+    for (const e of performance.getEntriesByType('resource')) {
+        if (/\.pdf(\?|#|$)/i.test(e.name) && !vistos.includes(e.name)) { vistos.push(e.name); }
+    }
+}
+app.page = num;
+return app.page === num;
+"""
 
-            except (AttributeError, ValueError) as e:
-                logger.warning(f"      ⚠️ Error parseando estilo de div[{i}]: {e}")
-                continue
 
-        if not all_fragments:
-            logger.warning("   ⚠️ No se extrajeron fragmentos válidos (all_fragments vacío).")
-            return ""
+def ir_a_pagina(driver, page_num, logger):
+    """
+    Lleva el visor directo a page_num vía PDFViewerApplication.page.
+    Retorna False si el visor no lo permite (p.ej. un PDF por página); el
+    llamador avanza entonces con next_arrow.
+    """
+    try:
+        metricas.llamada_externa("selenium")
+        capa_anterior = driver.find_elements(By.CSS_SELECTOR, "#viewer .textLayer") if MODO_ESPERA == "polling" else []
+        if not driver.execute_script(JS_IR_A_PAGINA, page_num, MARCA_CAPTURADA, MODO_CAPTURA == "pdf"):
+            logger.debug(f"Salto directo a la página {page_num} no disponible.")
+            return False
+    except WebDriverException as e:
+        logger.debug(f"Salto directo a la página {page_num} falló: {e}")
+        return False
+    if capa_anterior:
+        try:
+            WebDriverWait(driver, 10).until(EC.staleness_of(capa_anterior[0]))
+        except TimeoutException:
+            logger.debug(f"La capa anterior siguió presente tras saltar a la página {page_num}.")
+    return True
+
 
-        # 2. Filtro por font-size
-        logger.info("   ⚙️ [FILTRO] Analizando tamaños de fuente...")
-        if not any(f['font_size'] > 0 for f in all_fragments):
-            logger.warning("      ⚠️ No se detectaron font-sizes > 0. Usando todos los fragmentos.")
-            filtered_fragments = all_fragments
+def activar_modo_hd(driver, wait, logger):
+    try:
+        # Botón HD
+        logger.info("   🖼 Activando modo HD (si existe botón)...")
+        hd_button = wait.until(EC.element_to_be_clickable((By.ID, "active_pdf")))
+        if MODO_ESPERA == "observer":
+            # La capa previa al HD se marca como leída: solo vale la re-renderizada
+            marcar_capa_leida(driver)
+            driver.execute_script("arguments[0].click();", hd_button)
+            ok, _, ms = esperar_capa_estable(driver, logger, solo_nueva=True, max_ms=ESPERA_HD_MS)
+            if ok:
+                logger.debug(f"Capa HD estable en {ms} ms.")
+            else:
+                # Sin re-render (p.ej. ya estaba en HD): la capa actual es la de la página 1
+                logger.info("   ⚠️ El visor no re-renderizó la página tras el HD. Se usa la capa actual.")
+                marcar_capa_leida(driver, leida=False)
         else:
-            font_size_counts = Counter(f['font_size'] for f in all_fragments if f['font_size'] > 0)
-            main_font_size = font_size_counts.most_common(1)[0][0]
-            logger.info(f"      🎯 Font-size principal detectado: {main_font_size}px")
-
-            filtered_fragments = []
-            for frag in all_fragments:
-                is_main_font = abs(frag['font_size'] - main_font_size) < 0.1
-                is_numeric_title = frag['text'].isdigit() 
-                if is_main_font or is_numeric_title:
-                    filtered_fragments.append(frag)
-            
-            logger.info(f"      📉 Fragmentos tras filtro: {len(filtered_fragments)} (de {len(all_fragments)} originales)")
+            driver.execute_script("arguments[0].click();", hd_button)
+            time.sleep(1)
+        logger.debug("Botón HD clickeado.")
+    except Exception as e:
+        logger.info(f"   ⚠️ No se pudo activar modo HD (continuo): {e}")
 
-        if len(filtered_fragments) < 2:
-            logger.warning("      ⚠️ Menos de 2 fragmentos tras filtrado. Retornando texto plano sin columnas.")
-            return "\n".join(f['text'] for f in filtered_fragments)
 
-        # 3. Clustering por columnas
-        logger.info("   🧮 [KMEANS] Calculando columnas...")
+def esperar_textlayer(driver, wait, url, page_num, logger, cancel_event):
+    """
+    Espera a que #viewer y su .textLayer estén presentes y con texto.
+    Retorna el div #viewer.
+    """
+    try:
+        logger.info("   🔍 Buscando el contenedor #viewer y .textLayer...")
+        
+        # Espera explicita del #viewer (Solución TimeoutException)
         try:
-            left_coords = np.array([f['left'] for f in filtered_fragments]).reshape(-1, 1)
-            kmeans = KMeans(n_clusters=NUM_COLUMNAS_ESPERADAS, n_init='auto', random_state=0)
-            kmeans.fit(left_coords)
-            column_centers = sorted(kmeans.cluster_centers_.flatten())
-            dividers = [(column_centers[i] + column_centers[i+1]) / 2 for i in range(len(column_centers)-1)]
-            
-            logger.info(f"      📍 Centros de columna detectados (X): {[round(c,1) for c in column_centers]}")
-            logger.info(f"      ✂️ Divisores calculados: {[round(d,1) for d in dividers]}")
-        except Exception as e:
-            logger.error(f"      ❌ Error en KMeans: {e}. Retornando texto plano.")
-            return "\n".join(f['text'] for f in filtered_fragments)
-
-        # 4. Asignar fragmentos a columnas
-        num_columns = len(column_centers)
-        columns = [[] for _ in range(num_columns)]
-        for frag in filtered_fragments:
-            col_index = 0
-            for divider in dividers:
-                if frag['left'] > divider:
-                    col_index += 1
-                else:
-                    break
-            if col_index < num_columns:
-                columns[col_index].append(frag)
+            viewer_div = wait.until(EC.presence_of_element_located((By.ID, "viewer")))
+        except TimeoutException:
+            logger.warning("   ⚠️ Timeout esperando #viewer. Reintentando carga de URL...")
+            driver.get(url) # Intento de recuperación
+            viewer_div = wait.until(EC.presence_of_element_located((By.ID, "viewer")))
+
         
-        distribucion = [len(c) for c in columns]
-        logger.info(f"      📦 Distribución de items por columna: {distribucion}")
+        if MODO_ESPERA == "observer":
+            ok, divs, ms = esperar_capa_estable(driver, logger, solo_nueva=True)
+            if ok:
+                logger.info(f"   ✅ Texto detectado: {divs} líneas encontradas (capa estable en {ms} ms).")
+                marcar_capa_leida(driver)
+                return viewer_div
+            logger.warning("   ⚠️ El observer no confirmó una capa nueva. Reintentando con polling...")
 
+        # 1. Esperamos a que la capa exista
+        text_layer = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
+        
+        # 2. VALIDACIÓN CRÍTICA: Esperar a que la capa tenga hijos (texto real)
+        texto_cargado = False
+        for i in range(10):
+            if cancel_event.is_set(): break
+            divs_texto = text_layer.find_elements(By.TAG_NAME, "div")
+            if len(divs_texto) > 10: 
+                texto_cargado = True
+                logger.info(f"   ✅ Texto detectado: {len(divs_texto)} líneas encontradas.")
+                break
+            else:
+                logger.warning(f"   ⏳ Esperando renderizado de texto (Intento {i+1}/10)...")
+                time.sleep(0.5)
+        
+        if not texto_cargado:
+            logger.error("   ❌ La capa de texto existe pero está vacía después de esperar.")
+            guardar_screenshot(driver, f"logs/debug_vacio_pag_{page_num}.png", logger)
+        marcar_capa_leida(driver)
 
-        # 5. Armar texto columna por columna
-        full_page_text = []
-        numeros_especiales = {"1300", "1640", "1309", "1312", "1315", "1320", "1321", "1316", "1612", "1616", "1630", "1635"}
-        remate_re = re.compile(r'^16\d{2}$') 
+    except Exception as e:
+        logger.error(f"❌ No se encontró viewer/textLayer: {e}")
+        guardar_screenshot(driver, f"logs/error_page_{page_num}_viewer.png", logger)
+        raise
+    return viewer_div
 
-        logger.info("   📝 [ENSAMBLAJE] Procesando texto columna por columna...")
 
-        for i, column in enumerate(columns):
-            if not column: continue
-            
-            column.sort(key=lambda f: f['top'])
-            
-            output_lines = []
-            capture = False       
-            seen_remate = False   
-            last_special_code = None
-            
-            logger.debug(f"      Processing Col {i+1} ({len(column)} items)...")
+def capture_text_from_textlayer(driver, viewer_div, logger, cancel_event):
+    """
+    Versión con LOGS DE PROCESO para depuración detallada.
+    Retorna la lista cruda de fragmentos de la página (o None si falló).
+    """
+    if cancel_event.is_set(): return None
 
-            for frag in column:
-                s = frag['text'].strip()
-                UMBRAL_FONT_SIZE_TITULO = 10.0 
-                is_special_code = s in numeros_especiales
-                
-                if is_special_code and frag['font_size'] > UMBRAL_FONT_SIZE_TITULO:
-                    last_special_code = s
-                    s_marcado = f"[CODE:{s}]"
-                    
-                    if remate_re.match(s):   # es remate (16xx)
-                        logger.info(f"        🟢 [START] Código de inicio detectado: {s} (Col {i+1})")
-                        output_lines.append(s_marcado)
-                        capture = True
-                        seen_remate = True
-                    else:
-                        logger.info(f"        🔴 [STOP] Código de fin/ruido detectado: {s} (Col {i+1})")
-                        capture = False
-                    continue
-
-                if capture:
-                    output_lines.append(s)
-
-            if not seen_remate and last_special_code:
-                logger.debug(f"      ⚠️ Columna {i+1} sin remates. Conservando solo código: {last_special_code}")
-                output_lines = [last_special_code]
-
-            # Normalizar
-            normalized = []
-            prev = None
-            for L in output_lines:
-                if prev is not None and prev.strip() == L.strip():
-                    continue
-                normalized.append(L)
-                prev = L
-
-            texto_columna = "\n".join(normalized)
-            full_page_text.append(texto_columna)
-            logger.debug(f"      ✅ Columna {i+1} procesada: {len(normalized)} líneas útiles.")
-
-        final_text = "".join(full_page_text)
-        logger.info(f"   🏁 [FIN] Texto capturado total: {len(final_text)} caracteres.")
-        return final_text
-    
+    logger.info(f"📊 [DEBUG] Iniciando captura de texto. Modo: {MODO_CAPTURA}")
+
+    # 1. Extraer TODOS los fragmentos
+    if MODO_CAPTURA == "bulk":
+        return fragmentos_bulk(driver, logger)
+    return fragmentos_desde_dom(viewer_div, logger, cancel_event)
+
+
+@metricas.medir("paso1.captura_pagina")
+def capturar_pagina(driver, wait, url, page_num, logger, cancel_event, tiempos_espera=None):
+    """
+    Espera la capa de texto de la página actual y devuelve sus fragmentos crudos.
+    La espera queda anotada en tiempos_espera (el dict de la extracción).
+    """
+    from logger import log_section
+
+    log_section(logger, "PAGE_PREP")
+    logger.info(f"📄 Procesando página {page_num}...")
+    t0 = time.perf_counter()
+
+    if MODO_CAPTURA == "pdf":
+        fragmentos = fragmentos_pdf(driver, page_num, logger)
+        espera_ms = (time.perf_counter() - t0) * 1000
+        if fragmentos:
+            anotar_espera(tiempos_espera, page_num, espera_ms)
+            logger.info(f"   ⏱️ Página {page_num} desde PDF: {espera_ms:.0f} ms")
+            metricas.contar(items=len(fragmentos))
+            return fragmentos
+        logger.warning(f"   ⚠️ Motor PDF sin resultado en la página {page_num}. Usando textLayer...")
+
+    _pausa(1)
+    viewer_div = esperar_textlayer(driver, wait, url, page_num, logger, cancel_event)
+    espera_ms = (time.perf_counter() - t0) * 1000
+    anotar_espera(tiempos_espera, page_num, espera_ms)
+    logger.info(f"   ⏱️ Espera de la página {page_num}: {espera_ms:.0f} ms")
+    metricas.contar("paso1.espera_pagina", items=1, ms=round(espera_ms))
+
+    logger.info("   ✨ Extrayendo texto de la página...")
+    try:
+        fragmentos = capture_text_from_textlayer(driver, viewer_div, logger, cancel_event)
+        metricas.contar(items=len(fragmentos or []))
+        return fragmentos
+    except Exception as e:
+        logger.error(f"❌ Error al capturar la página {page_num}: {e}")
+        guardar_screenshot(driver, f"logs/error_page_{page_num}.png", logger)
+        return None
+
+
+def leer_paginas_cacheadas(url, paginas, logger):
+    """
+    Lee de la caché las páginas 1..paginas disponibles. Retorna {page_num: fragmentos}.
+    Una entrada que desapareció (desalojo) o está dañada no se incluye: esa
+    página queda como faltante y se vuelve a capturar con el navegador.
+    """
+    fragmentos_cache = {}
+    for page_num in sorted(cache_paginas.paginas_cacheadas(url, paginas)):
+        fragmentos = cache_paginas.leer_pagina(url, page_num)
+        if fragmentos is None:
+            logger.warning(f"⚠️ Página {page_num}: la entrada de caché no se pudo leer. Se volverá a capturar.")
+            continue
+        logger.info(f"📦 Página {page_num} leída desde caché ({len(fragmentos)} fragmentos).")
+        metricas.contar("paso1.cache", items=1, aciertos=1)
+        fragmentos_cache[page_num] = fragmentos
+    return fragmentos_cache
+
+
+def texto_pagina(driver, wait, url, page_num, columnas, logger, cancel_event, tiempos_espera=None):
+    """
+    Texto procesado de una página capturada del navegador. Los fragmentos se
+    guardan en la caché en disco (las páginas cacheadas se leen antes, con
+    leer_paginas_cacheadas).
+    """
+    fragmentos = capturar_pagina(driver, wait, url, page_num, logger, cancel_event, tiempos_espera)
+    if fragmentos:
+        cache_paginas.guardar_pagina(url, page_num, fragmentos)
+    return texto_desde_fragmentos(fragmentos, page_num, columnas, logger, cancel_event)
+
+
+def texto_desde_fragmentos(fragmentos, page_num, columnas, logger, cancel_event):
+    """Texto de la página a partir de sus fragmentos crudos ("" si no hay o si falla)."""
+    if fragmentos is None:
+        return ""
+    try:
+        return procesar_fragmentos(fragmentos, columnas, logger, cancel_event)
+    except Exception as e:
+        logger.error(f"❌ Error al procesar la página {page_num}: {e}")
+        return ""
+
+
+def sesion_activa_mercurio(driver, logger, timeout=ESPERA_VALIDAR_SESION_S):
+    """
+    True si, con las cookies ya aplicadas, el visor carga sin pedir login:
+    aparece el textLayer y ni el formulario ni el modal de límite están visibles.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.visibility_of_element_located((By.ID, "txtUsername")),
+            EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")),
+        ))
+    except TimeoutException:
+        return False
+
+    for id_login in ("txtUsername", "modal_limit_articulos"):
+        if any(el.is_displayed() for el in driver.find_elements(By.ID, id_login)):
+            return False
+    return bool(driver.find_elements(By.CSS_SELECTOR, "#viewer .textLayer"))
+
+
+@metricas.medir("paso1.login")
+def login_mercurio(driver, wait, url, email, password, logger, cancel_event):
+    """
+    Login en digital.elmercurio.com. Retorna True si la vista del diario quedó habilitada.
+    """
+    from logger import log_section
 
-    # LOGIN
     log_section(logger, "LOGIN")
+
+    # Sesión guardada de una ejecución anterior: si sigue válida se omite el formulario
+    cookies = sesiones.cargar_sesion(url, email)
+    if cookies:
+        try:
+            logger.info("🍪 Probando sesión guardada...")
+            sesiones.aplicar_cookies(driver, url, cookies, logger)
+            if sesion_activa_mercurio(driver, logger):
+                logger.info("♻️ Sesión reutilizada. Se omite el login.")
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo reutilizar la sesión guardada: {e}")
+        logger.info("🔐 La sesión guardada ya no es válida. Login normal.")
+        sesiones.invalidar_sesion(url, email)
+
     try:
-        logger.info(f"🌍 Navegando a: {URL}")
+        logger.info(f"🌍 Navegando a: {url}")
         driver.delete_all_cookies()
-        driver.get(URL)
+        driver.get(url)
         logger.info("🔐 Esperando el formulario de login...")
         
         if cancel_event.is_set(): 
-            driver.quit(); return None
+            return False
 
         username_field = wait.until(EC.element_to_be_clickable((By.ID, "txtUsername")))
         password_field = driver.find_element(By.ID, "txtPassword")
         logger.info("🔑 Ingresando credenciales...")
-        time.sleep(0.5)
-        username_field.send_keys(EMAIL)
-        time.sleep(0.5)
-        password_field.send_keys(PASSWORD)
-        time.sleep(0.5)
+        _pausa(0.5)
+        username_field.send_keys(email)
+        _pausa(0.5)
+        password_field.send_keys(password)
+        _pausa(0.5)
         login_button = driver.find_element(By.ID, "gopram")
         driver.execute_script("arguments[0].click();", login_button)
         logger.info("✅ Login enviado. Esperando a que desaparezca el modal...")
         wait.until(EC.invisibility_of_element_located((By.ID, "modal_limit_articulos")))
-        time.sleep(1.0)
+        _pausa(1.0)
         logger.info("👍 Modal cerrado. Vista del diario habilitada.")
 
         # --- CORRECCIÓN CRÍTICA: Asegurar carga de página destino ---
         # A veces el login redirige a portada. Forzamos ir a la URL correcta.
-        if driver.current_url != URL:
+        if driver.current_url != url:
              logger.info("📍 Redirigiendo a la página específica del diario...")
-             driver.get(URL)
-             time.sleep(2)
+             driver.get(url)
+             _pausa(2)
+
+        sesiones.guardar_sesion(url, email, driver.get_cookies())
+        return True
 
     except TimeoutException:
         logger.error("❌ Error: El modal de login no desapareció a tiempo o timeout.")
-        if DEBUG_SCREENSHOTS:
-            guardar_screenshot("logs/error_login.png")
-        driver.quit()
-        return None
+        guardar_screenshot(driver, "logs/error_login.png", logger)
+        return False
     except Exception as e:
         logger.error(f"❌ Error inesperado durante el login: {e}")
-        if DEBUG_SCREENSHOTS:
-            guardar_screenshot("logs/error_login.png")
-        driver.quit()
-        return None
+        guardar_screenshot(driver, "logs/error_login.png", logger)
+        return False
+
+
+def _dividir_paginas(paginas, workers):
+    """
+    Reparte una lista ordenada de páginas en tramos contiguos, uno por worker:
+    [1..40] con 4 workers -> [[1..10], [11..20], [21..30], [31..40]].
+    """
+    paginas = list(paginas)
+    if not paginas:
+        return []
+    workers = max(1, min(workers, len(paginas)))
+    tam = math.ceil(len(paginas) / workers)
+    return [paginas[i:i + tam] for i in range(0, len(paginas), tam)]
+
+
+def procesar_paginas_worker(id_worker, cookies, url, paginas_worker, columnas, cancel_event, logger,
+                            tiempos_espera=None):
+    """
+    Worker headless: reutiliza las cookies del login, salta directo a cada
+    página asignada (o avanza sin capturar si el visor no lo permite) y la
+    extrae. Retorna {page_num: texto}.
+    """
+    resultados = {}
+    ultima = paginas_worker[-1]
+    driver, clean_profile_path = _crear_driver(logger, headless=True)
+    wait = WebDriverWait(driver, 30)
+
+    try:
+        logger.info(f"   🧵 [Worker-{id_worker}] Páginas {paginas_worker[0]}-{ultima}")
+        sesiones.aplicar_cookies(driver, url, cookies, logger)
+        activar_modo_hd(driver, wait, logger)
+
+        pagina_visor, leida, salto_directo = 1, False, True
+        for page_num in paginas_worker:
+            if cancel_event.is_set():
+                logger.info(f"🛑 [Worker-{id_worker}] Cancelado por usuario.")
+                break
+
+            # Páginas que no son de este worker: se saltan de una vez si el visor lo permite
+            if salto_directo and page_num > pagina_visor + 1:
+                salto_directo = ir_a_pagina(driver, page_num, logger)
+                if salto_directo:
+                    logger.info(f"   ⏩ [Worker-{id_worker}] Salto directo a la página {page_num}.")
+                    pagina_visor, leida = page_num, False
+
+            # Sin salto directo: avanzar por el visor sin capturar
+            while pagina_visor < page_num:
+                if not leida:
+                    saltar_pagina(driver, wait, url, pagina_visor, logger, cancel_event)
+                if cancel_event.is_set() or not avanzar_pagina(driver, wait, logger, cancel_event):
+                    break
+                pagina_visor, leida = pagina_visor + 1, False
+            if pagina_visor < page_num:
+                if not cancel_event.is_set():
+                    logger.error(f"   💀 [Worker-{id_worker}] No se pudo avanzar desde la página {pagina_visor}.")
+                break
+
+            resultados[page_num] = texto_pagina(driver, wait, url, page_num, columnas, logger, cancel_event,
+                                                tiempos_espera)
+            leida = True
+            logger.info(f"   💾 [Worker-{id_worker}] Página {page_num} capturada ({len(resultados[page_num])} chars).")
+    except Exception as e:
+        logger.error(f"❌ [Worker-{id_worker}] Error durante la extracción: {e}")
+    finally:
+        _cerrar_driver(driver, clean_profile_path)
+
+    return resultados
+
+
+def _generar_paginas(url, paginas, columnas, cancel_event, workers, refrescar_cache, logger, headless=False):
+    """
+    Generador con la extracción completa: entrega (page_num, texto) en orden de
+    página a medida que cada una queda lista. Lanza Exception si falla el login.
+    """
+    from logger import log_section
+
+    load_dotenv()
+    EMAIL = os.getenv("USUARIO") 
+    PASSWORD = os.getenv("PASSWORD") 
+    WORKERS = workers or WORKERS_PARALELOS
+    tiempos_espera = {}
+
+    marco_horizontal = "═" * 50
+    logger.info(f"\n{marco_horizontal}\n")
+    logger.info("Empezando el proceso de extracción de remates judiciales...")
+    logger.info(f"Datos de entrada:\n URL: {url}, \n Usuario: {EMAIL}, \n Páginas a procesar: {paginas} \n Columnas: {columnas} \n Workers: {WORKERS}")
+
+    # --------------------------------------------------------------------------
+    # CACHÉ DE PÁGINAS
+    # --------------------------------------------------------------------------
+    if refrescar_cache:
+        cache_paginas.invalidar_edicion(url)
+    # Se leen de una vez: lo que no se pueda leer pasa a faltantes y se captura
+    cacheadas = leer_paginas_cacheadas(url, paginas, logger)
+    faltantes = [p for p in range(1, paginas + 1) if p not in cacheadas]
+    logger.info(f"📦 Caché: {len(cacheadas)} páginas disponibles | {len(faltantes)} por descargar.")
+
+    if not faltantes:
+        logger.info("📦 Todas las páginas están en caché. Se omite el navegador.")
+        for page_num in range(1, paginas + 1):
+            if cancel_event.is_set():
+                logger.info("🛑 Cancelado por usuario."); return
+            yield page_num, texto_desde_fragmentos(cacheadas.pop(page_num), page_num, columnas, logger, cancel_event)
+        return
+
+    paralelo = WORKERS > 1 and len(faltantes) > 1
+
+    # --------------------------------------------------------------------------
+    # CONFIGURACIÓN DEL NAVEGADOR
+    # --------------------------------------------------------------------------
+    # En modo paralelo la sesión de login también es headless: solo aporta cookies.
+    driver, clean_profile_path = _crear_driver(logger, headless=headless or paralelo)
+    wait = WebDriverWait(driver, 30) # Aumentado a 30s por seguridad
+
+    # LOGIN
+    if not login_mercurio(driver, wait, url, EMAIL, PASSWORD, logger, cancel_event):
+        _cerrar_driver(driver, clean_profile_path)
+        if cancel_event.is_set():
+            return
+        raise Exception("La extracción web de Santiago falló: no se completó el login.")
+
+    if paralelo:
+        yield from _paginas_en_paralelo(driver, clean_profile_path, url, paginas, faltantes, cacheadas, columnas,
+                                        WORKERS, cancel_event, logger, tiempos_espera)
+        return
 
     # EXTRACCIÓN
+    ultima_faltante = faltantes[-1]
     log_section(logger, "EXTRACT")
     logger.info("--- Iniciando proceso de extracción de texto ---")
     try:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f_out:
-            try:
-                # Botón HD
-                logger.info("   🖼 Activando modo HD (si existe botón)...")
-                hd_button = wait.until(EC.element_to_be_clickable((By.ID, "active_pdf")))
-                driver.execute_script("arguments[0].click();", hd_button)
-                time.sleep(1)
-                dbg(logger, "Botón HD clickeado.")
-            except Exception as e:
-                logger.info(f"   ⚠️ No se pudo activar modo HD (continuo): {e}")
-            
-            for page_num in range(1, PAGINAS_A_PROCESAR + 1):
-                if cancel_event.is_set(): 
-                    logger.info("🛑 Cancelado por usuario."); break
-
-                log_section(logger, "PAGE_PREP")
-                logger.info(f"📄 Procesando página {page_num}...")
-                time.sleep(1)
-                try:
-                    logger.info("   🔍 Buscando el contenedor #viewer y .textLayer...")
-                    
-                    # Espera explicita del #viewer (Solución TimeoutException)
-                    try:
-                        viewer_div = wait.until(EC.presence_of_element_located((By.ID, "viewer")))
-                    except TimeoutException:
-                        logger.warning("   ⚠️ Timeout esperando #viewer. Reintentando carga de URL...")
-                        driver.get(URL) # Intento de recuperación
-                        viewer_div = wait.until(EC.presence_of_element_located((By.ID, "viewer")))
-
-                    
-                    # 1. Esperamos a que la capa exista
-                    text_layer = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
-                    
-                    # 2. VALIDACIÓN CRÍTICA: Esperar a que la capa tenga hijos (texto real)
-                    texto_cargado = False
-                    for i in range(10):
-                        if cancel_event.is_set(): break
-                        divs_texto = text_layer.find_elements(By.TAG_NAME, "div")
-                        if len(divs_texto) > 10: 
-                            texto_cargado = True
-                            logger.info(f"   ✅ Texto detectado: {len(divs_texto)} líneas encontradas.")
-                            break
-                        else:
-                            logger.warning(f"   ⏳ Esperando renderizado de texto (Intento {i+1}/10)...")
-                            time.sleep(0.5)
-                    
-                    if not texto_cargado:
-                        logger.error("   ❌ La capa de texto existe pero está vacía después de esperar.")
-                        if DEBUG_SCREENSHOTS:
-                            guardar_screenshot(f"logs/debug_vacio_pag_{page_num}.png")
-
-                except Exception as e:
-                    logger.error(f"❌ No se encontró viewer/textLayer: {e}")
-                    if DEBUG_SCREENSHOTS:
-                        guardar_screenshot(f"logs/error_page_{page_num}_viewer.png")
-                    raise
-                
-                logger.info("   ✨ Extrayendo texto de la página...")
-                f_out.write(f"--- Página {page_num} ---\n\n")
-                try:
-                    text = capture_text_from_textlayer(viewer_div)
-                    f_out.write(text + "\n\n")
-                    logger.info(f"   💾 Texto de la página {page_num} guardado ({len(text)} chars).")
-                except Exception as e:
-                    logger.error(f"❌ Error al capturar o procesar la página {page_num}: {e}")
-                    if DEBUG_SCREENSHOTS:
-                        guardar_screenshot(f"logs/error_page_{page_num}.png")
-                finally:
-                    f_out.flush()
-                
-                if page_num < PAGINAS_A_PROCESAR:
-                    log_section(logger, "NEXT_PAGE")
-                    try:
-                        logger.info("   ➡️ Avanzando a la siguiente página (click en next_arrow)...")
-                        click_siguiente_pagina(driver, wait)
-                        logger.info("   ✅ Página avanzada correctamente.")
-                    except TimeoutException as te:
-                        logger.warning(f"⚠️ Click 'siguiente' no funcionó: {te}. Fallback con teclado...")
-                        try_keyboard_next(driver)
-                        time.sleep(0.8)
-                        try:
-                            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#viewer .textLayer")))
-                            logger.info("   ✅ Fallback teclado avanzó de página.")
-                        except Exception:
-                            logger.error("   ❌ No se pudo avanzar de página.")
-                            break
-                    except Exception as e:
-                        logger.error(f"⚠️ Error al avanzar de página: {e}")
-                        break
+        activar_modo_hd(driver, wait, logger)
+
+        for page_num in range(1, paginas + 1):
+            if cancel_event.is_set(): 
+                logger.info("🛑 Cancelado por usuario."); break
+
+            if page_num in cacheadas:
+                text = texto_desde_fragmentos(cacheadas.pop(page_num), page_num, columnas, logger, cancel_event)
+            else:
+                text = texto_pagina(driver, wait, url, page_num, columnas, logger, cancel_event, tiempos_espera)
+            logger.info(f"   💾 Texto de la página {page_num} listo ({len(text)} chars).")
+            yield page_num, text
+
+            # Más allá de la última página faltante todo sale de la caché
+            if page_num < ultima_faltante:
+                if page_num not in faltantes and (MODO_ESPERA == "observer" or MODO_CAPTURA == "pdf"):
+                    # La página vino de caché pero el visor la muestra igual: se marca
+                    # como leída para que la espera del avance reconozca la siguiente.
+                    saltar_pagina(driver, wait, url, page_num, logger, cancel_event)
+                if not avanzar_pagina(driver, wait, logger, cancel_event):
+                    break
     except Exception as e:
         log_section(logger, "EXTRACT_ERROR")
         logger.error(f"❌ Error general durante la extracción: {e}")
         
     finally:
         log_section(logger, "CLEANUP")
+        _cerrar_driver(driver, clean_profile_path)
+        resumen_tiempos_espera(tiempos_espera, logger)
+
+
+def _paginas_en_paralelo(driver, clean_profile_path, url, paginas, faltantes, cacheadas, columnas, workers, cancel_event, logger,
+                         tiempos_espera):
+    """
+    Reparte las páginas faltantes entre N sesiones headless que comparten las
+    cookies del login y entrega el resultado (caché + capturas) en orden de página.
+    """
+    from logger import log_section
+
+    cookies = driver.get_cookies()
+    _cerrar_driver(driver, clean_profile_path)
+
+    tramos = _dividir_paginas(faltantes, workers)
+    log_section(logger, "EXTRACT")
+    logger.info(f"🚀 Extracción PARALELA: {len(tramos)} workers | Tramos: {[(t[0], t[-1]) for t in tramos]}")
+
+    textos = {}
+    with ThreadPoolExecutor(max_workers=len(tramos)) as executor:
+        futures = [
+            executor.submit(metricas.heredar(procesar_paginas_worker), i + 1, cookies, url, tramo, columnas,
+                            cancel_event, logger, tiempos_espera)
+            for i, tramo in enumerate(tramos)
+        ]
+        for future in futures:
+            try:
+                textos.update(future.result())
+            except Exception as e:
+                logger.error(f"❌ Error crítico en worker: {e}")
+
+    resumen_tiempos_espera(tiempos_espera, logger)
+
+    sin_capturar = [p for p in faltantes if p not in textos]
+    if sin_capturar and not cancel_event.is_set():
+        logger.warning(f"⚠️ Páginas sin capturar: {sin_capturar}")
+
+    # Merge en orden de página (lo que no capturaron los workers sale de la caché)
+    for page_num in range(1, paginas + 1):
+        if page_num in textos:
+            yield page_num, textos[page_num]
+        elif page_num in cacheadas:
+            yield page_num, texto_desde_fragmentos(cacheadas.pop(page_num), page_num, columnas, logger, cancel_event)
+
+
+def iterar_paginas(url: str, paginas: int, columnas: int, cancel_event, workers: int = None,
+                   refrescar_cache: bool = False, output_file: str = "remates_extraidos.txt",
+                   headless: bool = False):
+    """
+    Generador para el pipeline en streaming: el navegador corre en un hilo
+    productor y cada página terminada se entrega como (page_num, texto) mientras
+    el navegador ya avanza a la siguiente. Además escribe output_file con el
+    mismo formato de siempre ("--- Página N ---"). Con headless, también la
+    sesión secuencial corre sin ventana (cron/CI).
+    """
+    from logger import get_logger
+
+    logger = get_logger("paso1", log_dir="logs", log_file="paso1.log")
+    logger.info("Ejecutando Paso 1 (streaming)...")
+
+    cola = queue.Queue()
+    FIN = object()
+    # Se activa si el consumidor deja de iterar (excepción o cierre del generador)
+    detener = cancelacion.EventoCancelacion(cancel_event)
+
+    def productor():
+        generador = _generar_paginas(url, paginas, columnas, detener, workers, refrescar_cache, logger, headless)
         try:
-            driver.quit()
-        except Exception:
-            pass
-        
-        # Limpiar carpeta temporal si se creó correctamente
-        try:
-            if os.path.exists(clean_profile_path):
-                shutil.rmtree(clean_profile_path)
-        except:
+            for item in generador:
+                cola.put(item)
+                if detener.is_set():
+                    break
+        except Exception as e:
+            cola.put(e)
+        finally:
+            # Cierra el generador: su finally cierra el navegador aunque no haya terminado
+            generador.close()
+            cola.put(FIN)
+
+    hilo = threading.Thread(target=metricas.heredar(productor), name="paso1-productor", daemon=True)
+    hilo.start()
+
+    terminado = False
+    try:
+        with open(output_file, "w", encoding="utf-8") as f_out:
+            while True:
+                item = cola.get()
+                if item is FIN:
+                    terminado = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                page_num, text = item
+                f_out.write(f"--- Página {page_num} ---\n\n")
+                f_out.write(text + "\n\n")
+                f_out.flush()
+                yield page_num, text
+    finally:
+        if not terminado and hilo.is_alive():
+            logger.info("🛑 El consumidor dejó de leer páginas: deteniendo el navegador...")
+            detener.set()
+
+    hilo.join()
+    logger.info(f"✅ Proceso completado. Texto guardado en: {output_file}")
+
+
+# SE AGREGA cancel_event A LOS ARGUMENTOS
+def run_extractor(url: str, paginas: int, columnas: int, cancel_event, workers: int = None,
+                  refrescar_cache: bool = False, headless: bool = False):
+    from logger import get_logger
+
+    logger = get_logger("paso1", log_dir="logs", log_file="paso1.log")
+    logger.info("Ejecutando Paso 1...")
+
+    OUTPUT_FILE = "remates_extraidos.txt"
+    try:
+        for _ in iterar_paginas(url, paginas, columnas, cancel_event, workers, refrescar_cache, OUTPUT_FILE, headless):
             pass
-        
-        logger.info(f"✅ Proceso completado. Texto guardado en: {OUTPUT_FILE}")
+    except Exception as e:
+        logger.error(f"❌ {e}")
+        return None
 
     logger.info(f"✅ Previsualización finalizada. Continuando con el siguiente paso.")
     return OUTPUT_FILE
 
 
 if __name__ == "__main__":
-    import threading
-    # Dummy run for testing
-    run_extractor("", 1, 7, threading.Event())
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extractor de remates - El Mercurio (Santiago)")
+    parser.add_argument("url")
+    parser.add_argument("paginas", type=int)
+    parser.add_argument("columnas", type=int, nargs="?", default=7)
+    parser.add_argument("--workers", type=int, default=None, help="Sesiones headless en paralelo")
+    parser.add_argument("--headless", action="store_true", help="Chrome sin ventana también en modo secuencial")
+    parser.add_argument("--refrescar-cache", action="store_true", help="Ignora y reemplaza las páginas cacheadas de la edición")
+    parser.add_argument("--motor", choices=["bulk", "dom", "pdf"], default=MODO_CAPTURA, help="Motor de captura de texto")
+    args = parser.parse_args()
+    MODO_CAPTURA = args.motor
+
+    run_extractor(args.url, args.paginas, args.columnas, threading.Event(),
+                  workers=args.workers, refrescar_cache=args.refrescar_cache, headless=args.headless)
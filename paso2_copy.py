@@ -1,13 +1,22 @@
+import os
 import re
 import json
+import threading
 from typing import List
 import preview_archivos
 import revision
+import metricas
+import separadores
+import clasificador
 # --- Configuración de logger ---
 from logger import get_logger, log_section, dbg
 
 logger = get_logger("paso2", log_dir="logs", log_file="paso2.log")
 
+# Las ventanas de preview y revisión humana se muestran de a una: en modo lote
+# (main.orquestador_lote) varias ediciones llegan a esta etapa a la vez.
+TURNO_REVISION = threading.Lock()
+
 KEYWORDS_INMUEBLES = [
     "DEPARTAMENTO", "CASA", "PARCELA", "SITIO", "TERRENO", "PATIO", 
     "CONDOMINIO", "BODEGA", "GALPÓN", "GALPON", "LOTEO", "ESTACIONAMIENTO", 
@@ -15,6 +24,31 @@ KEYWORDS_INMUEBLES = [
     "VIVIENDA", "LOCAL", "LOTE"
 ]
 
+# Palabras que apuntan a otro tipo de bien: compiten con las de inmuebles
+KEYWORDS_VEHICULOS = [
+    "VEHÍCULO", "VEHICULO", "AUTOMÓVIL", "AUTOMOVIL", "CAMIONETA", "CAMIÓN", "CAMION",
+    "MOTOCICLETA", "FURGÓN", "FURGON", "TRACTOR", "SEMIRREMOLQUE", "STATION WAGON",
+    "JEEP", "PLACA PATENTE", "PPU"
+]
+
+KEYWORDS_MUEBLES = [
+    "MUEBLE", "BIENES MUEBLES", "ENSERES", "MAQUINARIA", "ESPECIES", "MERCADERÍA",
+    "MERCADERIA", "TELEVISOR", "REFRIGERADOR", "COMPUTADOR", "ELECTRODOMÉSTICO",
+    "ELECTRODOMESTICO"
+]
+
+# Frases que contienen una palabra clave pero no hablan del bien rematado
+FRASES_NEUTRAS = [
+    "POLICÍA LOCAL", "POLICIA LOCAL", "CASA DE MARTILLO", "CASA MATRIZ",
+    "SITIO WEB", "SITIO ELECTRÓNICO", "SITIO ELECTRONICO"
+]
+
+CATEGORIAS_BIENES = {
+    "inmueble": KEYWORDS_INMUEBLES,
+    "vehiculo": KEYWORDS_VEHICULOS,
+    "mueble": KEYWORDS_MUEBLES,
+}
+
 CLAVES_SEPARADORES = [
     r"REMATE",
     r"EXTRACTO",
@@ -101,14 +135,19 @@ CLAVES_SEPARADORES_IQQ = [
 ]
 
 
-def recortar_remates(texto: str):
+PATRON_INICIO_SECCION = r"1616\s+REMATES\s+DE\s+PROPIEDADES|1616"
+
+# Se añaden los nuevos códigos de fin al patrón, escapando los caracteres especiales [ y ]
+PATRON_FIN_SECCION = r"(1635\s+PERSONAS\s+BUSCADAS\s+Y\s+COSAS\s+PERDIDAS|1640\s+CITAN\s+A\s+REUNIÓN\s+INSTITUCIONES|\[CODE:1630\]|\[CODE:1635\]|\[CODE:1640\]|\[CODE:1300\]|\[CODE:1309\]|\[CODE:1312\]|\[CODE:1316\])"
+
+
+@metricas.medir("paso2.recorte")
+def recortar_remates(texto: str, ruta_cortado: str = "remates_cortados.txt"):
     """
     Versión más explícita de la lógica de recorte.
     """
-    patron_inicio = r"1616\s+REMATES\s+DE\s+PROPIEDADES|1616"
-    
-    # Se añaden los nuevos códigos de fin al patrón, escapando los caracteres especiales [ y ]
-    patron_fin = r"(1635\s+PERSONAS\s+BUSCADAS\s+Y\s+COSAS\s+PERDIDAS|1640\s+CITAN\s+A\s+REUNIÓN\s+INSTITUCIONES|\[CODE:1630\]|\[CODE:1635\]|\[CODE:1640\]|\[CODE:1300\]|\[CODE:1309\]|\[CODE:1312\]|\[CODE:1316\])"
+    patron_inicio = PATRON_INICIO_SECCION
+    patron_fin = PATRON_FIN_SECCION
 
     # Buscar patrones
     match_inicio = re.search(patron_inicio, texto, re.IGNORECASE)
@@ -155,162 +194,391 @@ def recortar_remates(texto: str):
         logger.info(f"[INFO] Frase detectada como fin: '{match_fin.group()}'")
         
     # Guardar archivo temporal
-    with open("remates_cortados.txt", "w", encoding="utf-8") as f:
+    with open(ruta_cortado, "w", encoding="utf-8") as f:
         f.write(texto_cortado)
 
     return texto_cortado
 
-def separador_inteligente(match: re.Match) -> str:
+def recortar_remates_stream(tramos, ruta_cortado: str = "remates_cortados.txt"):
     """
-    Reemplaza la fusión detectada de remates por separación segura.
+    Versión incremental de recortar_remates: consume los tramos de texto de
+    cada página y entrega solo lo que queda dentro de la sección de remates,
+    con los mismos 4 casos. Mientras no aparece el inicio los tramos quedan en
+    espera (si nunca aparece, el caso 3/4 se resuelve al final).
     """
-    match_completo = match.group(0)
-    grupo_cierre = match.group(1)
-    grupo_espacios = match.group(2)
-    grupo_inicio = match.group(3)
+    estado = "buscando"   # buscando -> dentro -> terminado | hasta_el_final
+    pendientes = []
+    pos_fin_pendiente = None  # Posición del primer fin visto antes del inicio
+    largo_pendiente = 0
+
+    with open(ruta_cortado, "w", encoding="utf-8") as f_cortado:
+        def entregar(texto):
+            f_cortado.write(texto)
+            return texto
+
+        for tramo in tramos:
+            if estado == "buscando":
+                match_inicio = re.search(PATRON_INICIO_SECCION, tramo, re.IGNORECASE)
+                match_fin = re.search(PATRON_FIN_SECCION, tramo, re.IGNORECASE)
+
+                if match_inicio is None:
+                    if match_fin is not None and pos_fin_pendiente is None:
+                        pos_fin_pendiente = largo_pendiente + match_fin.start()
+                    pendientes.append(tramo)
+                    largo_pendiente += len(tramo)
+                    continue
+
+                logger.info(f"[INFO] Frase detectada como inicio: '{match_inicio.group()}'")
+                pendientes.clear()
+                fin_antes = pos_fin_pendiente is not None or (
+                    match_fin is not None and match_fin.start() < match_inicio.start()
+                )
+                if fin_antes:
+                    logger.warning("[WARN]⚠️ - Caso 1b: Fin antes que inicio, usando desde inicio al final.")
+                    estado = "hasta_el_final"
+                    yield entregar(tramo[match_inicio.start():])
+                elif match_fin is not None:
+                    logger.info("[INFO]✅ - Caso 1: Ambos patrones encontrados, recortando entre ellos.")
+                    logger.info(f"[INFO] Frase detectada como fin: '{match_fin.group()}'")
+                    estado = "terminado"
+                    yield entregar(tramo[match_inicio.start():match_fin.start()])
+                else:
+                    estado = "dentro"
+                    yield entregar(tramo[match_inicio.start():])
+
+            elif estado == "dentro":
+                match_fin = re.search(PATRON_FIN_SECCION, tramo, re.IGNORECASE)
+                if match_fin is not None:
+                    logger.info("[INFO]✅ - Caso 1: Ambos patrones encontrados, recortando entre ellos.")
+                    logger.info(f"[INFO] Frase detectada como fin: '{match_fin.group()}'")
+                    estado = "terminado"
+                    yield entregar(tramo[:match_fin.start()])
+                else:
+                    yield entregar(tramo)
+
+            elif estado == "hasta_el_final":
+                yield entregar(tramo)
+
+            # "terminado": se siguen consumiendo los tramos (el extractor sigue
+            # escribiendo el TXT bruto) pero ya no aportan texto.
+
+        if estado == "dentro":
+            logger.warning("[WARN]⚠️ - Caso 2: Solo inicio encontrado, usando desde inicio al final.")
+        elif estado == "buscando":
+            texto = "".join(pendientes)
+            if pos_fin_pendiente is not None:
+                logger.warning("[WARN]⚠️ - Caso 3: Solo fin encontrado, usando desde el principio al fin.")
+                texto = texto[:pos_fin_pendiente]
+            else:
+                logger.warning("[WARN]⚠️ - Caso 4: Ningún patrón encontrado, usando todo el texto.")
+            if texto:
+                yield entregar(texto)
+
+
+# Cuántos inicios de aviso (desde el final) se prueban como corte por página
+INTENTOS_CORTE_STREAM = 4
+# Tope del texto crudo arrastrado sin corte seguro (unas 5 páginas): sobre él
+# se corta igual en el último inicio de aviso para no reprocesar todo el
+# acumulado en cada página.
+MAX_CRUDO_STREAM = 100_000
+
+
+def _limpiar_y_separar(texto: str, region, cancel_event):
+    """Mismo procesamiento que el TXT completo: encabezados, uniones, limpieza y separadores."""
+    texto = limpiar_encabezados(texto, cancel_event)
+    if texto is None:
+        return None
+    return insertar_separadores(pre_separar_remates_fusionados(limpieza(texto), region), region)
 
-    if grupo_cierre and grupo_inicio:
-        # Evitar doble salto si ya hay salto
-        if "\n" in grupo_espacios:
-            texto_separado = f"{grupo_cierre}{grupo_espacios}{grupo_inicio}"
-        else:
-            texto_separado = f"{grupo_cierre}\n\n{grupo_inicio}"
-        logger.info(f"Separación exitosa: '{grupo_cierre}' | '{grupo_inicio}'")
-        return texto_separado
-    else:
-        logger.warning(f"Separación fallida. Se recuperó el texto original: '{match_completo}'")
-        return match_completo
 
+def _candidatos_corte(crudo: str, region):
+    """Posiciones de los inicios de aviso (cortes de insertar_separadores) en el texto crudo."""
+    claves = CLAVES_SEPARADORES_IQQ if region == "iquique" else CLAVES_SEPARADORES
+    return [m.start() for m in separadores.patron_cortes(claves).finditer(crudo) if m.start() > 0]
+
+
+def _corte_seguro(crudo: str, procesado: str, region, cancel_event):
+    """
+    Busca en el texto crudo un inicio de aviso donde cortar sin cambiar el
+    resultado: procesar crudo[:c] y crudo[c:] por separado tiene que dar lo
+    mismo que procesarlo entero, y la parte derecha tiene que empezar con el
+    separador de párrafos. Retorna (c, izquierda procesada) o (None, None).
+    """
+    for corte in reversed(_candidatos_corte(crudo, region)[-INTENTOS_CORTE_STREAM:]):
+        izquierda = _limpiar_y_separar(crudo[:corte], region, cancel_event)
+        derecha = _limpiar_y_separar(crudo[corte:], region, cancel_event)
+        if izquierda is None or derecha is None:
+            return None, None
+        if derecha.startswith("\n\n") and izquierda + derecha == procesado:
+            return corte, izquierda
+    return None, None
 
+
+def separar_remates_stream(tramos, region, cancel_event):
+    """
+    Limpieza y separación incremental. El texto crudo se acumula desde el
+    último corte y se procesa completo en cada página; lo que queda antes del
+    último inicio de aviso que se puede cortar sin alterar el resultado se
+    entrega y el resto (crudo, sin limpiar) se arrastra a la página siguiente.
+    Así los remates que cruzan páginas quedan unidos y el texto no pasa dos
+    veces por la limpieza: "\n\n".join de lo entregado es igual al
+    procesamiento del TXT completo.
+    Si el acumulado supera MAX_CRUDO_STREAM sin un corte seguro, se corta en
+    el último inicio de aviso (o al final si no hay) y esa unión puede
+    diferir del TXT completo.
+    """
+    crudo = ""
+    tras_corte = False  # crudo empieza en un corte: su "\n\n" inicial ya va entre párrafos
+
+    def parrafos(procesado):
+        return (procesado[2:] if tras_corte and procesado.startswith("\n\n") else procesado).split("\n\n")
+
+    for tramo in tramos:
+        if cancel_event.is_set():
+            logger.info("🛑 Proceso cancelado por usuario.")
+            return
+
+        crudo += tramo
+        procesado = _limpiar_y_separar(crudo, region, cancel_event)
+        if procesado is None:
+            return
+        corte, izquierda = _corte_seguro(crudo, procesado, region, cancel_event)
+        if cancel_event.is_set():
+            return
+        if corte is None:
+            if len(crudo) <= MAX_CRUDO_STREAM:
+                continue
+            candidatos = _candidatos_corte(crudo, region)
+            corte = candidatos[-1] if candidatos else len(crudo)
+            logger.warning(f"⚠️ {len(crudo)} caracteres sin un corte seguro: se corta en la posición {corte}.")
+            izquierda = _limpiar_y_separar(crudo[:corte], region, cancel_event) if candidatos else procesado
+            if izquierda is None:
+                return
+        yield from parrafos(izquierda)
+        crudo, tras_corte = crudo[corte:], True
+
+    if crudo:
+        procesado = _limpiar_y_separar(crudo, region, cancel_event)
+        if procesado is None:
+            return
+        yield from parrafos(procesado)
+
+
+@metricas.medir("paso2.pre_separacion")
 def pre_separar_remates_fusionados(texto: str, region) -> str:
     """
-    Busca patrones de remates fusionados y los separa de forma segura.
+    Busca patrones de remates fusionados (firma, teléfono o correo seguido de
+    un inicio de remate) y los separa de forma segura.
     """
     logger.debug(f"Buscando y separando remates fusionados para {region}...")
-    if region == "iquique":
-        CLAVES_SEPARADORES = CLAVES_SEPARADORES_IQQ
-    else:
-        CLAVES_SEPARADORES = CLAVES_SEPARADORES
-    
-    bloque_manual = [
-        r"REMATE\b",
-        r"REMATE[:.]?",
-        r"JUEZ PARTIDOR",
-        r"JUEZ ARBITRO",
-        r"LICITACI[ÓO]N\s+REMATE",
-        r"POR RESOLUCI[ÓO]N\sDEL\s4°\sJUZGADO",
-        r"NOTIFICACI[ÓO]N[.:]?\s+VIG[ÉE]SIMO\s+S[ÉE]PTIMO",
-        r"\bPARTIDOR\b",
-        r"CUARTO\s+REMATE\s+P[ÚU]BLICO[,;]?\s*NUEVO"
-    ]
+    claves_separadores = CLAVES_SEPARADORES_IQQ if region == "iquique" else CLAVES_SEPARADORES
 
-    
-    # CLAVES_SEPARADORES debería ser otra lista definida previamente
-    todos_los_inicios = bloque_manual + CLAVES_SEPARADORES  
-
-    palabras_cierre = r"\b(?:Secretaría|Secretario\(a\)|La Actuaria|El Actuario)\b"
-    patron_email = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    patron_telefono = r'(?:\+56\s?)?[29]\s?\d{4}\s?\d{4}'
-    palabras_inicio = r"(?:{})".format("|".join(todos_los_inicios))
-
-    # Patrón final: cierre + espacios + inicio
-    patron_fusion = re.compile(
-        f"({palabras_cierre}|{patron_telefono}|{patron_email})"  # grupo 1: cierre
-        r"(\s+)"                                                # grupo 2: espacios (pueden incluir saltos)
-        f"({palabras_inicio})"                                   # grupo 3: inicio
-    )
+    partes = []
+    ultimo = 0
+    for inicio_cierre, inicio_espacios, inicio_remate, fin in separadores.fusiones(texto, claves_separadores):
+        espacios = texto[inicio_espacios:inicio_remate]
+        partes.append(texto[ultimo:inicio_espacios])
+        # Evitar doble salto si ya hay salto
+        partes.append(espacios if "\n" in espacios else "\n\n")
+        partes.append(texto[inicio_remate:fin])
+        ultimo = fin
+        logger.info(f"Separación exitosa: '{texto[inicio_cierre:inicio_espacios]}' | '{texto[inicio_remate:fin]}'")
 
-    texto_corregido = patron_fusion.sub(separador_inteligente, texto)
-    return texto_corregido
+    if not partes:
+        return texto
+    partes.append(texto[ultimo:])
+    return "".join(partes)
 
 
 # --- CORRECCIÓN 1: Agregar cancel_event ---
 def limpiar_encabezados(texto: str, cancel_event) -> str:
+    texto = _eliminar_encabezados(texto, cancel_event)
+    if texto is None:
+        return None
+    return _unir_lineas(texto, cancel_event)
+
+
+# --- Motor de limpieza: patrones compilados una sola vez al importar ---
+# Los reemplazos se siguen aplicando en el mismo orden de siempre: cada uno
+# trabaja sobre el texto que dejó el anterior, así que fundirlos en una sola
+# alternancia cambiaría el resultado. Lo que se optimiza es cada pasada:
+#   - se omiten los patrones cuyo literal obligatorio no aparece en el texto,
+#   - los patrones se escriben de forma que el motor salte directo a los
+#     candidatos (literal al inicio en vez de \b o de una clase de caracteres),
+#   - las uniones de líneas recorren solo los saltos de línea del texto.
+# La salida es idéntica byte a byte a la de las expresiones originales.
+
+_FLAGS_ENCABEZADOS = re.IGNORECASE | re.MULTILINE
+
+# (patrón, literal que toda coincidencia contiene, o None)
+_PATRONES_ELIMINAR = [
+    (re.compile(r"---\s+PÁGINA\s+\d+\s+---\s*\n\d+\s*\n", _FLAGS_ENCABEZADOS), "---"),
+    (re.compile(r"^(?:LUNES|MARTES|MIÉRCOLES|JUEVES|VIERNES|SÁBADO|DOMINGO)\s+\d{1,2}\s+DE\s+[A-ZÁÉÍÓÚÑ]+\s+DE\s+\d{4}$", _FLAGS_ENCABEZADOS), None),
+    (re.compile(r"1611\s+JUDICIALES", _FLAGS_ENCABEZADOS), "1611"),
+    (re.compile(r"1612\s+REMATES", _FLAGS_ENCABEZADOS), "1612"),
+    (re.compile(r"1616\s+REMATES\s+DE\s+PROPIEDADES", _FLAGS_ENCABEZADOS), "1616"),
+    (re.compile(r"1635\s+PERSONAS\s+BUSCADAS\s+Y\s+COSAS\s+PERDIDAS", _FLAGS_ENCABEZADOS), "1635"),
+    (re.compile(r"1640\s+CITAN\s+A\s+REUNIÓN\s+INSTITUCIONES", _FLAGS_ENCABEZADOS), "1640"),
+    # Equivale a \bECONÓMICOS...: el \b se comprueba después del literal
+    (re.compile(r"ECONÓMICOS(?<!\wECONÓMICOS)\s+CLASIFICADOS\b", _FLAGS_ENCABEZADOS), None),
+    (re.compile(r"---\s+Página\s+\d+\s+---", _FLAGS_ENCABEZADOS), "---"),
+    (re.compile(r"^\s*\d+\s*$"
+                r"^\s*EL\s+MERCURIO\s+DE\s+VALPARA[ÍI]SO\s*$", _FLAGS_ENCABEZADOS), None),
+]
+
+# Uniones de líneas en orden. Las de la forma "<car>\s*\n\s*<sigue>" van como
+# (previo, largo del previo, siguiente, separador, caracteres del previo que se
+# descartan) y las resuelve _unir_saltos; el resto como (patrón, reemplazo).
+_SALTO = re.compile(r"\n\s*")
+_UNIONES = [
+    # (\w+)-\s*\n\s*(\w+) -> \1\2
+    (re.compile(r"\w-", re.IGNORECASE), 2, re.compile(r"\w+", re.IGNORECASE), "", 1),
+    # ([a-zA-Z0-9_.-])\s*\n\s*(@) -> \1\2
+    (re.compile(r"[a-zA-Z0-9_.-]", re.IGNORECASE), 1, re.compile(r"@"), "", 0),
+    (re.compile(r"(:)\s*\n\s*([a-zA-Z0-9])", re.IGNORECASE), r"\1 \2"),
+    # Equivale a \b(N|N°|...): el lookahead descarta rápido las demás palabras
+    (re.compile(r'\b(?=[NDOBERP])(N|N°|Nº|Departamento|Depto|Oficina|Of|Bodega|Estacionamiento|Rol|Piso)\s*\n\s*(\d+)', re.IGNORECASE), r'\1 \2'),
+    (re.compile(r"(\d)\s*\n\s*([a-z])", re.IGNORECASE), r"\1 \2"),
+    # ([a-z0-9,])\s*\n\s*([A-Z][a-z]) -> \1 \2
+    (re.compile(r"[a-z0-9,]", re.IGNORECASE), 1, re.compile(r"[A-Z][a-z]", re.IGNORECASE), " ", 0),
+]
+
+
+def _unir_saltos(texto: str, previo, largo_previo: int, siguiente, separador: str, quitar: int = 0) -> str:
+    r"""
+    Equivalente exacto de re.sub(r"(<previo>)\s*\n\s*(<siguiente>)", r"\1<sep>\2")
+    para un `previo` de largo fijo, pero visitando solo los bloques de espacios
+    que contienen un salto de línea en vez de probar cada posición del texto.
+    Respeta que re.sub no solapa coincidencias: si el carácter previo ya fue
+    consumido por la unión anterior, el salto queda como está.
+    """
+    partes = []
+    ultimo = 0      # hasta dónde se copió el texto original
+    consumido = 0   # fin de la última coincidencia (incluye lo que exige `siguiente`)
+    for m in _SALTO.finditer(texto):
+        inicio = m.start()
+        while inicio > 0 and texto[inicio - 1].isspace():
+            inicio -= 1
+        desde = inicio - largo_previo
+        if desde < consumido or not previo.match(texto, desde):
+            continue
+        fin = siguiente.match(texto, m.end())
+        if not fin:
+            continue
+        partes.append(texto[ultimo:inicio - quitar])
+        partes.append(separador)
+        ultimo = m.end()
+        consumido = fin.end()
+
+    if not partes:
+        return texto
+    partes.append(texto[ultimo:])
+    return "".join(partes)
+
+
+@metricas.medir("paso2.encabezados")
+def _eliminar_encabezados(texto: str, cancel_event) -> str:
     logger.debug("Eliminando encabezados conocidos...")
-    patrones_eliminar = [
-        r"---\s+PÁGINA\s+\d+\s+---\s*\n\d+\s*\n",
-        r"^(?:LUNES|MARTES|MIÉRCOLES|JUEVES|VIERNES|SÁBADO|DOMINGO)\s+\d{1,2}\s+DE\s+[A-ZÁÉÍÓÚÑ]+\s+DE\s+\d{4}$",
-        r"1611\s+JUDICIALES",
-        r"1612\s+REMATES",
-        r"1616\s+REMATES\s+DE\s+PROPIEDADES",
-        r"1635\s+PERSONAS\s+BUSCADAS\s+Y\s+COSAS\s+PERDIDAS",
-        r"1640\s+CITAN\s+A\s+REUNIÓN\s+INSTITUCIONES",
-        r"\bECONÓMICOS\s+CLASIFICADOS\b",
-        r"---\s+Página\s+\d+\s+---",
-        r"^\s*\d+\s*$"
-        r"^\s*EL\s+MERCURIO\s+DE\s+VALPARA[ÍI]SO\s*$"
-    ]
-    for patron in patrones_eliminar:
+    for patron, literal in _PATRONES_ELIMINAR:
         
         if cancel_event.is_set():
             logger.info("🛑 Proceso cancelado por usuario.")
             return None # Retorna None para abortar
-        texto = re.sub(patron, "", texto, flags=re.IGNORECASE | re.MULTILINE)
-
-    patrones_union = [
-        (r"(\w+)-\s*\n\s*(\w+)", r"\1\2"),
-        (r"([a-zA-Z0-9_.-])\s*\n\s*(@)", r"\1\2"),
-        (r"(:)\s*\n\s*([a-zA-Z0-9])", r"\1 \2"),
-        (r'\b(N|N°|Nº|Departamento|Depto|Oficina|Of|Bodega|Estacionamiento|Rol|Piso)\s*\n\s*(\d+)', r'\1 \2'),
-        (r"(\d)\s*\n\s*([a-z])", r"\1 \2"),
-        (r"([a-z0-9,])\s*\n\s*([A-Z][a-z])", r"\1 \2")
-    ]
-    for patron, reemplazo in patrones_union:
+        if literal is not None and literal not in texto:
+            continue
+        texto = patron.sub("", texto)
+
+    return texto
+
+
+@metricas.medir("paso2.union_lineas")
+def _unir_lineas(texto: str, cancel_event) -> str:
+    """
+    Une palabras cortadas con guion, correos, números de depto, etc. que
+    quedaron partidos en dos líneas.
+    """
+    for regla in _UNIONES:
         
         if cancel_event.is_set():
             logger.info("🛑 Proceso cancelado por usuario.")
             return None
-        texto = re.sub(patron, reemplazo, texto, flags=re.IGNORECASE)
+        if len(regla) == 2:
+            patron, reemplazo = regla
+            texto = patron.sub(reemplazo, texto)
+        else:
+            texto = _unir_saltos(texto, *regla)
     
     return texto
 
 
+@metricas.medir("paso2.separadores")
 def insertar_separadores(texto: str, region) -> str:
     logger.debug("Insertando separadores entre avisos...")
-    if region == "iquique":
-        CLAVES_SEPARADORES = CLAVES_SEPARADORES_IQQ
-    else:
-        CLAVES_SEPARADORES = CLAVES_SEPARADORES
-
-    patron_frases = "|".join(CLAVES_SEPARADORES)
-    patron_separador = rf"""
-        \n
-        (?=
-            \s*
-            (?:{patron_frases})
-            (?:\s+[A-ZÁÉÍÓÚÑ\d]+)*
-        )
+    claves_separadores = CLAVES_SEPARADORES_IQQ if region == "iquique" else CLAVES_SEPARADORES
+    return separadores.patron_cortes(claves_separadores).sub("\n\n", texto)
+
+# "[CODE:" va dos veces a propósito: quitar "[CO[CODE:DE:" deja otro "[CODE:"
+_CODIGOS_ELIMINAR = ("[CODE:1616]", "[CODE:1612]", "[CODE:", "[CODE:", "1616]")
+_SALTOS_MULTIPLES = re.compile(r"\n\s*\n+")
+_PUNTOS_SUSPENSIVOS = re.compile(r"\s*\.\.\s*")
+_ESPACIOS_MULTIPLES = re.compile(r"\s{2,}")
+_ESPACIO_ANTES_SIGNO = re.compile(r"\s+(?=[,.;:])")
+_DOS_PUNTOS_HORA = re.compile(r":(?<=\d:)\s*(?=\d\d)")
+_MONTO_PESOS = re.compile(r"\$\s*([\d\.]+)\s*-\s*")
+
+
+def _normalizar_horas(texto: str) -> str:
+    r"""
+    Equivalente exacto de re.sub(r"(\d{1,2}):\s*(\d{2})", r"\1:\2"), anclado
+    en los ':' del texto. Una hora cuyo primer dígito ya fue consumido por la
+    anterior (ej. "1:23: 45") no se toca, igual que con re.sub.
     """
-    return re.sub(patron_separador, "\n\n", texto, flags=re.MULTILINE | re.VERBOSE)
-
+    partes = []
+    ultimo = 0
+    consumido = 0
+    for m in _DOS_PUNTOS_HORA.finditer(texto):
+        if m.start() - 1 < consumido:
+            continue
+        consumido = m.end() + 2
+        if m.end() - m.start() > 1:
+            partes.append(texto[ultimo:m.start() + 1])
+            ultimo = m.end()
+
+    if not partes:
+        return texto
+    partes.append(texto[ultimo:])
+    return "".join(partes)
+
+
+@metricas.medir("paso2.limpieza")
 def limpieza(texto: str) -> str:
     logger.debug("[LIMPIEZA] - Eliminando líneas vacías múltiples y códigos...")
 
-    # 1. Eliminar códigos específicos
-    texto = re.sub(r'\[CODE:1616\]', '', texto)
-    texto = re.sub(r'\[CODE:1612\]', '', texto)
-    texto = re.sub(r'\[CODE:', '', texto)
-    texto = re.sub(r'\[CODE:', '', texto)
-    texto = re.sub(r'1616\]', '', texto)
+    # 1. Eliminar códigos específicos (literales: basta str.replace)
+    for codigo in _CODIGOS_ELIMINAR:
+        texto = texto.replace(codigo, "")
     
     # 2. Compactar saltos de línea excesivos
-    texto = re.sub(r"\n\s*\n+", "\n\n", texto)
+    texto = _SALTOS_MULTIPLES.sub("\n\n", texto)
     # 3. Unificar puntos suspensivos
-    texto = re.sub(r"\s*\.\.\s*", " ", texto)
+    if ".." in texto:
+        texto = _PUNTOS_SUSPENSIVOS.sub(" ", texto)
     # 4. Normalizar espacios múltiples
-    texto = re.sub(r"\s{2,}", " ", texto)
+    texto = _ESPACIOS_MULTIPLES.sub(" ", texto)
     # 5. Corregir espacios antes de signos de puntuación
-    texto = re.sub(r"\s+([,.;:])", r"\1", texto)
+    texto = _ESPACIO_ANTES_SIGNO.sub("", texto)
     # 7. Normalizar horas con espacios
-    texto = re.sub(r"(\d{1,2}):\s*(\d{2})", r"\1:\2", texto)
+    texto = _normalizar_horas(texto)
     # 8. Corregir formato de montos en pesos
-    texto = re.sub(r"\$\s*([\d\.]+)\s*-\s*", r"$\1", texto)
-    texto = re.sub(r"\s{2,}", " ", texto)
+    if "$" in texto:
+        texto = _MONTO_PESOS.sub(r"$\1", texto)
+    texto = _ESPACIOS_MULTIPLES.sub(" ", texto)
 
     return texto
 
 
 # --- CORRECCIÓN 2: Agregar cancel_event ---
+@metricas.medir("paso2.parrafos")
 def extraer_parrafos_remates(texto: str, cancel_event) -> List[str]:
     logger.debug("Extrayendo párrafos de remates...")
     parrafos_brutos = texto.split('\n\n')
@@ -329,22 +597,34 @@ def limpiar_encabezados_y_guardar(
     cancel_event,
     region,
     input_path: str,
-    output_path: str = "remates_limpio.txt"
+    output_path: str = "remates_limpio.txt",
+    paginas=None,
+    carpeta_trabajo: str = "",
+    politica_revision: str = "interactiva"
 ) -> str:
-    logger.info(f"Iniciando limpieza de encabezados para: {input_path} para {region}")
-    with open(input_path, "r", encoding="utf-8") as f:
-        texto = f.read()
-    
-    texto_cortado = recortar_remates(texto) 
-    region = region
-    # CORRECCIÓN: Pasar cancel_event
-    texto_limpio = limpiar_encabezados(texto_cortado, cancel_event)
-    if texto_limpio is None: return None # Check de cancelación
+    ruta_cortado = os.path.join(carpeta_trabajo, "remates_cortados.txt")
+    if paginas is not None:
+        # Streaming: las páginas llegan desde el extractor mientras sigue navegando
+        logger.info(f"Iniciando limpieza en streaming (página a página) para {region}")
+        tramos = (f"--- Página {n} ---\n\n{texto}\n\n" for n, texto in paginas)
+        parrafos = list(separar_remates_stream(recortar_remates_stream(tramos, ruta_cortado), region, cancel_event))
+        if cancel_event.is_set(): return None
+        texto_final = "\n\n".join(parrafos)
+    else:
+        logger.info(f"Iniciando limpieza de encabezados para: {input_path} para {region}")
+        with open(input_path, "r", encoding="utf-8") as f:
+            texto = f.read()
+        
+        texto_cortado = recortar_remates(texto, ruta_cortado)
+        region = region
+        # CORRECCIÓN: Pasar cancel_event
+        texto_limpio = limpiar_encabezados(texto_cortado, cancel_event)
+        if texto_limpio is None: return None # Check de cancelación
 
-    texto_clean = limpieza(texto_limpio)
-    texto_pre_separado = pre_separar_remates_fusionados(texto_clean, region)
-    texto_final = insertar_separadores(texto_pre_separado, region)
-    #texto_final = limpieza(texto_separado) 
+        texto_clean = limpieza(texto_limpio)
+        texto_pre_separado = pre_separar_remates_fusionados(texto_clean, region)
+        texto_final = insertar_separadores(texto_pre_separado, region)
+        #texto_final = limpieza(texto_separado) 
 
     if output_path:
         logger.info("Limpieza terminada")
@@ -352,7 +632,9 @@ def limpiar_encabezados_y_guardar(
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(texto_final)
             
-        preview_archivos.mostrar_preview_html(output_path, cancel_event)
+        if politica_revision == "interactiva":
+            with TURNO_REVISION, metricas.etapa("paso2.preview_humano"):
+                preview_archivos.mostrar_preview_html(output_path, cancel_event)
         
         if cancel_event.is_set():
             logger.info("🛑 Proceso cancelado por usuario.")
@@ -369,48 +651,81 @@ def limpiar_encabezados_y_guardar(
 # 🔍 NUEVA FUNCIÓN DE FILTRADO (Autos vs Casas)
 # ==========================================
 # --- CORRECCIÓN 3: Agregar cancel_event ---
-def filtrar_remates_inmuebles(lista_remates: List[dict], cancel_event) -> tuple[List[dict], List[dict]]:
+@metricas.medir("paso2.filtro_inmuebles")
+def filtrar_remates_inmuebles(lista_remates: List[dict], cancel_event) -> tuple[List[dict], List[dict], dict]:
     """
-    Recorre la lista de remates y separa los que contienen palabras clave de inmuebles
-    de los que no (posibles autos, muebles, etc.).
+    Clasifica todos los remates de una vez (ver clasificador.py) y separa los
+    que tienen más evidencia de inmueble de los demás (autos, muebles, sin
+    palabras clave). Las palabras se buscan completas: "LOCAL" dentro de
+    "POLICÍA LOCAL" o "CASA" dentro de "CASABLANCA" ya no cuentan.
+
+    Retorna (validos, descartados, clasificacion) donde clasificacion es
+    {id_remate: {"categoria", "puntajes", "evidencia"}} para la revisión humana.
     """
+    logger.info("🕵️ Filtrando remates por tipo de bien (Inmuebles vs Otros)...")
+
+    if cancel_event.is_set():
+        logger.info("🛑 Proceso cancelado por usuario.")
+        return None, None, None
+
+    resultados = clasificador.clasificar_lote(
+        [item['remate'] for item in lista_remates],
+        CATEGORIAS_BIENES,
+        FRASES_NEUTRAS,
+        cancel_event,
+    )
+    if resultados is None:
+        logger.info("🛑 Proceso cancelado por usuario.")
+        return None, None, None
+
     validos = []     # Casas, deptos, terrenos...
     descartados = [] # Autos, camiones, otros...
-
-    logger.info("🕵️ Filtrando remates por tipo de bien (Inmuebles vs Otros)...")
-    
-    for item in lista_remates:
-        
-        if cancel_event.is_set():
-            logger.info("🛑 Proceso cancelado por usuario.")
-            return None, None
-        texto = item['remate'].upper()
-        
-        # Estrategia LISTA BLANCA:
-        # Si contiene AL MENOS UNA palabra clave de inmueble, se queda.
-        # Si no tiene ninguna, se descarta (probablemente es auto o mueble).
-        es_inmueble = False
-        for kw in KEYWORDS_INMUEBLES:
-            if cancel_event.is_set():
-                return None, None
-            # Buscamos la palabra completa o parte de ella (ej: DEPARTAMENTO)
-            if kw in texto:
-                es_inmueble = True
-                break
-        
-        if es_inmueble:
+    clasificacion = {}
+    for item, resultado in zip(lista_remates, resultados):
+        clasificacion[item['id_remate']] = resultado
+        if resultado["categoria"] == "inmueble":
             validos.append(item)
         else:
             descartados.append(item)
+            logger.debug(f"Remate #{item['id_remate']} descartado: {resultado['puntajes']}")
+
+    por_categoria = {}
+    for resultado in resultados:
+        categoria = resultado["categoria"] or "sin_evidencia"
+        por_categoria[categoria] = por_categoria.get(categoria, 0) + 1
 
-    logger.info(f"📊 Resultado Filtrado: {len(validos)} Inmuebles válidos | {len(descartados)} Descartados (No inmuebles)")
-    return validos, descartados
+    logger.info(f"📊 Resultado Filtrado: {len(validos)} Inmuebles válidos | {len(descartados)} Descartados (No inmuebles) | {por_categoria}")
+    metricas.contar(items=len(lista_remates), validos=len(validos), descartados=len(descartados))
+    return validos, descartados, clasificacion
 
-def procesar_remates(cancel_event, region, input_path: str, archivo_final: str = "remates_separados.json") -> str:
-    logger.info(f"Procesando archivo de remates: {input_path} para {region}")
+def ruta_reporte_revision(archivo_final: str) -> str:
+    """Dónde deja procesar_remates el reporte de la política "auto_reporte"."""
+    return archivo_final.replace(".json", "_revision.json")
+
+def procesar_remates(cancel_event, region, input_path: str = None, archivo_final: str = "remates_separados.json",
+                     paginas=None, carpeta_trabajo: str = "", politica_revision: str = "interactiva") -> str:
+    """
+    Limpia, separa y filtra los remates. Recibe el TXT completo (input_path) o,
+    en modo streaming, un iterable de (page_num, texto) como el de
+    paso1_copy.iterar_paginas. Los intermedios (remates_cortados.txt,
+    remates_limpio.txt) se escriben en carpeta_trabajo.
+
+    politica_revision (ver revision.POLITICAS_REVISION): "interactiva" abre las
+    ventanas de preview y revisión; "auto" y "auto_reporte" aceptan la
+    clasificación automática sin ventanas ("auto_reporte" deja además
+    <archivo_final>_revision.json con la decisión por remate).
+    """
+    if politica_revision not in revision.POLITICAS_REVISION:
+        raise ValueError(f"Política de revisión desconocida: {politica_revision}. "
+                         f"Opciones: {', '.join(revision.POLITICAS_REVISION)}")
+
+    logger.info(f"Procesando archivo de remates: {input_path or 'streaming'} para {region}")
     
     # 1. Limpieza y Texto Plano
-    texto_limpio = limpiar_encabezados_y_guardar(cancel_event,region, input_path, output_path="remates_limpio.txt")
+    texto_limpio = limpiar_encabezados_y_guardar(cancel_event,region, input_path,
+                                                 output_path=os.path.join(carpeta_trabajo, "remates_limpio.txt"),
+                                                 paginas=paginas, carpeta_trabajo=carpeta_trabajo,
+                                                 politica_revision=politica_revision)
     if cancel_event.is_set() or texto_limpio is None:
         return None
     
@@ -420,28 +735,43 @@ def procesar_remates(cancel_event, region, input_path: str, archivo_final: str =
         return None
 
     logger.info(f"Se han detectado {len(parrafos)} bloques de texto.")
+    metricas.contar("paso2.parrafos", items=len(parrafos), bytes=len(texto_limpio.encode("utf-8")))
     
     # 3. Creación de lista cruda
     lista_cruda = [{"id_remate": i, "remate": p.strip()} for i, p in enumerate(parrafos, 1)]
     
     # 4. FILTRADO (NUEVO)
-    resultado_filtrado = filtrar_remates_inmuebles(lista_cruda, cancel_event)
-    if resultado_filtrado is None or resultado_filtrado[0] is None:
+    lista_validos, lista_descartados, clasificacion = filtrar_remates_inmuebles(lista_cruda, cancel_event)
+    if lista_validos is None:
         return None
     
-    lista_validos, lista_descartados = resultado_filtrado
-    
     if cancel_event.is_set():
         return None
     
-    logger.info("👀 Abriendo ventana de revisión humana...")
-    
-    # Llamamos a la ventana bloqueante
-    lista_validos_final, lista_descartados_final = revision.mostrar_revision(
-        lista_validos, 
-        lista_descartados, 
-        cancel_event
-    )
+    if politica_revision == "interactiva":
+        if TURNO_REVISION.locked():
+            logger.info("⏳ Otra edición está en revisión humana, esperando turno...")
+        logger.info("👀 Abriendo ventana de revisión humana...")
+        
+        # Llamamos a la ventana bloqueante
+        with TURNO_REVISION, metricas.etapa("paso2.revision_humana"):
+            lista_validos_final, lista_descartados_final = revision.mostrar_revision(
+                lista_validos, 
+                lista_descartados, 
+                cancel_event,
+                clasificacion=clasificacion
+            )
+    else:
+        logger.info(f"🤖 Revisión automática (política '{politica_revision}'): se acepta la clasificación.")
+        ruta_reporte = ruta_reporte_revision(archivo_final) if politica_revision == "auto_reporte" else None
+        lista_validos_final, lista_descartados_final = revision.revision_automatica(
+            lista_validos,
+            lista_descartados,
+            clasificacion,
+            ruta_reporte=ruta_reporte
+        )
+        if ruta_reporte:
+            logger.info(f"📝 Reporte de revisión automática: {ruta_reporte}")
 
     if cancel_event.is_set():
         logger.warning("🛑 Proceso cancelado durante la revisión humana.")
@@ -461,7 +791,9 @@ def procesar_remates(cancel_event, region, input_path: str, archivo_final: str =
         logger.info(f"🗑️ Remates descartados guardados en: {archivo_descarte}")
 
     # Preview HTML del válido
-    preview_archivos.mostrar_preview_html(archivo_final, cancel_event)
+    if politica_revision == "interactiva":
+        with TURNO_REVISION, metricas.etapa("paso2.preview_humano"):
+            preview_archivos.mostrar_preview_html(archivo_final, cancel_event)
     
     logger.info(f"✅ Archivo final (INMUEBLES) guardado en: {archivo_final}")
     return archivo_final
@@ -1,17 +1,28 @@
 import json
 import re
 import time
-import pandas as pd
-from openai import APIError, OpenAI, RateLimitError
+import random
+import hashlib
+import textwrap
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai import APIConnectionError, APIError, InternalServerError, OpenAI, RateLimitError
 
 # --- Configuración de logger ---
 from logger import get_logger, log_section, dbg
+import metricas
+import cache_llm
+import preextractor
+import bitacora
+import exportar_excel
 
 logger = get_logger("paso3", log_dir="logs", log_file="paso3.log")
 
 # ==================== FUNCIONES AUXILIARES ====================
 
 # CORRECCIÓN 1: Agregar cancel_event como argumento
+@metricas.medir("paso3.limpieza_final")
 def funcion_limpieza_final(remates_json, cancel_event):
     """
     Realiza una limpieza básica en el texto de cada remate.
@@ -42,11 +53,11 @@ def funcion_limpieza_final(remates_json, cancel_event):
     logger.info("🧹 - Limpieza final terminada.")
     return remates_limpios
 
-def generar_prompt_remate(texto_remate: str) -> str:
-    """
-    Crea el prompt estructurado para la API de OpenAI.
-    """ 
-    prompt = f"""
+# Reglas de extracción: van como mensaje de sistema, idéntico en todas las
+# llamadas, y solo el texto del remate cambia en el mensaje de usuario. Así el
+# proveedor reutiliza el prefijo (prompt caching) y cobra esos tokens como
+# cacheados. Cualquier cambio aquí => subir PROMPT_VERSION.
+INSTRUCCIONES_SISTEMA = """
         EXTRACTOR DE DATOS DE REMATES JUDICIALES
             Eres un especialista en extracción de datos de remates judiciales chilenos. Tu tarea es extraer información precisa y estructurada del texto proporcionado.
         REGLAS FUNDAMENTALES
@@ -136,106 +147,286 @@ def generar_prompt_remate(texto_remate: str) -> str:
         9.- INSTRUCCIÓN FINAL
             -haz una pequeña validacion de los datos, contrasta con el remate solo para verificar.
             -Respeta el esquema JSON.
-            -Procesa el siguiente texto de remate y devuelve ÚNICAMENTE el JSON resultante, en español, siguiendo todas las reglas establecidas:
-        {texto_remate}
+            -Procesa el texto de remate que envía el usuario y devuelve ÚNICAMENTE el JSON resultante, en español, siguiendo todas las reglas establecidas.
+""".strip()
+
+
+def generar_prompt_remate(texto_remate: str) -> str:
     """
+    Mensaje de usuario para la API de OpenAI: el texto del remate y, como
+    pista, lo que preextractor ya sacó con reglas locales (las reglas van en
+    INSTRUCCIONES_SISTEMA).
+    """
+    pistas = {campo: valor for campo, valor in preextractor.extraer(texto_remate).items() if campo != "diario"}
+    if not pistas:
+        return f"TEXTO DEL REMATE:\n{texto_remate}"
+    return (
+        f"TEXTO DEL REMATE:\n{texto_remate}\n"
+        "DATOS PRE-EXTRAÍDOS CON REGLAS LOCALES (verifícalos contra el texto; con varias propiedades o lotes "
+        f"pueden no aplicar a todas):\n{json.dumps(pistas, ensure_ascii=False)}"
+    )
+
 
-    return prompt.strip()
+def generar_mensajes(texto_remate: str) -> list:
+    return [
+        {"role": "system", "content": INSTRUCCIONES_SISTEMA},
+        {"role": "user", "content": generar_prompt_remate(texto_remate)},
+    ]
 
 def calcular_costo(usage, engine):
     """
     Calcula el costo de la llamada a la API basado en los tokens usados.
     """
     precios_por_1M_tokens = {
-        "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
-        "gpt-4.1-nano": {"prompt": 0.10, "completion": 0.40},
-        "gpt-5-nano":{"prompt": 0.05, "completion": 0.40}
+        "gpt-4o-mini": {"prompt": 0.15, "cached": 0.075, "completion": 0.60},
+        "gpt-4.1-nano": {"prompt": 0.10, "cached": 0.025, "completion": 0.40},
+        "gpt-5-nano":{"prompt": 0.05, "cached": 0.005, "completion": 0.40}
     }
     precios = precios_por_1M_tokens.get(engine)
     if not precios:
         # Fallback genérico si el modelo no está en la lista (para evitar crashes)
-        precios = {"prompt": 0.15, "completion": 0.60}
+        precios = {"prompt": 0.15, "cached": 0.075, "completion": 0.60}
     
     prompt_tokens = getattr(usage, "prompt_tokens", 0)
     completion_tokens = getattr(usage, "completion_tokens", 0)
+    cached_tokens = tokens_cacheados(usage)
     
-    prompt_cost = (prompt_tokens / 1_000_000) * precios["prompt"]
+    # Los tokens del prefijo que el proveedor ya tenía en caché se cobran a precio reducido
+    prompt_cost = ((prompt_tokens - cached_tokens) / 1_000_000) * precios["prompt"]
+    cached_cost = (cached_tokens / 1_000_000) * precios["cached"]
     completion_cost = (completion_tokens / 1_000_000) * precios["completion"]
-    return prompt_cost + completion_cost
+    return prompt_cost + cached_cost + completion_cost
 
 
-def extraer_datos_remate(client, engine, texto_remate: str) -> dict:
-    """
-    Llama a la API de OpenAI para extraer los datos estructurados.
-    """
-    logger.info("🔩 - Generando Prompt")
-    prompt = generar_prompt_remate(texto_remate)
-    
-    try:
-        logger.info(f"🤖 - Llamando a la API de OpenAI con el modelo {engine}...")
-        completion = client.chat.completions.create(
-            model=engine,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=8192,   
-            # max_completion_tokens=8192, #para gtp5
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "remate_schema",
-                    "schema": {
+def tokens_cacheados(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens (0 si no viene)."""
+    detalles = getattr(usage, "prompt_tokens_details", None)
+    return getattr(detalles, "cached_tokens", 0) or 0
+
+
+# ==================== LLAMADAS A LA API (CONCURRENTES) ====================
+
+MAX_CONCURRENCIA_IA = 4          # remates que se consultan a la vez
+REINTENTOS_API = 5               # reintentos ante 429, errores de conexión y 5xx
+ESPERA_MAX_REINTENTO_S = 60
+MAX_TOKENS_RESPUESTA = 8192
+# Límites con que arranca el limitador, hasta que lleguen los encabezados x-ratelimit-*
+RPM_INICIAL = 60
+TPM_INICIAL = 200_000
+
+# Esquema de salida (response_format) de la extracción de remates
+REMATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "remates": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "nombre_propiedad": {"type": ["string", "null"]},
+                    "Caratulado": {"type": ["string", "null"]},
+                    "region": {"type": ["string", "null"]},
+                    "comuna": {"type": ["string", "null"]},
+                    "direccion": {"type": ["string", "null"]},
+                    "tipo_propiedad": {"type": ["string", "null"]},
+                    "villa_barrio_condominio": {"type": ["string", "null"]},
+                    "postura_minima_uf": {"type": "string"},
+                    "postura_minima_clp": {"type": "string"},
+                    "forma_pago_garantia": {"type": ["string", "null"]},
+                    "garantia_porcentaje": {"type": "number"},
+                    "fecha_pago_saldo_remate": {"type": ["string", "null"]},
+                    "diario": {"type": ["string", "null"]},
+                    "corte": {"type": ["string", "null"]},
+                    "tribunal": {"type": ["string", "null"]},
+                    "causa": {"type": ["string", "null"]},
+                    "fecha_remate": {"type": ["string", "null"]},
+                    "comentario": {
                         "type": "object",
                         "properties": {
-                            "remates": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "nombre_propiedad": {"type": ["string", "null"]},
-                                        "Caratulado": {"type": ["string", "null"]},
-                                        "region": {"type": ["string", "null"]},
-                                        "comuna": {"type": ["string", "null"]},
-                                        "direccion": {"type": ["string", "null"]},
-                                        "tipo_propiedad": {"type": ["string", "null"]},
-                                        "villa_barrio_condominio": {"type": ["string", "null"]},
-                                        "postura_minima_uf": {"type": "string"},
-                                        "postura_minima_clp": {"type": "string"},
-                                        "forma_pago_garantia": {"type": ["string", "null"]},
-                                        "garantia_porcentaje": {"type": "number"},
-                                        "fecha_pago_saldo_remate": {"type": ["string", "null"]},
-                                        "diario": {"type": ["string", "null"]},
-                                        "corte": {"type": ["string", "null"]},
-                                        "tribunal": {"type": ["string", "null"]},
-                                        "causa": {"type": ["string", "null"]},
-                                        "fecha_remate": {"type": ["string", "null"]},
-                                        "comentario": {
-                                            "type": "object",
-                                            "properties": {
-                                                "link_zoom": {"type": ["string", "null"]},
-                                                "fecha_hora_remate": {"type": ["string", "null"]}
-                                            },
-                                            "required": ["link_zoom", "fecha_hora_remate"]
-                                        }
-                                    },
-                                    "required": [
-                                        "nombre_propiedad", "Caratulado", "region", "comuna",
-                                        "direccion", "tipo_propiedad", "villa_barrio_condominio",
-                                        "postura_minima_uf", "postura_minima_clp",
-                                        "forma_pago_garantia", "garantia_porcentaje",
-                                        "fecha_pago_saldo_remate", "diario", "corte", "tribunal",
-                                        "causa", "fecha_remate", "comentario"
-                                    ],
-                                    "additionalProperties": False
-                                }
-                            }
+                            "link_zoom": {"type": ["string", "null"]},
+                            "fecha_hora_remate": {"type": ["string", "null"]}
                         },
-                        "required": ["remates"]
+                        "required": ["link_zoom", "fecha_hora_remate"]
                     }
-                }
+                },
+                "required": [
+                    "nombre_propiedad", "Caratulado", "region", "comuna",
+                    "direccion", "tipo_propiedad", "villa_barrio_condominio",
+                    "postura_minima_uf", "postura_minima_clp",
+                    "forma_pago_garantia", "garantia_porcentaje",
+                    "fecha_pago_saldo_remate", "diario", "corte", "tribunal",
+                    "causa", "fecha_remate", "comentario"
+                ],
+                "additionalProperties": False
             }
+        }
+    },
+    "required": ["remates"]
+}
 
-        )
+# Versiones que forman parte de la clave de cache_llm. PROMPT_VERSION se sube a
+# mano al cambiar INSTRUCCIONES_SISTEMA, generar_prompt_remate o las pistas que
+# arma preextractor; la del esquema sale de su contenido.
+PROMPT_VERSION = 4
+SCHEMA_VERSION = hashlib.sha1(json.dumps(REMATE_SCHEMA, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "remate_schema", "schema": REMATE_SCHEMA}
+}
+
+# Columnas del Excel: salen del esquema (no de los datos) y remate_texto va al final
+COLUMNAS_EXCEL = exportar_excel.columnas_remates(REMATE_SCHEMA["properties"]["remates"]["items"])
+
+
+def cuerpo_solicitud(engine, texto_remate: str) -> dict:
+    """Parámetros de chat.completions para un remate (los mismos en modo síncrono y batch)."""
+    return {
+        "model": engine,
+        "messages": generar_mensajes(texto_remate),
+        "temperature": 0.2,
+        "max_tokens": MAX_TOKENS_RESPUESTA,
+        # "max_completion_tokens": 8192, #para gtp5
+        "response_format": RESPONSE_FORMAT,
+    }
+
+
+def _segundos(duracion) -> float:
+    """'1s', '6m0s', '250ms', '1h2m3.5s' (formato de x-ratelimit-reset-*) o número -> segundos."""
+    if duracion is None:
+        return 0.0
+    try:
+        return float(duracion)
+    except ValueError:
+        pass
+    unidades = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * unidades[u] for n, u in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", duracion))
+
+
+class LimitadorTasa:
+    """
+    Token bucket doble (solicitudes y tokens por minuto) compartido por los
+    hilos que llaman a OpenAI. Arranca con RPM_INICIAL/TPM_INICIAL y se ajusta
+    con los encabezados x-ratelimit-* de cada respuesta; ante un 429 se pausa
+    para todos los hilos.
+    """
+
+    def __init__(self, solicitudes_por_minuto: int = RPM_INICIAL, tokens_por_minuto: int = TPM_INICIAL):
+        self._lock = threading.Lock()
+        self._capacidad = {"requests": float(solicitudes_por_minuto), "tokens": float(tokens_por_minuto)}
+        self._disponible = dict(self._capacidad)
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+
+    def _rellenar(self, ahora):
+        # Llamar con _lock tomado
+        transcurrido = ahora - self._ultimo
+        self._ultimo = ahora
+        for tipo, capacidad in self._capacidad.items():
+            self._disponible[tipo] = min(capacidad, self._disponible[tipo] + capacidad * transcurrido / 60)
+
+    def adquirir(self, tokens: int, cancel_event=None) -> bool:
+        """Bloquea hasta que haya cupo para 1 solicitud de ~tokens. False si se canceló."""
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            with self._lock:
+                ahora = time.monotonic()
+                self._rellenar(ahora)
+                necesarios = {"requests": 1.0, "tokens": float(min(tokens, self._capacidad["tokens"]))}
+                if ahora >= self._pausa_hasta and all(self._disponible[t] >= n for t, n in necesarios.items()):
+                    for tipo, n in necesarios.items():
+                        self._disponible[tipo] -= n
+                    return True
+                espera = max(
+                    self._pausa_hasta - ahora,
+                    *((n - self._disponible[t]) * 60 / self._capacidad[t] for t, n in necesarios.items())
+                )
+            with metricas.etapa("paso3.pausa_rate_limit"):
+                time.sleep(min(max(espera, 0.05), 1.0))
+
+    def actualizar(self, headers):
+        """Ajusta límites y cupo con x-ratelimit-limit-*/remaining-*/reset-*."""
+        with self._lock:
+            for tipo in ("requests", "tokens"):
+                limite = headers.get(f"x-ratelimit-limit-{tipo}")
+                restante = headers.get(f"x-ratelimit-remaining-{tipo}")
+                if limite:
+                    self._capacidad[tipo] = float(limite)
+                if restante is not None:
+                    self._disponible[tipo] = min(self._disponible[tipo], float(restante))
+                    if float(restante) <= 0:
+                        self._pausa_hasta = max(self._pausa_hasta,
+                                                time.monotonic() + _segundos(headers.get(f"x-ratelimit-reset-{tipo}")))
+
+    def pausar(self, segundos: float):
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+
+def _espera_reintento(error, intento: int) -> float:
+    """retry-after del 429 si viene; si no, backoff exponencial con jitter."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    espera = _segundos(headers.get("retry-after-ms", 0)) / 1000 if headers.get("retry-after-ms") else _segundos(headers.get("retry-after"))
+    if not espera:
+        espera = min(ESPERA_MAX_REINTENTO_S, 2 ** intento) + random.uniform(0, 1)
+    return min(espera, ESPERA_MAX_REINTENTO_S)
+
+
+def _crear_completion(client, cuerpo: dict, limitador: LimitadorTasa = None, cancel_event=None):
+    """
+    Envía cuerpo a chat.completions y retorna el completion, o None si se
+    canceló. Con limitador, espera cupo antes de cada intento. Los 429,
+    errores de conexión y 5xx se reintentan con backoff (REINTENTOS_API
+    veces); un 429 además pausa el limitador para todos los hilos.
+    """
+    # Los límites de OpenAI cuentan el prompt (~4 caracteres por token) + max_tokens
+    tokens_estimados = sum(len(m["content"]) for m in cuerpo["messages"]) // 4 + cuerpo["max_tokens"]
+
+    for intento in range(REINTENTOS_API + 1):
+        if limitador is not None and not limitador.adquirir(tokens_estimados, cancel_event):
+            return None
+        try:
+            logger.info(f"🤖 - Llamando a la API de OpenAI con el modelo {cuerpo['model']}...")
+            metricas.llamada_externa("openai")
+            respuesta = client.chat.completions.with_raw_response.create(**cuerpo)
+            break
+        except (RateLimitError, APIConnectionError, InternalServerError) as e:
+            if intento == REINTENTOS_API:
+                raise
+            espera = _espera_reintento(e, intento)
+            if isinstance(e, RateLimitError):
+                logger.warning(f"⏳ Límite de API alcanzado, reintento {intento + 1}/{REINTENTOS_API} en {espera:.1f}s")
+                metricas.contar(reintentos_rate_limit=1)
+            else:
+                logger.warning(f"⚠️ Error transitorio de la API ({e}), reintento {intento + 1}/{REINTENTOS_API} en {espera:.1f}s")
+                metricas.contar(reintentos_error=1)
+            if limitador is not None and isinstance(e, RateLimitError):
+                limitador.pausar(espera)
+            else:
+                time.sleep(espera)
+
+    if limitador is not None:
+        limitador.actualizar(respuesta.headers)
+    return respuesta.parse()
+
+
+@metricas.medir("paso3.openai")
+def extraer_datos_remate(client, engine, texto_remate: str, limitador: LimitadorTasa = None,
+                         cancel_event=None) -> dict:
+    """
+    Llama a la API de OpenAI para extraer los datos estructurados de un
+    remate (reintentos y limitador: ver _crear_completion).
+    """
+    logger.info("🔩 - Generando Prompt")
+    try:
+        completion = _crear_completion(client, cuerpo_solicitud(engine, texto_remate), limitador, cancel_event)
+        if completion is None:
+            return {"error": "Cancelado", "detalle": "Proceso cancelado por usuario"}
         
+        metricas.contar(items=1, tokens_entrada=getattr(completion.usage, "prompt_tokens", 0),
+                        tokens_entrada_cacheados=tokens_cacheados(completion.usage),
+                        tokens_salida=getattr(completion.usage, "completion_tokens", 0))
         contenido_original = completion.choices[0].message.content
         logger.debug(f"Contenido recibido de la API: '{contenido_original}'")
         logger.debug(f"Razón de finalización: {completion.choices[0].finish_reason}")
@@ -255,20 +446,353 @@ def extraer_datos_remate(client, engine, texto_remate: str) -> dict:
         logger.error(f"❌ Error inesperado: {e}")
         return {"error": "Error inesperado", "detalle": str(e)}
 
+
+def construir_registros(remate: dict, resultado_ia: dict):
+    """
+    Convierte la respuesta de la IA para un remate en las filas de resultados:
+    una por propiedad, con id_remate "N" (una sola) o "N.j" (varias). Retorna
+    None si la respuesta no trae datos.
+    """
+    if "datos" not in resultado_ia or not isinstance(resultado_ia["datos"], dict):
+        return None
+
+    lista_propiedades = resultado_ia["datos"].get("remates", [])
+    remate_texto = remate.get("remate_limpio", "Sin remate")
+    registros = []
+
+    if len(lista_propiedades) == 1:
+        propiedad = lista_propiedades[0]
+        propiedad["diario"] = "El Mercurio"
+        registro_final = {
+            "id_remate": remate["id_remate"],
+            **propiedad,
+            "remate_texto": remate_texto
+            }
+        registros.append(registro_final)
+        logger.info(f"  -> Propiedad '{propiedad.get('nombre_propiedad')}' agregada con ID {remate['id_remate']}.")
+    else:
+        for j, propiedad in enumerate(lista_propiedades, 1):
+            propiedad["diario"] = "El Mercurio"
+            id_remate_compuesto = f"{remate['id_remate']}.{j}"
+            registro_final = {
+                "id_remate": id_remate_compuesto,
+                **propiedad,
+                "remate_texto": remate_texto
+            }
+            registros.append(registro_final)
+            logger.info(f"  -> Propiedad '{propiedad.get('nombre_propiedad')}' agregada con ID {id_remate_compuesto}.")
+    return registros
+
+# ==================== EMPAQUETADO DE REMATES CORTOS ====================
+# Muchos remates son de un párrafo y mandarlos de a uno repite una solicitud
+# completa por cada uno. En modo síncrono se agrupan, en orden, hasta
+# TOKENS_POR_PAQUETE de texto por llamada; el modelo responde una entrada por
+# id_remate con el mismo arreglo "remates" del esquema individual. Si la
+# respuesta de un paquete no trae exactamente los id enviados (o falla), esos
+# remates se consultan de a uno.
+
+TOKENS_POR_PAQUETE = 3000          # texto de remates por llamada (~4 caracteres por token); 0 = de a uno
+MAX_REMATES_POR_PAQUETE = 8        # que la respuesta quepa en MAX_TOKENS_RESPUESTA
+
+PAQUETE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "resultados": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id_remate": {"type": "string"},
+                    "remates": REMATE_SCHEMA["properties"]["remates"]
+                },
+                "required": ["id_remate", "remates"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["resultados"]
+}
+
+RESPONSE_FORMAT_PAQUETE = {
+    "type": "json_schema",
+    "json_schema": {"name": "paquete_remates_schema", "schema": PAQUETE_SCHEMA}
+}
+
+
+def armar_paquetes(textos: list, tokens_por_paquete: int = TOKENS_POR_PAQUETE,
+                   max_remates: int = MAX_REMATES_POR_PAQUETE) -> list:
+    """
+    Agrupa [(clave, texto)] en orden en listas cuyo texto suma hasta
+    tokens_por_paquete (y hasta max_remates). Un remate más largo que el
+    presupuesto queda solo.
+    """
+    paquetes, actual, tokens = [], [], 0
+    for clave_texto, texto in textos:
+        n = len(texto) // 4
+        if actual and (tokens + n > tokens_por_paquete or len(actual) >= max_remates):
+            paquetes.append(actual)
+            actual, tokens = [], 0
+        actual.append((clave_texto, texto))
+        tokens += n
+    if actual:
+        paquetes.append(actual)
+    return paquetes
+
+
+def generar_prompt_paquete(textos: list) -> str:
+    """Mensaje de usuario con varios remates [(id_remate, texto)], cada uno con su ID_REMATE."""
+    bloques = "\n\n---\n\n".join(f"ID_REMATE: {id_remate}\n{generar_prompt_remate(texto)}" for id_remate, texto in textos)
+    return (
+        "Vienen varios remates independientes, cada uno precedido de su ID_REMATE. Aplica las reglas a cada uno "
+        "por separado y devuelve en \"resultados\" exactamente una entrada por ID_REMATE, con ese mismo id_remate "
+        "y en \"remates\" las propiedades de ese remate.\n\n" + bloques
+    )
+
+
+def cuerpo_solicitud_paquete(engine, textos: list) -> dict:
+    """Como cuerpo_solicitud, para un paquete [(id_remate, texto)]: mismo prefijo de sistema."""
+    return {
+        **cuerpo_solicitud(engine, ""),
+        "messages": [
+            {"role": "system", "content": INSTRUCCIONES_SISTEMA},
+            {"role": "user", "content": generar_prompt_paquete(textos)},
+        ],
+        "response_format": RESPONSE_FORMAT_PAQUETE,
+    }
+
+
+def _separar_paquete(datos, ids: list):
+    """
+    {"resultados": [...]} -> {id_remate: [propiedades]} si trae exactamente
+    una entrada no vacía por cada id enviado; si no, None.
+    """
+    entradas = datos.get("resultados") if isinstance(datos, dict) else None
+    if not isinstance(entradas, list):
+        return None
+    por_id = {}
+    for entrada in entradas:
+        if not isinstance(entrada, dict) or not isinstance(entrada.get("remates"), list):
+            return None
+        id_remate = str(entrada.get("id_remate")).strip()
+        if id_remate in por_id or not entrada["remates"]:
+            return None
+        por_id[id_remate] = entrada["remates"]
+    return por_id if set(por_id) == set(ids) else None
+
+
+def _repartir_usage(usage, pesos_entrada: dict, pesos_salida: dict) -> dict:
+    """Reparte el usage de un paquete entre sus remates (entrada por largo del texto, salida por largo de la respuesta)."""
+    total_entrada = sum(pesos_entrada.values()) or 1
+    total_salida = sum(pesos_salida.values()) or 1
+    cacheados = tokens_cacheados(usage)
+    repartido = {}
+    for id_remate in pesos_entrada:
+        fraccion_entrada = pesos_entrada[id_remate] / total_entrada
+        prompt_tokens = round(getattr(usage, "prompt_tokens", 0) * fraccion_entrada)
+        completion_tokens = round(getattr(usage, "completion_tokens", 0) * pesos_salida[id_remate] / total_salida)
+        repartido[id_remate] = SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=round(cacheados * fraccion_entrada)))
+    return repartido
+
+
+@metricas.medir("paso3.openai_paquete")
+def extraer_datos_paquete(client, engine, textos: list, limitador: LimitadorTasa = None,
+                          cancel_event=None) -> dict:
+    """
+    Extrae varios remates [(id_remate, texto)] en una sola llamada y retorna
+    {id_remate: resultado} con el formato de extraer_datos_remate (el usage
+    del paquete se reparte entre ellos). Si la llamada falla o la respuesta
+    no pasa la validación, cada remate se consulta de a uno.
+    """
+    ids = [str(id_remate) for id_remate, _ in textos]
+    por_id = None
+    try:
+        completion = _crear_completion(client, cuerpo_solicitud_paquete(engine, textos), limitador, cancel_event)
+        if completion is None:
+            return {id_remate: {"error": "Cancelado", "detalle": "Proceso cancelado por usuario"} for id_remate in ids}
+        metricas.contar(items=len(textos), paquetes=1, tokens_entrada=getattr(completion.usage, "prompt_tokens", 0),
+                        tokens_entrada_cacheados=tokens_cacheados(completion.usage),
+                        tokens_salida=getattr(completion.usage, "completion_tokens", 0))
+        contenido_original = completion.choices[0].message.content
+        logger.debug(f"Contenido recibido de la API (paquete {', '.join(ids)}): '{contenido_original}'")
+        por_id = _separar_paquete(json.loads(contenido_original), ids)
+    except Exception as e:
+        logger.warning(f"⚠️ Falló el paquete de remates {', '.join(ids)}: {e}")
+
+    if por_id is None:
+        logger.warning(f"📦 Respuesta inválida para el paquete {', '.join(ids)}; se consultan de a uno.")
+        metricas.contar(paquetes_fallidos=1)
+        return {str(id_remate): extraer_datos_remate(client, engine, texto, limitador, cancel_event)
+                for id_remate, texto in textos}
+
+    usages = _repartir_usage(
+        completion.usage,
+        {str(id_remate): len(texto) for id_remate, texto in textos},
+        {id_remate: len(json.dumps(propiedades, ensure_ascii=False)) for id_remate, propiedades in por_id.items()},
+    )
+    return {id_remate: {"datos": {"remates": por_id[id_remate]}, "usage": usages[id_remate]} for id_remate in ids}
+
+# ==================== MODO BATCH (BACKFILLS) ====================
+# Para backlogs grandes no hace falta respuesta inmediata: la Batch API de
+# OpenAI procesa un JSONL de solicitudes en hasta 24 h a mitad de precio.
+# Las respuestas vuelven por custom_id (la clave de caché del texto) y pasan
+# por el mismo construir_registros que el modo síncrono.
+
+MODOS_IA = ("sincrono", "batch")
+DESCUENTO_BATCH = 0.5              # la Batch API cobra la mitad
+INTERVALO_SONDEO_BATCH_S = 30
+ESTADOS_FINALES_BATCH = ("completed", "failed", "expired", "cancelled")
+
+
+def _resultado_batch(linea: dict) -> dict:
+    """Una línea del archivo de salida del batch -> mismo formato que extraer_datos_remate."""
+    respuesta = linea.get("response") or {}
+    if linea.get("error") or respuesta.get("status_code") != 200:
+        detalle = linea.get("error") or respuesta.get("body", {}).get("error")
+        return {"error": "Error en batch", "detalle": str(detalle)}
+    try:
+        completion = respuesta["body"]
+        datos = json.loads(completion["choices"][0]["message"]["content"])
+        usage = completion.get("usage") or {}
+        return {
+            "datos": datos,
+            "usage": SimpleNamespace(prompt_tokens=usage.get("prompt_tokens", 0),
+                                     completion_tokens=usage.get("completion_tokens", 0),
+                                     total_tokens=usage.get("total_tokens", 0),
+                                     prompt_tokens_details=SimpleNamespace(
+                                         cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0))),
+            "batch": True,
+        }
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return {"error": "Respuesta de batch ilegible", "detalle": str(e)}
+
+
+def ejecutar_batch(client, engine, textos: dict, ruta_jsonl: str, cancel_event, progress_callback=None,
+                   intervalo_sondeo: float = None) -> dict:
+    """
+    Envía {custom_id: texto_remate} como un batch de /v1/chat/completions,
+    espera a que termine y retorna {custom_id: resultado} (con "datos"/"usage"
+    o "error", como extraer_datos_remate). None si se canceló (el batch se
+    cancela también en OpenAI). El sondeo es cada intervalo_sondeo segundos
+    (por defecto INTERVALO_SONDEO_BATCH_S).
+    """
+    intervalo_sondeo = intervalo_sondeo or INTERVALO_SONDEO_BATCH_S
+    with open(ruta_jsonl, "w", encoding="utf-8") as f:
+        for custom_id, texto in textos.items():
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": cuerpo_solicitud(engine, texto),
+            }, ensure_ascii=False) + "\n")
+
+    with metricas.etapa("paso3.batch_envio"):
+        metricas.llamada_externa("openai_batch", 2)
+        with open(ruta_jsonl, "rb") as f:
+            archivo = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=archivo.id, endpoint="/v1/chat/completions",
+                                      completion_window="24h")
+    logger.info(f"📦 Batch enviado: {batch.id} ({len(textos)} solicitudes, archivo {ruta_jsonl})")
+
+    with metricas.etapa("paso3.batch_espera"):
+        while batch.status not in ESTADOS_FINALES_BATCH:
+            if cancel_event.is_set():
+                logger.info(f"🛑 Proceso cancelado por usuario. Cancelando batch {batch.id}...")
+                try:
+                    client.batches.cancel(batch.id)
+                except Exception as e:
+                    logger.warning(f"No se pudo cancelar el batch {batch.id}: {e}")
+                return None
+            cancel_event.wait(intervalo_sondeo)
+            metricas.llamada_externa("openai_batch")
+            batch = client.batches.retrieve(batch.id)
+            conteo = batch.request_counts
+            if conteo and progress_callback:
+                hechos = (conteo.completed or 0) + (conteo.failed or 0)
+                progress_callback(hechos, conteo.total or len(textos))
+            logger.info(f"⏳ Batch {batch.id}: {batch.status}"
+                        + (f" ({conteo.completed}/{conteo.total} ok, {conteo.failed} fallidas)" if conteo else ""))
+
+    if batch.status != "completed":
+        logger.error(f"❌ El batch {batch.id} terminó con estado '{batch.status}': {batch.errors}")
+
+    resultados = {}
+    for id_archivo in (batch.output_file_id, batch.error_file_id):
+        if not id_archivo:
+            continue
+        metricas.llamada_externa("openai_batch")
+        for linea in client.files.content(id_archivo).text.splitlines():
+            if linea.strip():
+                linea = json.loads(linea)
+                resultados[linea["custom_id"]] = _resultado_batch(linea)
+
+    for custom_id in textos:
+        resultados.setdefault(custom_id, {"error": "Sin respuesta en el batch", "detalle": batch.status})
+    if batch.status == "completed":
+        os.remove(ruta_jsonl)
+    return resultados
+
+
 # ==================== FUNCIÓN PRINCIPAL ENCAPSULADA ====================
 from dotenv import load_dotenv
 import os
 
-def run_processor(cancel_event, input_json_path: str, progress_callback, output_prefix: str = "remates_final"):
+def ruta_progreso(output_prefix: str) -> str:
+    """Bitácora JSONL de run_processor para ese output_prefix (ver bitacora.py)."""
+    return f"{output_prefix}_progreso.jsonl"
+
+
+def escribir_json_registros(registros, ruta: str) -> int:
+    """
+    Escribe la lista JSON de a un registro, con el mismo formato que
+    json.dump(..., indent=2). Retorna cuántos registros escribió.
+    """
+    n = 0
+    with open(ruta, "w", encoding="utf-8") as f:
+        for registro in registros:
+            f.write("[\n" if n == 0 else ",\n")
+            f.write(textwrap.indent(json.dumps(registro, ensure_ascii=False, indent=2), "  "))
+            n += 1
+        f.write("\n]" if n else "[]")
+    return n
+
+
+def _respuesta_desde_cache(en_cache: dict) -> dict:
+    usage = SimpleNamespace(prompt_tokens=en_cache["prompt_tokens"], completion_tokens=en_cache["completion_tokens"],
+                            total_tokens=en_cache["prompt_tokens"] + en_cache["completion_tokens"])
+    return {"datos": en_cache["datos"], "usage": usage, "cache": True}
+
+
+def run_processor(cancel_event, input_json_path: str, progress_callback, output_prefix: str = "remates_final",
+                  max_concurrentes: int = MAX_CONCURRENCIA_IA, usar_cache: bool = True, modo: str = "sincrono",
+                  tokens_por_paquete: int = TOKENS_POR_PAQUETE, usar_preextractor: bool = True,
+                  reanudar: bool = False):
     
     load_dotenv()
     """
     Orquesta el proceso completo de limpieza, extracción con IA y guardado.
+    Con usar_preextractor, los remates que preextractor.registro_confiable
+    acepta (una sola propiedad, todo encontrado y sin ambigüedad) no pasan por la API.
+    Hasta max_concurrentes remates se consultan a la vez. Con usar_cache, las
+    respuestas ya vistas salen de cache_llm sin llamar a la API. En modo
+    síncrono los remates cortos se agrupan hasta tokens_por_paquete por
+    llamada (0 = de a uno; ver extraer_datos_paquete). Con modo="batch" los
+    remates sin caché van en un solo batch de OpenAI (más lento, mitad de
+    precio; ver ejecutar_batch).
+    Cada remate terminado se agrega a la bitácora ruta_progreso(output_prefix)
+    y el JSON/Excel final se arma desde ella. Con reanudar, los remates que
+    ya están en la bitácora (de una corrida cortada con la misma entrada) no
+    se vuelven a procesar.
     """
+    if modo not in MODOS_IA:
+        raise ValueError(f"Modo de IA desconocido: {modo}. Opciones: {', '.join(MODOS_IA)}")
     API_KEY = os.getenv("OPENAI_API_KEY_EXTRACTOR") 
     MODEL_ENGINE = os.getenv("MODEL_ENGINE")
     
-    client = OpenAI(api_key=API_KEY)
+    # Los reintentos los hace extraer_datos_remate (un 429 pausa a todos los hilos), no el SDK
+    client = OpenAI(api_key=API_KEY, max_retries=0)
 
     # --- CARGA DE DATOS ---
     try:
@@ -288,96 +812,185 @@ def run_processor(cancel_event, input_json_path: str, progress_callback, output_
     if remates_limpios is None: # Si devolvió None, fue cancelado
         return None, None
 
-    resultados = []
     #calculo % etapa 3
     total_remates = len(remates_limpios)
     progreso_base_etapa3 = 66.6
     peso_total_etapa3 = 33.3 # (99.9 - 66.6)
     
     total_tokens_usados = 0
+    total_tokens_cacheados = 0
     total_costo_usd = 0
+    ahorro_cache_usd = 0
 
-    logger.info("🏁 - Comienzo del pipeline de extracción con IA")
+    logger.info(f"🏁 - Comienzo del pipeline de extracción con IA "
+                f"({'batch' if modo == 'batch' else f'{max_concurrentes} en paralelo'})")
 
-    for i, remate in enumerate(remates_limpios):
-        
-        if cancel_event.is_set():
-            logger.info("🛑 Proceso cancelado por usuario.")
-            return None, None # Cancelación limpia
-            
+    # Bitácora: cada remate terminado se baja a disco apenas llega, así un
+    # corte no pierde lo ya pagado. Al reanudar se saltan los que ya están.
+    ruta_bitacora = ruta_progreso(output_prefix)
+    hechos = bitacora.iniciar(ruta_bitacora, bitacora.huella(remates_limpios), reanudar)
+    respuestas = [None] * total_remates
+
+    def anotar(i, resultado_ia):
+        """Agrega a la bitácora las filas de remates_limpios[i] y suma sus tokens y costo."""
+        nonlocal total_tokens_usados, total_tokens_cacheados, total_costo_usd, ahorro_cache_usd
+        respuestas[i] = resultado_ia
+        remate = remates_limpios[i]
         logger.info("-" * 50)
         logger.info(f"Procesando remate ID {remate['id_remate']}...")
 
-        # cálculo % progreso
-        progreso_en_etapa = ((i + 1) / total_remates) * peso_total_etapa3
-        progreso_total_actual = progreso_base_etapa3 + progreso_en_etapa
-        mensaje_progreso = f"Etapa 3: Analizando remate {i + 1} de {total_remates}"
-        progress_callback(progreso_total_actual, mensaje_progreso)
+        registros = construir_registros(remate, resultado_ia)
+        if registros is None:
+            logger.warning(f"No se pudo extraer datos para remate ID {remate['id_remate']}")
+            return
 
-        resultado_ia = extraer_datos_remate(client, MODEL_ENGINE, remate["remate_limpio"])
+        usage = resultado_ia.get("usage", {})
+        costo_usd = 0
+        if resultado_ia.get("cache"):
+            ahorro_cache_usd += calcular_costo(usage, MODEL_ENGINE)
+        else:
+            total_tokens_usados += getattr(usage, "total_tokens", 0)
+            total_tokens_cacheados += tokens_cacheados(usage)
+            costo_usd = calcular_costo(usage, MODEL_ENGINE) * (DESCUENTO_BATCH if resultado_ia.get("batch") else 1)
+            total_costo_usd += costo_usd
+        bitacora.agregar(ruta_bitacora, i, remate["id_remate"], registros, costo_usd)
 
-        if "datos" in resultado_ia and isinstance(resultado_ia["datos"], dict):
-            lista_propiedades = resultado_ia["datos"].get("remates", [])
-            usage = resultado_ia.get("usage", {})
+    # Primero la extracción local (en bloque) y la caché: los remates resueltos
+    # así no pasan por la API. Los textos repetidos dentro de la misma corrida
+    # se consultan una sola vez.
+    locales = preextractor.extraer_lote([remate["remate_limpio"] for remate in remates_limpios], cancel_event)
+    if locales is None:
+        logger.info("🛑 Proceso cancelado por usuario.")
+        return None, None
 
-            remate_texto = remate.get("remate_limpio", "Sin remate")
+    pendientes = {}   # clave de caché -> posiciones de los remates con ese texto
+    for i, remate in enumerate(remates_limpios):
+        if i in hechos:
+            respuestas[i] = {"reanudado": True}
+            continue
+        registro_local = preextractor.registro_confiable(remate["remate_limpio"], locales[i]) if usar_preextractor else None
+        if registro_local is not None:
+            anotar(i, {"datos": {"remates": [registro_local]}, "local": True,
+                       "usage": SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0)})
+            continue
+        clave_cache = cache_llm.clave(remate["remate_limpio"], MODEL_ENGINE, PROMPT_VERSION, SCHEMA_VERSION)
+        en_cache = cache_llm.leer(clave_cache) if usar_cache else None
+        if en_cache is not None:
+            anotar(i, _respuesta_desde_cache(en_cache))
+        else:
+            pendientes.setdefault(clave_cache, []).append(i)
 
-            if len(lista_propiedades) == 1:
-                propiedad = lista_propiedades[0]
-                propiedad["diario"] = "El Mercurio"
-                registro_final = {
-                    "id_remate": remate["id_remate"],
-                    **propiedad,
-                    "remate_texto": remate_texto
-                    }
-                resultados.append(registro_final)
-                logger.info(f"  -> Propiedad '{propiedad.get('nombre_propiedad')}' agregada con ID {remate['id_remate']}.")
-            else:
-                for j, propiedad in enumerate(lista_propiedades, 1):
-                    propiedad["diario"] = "El Mercurio"
-                    id_remate_compuesto = f"{remate['id_remate']}.{j}"
-                    registro_final = {
-                        "id_remate": id_remate_compuesto,
-                        **propiedad,
-                        "remate_texto": remate_texto
-                    }
-                    resultados.append(registro_final)
-                    logger.info(f"  -> Propiedad '{propiedad.get('nombre_propiedad')}' agregada con ID {id_remate_compuesto}.")
+    completados = total_remates - sum(len(posiciones) for posiciones in pendientes.values())
+    directos = sum(1 for r in respuestas if r is not None and r.get("local"))
+    reanudados = sum(1 for r in respuestas if r is not None and r.get("reanudado"))
+    if directos:
+        logger.info(f"⚡ {directos}/{total_remates} remates ({directos / total_remates:.0%}) extraídos con reglas locales, sin llamar a la API.")
+    if completados - directos - reanudados:
+        logger.info(f"💾 {completados - directos - reanudados} remates resueltos desde la caché LLM.")
+    if completados:
+        progress_callback(progreso_base_etapa3 + (completados / total_remates) * peso_total_etapa3,
+                          f"Etapa 3: {completados} de {total_remates} remates sin llamar a la API")
 
-            total_tokens_usados += getattr(usage, "total_tokens", 0)
-            total_costo_usd += calcular_costo(usage, MODEL_ENGINE)
+    def registrar(clave_cache, resultado_ia):
+        posiciones = pendientes[clave_cache]
+        if usar_cache and "datos" in resultado_ia:
+            usage = resultado_ia.get("usage")
+            cache_llm.guardar(clave_cache, resultado_ia["datos"], getattr(usage, "prompt_tokens", 0),
+                              getattr(usage, "completion_tokens", 0), modelo=MODEL_ENGINE)
+        anotar(posiciones[0], resultado_ia)
+        for repetido in posiciones[1:]:
+            anotar(repetido, {**resultado_ia, "cache": True})
+        return len(posiciones)
 
-        else:
-            logger.warning(f"No se pudo extraer datos para remate ID {remate['id_remate']}")
+    def informar_progreso(hechos):
+        progreso_en_etapa = (hechos / total_remates) * peso_total_etapa3
+        progress_callback(progreso_base_etapa3 + progreso_en_etapa, f"Etapa 3: Analizando remate {hechos} de {total_remates}")
+
+    if modo == "batch" and pendientes:
+        desde_cache = completados
+        textos = {clave_cache: remates_limpios[posiciones[0]]["remate_limpio"] for clave_cache, posiciones in pendientes.items()}
+        por_clave = ejecutar_batch(
+            client, MODEL_ENGINE, textos, f"{output_prefix}_batch.jsonl", cancel_event,
+            progress_callback=lambda hechos, total: informar_progreso(desde_cache + hechos * (total_remates - desde_cache) // max(total, 1))
+        )
+        if por_clave is None:
+            return None, None
+        for clave_cache, resultado_ia in por_clave.items():
+            if clave_cache in pendientes:
+                completados += registrar(clave_cache, resultado_ia)
+        informar_progreso(completados)
+    else:
+        # Las llamadas son independientes: corren en paralelo (acotadas por el
+        # limitador de tasa) y las respuestas se guardan por posición, así
+        # resultados mantiene el orden de id_remate aunque terminen desordenadas.
+        limitador = LimitadorTasa()
+        textos = [(clave_cache, remates_limpios[posiciones[0]]["remate_limpio"]) for clave_cache, posiciones in pendientes.items()]
+        paquetes = armar_paquetes(textos, tokens_por_paquete) if tokens_por_paquete > 0 else [[t] for t in textos]
+        if len(paquetes) < len(textos):
+            logger.info(f"📦 {len(textos)} remates agrupados en {len(paquetes)} llamadas (hasta {tokens_por_paquete} tokens por llamada)")
 
-        time.sleep(0.8)
+        def extraer(paquete):
+            """[(clave de caché, texto)] -> {clave de caché: resultado_ia}"""
+            if len(paquete) == 1:
+                clave_cache, texto = paquete[0]
+                return {clave_cache: extraer_datos_remate(client, MODEL_ENGINE, texto, limitador, cancel_event)}
+            ids = [str(remates_limpios[pendientes[clave_cache][0]]["id_remate"]) for clave_cache, _ in paquete]
+            if len(set(ids)) < len(ids):   # id_remate repetidos: el modelo no podría distinguirlos
+                return {clave_cache: extraer_datos_remate(client, MODEL_ENGINE, texto, limitador, cancel_event)
+                        for clave_cache, texto in paquete}
+            por_id = extraer_datos_paquete(client, MODEL_ENGINE, [(id_remate, texto) for id_remate, (_, texto) in zip(ids, paquete)],
+                                           limitador, cancel_event)
+            id_a_clave = {id_remate: clave_cache for id_remate, (clave_cache, _) in zip(ids, paquete)}
+            return {id_a_clave[id_remate]: resultado_ia for id_remate, resultado_ia in por_id.items()}
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrentes))
+        try:
+            futuros = [executor.submit(metricas.heredar(extraer), paquete) for paquete in paquetes]
+            for futuro in as_completed(futuros):
+                if cancel_event.is_set():
+                    logger.info("🛑 Proceso cancelado por usuario.")
+                    return None, None # Cancelación limpia
+
+                for clave_cache, resultado_ia in futuro.result().items():
+                    completados += registrar(clave_cache, resultado_ia)
+                informar_progreso(completados)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if cancel_event.is_set():
+        logger.info("🛑 Proceso cancelado por usuario.")
+        return None, None
+
+    aciertos_cache = sum(1 for r in respuestas if r.get("cache"))
+    if usar_cache:
+        cache_llm.desalojar()
 
 
     # --- GUARDADO DE RESULTADOS ---
+    # Desde la bitácora y en el orden de la entrada (incluye lo hecho antes de reanudar)
     json_output_path = f"{output_prefix}.json"
     excel_output_path = f"{output_prefix}.xlsx"
+    propiedades = escribir_json_registros(bitacora.registros_en_orden(ruta_bitacora, total_remates), json_output_path)
 
-    with open(json_output_path, "w", encoding="utf-8") as f:
-        json.dump(resultados, f, ensure_ascii=False, indent=2)
-
-    if resultados:
-        df = pd.json_normalize(resultados)
-        columnas = df.columns.tolist()
-        if 'remate_texto' in columnas:
-            columnas.remove('remate_texto')
-            columnas.append('remate_texto')
-        df = df[columnas]
-        
-        # Guardamos el Excel
-        df.to_excel(excel_output_path, index=False)
-    else:
+    if not propiedades:
         logger.warning("No se generaron resultados, el archivo Excel estará vacío.")
-        pd.DataFrame().to_excel(excel_output_path, index=False)
+    exportar_excel.escribir_filas(excel_output_path, bitacora.registros_en_orden(ruta_bitacora, total_remates), COLUMNAS_EXCEL)
+    os.remove(ruta_bitacora)
 
     logger.info("="*50)
     logger.info("✅ Proceso completado.")
-    logger.info(f"Total tokens usados: {total_tokens_usados}")
+    if reanudados:
+        logger.info(f"♻️ {reanudados} remates tomados de la bitácora de una corrida anterior.")
+    logger.info(f"Total tokens usados: {total_tokens_usados} (entrada cacheada: {total_tokens_cacheados})")
     logger.info(f"Costo estimado total USD: ${total_costo_usd:.4f}")
+    if total_remates:
+        logger.info(f"💾 Caché LLM: {aciertos_cache}/{total_remates} aciertos ({aciertos_cache / total_remates:.0%}) | "
+                    f"Ahorro estimado USD: ${ahorro_cache_usd:.4f}")
+    metricas.contar("paso3", items=len(remates_limpios), propiedades=propiedades,
+                    costo_usd_micro=round(total_costo_usd * 1_000_000),
+                    cache_aciertos=aciertos_cache, cache_fallos=total_remates - aciertos_cache - directos - reanudados,
+                    preextraccion_directos=directos, reanudados=reanudados,
+                    ahorro_cache_usd_micro=round(ahorro_cache_usd * 1_000_000))
     logger.info(f"Resultados guardados en '{json_output_path}' y '{excel_output_path}'")
     logger.info("="*50)
     
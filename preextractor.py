@@ -0,0 +1,328 @@
+# preextractor.py
+# EXTRACCIÓN LOCAL (REGEX) DE LOS CAMPOS FÁCILES DE UN REMATE, ANTES DE OPENAI
+#
+# La causa (C-1234-2020), las posturas mínimas, el % de garantía, el link de
+# Zoom, el tribunal (con el ordinal convertido), la fecha del remate, etc. se
+# sacan del texto con expresiones regulares. Un campo se llena solo si el texto
+# trae un único valor para él (dos causas o dos posturas distintas => queda
+# sin llenar). paso3 lo usa así:
+#   - si registro_confiable() acepta el remate (todos los campos del esquema,
+#     una sola dirección que no es la del tribunal y montos que cuadran) se
+#     toma el registro local y no se llama a la API;
+#   - en otro caso, lo encontrado va como pista en el mensaje del usuario.
+# Las direcciones junto a "juzgado"/"tribunal" o de un tribunal conocido
+# (DIRECCIONES_TRIBUNALES) se descartan.
+# Las búsquedas se hacen sobre una copia en minúsculas y sin tildes del mismo
+# largo que el texto, así los valores literales se recortan del original.
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Campos del esquema de paso3 (comentario.link_zoom y comentario.fecha_hora_remate van planos)
+CAMPOS = (
+    "nombre_propiedad", "Caratulado", "region", "comuna", "direccion", "tipo_propiedad",
+    "villa_barrio_condominio", "postura_minima_uf", "postura_minima_clp", "forma_pago_garantia",
+    "garantia_porcentaje", "fecha_pago_saldo_remate", "diario", "corte", "tribunal", "causa",
+    "fecha_remate", "link_zoom", "fecha_hora_remate",
+)
+REVISAR_CANCELACION_CADA = 50      # remates
+
+MESES = {"enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+         "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12}
+ORDINALES = {"primero": 1, "primer": 1, "segundo": 2, "tercero": 3, "tercer": 3, "cuarto": 4, "quinto": 5,
+             "sexto": 6, "septimo": 7, "octavo": 8, "noveno": 9, "decimo": 10, "undecimo": 11,
+             "duodecimo": 12, "vigesimo": 20, "trigesimo": 30}
+
+# Comunas de la Región Metropolitana: la región solo se completa si la comuna es una de estas
+COMUNAS_RM = (
+    "Alhué", "Buin", "Calera de Tango", "Cerrillos", "Cerro Navia", "Colina", "Conchalí", "Curacaví",
+    "El Bosque", "El Monte", "Estación Central", "Huechuraba", "Independencia", "Isla de Maipo",
+    "La Cisterna", "La Florida", "La Granja", "La Pintana", "La Reina", "Lampa", "Las Condes",
+    "Lo Barnechea", "Lo Espejo", "Lo Prado", "Macul", "Maipú", "María Pinto", "Melipilla", "Ñuñoa",
+    "Padre Hurtado", "Paine", "Pedro Aguirre Cerda", "Peñaflor", "Peñalolén", "Pirque", "Providencia",
+    "Pudahuel", "Puente Alto", "Quilicura", "Quinta Normal", "Recoleta", "Renca", "San Bernardo",
+    "San Joaquín", "San José de Maipo", "San Miguel", "San Pedro", "San Ramón", "Santiago", "Talagante",
+    "Tiltil", "Vitacura",
+)
+REGION_RM = "Región Metropolitana de Santiago"
+# Ciudad del tribunal -> Corte de Apelaciones que le corresponde
+CORTES = {"santiago": "Santiago", "san miguel": "San Miguel", "puente alto": "San Miguel",
+          "san bernardo": "San Miguel", "talagante": "San Miguel", "buin": "San Miguel",
+          "valparaiso": "Valparaíso", "vina del mar": "Valparaíso", "rancagua": "Rancagua",
+          "concepcion": "Concepción", "temuco": "Temuco", "antofagasta": "Antofagasta", "iquique": "Iquique"}
+
+# Tipos permitidos por el esquema (plano -> valor); "sitio"/"terreno" junto a una casa son la misma propiedad
+TIPOS = {"departamento": "departamento", "casa": "casa", "parcela": "parcela", "sitio": "sitio",
+         "terreno": "terreno", "bodega": "bodega", "galpon": "galpón", "estacionamiento": "estacionamiento",
+         "oficina": "oficina"}
+_NUMERO = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?"
+# Ciudad después de "Juzgado ... de" / "Corte de Apelaciones de": las conocidas (de varias
+# palabras) primero; si no, una sola palabra, para no arrastrar lo que sigue ("de Santiago se rematará")
+_CIUDAD = "(" + "|".join(sorted(CORTES, key=len, reverse=True)) + r"|[a-z]+)\b"
+
+_RE_CAUSA = re.compile(r"\b(?:rol|causa)[^a-z0-9]{0,12}([cveo])\s*-\s*(\d{1,6})\s*-\s*((?:19|20)\d{2})\b")
+_RE_CARATULADO = re.compile(r"caratulad[oa]s?[\s:]+'?(.{3,120}?)\s+con\s+")
+_RE_TRIBUNAL = re.compile(
+    r"\b(?:(\d{1,2})\s*[°º]?\s*|((?:(?:decimo|vigesimo|trigesimo|undecimo|duodecimo|primero?|segundo|tercero?|cuarto|quinto|sexto|septimo|octavo|noveno)\s*){1,2}))"
+    r"juzgado (civil|de letras(?: en lo civil)?) de " + _CIUDAD
+)
+_RE_CORTE = re.compile(r"corte de apelaciones de " + _CIUDAD)
+_RE_MINIMO = re.compile(r"minim[oa]")
+_RE_GARANTIA = re.compile(r"garant")
+_RE_UF = re.compile(rf"({_NUMERO})\s*(?:unidades de fomento|u\.?f\.?)(?![a-z])|(?<![a-z])(?:u\.?f\.?)\s*({_NUMERO})")
+_RE_CLP = re.compile(rf"\$\s*({_NUMERO})")
+_RE_PORCENTAJE = re.compile(r"(\d{1,2}(?:[.,]\d+)?)\s*(?:%|por ciento)")
+_RE_FECHA_HORA = re.compile(
+    r"(\d{1,2}) de (" + "|".join(MESES) + r") (?:de |del )?(\d{4})[^0-9]{0,40}?a las (\d{1,2})(?:[:.](\d{2}))?\s*(?:horas|hrs|:)?"
+)
+_RE_ZOOM_URL = re.compile(r"https?://[^\s,;']*zoom\.us[^\s,;']*")
+_RE_ZOOM_ID = re.compile(r"\bid(?: de (?:la )?reunion)?[:\s]+(\d{3}\s?\d{3,4}\s?\d{3,4})\b")
+_RE_SALDO = re.compile(r"saldo[^.;]{0,80}?((?:dentro (?:de|del) )?(?:\w+ ){0,2}dias? habil(?:es)? siguientes?[^.,;]{0,40})")
+# Direcciones de tribunales (en plano y sin "n°") que nunca son la de la propiedad
+DIRECCIONES_TRIBUNALES = ("huerfanos 1409", "compania de jesus 1140")
+# Hasta dónde se mira hacia atrás de un "ubicado en" para saber de qué habla
+VENTANA_CONTEXTO_DIRECCION = 80
+_RE_MENCION_TRIBUNAL = re.compile(r"\b(?:juzgados?|tribunal(?:es)?|corte de apelaciones)\b")
+_RE_MENCION_PROPIEDAD = re.compile(
+    r"\b(?:departamento|casa|parcela|sitio|terreno|bodega|galpon|estacionamiento|oficina|inmueble|propiedad"
+    r"|edificio|predio|vivienda|lote)s?\b"
+)
+_RE_DIRECCION = re.compile(r"(?:ubicad[oa]s?|situad[oa]s?) en ((?:calle |avenida |av\. |pasaje |camino )?[^,;]{3,80}?(?:n[°º]\s*)?\d{1,5}[a-z]?)\b")
+_RE_VILLA = re.compile(r"\b(villa|poblacion|condominio|conjunto habitacional|barrio) '?([a-z0-9][^,.;']{2,40})")
+_RE_NUMERO_UNIDAD = re.compile(r"\b(departamento|bodega|estacionamiento|oficina|casa)\s*(?:n[°º]?\.?\s*)?(\d{1,5}[a-z]?)\b")
+_RE_VARIOS = re.compile(r"\blotes?\b|\b(?:uno|dos|tres)\s*:|\buso y goce\b|\bderechos? (?:de|sobre)")
+
+
+def _plano(texto: str) -> str:
+    """Minúsculas y sin tildes, con el mismo largo que texto (para recortar del original)."""
+    plano = "".join(c for c in unicodedata.normalize("NFD", texto) if not unicodedata.combining(c)).lower()
+    return plano if len(plano) == len(texto) else texto.lower()
+
+
+def _unico(valores):
+    """El valor si todos los encontrados son iguales; None si no hay o hay distintos."""
+    distintos = set(valores)
+    return distintos.pop() if len(distintos) == 1 else None
+
+
+def _ordinal(palabras: str):
+    total = 0
+    for palabra in palabras.split():
+        if palabra not in ORDINALES:
+            return None
+        total += ORDINALES[palabra]
+    return total or None
+
+
+def _ventanas(patron, plano: str, regex, largo: int):
+    """Coincidencias de regex en los `largo` caracteres que siguen a cada aparición de patron."""
+    for m in patron.finditer(plano):
+        yield regex.search(plano, m.end(), m.end() + largo)
+
+
+def _tribunal(texto: str, plano: str, campos: dict):
+    tribunales = []
+    for m in _RE_TRIBUNAL.finditer(plano):
+        numero = int(m.group(1)) if m.group(1) else _ordinal(m.group(2).strip())
+        if not numero:
+            continue
+        ciudad = texto[m.start(4):m.end(4)].strip()
+        tipo = "Juzgado Civil" if m.group(3) == "civil" else "Juzgado de Letras"
+        tribunales.append((f"{numero}° {tipo} de {ciudad.title().replace(' Del ', ' del ')}", m.group(4)))
+    unico = _unico(tribunales)
+    if unico:
+        campos["tribunal"] = unico[0]
+
+    cortes = [texto[m.start(1):m.end(1)].title().replace(" Del ", " del ") for m in _RE_CORTE.finditer(plano)]
+    if cortes:
+        corte = _unico(cortes)
+    else:
+        corte = CORTES.get(unico[1]) if unico else None
+    if corte:
+        campos["corte"] = f"Corte de Apelaciones de {corte}"
+
+
+def _posturas(plano: str, campos: dict):
+    uf = [m.group(1) or m.group(2) for m in _ventanas(_RE_MINIMO, plano, _RE_UF, 200) if m]
+    clp = [m.group(1) for m in _ventanas(_RE_MINIMO, plano, _RE_CLP, 200) if m]
+    if len(set(uf)) > 1 or len(set(clp)) > 1 or not (uf or clp):
+        return
+    campos["postura_minima_uf"] = uf[0] if uf else "0"
+    campos["postura_minima_clp"] = clp[0] if clp else "0"
+
+
+def _garantia(plano: str, campos: dict):
+    if "garant" not in plano:
+        campos["garantia_porcentaje"] = 0
+        campos["forma_pago_garantia"] = None
+        return
+    porcentaje = _unico(m.group(1).replace(",", ".")
+                        for m in _ventanas(_RE_GARANTIA, plano, _RE_PORCENTAJE, 150) if m)
+    if porcentaje:
+        campos["garantia_porcentaje"] = float(porcentaje)
+
+    formas = set()
+    if "cupon de pago" in plano:
+        formas.add("Cupón de Pago")
+    if re.search(r"transferencia (?:electronica|bancaria)", plano):
+        formas.add("Transferencia")
+    if "vale vista" in plano and re.search(r"a la orden del (?:tribunal|juzgado)|a nombre del (?:tribunal|juzgado)", plano):
+        formas.add("Vale Vista Nominativo")
+    elif "vale vista" in plano:
+        formas.add(None)   # vale vista sin más detalle: endosable o nominativo lo decide el modelo
+    if len(formas) == 1 and None not in formas:
+        campos["forma_pago_garantia"] = formas.pop()
+
+
+def _es_direccion_tribunal(plano: str, m) -> bool:
+    """
+    True si el "ubicado en <dirección>" de m es el del tribunal: la dirección es
+    la de un tribunal conocido, o lo último que se nombra antes es un juzgado o
+    tribunal y no la propiedad.
+    """
+    direccion = re.sub(r"\s+", " ", re.sub(r"n[°º]\s*", "", m.group(1)))
+    if any(conocida in direccion for conocida in DIRECCIONES_TRIBUNALES):
+        return True
+    previo = plano[max(0, m.start() - VENTANA_CONTEXTO_DIRECCION):m.start()]
+    tribunales = [t.end() for t in _RE_MENCION_TRIBUNAL.finditer(previo)]
+    if not tribunales:
+        return False
+    propiedades = [p.end() for p in _RE_MENCION_PROPIEDAD.finditer(previo)]
+    return not propiedades or tribunales[-1] > propiedades[-1]
+
+
+def _propiedad(texto: str, plano: str, campos: dict):
+    """Tipo, nombre, dirección, comuna, región y villa, solo si el remate es de una sola propiedad."""
+    if _RE_VARIOS.search(plano):
+        return
+    encontrados = {tipo for tipo in TIPOS if re.search(rf"\b{tipo}s?\b", plano)}
+    if "sitio" in encontrados and re.search(r"\bsitio (?:web|electronico)", plano):
+        encontrados.discard("sitio")
+    if "casa" in encontrados:
+        encontrados -= {"sitio", "terreno"}
+    if len(encontrados) != 1:
+        return
+    tipo = encontrados.pop()
+    campos["tipo_propiedad"] = TIPOS[tipo]
+
+    numeros = {m.group(2) for m in _RE_NUMERO_UNIDAD.finditer(plano) if m.group(1) == tipo}
+    if len(numeros) > 1:
+        del campos["tipo_propiedad"]
+        return
+
+    direcciones = [re.sub(r"\s+", " ", re.sub(r"n[°º]\s*", "", texto[m.start(1):m.end(1)], flags=re.I)).strip()
+                   for m in _RE_DIRECCION.finditer(plano) if not _es_direccion_tribunal(plano, m)]
+    direccion = _unico(direcciones)
+    if direccion:
+        campos["direccion"] = direccion
+    if numeros:
+        campos["nombre_propiedad"] = f"{TIPOS[tipo].capitalize()} {numeros.pop()}"
+    elif direccion:
+        campos["nombre_propiedad"] = f"{TIPOS[tipo].capitalize()} {direccion}"
+
+    comunas = [comuna for comuna in COMUNAS_RM if re.search(rf"comuna (?:de )?{re.escape(_plano(comuna))}\b", plano)]
+    if len(comunas) == 1:
+        campos["comuna"] = comunas[0]
+        campos["region"] = REGION_RM
+
+    villas = [re.sub(r"\s*'\s*", " ", texto[m.start(1):m.end(2)]).strip() for m in _RE_VILLA.finditer(plano)]
+    if not villas:
+        campos["villa_barrio_condominio"] = None
+    elif _unico(villas):
+        campos["villa_barrio_condominio"] = villas[0]
+
+
+@lru_cache(maxsize=4096)
+def extraer(texto: str) -> dict:
+    """
+    Campos (de CAMPOS) que se pudieron sacar del texto con seguridad. Los que
+    faltan no se encontraron o eran ambiguos. No modificar el resultado (va
+    cacheado por texto).
+    """
+    texto = unicodedata.normalize("NFC", texto or "")
+    plano = _plano(texto)
+    campos = {"diario": "El Mercurio"}
+
+    causa = _unico(f"{m.group(1).upper()}-{m.group(2)}-{m.group(3)}" for m in _RE_CAUSA.finditer(plano))
+    if causa:
+        campos["causa"] = causa
+
+    caratulados = [texto[m.start(1):m.end(1)].strip(" '") for m in _RE_CARATULADO.finditer(plano)]
+    if _unico(caratulados):
+        campos["Caratulado"] = caratulados[0]
+
+    _tribunal(texto, plano, campos)
+    _posturas(plano, campos)
+    _garantia(plano, campos)
+
+    fechas = {(int(m.group(3)), MESES[m.group(2)], int(m.group(1)), int(m.group(4)), int(m.group(5) or 0))
+              for m in _RE_FECHA_HORA.finditer(plano)}
+    if len(fechas) == 1:
+        anio, mes, dia, hora, minuto = fechas.pop()
+        campos["fecha_remate"] = f"{anio:04d}-{mes:02d}-{dia:02d}"
+        campos["fecha_hora_remate"] = f"{anio:04d}-{mes:02d}-{dia:02d}T{hora:02d}:{minuto:02d}"
+
+    enlaces = [texto[m.start():m.end()].rstrip(".") for m in _RE_ZOOM_URL.finditer(plano)] \
+        or [m.group(1) for m in _RE_ZOOM_ID.finditer(plano)]
+    if not enlaces:
+        campos["link_zoom"] = "Necesario contactar"
+    elif _unico(enlaces):
+        campos["link_zoom"] = enlaces[0]
+
+    if "saldo" not in plano:
+        campos["fecha_pago_saldo_remate"] = None
+    else:
+        saldo = _unico(texto[m.start(1):m.end(1)].strip() for m in _RE_SALDO.finditer(plano))
+        if saldo:
+            campos["fecha_pago_saldo_remate"] = saldo
+
+    _propiedad(texto, plano, campos)
+    return campos
+
+
+def _montos_cuadran(plano: str, campos: dict) -> bool:
+    """
+    True si la postura mínima está en una sola moneda y es el único monto de
+    esa moneda en el texto, y no hay montos en la otra.
+    """
+    uf = {m.group(1) or m.group(2) for m in _RE_UF.finditer(plano)}
+    clp = {m.group(1) for m in _RE_CLP.finditer(plano)}
+    if campos["postura_minima_uf"] != "0" and campos["postura_minima_clp"] == "0":
+        return uf == {campos["postura_minima_uf"]} and not clp
+    if campos["postura_minima_clp"] != "0" and campos["postura_minima_uf"] == "0":
+        return clp == {campos["postura_minima_clp"]} and not uf
+    return False
+
+
+def registro_confiable(texto: str, campos: dict):
+    """
+    Registro con la forma del esquema de paso3 si el remate se puede resolver
+    sin el modelo; si no, None. Además de traer todos los campos de CAMPOS, el
+    texto debe tener un solo "ubicado en ..." (que no sea el del tribunal),
+    montos que cuadren con la postura mínima (_montos_cuadran) y, si no hay
+    villa, tampoco un edificio (el modelo lo pondría en villa_barrio_condominio).
+    """
+    if any(campo not in campos for campo in CAMPOS):
+        return None
+    plano = _plano(unicodedata.normalize("NFC", texto or ""))
+    ubicaciones = list(_RE_DIRECCION.finditer(plano))
+    if len(ubicaciones) != 1 or _es_direccion_tribunal(plano, ubicaciones[0]):
+        return None
+    if not _montos_cuadran(plano, campos):
+        return None
+    if campos["villa_barrio_condominio"] is None and re.search(r"\bedificio\b", plano):
+        return None
+    registro = {campo: campos[campo] for campo in CAMPOS if campo not in ("link_zoom", "fecha_hora_remate")}
+    registro["comentario"] = {"link_zoom": campos["link_zoom"], "fecha_hora_remate": campos["fecha_hora_remate"]}
+    return registro
+
+
+def extraer_lote(textos: list, cancel_event=None):
+    """extraer() para cada texto, en orden. None si se canceló."""
+    resultados = []
+    for n, texto in enumerate(textos):
+        if cancel_event is not None and n % REVISAR_CANCELACION_CADA == 0 and cancel_event.is_set():
+            return None
+        resultados.append(extraer(texto))
+    return resultados
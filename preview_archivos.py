@@ -1,4 +1,3 @@
-import webview
 import threading
 import html
 
@@ -8,6 +7,9 @@ def mostrar_preview_html(file_path: str, cancel_event: threading.Event):
     La ejecución del script que llama a esta función se bloquea hasta que la 
     ventana de previsualización se cierra.
     """
+    # Import diferido: las corridas sin pantalla (remates.py) no cargan pywebview
+    import webview
+
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
@@ -0,0 +1,194 @@
+# remates.py
+# EJECUCIÓN SIN VENTANA (CLI) DE LOS PIPELINES: El Mercurio, Macal y House Pricing
+#
+#   python -m remates run mercurio --url URL --pages 12 [--columns 7] [--review auto_reporte] [--workers 4]
+#   python -m remates run lote --edition URL 12 --edition URL 8 7 [--review auto] [--ai-mode batch]
+#   python -m remates run ia --input remates_separados.json [--resume] [--ai-mode batch]
+#   python -m remates run macal [--output propiedades_macal/propiedades_macal_final.xlsx]
+#   python -m remates run hp [--lista lista.xlsx]
+#
+# Pensado para cron / servidores sin pantalla: Chrome corre headless (salvo
+# --no-headless), no importa pywebview y la revisión humana se reemplaza por
+# una política automática (ver revision.POLITICAS_REVISION). Cada pipeline se importa recién al usarlo, así
+# "macal" no carga Selenium ni OpenCV.
+# Códigos de salida: 0 ok, 1 error, 130 cancelado (Ctrl+C).
+
+import os
+import sys
+import argparse
+import threading
+from logger import get_logger
+
+logger = get_logger("cli", log_dir="logs", log_file="cli.log")
+
+POLITICAS_SIN_VENTANA = ("auto", "auto_reporte")
+
+MACAL_SEARCH_URL = "https://api-net.macal.cl/api/v1/properties/search"
+MACAL_DETAILS_URL = "https://api-net.macal.cl/api/v1/properties/details"
+
+
+def imprimir_progreso(porcentaje, mensaje):
+    print(f"[{porcentaje:5.1f}%] {mensaje}", flush=True)
+
+
+def _edicion(valores):
+    """['URL', '12'] o ['URL', '12', '7'] -> (url, paginas, columnas)."""
+    if len(valores) not in (2, 3):
+        raise argparse.ArgumentTypeError("--edition espera URL PAGINAS [COLUMNAS]")
+    try:
+        return valores[0], int(valores[1]), int(valores[2]) if len(valores) == 3 else 7
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Páginas y columnas deben ser números: {' '.join(valores)}")
+
+
+def run_mercurio(args, cancel_event):
+    import main
+    main.orquestador_con_datos(
+        args.url, args.pages, args.columns,
+        cancel_event,
+        not args.no_cleanup,
+        imprimir_progreso,
+        politica_revision=args.review,
+        modo_ia=args.ai_mode,
+        headless=args.headless,
+        workers=args.workers
+    )
+
+
+def run_lote(args, cancel_event):
+    import main
+    resultado = main.orquestador_lote(
+        [_edicion(valores) for valores in args.edition],
+        cancel_event,
+        not args.no_cleanup,
+        imprimir_progreso,
+        max_concurrentes=args.workers,
+        politica_revision=args.review,
+        modo_ia=args.ai_mode,
+        headless=args.headless
+    )
+    if resultado:
+        for edicion in resultado["ediciones"]:
+            detalle = edicion["error"] or f"{edicion['propiedades']} propiedades"
+            print(f"  {edicion['edicion']}: {edicion['estado']} ({detalle})")
+        print(f"Excel del lote: {resultado['excel']}")
+        if any(e["estado"] == "error" for e in resultado["ediciones"]):
+            return 1
+
+
+def run_ia(args, cancel_event):
+    import paso3_copy
+    ruta_json, ruta_excel = paso3_copy.run_processor(
+        cancel_event,
+        args.input,
+        imprimir_progreso,
+        output_prefix=args.output_prefix,
+        modo=args.ai_mode,
+        reanudar=args.resume
+    )
+    if not ruta_json:
+        return 1
+    print(f"Resultados: {ruta_json} y {ruta_excel}")
+
+
+def run_macal(args, cancel_event):
+    import macal
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    macal.run_extractor_macal(
+        MACAL_SEARCH_URL, MACAL_DETAILS_URL, args.output,
+        cancel_event,
+        progress_callback=imprimir_progreso
+    )
+
+
+def run_hp(args, cancel_event):
+    from housePrincing import main_hp
+    main_hp.main(cancel_event, ruta_lista=args.lista)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m remates",
+        description="Ejecuta los pipelines de remates sin interfaz gráfica."
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    run = comandos.add_parser("run", help="Ejecuta un pipeline.")
+    pipelines = run.add_subparsers(dest="pipeline", required=True)
+
+    def opciones_mercurio(sub):
+        sub.add_argument("--review", choices=POLITICAS_SIN_VENTANA, default="auto_reporte",
+                         help="Política de revisión humana (por defecto: auto_reporte).")
+        sub.add_argument("--no-cleanup", action="store_true",
+                         help="No borra los archivos temporales (modo desarrollo).")
+        sub.add_argument("--ai-mode", choices=("sincrono", "batch"), default="sincrono",
+                         help="batch: Batch API de OpenAI, hasta 24 h y mitad de precio (backfills).")
+        sub.add_argument("--headless", action=argparse.BooleanOptionalAction, default=True,
+                         help="Chrome sin ventana (por defecto); --no-headless lo muestra.")
+
+    mercurio = pipelines.add_parser("mercurio", help="Una edición de El Mercurio (Santiago o regional).")
+    mercurio.add_argument("--url", required=True, help="URL del visor papel de la edición.")
+    mercurio.add_argument("--pages", type=int, required=True, help="Páginas a procesar.")
+    mercurio.add_argument("--columns", type=int, default=7, help="Columnas del layout (Santiago).")
+    mercurio.add_argument("--workers", type=int, default=None,
+                          help="Sesiones de Chrome en paralelo (Santiago; por defecto paso1_copy.WORKERS_PARALELOS).")
+    opciones_mercurio(mercurio)
+    mercurio.set_defaults(funcion=run_mercurio)
+
+    lote = pipelines.add_parser("lote", help="Varias ediciones en paralelo, unidas en un solo Excel.")
+    lote.add_argument("--edition", nargs="+", action="append", required=True, metavar="URL PAGINAS [COLUMNAS]",
+                      help="Una edición del lote (repetible).")
+    lote.add_argument("--workers", type=int, default=3, help="Ediciones simultáneas.")
+    opciones_mercurio(lote)
+    lote.set_defaults(funcion=run_lote)
+
+    ia = pipelines.add_parser("ia", help="Solo el paso 3 (extracción con IA) sobre un JSON de remates separados.")
+    ia.add_argument("--input", required=True, help="JSON del paso 2 (ej. remates_separados.json).")
+    ia.add_argument("--output-prefix", default="remates_final", help="Prefijo de los archivos .json/.xlsx de salida.")
+    ia.add_argument("--resume", action="store_true",
+                    help="Reanuda desde la bitácora <prefijo>_progreso.jsonl de una corrida cortada.")
+    ia.add_argument("--ai-mode", choices=("sincrono", "batch"), default="sincrono",
+                    help="batch: Batch API de OpenAI, hasta 24 h y mitad de precio (backfills).")
+    ia.set_defaults(funcion=run_ia)
+
+    macal = pipelines.add_parser("macal", help="Extractor de la API de Macal.")
+    macal.add_argument("--output", default=os.path.join("propiedades_macal", "propiedades_macal_final.xlsx"))
+    macal.set_defaults(funcion=run_macal)
+
+    hp = pipelines.add_parser("hp", help="House Pricing sobre input_pdfs/ (o descargando desde una lista).")
+    hp.add_argument("--lista", default=None, help="CSV/Excel con Rol y Comuna (activa la descarga automática).")
+    hp.set_defaults(funcion=run_hp)
+
+    return parser
+
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "edition", None):
+        try:
+            for valores in args.edition:
+                _edicion(valores)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+
+    cancel_event = threading.Event()
+    logger.info(f"▶️ CLI: {' '.join(argv if argv is not None else sys.argv[1:])}")
+    try:
+        codigo = args.funcion(args, cancel_event) or 0
+    except KeyboardInterrupt:
+        cancel_event.set()
+        logger.warning("🛑 Proceso cancelado (Ctrl+C).")
+        return 130
+    except Exception as e:
+        logger.exception(f"❌ Error en el pipeline '{args.pipeline}': {e}")
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if cancel_event.is_set():
+        logger.warning("🛑 Proceso cancelado.")
+        return 130
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
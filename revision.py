@@ -1,14 +1,25 @@
-import webview
 import threading
 import os
+import json
 
-def mostrar_revision(lista_validos: list, lista_descartados: list, cancel_event: threading.Event):
+# Políticas de revisión humana (paso2_copy.procesar_remates):
+#   "interactiva"  -> ventanas de preview y revisión (pywebview)
+#   "auto"         -> se acepta la clasificación automática tal cual, sin ventanas
+#   "auto_reporte" -> igual que "auto" y además se deja un reporte JSON de la decisión
+POLITICAS_REVISION = ("interactiva", "auto", "auto_reporte")
+
+def mostrar_revision(lista_validos: list, lista_descartados: list, cancel_event: threading.Event,
+                     clasificacion: dict = None):
     """
     Abre una ventana para que el usuario revise y mueva ítems entre 
     la lista de Válidos y Descartados.
+    clasificacion (opcional): {id_remate: {"categoria", "puntajes", "evidencia"}}
+    se muestra en cada tarjeta como el motivo de la clasificación automática.
     
     Retorna: (lista_validos_final, lista_descartados_final)
     """
+    # Import diferido: las corridas sin pantalla (remates.py) no cargan pywebview
+    import webview
     
     # Contenedores para almacenar la respuesta del usuario
     resultado = {
@@ -24,7 +35,8 @@ def mostrar_revision(lista_validos: list, lista_descartados: list, cancel_event:
         def get_data(self):
             return {
                 "validos": lista_validos,
-                "descartados": lista_descartados
+                "descartados": lista_descartados,
+                "clasificacion": clasificacion or {}
             }
 
         def confirmar_revision(self, nuevos_validos, nuevos_descartados):
@@ -70,4 +82,40 @@ def mostrar_revision(lista_validos: list, lista_descartados: list, cancel_event:
         print("⚠️ Ventana cerrada sin confirmar. Cancelando proceso.")
         cancel_event.set()
 
-    return resultado["validos"], resultado["descartados"]
\ No newline at end of file
+    return resultado["validos"], resultado["descartados"]
+
+
+def revision_automatica(lista_validos: list, lista_descartados: list, clasificacion: dict = None,
+                        ruta_reporte: str = None):
+    """
+    Revisión sin ventana: acepta la clasificación automática tal cual. Con
+    ruta_reporte deja un JSON con la decisión tomada para cada remate (y la
+    evidencia del clasificador) para revisarlo después.
+
+    Retorna: (lista_validos, lista_descartados)
+    """
+    if ruta_reporte:
+        clasificacion = clasificacion or {}
+
+        def fila(item, decision):
+            info = clasificacion.get(item["id_remate"]) or {}
+            return {
+                "id_remate": item["id_remate"],
+                "decision": decision,
+                "categoria": info.get("categoria"),
+                "puntajes": info.get("puntajes", {}),
+                "evidencia": info.get("evidencia", {}),
+                "extracto": item["remate"][:200],
+            }
+
+        reporte = {
+            "politica": "auto_reporte",
+            "total_validos": len(lista_validos),
+            "total_descartados": len(lista_descartados),
+            "remates": [fila(item, "valido") for item in lista_validos]
+                       + [fila(item, "descartado") for item in lista_descartados],
+        }
+        with open(ruta_reporte, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=4, ensure_ascii=False)
+
+    return lista_validos, lista_descartados
@@ -0,0 +1,200 @@
+# separadores.py
+# DETECCIÓN DE INICIOS DE REMATE (CLAVES_SEPARADORES) COMPILADA POR REGIÓN
+#
+# paso2_copy juntaba ~50 claves en una alternancia gigante y la reconstruía en
+# cada llamada. Aquí las claves se normalizan y se compilan una sola vez por
+# lista (santiago / iquique) y quedan en caché:
+#   - se aplanan los grupos "(A|B|C)" en alternativas sueltas,
+#   - se quitan duplicados y las claves que nunca pueden ganar porque una
+#     anterior es prefijo literal suyo ("REMATE" ya cubre "REMATE:\s+SEGUNDO..."),
+# y los remates fusionados se buscan recorriendo solo los inicios de remate
+# del texto en vez de probar la expresión completa en cada posición.
+# El resultado es el mismo que con las expresiones originales.
+
+import re
+from functools import lru_cache
+
+# Inicios que se prueban antes que CLAVES_SEPARADORES al separar fusionados
+BLOQUE_MANUAL = [
+    r"REMATE\b",
+    r"REMATE[:.]?",
+    r"JUEZ PARTIDOR",
+    r"JUEZ ARBITRO",
+    r"LICITACI[ÓO]N\s+REMATE",
+    r"POR RESOLUCI[ÓO]N\sDEL\s4°\sJUZGADO",
+    r"NOTIFICACI[ÓO]N[.:]?\s+VIG[ÉE]SIMO\s+S[ÉE]PTIMO",
+    r"\bPARTIDOR\b",
+    r"CUARTO\s+REMATE\s+P[ÚU]BLICO[,;]?\s*NUEVO"
+]
+
+# Lo que cierra un remate (firma, teléfono o correo) justo antes del siguiente
+PALABRAS_CIERRE = r"\b(?:Secretaría|Secretario\(a\)|La Actuaria|El Actuario)\b"
+PATRON_EMAIL = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+PATRON_TELEFONO = r'(?:\+56\s?)?[29]\s?\d{4}\s?\d{4}'
+
+# Largos posibles de una firma o teléfono (de "2 1234 5678" a "+56 2 1234 5678")
+_LARGOS_CIERRE = range(9, 16)
+_CARACTERES_EMAIL = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+_DOMINIO_EMAIL = re.compile(r"[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+
+def _partir_alternativas(patron: str) -> list:
+    """Divide un patrón por los '|' de primer nivel (fuera de grupos y clases)."""
+    partes, actual = [], []
+    nivel, en_clase, i = 0, False, 0
+    while i < len(patron):
+        c = patron[i]
+        if c == "\\":
+            actual.append(patron[i:i + 2])
+            i += 2
+            continue
+        if en_clase:
+            en_clase = c != "]"
+        elif c == "[":
+            en_clase = True
+            if patron[i + 1:i + 2] == "]":   # "[]...]": el ']' inicial es literal
+                actual.append(c)
+                c = patron[i + 1]
+                i += 1
+        elif c == "(":
+            nivel += 1
+        elif c == ")":
+            nivel -= 1
+        elif c == "|" and nivel == 0:
+            partes.append("".join(actual))
+            actual = []
+            i += 1
+            continue
+        actual.append(c)
+        i += 1
+    partes.append("".join(actual))
+    return partes
+
+
+def _desagrupar(patron: str) -> str:
+    """'(A|B)' o '(?:A|B)' que abarcan todo el patrón -> 'A|B'."""
+    for apertura in ("(?:", "("):
+        if not (patron.startswith(apertura) and patron.endswith(")")):
+            continue
+        interior = patron[len(apertura):-1]
+        if apertura == "(" and interior.startswith("?"):
+            continue
+        # El paréntesis final tiene que ser el que cierra la apertura
+        if _balanceado(interior):
+            return interior
+    return patron
+
+
+def _balanceado(patron: str) -> bool:
+    nivel, en_clase, i = 0, False, 0
+    while i < len(patron):
+        c = patron[i]
+        if c == "\\":
+            i += 2
+            continue
+        if en_clase:
+            en_clase = c != "]"
+        elif c == "[":
+            en_clase = True
+            if patron[i + 1:i + 2] == "]":
+                i += 1
+        elif c == "(":
+            nivel += 1
+        elif c == ")":
+            nivel -= 1
+            if nivel < 0:
+                return False
+        i += 1
+    return nivel == 0
+
+
+def normalizar_claves(claves) -> list:
+    """
+    Aplana, deduplica y poda las claves manteniendo el orden. Una clave se
+    descarta si una anterior es prefijo literal suyo: donde ella coincide, la
+    anterior ya coincidió antes (alternancia ordenada) o igual (lookahead).
+    """
+    planas = []
+    pendientes = list(claves)
+    while pendientes:
+        clave = pendientes.pop(0)
+        alternativas = _partir_alternativas(clave)
+        if len(alternativas) > 1:
+            pendientes[0:0] = alternativas
+            continue
+        sin_grupo = _desagrupar(clave)
+        if sin_grupo != clave:
+            pendientes.insert(0, sin_grupo)
+            continue
+        planas.append(clave)
+
+    normalizadas = []
+    for clave in planas:
+        if any(_cubre(previa, clave) for previa in normalizadas):
+            continue
+        normalizadas.append(clave)
+    return normalizadas
+
+
+def _cubre(previa: str, clave: str) -> bool:
+    if clave == previa:
+        return True
+    # "A+" no es prefijo de "A+?B" ni "\d" de "\d{1,2}": el siguiente carácter
+    # no puede modificar al último elemento de la previa
+    return clave.startswith(previa) and clave[len(previa)] not in "?*+{"
+
+
+@lru_cache(maxsize=None)
+def _compilar(inicios: tuple) -> dict:
+    """Compila (una vez por lista de claves) los patrones de detección."""
+    alternativas = "|".join(normalizar_claves(inicios))
+    return {
+        # Igual que en insertar_separadores: el resto opcional
+        # "(?:\s+[A-ZÁÉÍÓÚÑ\d]+)*" del lookahead no cambia dónde coincide
+        "corte": re.compile(rf"\n(?=\s*(?:{alternativas}))"),
+        # Bloque de espacios seguido de un inicio de remate
+        "ancla": re.compile(rf"\s+(?={alternativas})"),
+        # Inicio que gana en la alternancia ordenada (define hasta dónde llega)
+        "inicio": re.compile(f"(?:{alternativas})"),
+        "cierre": re.compile(f"(?:{PALABRAS_CIERRE}|{PATRON_TELEFONO}|{PATRON_EMAIL})"),
+    }
+
+
+def patron_cortes(claves_separadores) -> re.Pattern:
+    """
+    Patrón de insertar_separadores: coincide con los '\\n' seguidos (tras
+    espacios opcionales) de una clave separadora.
+    """
+    return _compilar(tuple(claves_separadores))["corte"]
+
+
+def fusiones(texto: str, claves_separadores):
+    """
+    Recorre los remates fusionados: cierre + espacios + inicio de remate, con
+    los mismos inicios (BLOQUE_MANUAL + claves) y la misma resolución que
+    re.sub(r"(cierre)(\\s+)(inicio)") (coincidencia más a la izquierda, sin
+    solapes). Entrega tuplas (inicio_cierre, inicio_espacios, inicio_remate,
+    fin_inicio) con posiciones en `texto`.
+    """
+    patrones = _compilar(tuple(BLOQUE_MANUAL) + tuple(claves_separadores))
+    cierre, inicio = patrones["cierre"], patrones["inicio"]
+    reanudar = 0
+    for m in patrones["ancla"].finditer(texto):
+        espacios, remate = m.start(), m.end()
+        if espacios <= reanudar:
+            continue
+
+        candidatos = {espacios - largo for largo in _LARGOS_CIERRE}
+        arroba = texto.rfind("@", reanudar, espacios)
+        if arroba != -1 and _DOMINIO_EMAIL.fullmatch(texto, arroba + 1, espacios):
+            desde = arroba
+            while desde > reanudar and texto[desde - 1] in _CARACTERES_EMAIL:
+                desde -= 1
+            candidatos.add(desde)
+
+        for desde in sorted(c for c in candidatos if c >= reanudar):
+            if cierre.fullmatch(texto, desde, espacios):
+                fin = inicio.match(texto, remate).end()
+                yield desde, espacios, remate, fin
+                reanudar = fin
+                break
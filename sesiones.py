@@ -0,0 +1,100 @@
+# sesiones.py
+# ALMACÉN DE SESIONES AUTENTICADAS (cookies) ENTRE EJECUCIONES
+#
+# Después de un login exitoso se guardan las cookies del navegador por
+# dominio + usuario. En la siguiente ejecución se inyectan en el Chrome nuevo
+# y, si el sitio las sigue aceptando, se omite el formulario de login.
+# La validación de "sigue logueado" depende del sitio y la hace cada extractor.
+
+import os
+import json
+import time
+import hashlib
+from urllib.parse import urlparse
+from logger import get_logger
+
+logger = get_logger("sesiones", log_dir="logs", log_file="sesiones.log")
+
+CARPETA_SESIONES = "sesiones"
+MAX_EDAD_SESION_HORAS = 12
+
+CAMPOS_COOKIE = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry")
+
+
+def _ruta_sesion(url: str, usuario: str) -> str:
+    host = urlparse(url).netloc or url
+    clave_usuario = hashlib.sha1((usuario or "").encode("utf-8")).hexdigest()[:10]
+    return os.path.join(CARPETA_SESIONES, f"{host}_{clave_usuario}.json")
+
+
+def cargar_sesion(url: str, usuario: str):
+    """
+    Retorna las cookies guardadas para (dominio, usuario), o None si no hay
+    sesión, si es más antigua que MAX_EDAD_SESION_HORAS o si ya expiró.
+    """
+    ruta = _ruta_sesion(url, usuario)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Sesión guardada ilegible ({ruta}): {e}. Se descarta.")
+        invalidar_sesion(url, usuario)
+        return None
+
+    ahora = time.time()
+    if ahora - datos.get("guardado", 0) > MAX_EDAD_SESION_HORAS * 3600:
+        logger.info(f"⌛ Sesión guardada vencida por antigüedad: {ruta}")
+        invalidar_sesion(url, usuario)
+        return None
+
+    cookies = [c for c in datos.get("cookies", []) if c.get("expiry") is None or c["expiry"] > ahora]
+    if not cookies:
+        invalidar_sesion(url, usuario)
+        return None
+    return cookies
+
+
+def guardar_sesion(url: str, usuario: str, cookies: list):
+    """Guarda las cookies de una sesión recién autenticada (solo lectura/escritura del dueño)."""
+    if not cookies:
+        return
+    ruta = _ruta_sesion(url, usuario)
+    os.makedirs(CARPETA_SESIONES, exist_ok=True)
+    datos = {
+        "guardado": time.time(),
+        "cookies": [{k: v for k, v in c.items() if k in CAMPOS_COOKIE} for c in cookies],
+    }
+    try:
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.chmod(ruta, 0o600)
+        logger.info(f"🍪 Sesión guardada: {ruta} ({len(cookies)} cookies)")
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo guardar la sesión ({ruta}): {e}")
+
+
+def invalidar_sesion(url: str, usuario: str):
+    ruta = _ruta_sesion(url, usuario)
+    try:
+        os.remove(ruta)
+        logger.info(f"🧹 Sesión descartada: {ruta}")
+    except OSError:
+        pass
+
+
+def aplicar_cookies(driver, url, cookies, logger):
+    """
+    Inyecta en un driver nuevo las cookies obtenidas por otra sesión ya logueada
+    y navega a la URL.
+    """
+    origen = "/".join(url.split("/", 3)[:3])
+    driver.get(origen)
+    for cookie in cookies:
+        cookie = {k: v for k, v in cookie.items() if k in CAMPOS_COOKIE}
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            logger.debug(f"Cookie '{cookie.get('name')}' no aplicada: {e}")
+    driver.get(url)
@@ -0,0 +1,192 @@
+import email
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import OpenAI
+
+import paso3_copy
+
+
+class ServidorBatch(ThreadingHTTPServer):
+    """
+    Batch API mínima en memoria: /v1/files, /v1/batches, sondeo, cancelación y
+    /v1/files/<id>/content. El batch avanza en cada sondeo y termina en el segundo;
+    la solicitud cuyo texto contenga "falla" sale en el archivo de errores.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorBatch)
+        self.archivos, self.batches = {}, {}
+        self.hilo = threading.Thread(target=self.serve_forever, daemon=True)
+        self.hilo.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def nuevo_id(self, prefijo):
+        return f"{prefijo}_{len(self.archivos) + len(self.batches) + 1}"
+
+
+def respuesta_chat(cuerpo):
+    texto = re.search(r"TEXTO DEL REMATE:\n(.*)", cuerpo["messages"][-1]["content"]).group(1)
+    if "falla" in texto:
+        return {"status_code": 500, "body": {"error": {"message": "error simulado"}}}
+    contenido = json.dumps({"remates": [{"nombre_propiedad": texto.split()[-1]}]})
+    return {"status_code": 200, "body": {
+        "id": "chatcmpl", "object": "chat.completion", "created": 0, "model": cuerpo["model"],
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": contenido}}],
+        "usage": {"prompt_tokens": 1800, "completion_tokens": 20, "total_tokens": 1820,
+                  "prompt_tokens_details": {"cached_tokens": 1536}},
+    }}
+
+
+class ManejadorBatch(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, cuerpo, codigo=200, tipo="application/json"):
+        datos = cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo).encode()
+        self.send_response(codigo)
+        self.send_header("content-type", tipo)
+        self.send_header("content-length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _batch(self, batch):
+        return {"id": batch["id"], "object": "batch", "endpoint": "/v1/chat/completions",
+                "input_file_id": batch["entrada"], "completion_window": "24h", "status": batch["estado"],
+                "created_at": 0, "output_file_id": batch.get("salida"), "error_file_id": batch.get("errores"),
+                "errors": None, "request_counts": {"total": len(batch["lineas"]), "completed": batch["hechos"],
+                                                   "failed": batch["fallidas"]}}
+
+    def do_POST(self):
+        srv = self.server
+        crudo = self.rfile.read(int(self.headers.get("content-length", 0)))
+        if self.path == "/v1/files":
+            mensaje = email.message_from_bytes(
+                f"content-type: {self.headers['content-type']}\r\n\r\n".encode() + crudo)
+            contenido = next(p.get_payload(decode=True) for p in mensaje.get_payload()
+                             if p.get_param("name", header="content-disposition") == "file")
+            id_archivo = srv.nuevo_id("file")
+            srv.archivos[id_archivo] = contenido
+            return self._responder({"id": id_archivo, "object": "file", "bytes": len(contenido), "created_at": 0,
+                                    "filename": "lote.jsonl", "purpose": "batch", "status": "processed"})
+        if self.path == "/v1/batches":
+            cuerpo = json.loads(crudo)
+            lineas = [json.loads(l) for l in srv.archivos[cuerpo["input_file_id"]].decode().splitlines() if l.strip()]
+            id_batch = srv.nuevo_id("batch")
+            srv.batches[id_batch] = {"id": id_batch, "entrada": cuerpo["input_file_id"], "estado": "validating",
+                                     "lineas": lineas, "hechos": 0, "fallidas": 0}
+            return self._responder(self._batch(srv.batches[id_batch]))
+        m = re.fullmatch(r"/v1/batches/(\w+)/cancel", self.path)
+        if m:
+            batch = srv.batches[m.group(1)]
+            batch["estado"] = "cancelled"
+            return self._responder(self._batch(batch))
+        self._responder({"error": {"message": "no encontrado"}}, 404)
+
+    def do_GET(self):
+        srv = self.server
+        m = re.fullmatch(r"/v1/batches/(\w+)", self.path)
+        if m:
+            batch = srv.batches[m.group(1)]
+            if batch["estado"] in ("validating", "in_progress"):
+                batch["estado"] = "in_progress"
+                batch["hechos"] = min(len(batch["lineas"]), batch["hechos"] + len(batch["lineas"]) // 2 + 1)
+                if batch["hechos"] == len(batch["lineas"]):
+                    self._terminar(batch)
+            return self._responder(self._batch(batch))
+        m = re.fullmatch(r"/v1/files/(\w+)/content", self.path)
+        if m:
+            return self._responder(srv.archivos[m.group(1)], tipo="application/octet-stream")
+        self._responder({"error": {"message": "no encontrado"}}, 404)
+
+    def _terminar(self, batch):
+        # Como la API real: la salida no respeta el orden de entrada
+        salida, errores = [], []
+        for linea in reversed(batch["lineas"]):
+            respuesta = respuesta_chat(linea["body"])
+            destino = salida if respuesta["status_code"] == 200 else errores
+            destino.append({"id": "req", "custom_id": linea["custom_id"], "response": respuesta, "error": None})
+        for clave, lineas in (("salida", salida), ("errores", errores)):
+            batch[clave] = self.server.nuevo_id("file")
+            self.server.archivos[batch[clave]] = "\n".join(json.dumps(l) for l in lineas).encode()
+        batch["hechos"], batch["fallidas"] = len(salida), len(errores)
+        batch["estado"] = "completed"
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    srv = ServidorBatch()
+    monkeypatch.setattr(paso3_copy, "INTERVALO_SONDEO_BATCH_S", 0.01)
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def cliente(servidor):
+    return OpenAI(api_key="clave-de-prueba", base_url=servidor.url, max_retries=0)
+
+
+def test_batch_completo_con_una_solicitud_fallida(servidor, tmp_path):
+    ruta = tmp_path / "lote.jsonl"
+    textos = {"a": "remate casa A1", "b": "remate que falla", "c": "remate depto C3"}
+    progreso = []
+
+    resultados = paso3_copy.ejecutar_batch(cliente(servidor), "gpt-4o-mini", textos, str(ruta),
+                                           threading.Event(), progress_callback=lambda h, t: progreso.append((h, t)))
+
+    assert resultados["a"]["datos"] == {"remates": [{"nombre_propiedad": "A1"}]}
+    assert resultados["c"]["datos"] == {"remates": [{"nombre_propiedad": "C3"}]}
+    assert resultados["a"]["usage"].prompt_tokens_details.cached_tokens == 1536
+    assert resultados["b"]["error"] == "Error en batch"
+    assert progreso[-1] == (3, 3)
+    assert not ruta.exists()          # el JSONL se borra solo si el batch terminó
+
+
+def test_cancelar_cancela_el_batch_en_el_servidor(servidor, tmp_path):
+    ruta = tmp_path / "lote.jsonl"
+    cancel_event = threading.Event()
+    textos = {str(i): f"remate casa C{i}" for i in range(5)}
+
+    # Se cancela en el primer sondeo, con el batch a medias (3 de 5)
+    resultados = paso3_copy.ejecutar_batch(cliente(servidor), "gpt-4o-mini", textos, str(ruta), cancel_event,
+                                           progress_callback=lambda h, t: cancel_event.set())
+
+    assert resultados is None
+    assert [b["estado"] for b in servidor.batches.values()] == ["cancelled"]
+    assert ruta.exists()
+
+
+def test_run_processor_en_modo_batch(servidor, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", servidor.url)
+    monkeypatch.setenv("OPENAI_API_KEY_EXTRACTOR", "clave-de-prueba")
+    monkeypatch.setenv("MODEL_ENGINE", "gpt-4o-mini")
+    entrada = tmp_path / "remates_separados.json"
+    # El 3 repite el texto del 1: va una sola vez en el batch. El 4 lo resuelve
+    # preextractor sin la API; el 5 es igual pero nombra la dirección del juzgado
+    # y va al batch
+    completo = "REMATE. 30° Juzgado Civil de Santiago, Rol C-8080-2022, caratulados 'Banco Security con " \
+               "Contreras', se rematará el 21 de agosto de 2025 a las 10:30 horas la casa ubicada en calle Los " \
+               "Almendros N° 1550, comuna de Ñuñoa. Mínimo 7.250,75 UF. Garantía 10% mediante transferencia " \
+               "electrónica. Saldo dentro de quinto día hábil siguiente. Zoom ID 912 345 6789. Secretaría"
+    con_juzgado = completo.replace("Santiago, Rol", "Santiago, ubicado en Huérfanos 1409, Rol") + " P5"
+    remates = [{"id_remate": 1, "remate": "remate casa P1"}, {"id_remate": 2, "remate": "remate que falla"},
+               {"id_remate": 3, "remate": "remate casa P1"}, {"id_remate": 4, "remate": completo},
+               {"id_remate": 5, "remate": con_juzgado}]
+    entrada.write_text(json.dumps(remates), encoding="utf-8")
+
+    ruta_json, ruta_excel = paso3_copy.run_processor(
+        threading.Event(), str(entrada), lambda porcentaje, mensaje: None,
+        output_prefix=str(tmp_path / "remates_final"), usar_cache=False, modo="batch")
+
+    registros = json.loads(open(ruta_json, encoding="utf-8").read())
+    assert [(r["id_remate"], r.get("nombre_propiedad")) for r in registros if not r.get("error")] == [
+        (1, "P1"), (3, "P1"), (4, "Casa calle Los Almendros 1550"), (5, "P5")]
+    assert len(servidor.batches) == 1
+    assert len(next(iter(servidor.batches.values()))["lineas"]) == 3
+    assert (tmp_path / "remates_final.xlsx").exists()
@@ -0,0 +1,34 @@
+import bitacora
+
+REMATES = [
+    {"id_remate": 1, "remate_limpio": "casa en Santiago"},
+    {"id_remate": 2, "remate_limpio": "depto en Ñuñoa"},
+    {"id_remate": 2, "remate_limpio": "bodega en Ñuñoa"},   # id repetido en la entrada
+]
+
+
+def test_id_repetido_no_pisa_registros(tmp_path):
+    ruta = str(tmp_path / "progreso.jsonl")
+    bitacora.iniciar(ruta, bitacora.huella(REMATES))
+    # Terminan desordenados, como con varios hilos
+    for posicion in (2, 0, 1):
+        bitacora.agregar(ruta, posicion, REMATES[posicion]["id_remate"], [{"texto": REMATES[posicion]["remate_limpio"]}])
+
+    registros = list(bitacora.registros_en_orden(ruta, len(REMATES)))
+    assert [r["texto"] for r in registros] == [r["remate_limpio"] for r in REMATES]
+
+
+def test_reanudar_retorna_posiciones_y_descarta_linea_incompleta(tmp_path):
+    ruta = str(tmp_path / "progreso.jsonl")
+    huella = bitacora.huella(REMATES)
+    bitacora.iniciar(ruta, huella)
+    bitacora.agregar(ruta, 1, 2, [{"texto": "depto"}])
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write('{"posicion": 2, "id_remate": 2, "regis')
+
+    assert bitacora.iniciar(ruta, huella, reanudar=True) == {1}
+    bitacora.agregar(ruta, 2, 2, [{"texto": "bodega"}])
+    assert [r["texto"] for r in bitacora.registros_en_orden(ruta, len(REMATES))] == ["depto", "bodega"]
+
+    # Otra entrada: se empieza de cero
+    assert bitacora.iniciar(ruta, bitacora.huella(REMATES[:2]), reanudar=True) == set()
@@ -0,0 +1,91 @@
+import logging
+import threading
+
+import pytest
+
+import cache_paginas
+import paso1_copy
+
+URL = "https://digital.elmercurio.com/2026/01/01/A"
+logger = logging.getLogger("test_cache_paginas")
+
+
+def fragmentos_de(page_num):
+    return [{"text": f"pagina {page_num}", "top": 10.0, "left": 40.0, "font_size": 9.0}]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_paginas, "CARPETA_CACHE", str(tmp_path / "cache_paginas"))
+    for page_num in (1, 2, 3):
+        cache_paginas.guardar_pagina(URL, page_num, fragmentos_de(page_num))
+    return tmp_path
+
+
+@pytest.fixture
+def navegador(monkeypatch):
+    """Navegador falso: registra qué páginas se capturaron en vivo."""
+    capturadas = []
+    monkeypatch.setattr(paso1_copy, "_crear_driver", lambda logger, headless=False: (object(), ""))
+    monkeypatch.setattr(paso1_copy, "_cerrar_driver", lambda driver, perfil: None)
+    monkeypatch.setattr(paso1_copy, "login_mercurio", lambda *args: True)
+    monkeypatch.setattr(paso1_copy, "activar_modo_hd", lambda *args: None)
+    monkeypatch.setattr(paso1_copy, "avanzar_pagina", lambda *args: True)
+    monkeypatch.setattr(paso1_copy, "saltar_pagina", lambda *args: None)
+    monkeypatch.setattr(paso1_copy, "procesar_fragmentos", lambda frags, *args: frags[0]["text"])
+
+    def capturar(driver, wait, url, page_num, logger, cancel_event, tiempos_espera=None):
+        capturadas.append(page_num)
+        return fragmentos_de(page_num)
+
+    monkeypatch.setattr(paso1_copy, "capturar_pagina", capturar)
+    return capturadas
+
+
+def corromper(page_num):
+    with open(cache_paginas._ruta_pagina(URL, page_num), "wb") as f:
+        f.write(b"no es un npz")
+
+
+def paginas(workers=1):
+    return list(paso1_copy._generar_paginas(URL, 3, 7, threading.Event(), workers, False, logger))
+
+
+def test_todo_en_cache_no_abre_el_navegador(cache, navegador):
+    assert paginas() == [(1, "pagina 1"), (2, "pagina 2"), (3, "pagina 3")]
+    assert navegador == []
+
+
+def test_entrada_danada_se_recaptura(cache, navegador):
+    corromper(2)
+    assert paginas() == [(1, "pagina 1"), (2, "pagina 2"), (3, "pagina 3")]
+    assert navegador == [2]
+
+
+def test_entrada_desalojada_se_recaptura_en_paralelo(cache, navegador, monkeypatch):
+    corromper(2)
+    cache_paginas._eliminar(cache_paginas._ruta_pagina(URL, 3))
+    monkeypatch.setattr(paso1_copy.sesiones, "aplicar_cookies", lambda *args: None)
+    monkeypatch.setattr(paso1_copy, "ir_a_pagina", lambda *args: False)
+
+    class Driver:
+        def get_cookies(self):
+            return []
+
+    monkeypatch.setattr(paso1_copy, "_crear_driver", lambda logger, headless=False: (Driver(), ""))
+    assert paginas(workers=2) == [(1, "pagina 1"), (2, "pagina 2"), (3, "pagina 3")]
+    assert sorted(navegador) == [2, 3]
+
+
+def test_modo_secuencial_headless(cache, navegador, monkeypatch):
+    corromper(2)
+    modos = []
+
+    def crear(logger, headless=False):
+        modos.append(headless)
+        return object(), ""
+
+    monkeypatch.setattr(paso1_copy, "_crear_driver", crear)
+    assert list(paso1_copy._generar_paginas(URL, 3, 7, threading.Event(), 1, False, logger, headless=True))[1] == \
+        (2, "pagina 2")
+    assert modos == [True]
@@ -0,0 +1,33 @@
+import threading
+import time
+
+import cancelacion
+
+
+def test_hijo_ve_al_padre_pero_no_al_reves():
+    padre = threading.Event()
+    edicion_1 = cancelacion.EventoCancelacion(padre)
+    edicion_2 = cancelacion.EventoCancelacion(padre)
+
+    edicion_1.set()
+    assert edicion_1.is_set() and not edicion_2.is_set() and not padre.is_set()
+
+    padre.set()
+    assert edicion_2.is_set()
+
+
+def test_wait_vuelve_cuando_se_activa_el_padre():
+    padre = threading.Event()
+    hijo = cancelacion.EventoCancelacion(padre)
+    threading.Timer(0.05, padre.set).start()
+
+    t0 = time.monotonic()
+    assert hijo.wait(5)
+    assert time.monotonic() - t0 < 1
+
+
+def test_wait_respeta_el_timeout():
+    hijo = cancelacion.EventoCancelacion(threading.Event())
+    t0 = time.monotonic()
+    assert not hijo.wait(0.3)
+    assert 0.25 < time.monotonic() - t0 < 1
@@ -0,0 +1,48 @@
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import remates
+from valpoOCR import paso1_regional
+
+
+def parsear(*argv):
+    return remates.crear_parser().parse_args(["run", *argv])
+
+
+def test_chrome_headless_por_defecto():
+    args = parsear("mercurio", "--url", "u", "--pages", "3")
+    assert args.headless is True and args.workers is None
+    assert parsear("mercurio", "--url", "u", "--pages", "3", "--no-headless", "--workers", "4").headless is False
+    assert parsear("lote", "--edition", "u", "3").headless is True
+
+
+@pytest.mark.parametrize("argv, esperado", [
+    (["mercurio", "--url", "u", "--pages", "3", "--workers", "4"],
+     {"orquestador_con_datos": {"headless": True, "workers": 4}}),
+    (["mercurio", "--url", "u", "--pages", "3", "--no-headless"],
+     {"orquestador_con_datos": {"headless": False, "workers": None}}),
+    (["lote", "--edition", "u", "3"], {"orquestador_lote": {"headless": True}}),
+])
+def test_cli_pasa_headless_al_orquestador(monkeypatch, argv, esperado):
+    llamadas = {}
+
+    def registrar(nombre):
+        def orquestador(*args, **kwargs):
+            llamadas[nombre] = {clave: kwargs[clave] for clave in esperado[nombre]}
+        return orquestador
+
+    # main no se importa aquí: arrastra Selenium, OpenCV y los flujos regionales
+    monkeypatch.setitem(sys.modules, "main", SimpleNamespace(
+        orquestador_con_datos=registrar("orquestador_con_datos"), orquestador_lote=registrar("orquestador_lote")))
+    args = parsear(*argv)
+    args.funcion(args, threading.Event())
+    assert llamadas == esperado
+
+
+def test_opciones_chrome_regional():
+    headless = paso1_regional._opciones_chrome("/tmp/perfil", headless=True).arguments
+    assert "--headless=new" in headless and "--start-maximized" not in headless
+    assert "--start-maximized" in paso1_regional._opciones_chrome("/tmp/perfil").arguments
@@ -0,0 +1,131 @@
+import os
+import re
+import logging
+
+import numpy as np
+import pytest
+
+import paso1_copy
+from paso1_copy import detectar_columnas_1d
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINA_GUARDADA = os.path.join(RAIZ, "benchmarks", "fixtures", "textlayer_pagina.html")
+
+logger = logging.getLogger("test_columnas")
+
+
+def pagina_sintetica(rng, n_columnas=7):
+    """
+    Lefts de una página de avisos con su columna real: líneas alineadas al borde,
+    sangrías, spans a mitad de línea y títulos/códigos centrados.
+    """
+    x0 = rng.uniform(20, 60)
+    lefts, reales = [], []
+    for col in range(n_columnas):
+        ancho = rng.uniform(140, 165)
+        for _ in range(rng.integers(25, 60)):
+            sangria = rng.uniform(8, 15) if rng.random() < 0.15 else 0.0
+            lefts.append(x0 + rng.normal(0, 0.4) + sangria)
+            reales.append(col)
+            if rng.random() < 0.3:
+                lefts.append(x0 + rng.uniform(20, ancho - 20))
+                reales.append(col)
+        for _ in range(rng.integers(0, 3)):
+            lefts.append(x0 + (ancho - 30) / 2 + rng.normal(0, 1))
+            reales.append(col)
+        x0 += ancho + rng.uniform(8, 14)
+    return np.array(lefts), np.array(reales)
+
+
+def precision(lefts, reales, centros, divisores):
+    if len(centros) != reales.max() + 1:
+        return 0.0
+    asignadas = np.searchsorted(np.asarray(divisores, dtype=float), lefts, side="left")
+    return float(np.mean(asignadas == reales))
+
+
+def centros_kmeans(lefts, n_columnas):
+    # Mismo llamado que usaba paso1 antes de detectar_columnas_1d
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=n_columnas, n_init="auto", random_state=0).fit(lefts.reshape(-1, 1))
+    centros = sorted(kmeans.cluster_centers_.ravel())
+    return centros, [(centros[i] + centros[i + 1]) / 2 for i in range(len(centros) - 1)]
+
+
+def test_formato_centros_y_divisores():
+    centros, divisores = detectar_columnas_1d([10, 11, 12, 200, 201, 202], 2)
+    assert centros == pytest.approx([11.0, 201.0])
+    assert divisores == pytest.approx([106.0])
+
+
+def test_respeta_columnas_indicadas_con_titulos_centrados():
+    # 7 columnas alineadas al borde y 5 códigos de sección centrados: la página
+    # "parece" tener 12 columnas, pero se pidieron 7.
+    lefts = []
+    for col in range(7):
+        lefts += [40.0 + col * 160] * 30
+    for col in range(5):
+        lefts.append(40.0 + col * 160 + 62.5)
+    assert paso1_copy._inferir_num_columnas(np.diff(np.sort(lefts)))[0] == 12
+
+    centros, _ = detectar_columnas_1d(lefts, 7, logger)
+    assert len(centros) == 7
+
+
+def test_infiere_columnas_si_no_se_indican():
+    rng = np.random.default_rng(1)
+    lefts = np.concatenate([40.0 + col * 160 + rng.normal(0, 0.4, 30) for col in range(5)])
+    centros, _ = detectar_columnas_1d(lefts, None)
+    assert len(centros) == 5
+
+
+def test_precision_contra_kmeans_en_paginas_sinteticas():
+    pytest.importorskip("sklearn")
+    rng = np.random.default_rng(0)
+    propia, kmeans = [], []
+    for _ in range(200):
+        lefts, reales = pagina_sintetica(rng)
+        propia.append(precision(lefts, reales, *detectar_columnas_1d(lefts, 7)))
+        kmeans.append(precision(lefts, reales, *centros_kmeans(lefts, 7)))
+    assert np.mean(propia) >= np.mean(kmeans)
+    assert np.mean(propia) > 0.9
+
+
+def test_precision_contra_kmeans_en_pagina_guardada():
+    pytest.importorskip("sklearn")
+    with open(PAGINA_GUARDADA, encoding="utf-8") as f:
+        lefts = np.array([float(m) for m in re.findall(r"left: ([\d.]+)px", f.read())])
+    # La página guardada tiene columnas de 160 px desde x=40
+    reales = ((lefts - 40) // 160).astype(int)
+
+    propia = precision(lefts, reales, *detectar_columnas_1d(lefts, 7))
+    assert propia >= precision(lefts, reales, *centros_kmeans(lefts, 7))
+    assert propia > 0.85
+
+
+def test_kmeans_1d_da_el_optimo_exacto():
+    # Contra fuerza bruta sobre todos los cortes contiguos posibles
+    from itertools import combinations
+
+    rng = np.random.default_rng(2)
+    for _ in range(60):
+        x = np.sort(rng.integers(0, 40, rng.integers(2, 10)).astype(float))
+        valores = np.unique(x)
+        for n in range(1, valores.size + 1):
+            def suma_cuadrados(cortes):
+                grupos = np.split(valores, cortes)
+                return sum(((x[np.isin(x, g)] - x[np.isin(x, g)].mean()) ** 2).sum() for g in grupos)
+
+            optimo = min(suma_cuadrados(list(c)) for c in combinations(range(1, valores.size), n - 1))
+            centros = paso1_copy._kmeans_1d(x, n)
+            asignadas = np.argmin(np.abs(x[:, None] - centros[None, :]), axis=1)
+            obtenido = sum(((x[asignadas == k] - centros[k]) ** 2).sum() for k in range(n))
+            assert obtenido == pytest.approx(optimo, abs=1e-6)
+
+
+def test_kmeans_1d_pagina_grande():
+    # Miles de 'left' distintos: sin matriz m x m de costos
+    x = np.sort(np.random.default_rng(3).uniform(0, 1200, 20000))
+    centros = paso1_copy._kmeans_1d(x, 7)
+    assert len(centros) == 7 and np.all(np.diff(centros) > 0)
@@ -0,0 +1,65 @@
+import threading
+
+from openpyxl import load_workbook
+
+import exportar_excel
+from housePrincing import paso3_hp
+
+
+class EventoTardio:
+    """is_set() da False las primeras `llamadas` veces y True después."""
+
+    def __init__(self, llamadas):
+        self.llamadas = llamadas
+
+    def is_set(self):
+        self.llamadas -= 1
+        return self.llamadas < 0
+
+
+def test_escribir_filas_guarda_el_libro(tmp_path):
+    ruta = tmp_path / "salida.xlsx"
+    filas = [{"a": 1, "b": {"c": "x"}}, {"a": 2}]
+
+    assert exportar_excel.escribir_filas(str(ruta), filas, ["a", "b.c"], cancel_event=threading.Event()) == 2
+    assert [fila for fila in load_workbook(ruta).active.values] == [("a", "b.c"), (1, "x"), (2, None)]
+
+
+def test_cancelar_a_mitad_no_guarda_el_libro(tmp_path):
+    ruta = tmp_path / "salida.xlsx"
+    cancel_event = threading.Event()
+
+    def filas():
+        for i in range(10):
+            if i == 3:
+                cancel_event.set()
+            yield {"a": i}
+
+    assert exportar_excel.escribir_filas(str(ruta), filas(), ["a"], cancel_event=cancel_event) is None
+    assert not ruta.exists()
+
+
+def test_generar_excel_cancelado_al_escribir_devuelve_false(tmp_path):
+    ruta = tmp_path / "reporte.xlsx"
+    datos = [{"ID_Propiedad": 1, "informacion_general": {"rol": "123-4"}}]
+
+    # La primera revisión es la del armado de filas; se cancela ya escribiendo el libro
+    assert paso3_hp.generar_excel(datos, EventoTardio(1), str(ruta)) is False
+    assert not ruta.exists()
+    assert paso3_hp.generar_excel(datos, threading.Event(), str(ruta)) is True
+    assert ruta.exists()
+
+
+def test_cancelar_borra_los_temporales_de_las_hojas(tmp_path, monkeypatch):
+    import tempfile
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    cancel_event = threading.Event()
+
+    def filas():
+        yield {"a": 1}
+        cancel_event.set()
+        yield {"a": 2}
+
+    assert exportar_excel.escribir_filas(str(tmp_path / "salida.xlsx"), filas(), ["a"], cancel_event=cancel_event) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+
+import pytest
+
+import paso2_copy
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "paso2")
+
+
+def leer(nombre):
+    # newline="" para comparar los \n tal cual quedaron en el fixture
+    with open(os.path.join(FIXTURES, nombre), encoding="utf-8", newline="") as f:
+        return json.load(f) if nombre.endswith(".json") else f.read()
+
+
+def limpiar(texto):
+    return paso2_copy.limpieza(paso2_copy.limpiar_encabezados(texto, threading.Event()))
+
+
+def test_corpus_igual_a_la_version_base():
+    # limpio.txt es la salida de la versión base (benchmarks/bench_limpieza.py --regenerar)
+    assert limpiar(leer("corpus.txt")) == leer("limpio.txt")
+
+
+@pytest.mark.parametrize("caso", leer("casos_limpieza.json"), ids=lambda c: repr(c["texto"])[:40])
+def test_casos_cortos_iguales_a_la_version_base(caso):
+    assert limpiar(caso["texto"]) == caso["limpio"]
+
+
+def test_cancelacion_corta_la_limpieza():
+    cancelado = threading.Event()
+    cancelado.set()
+    assert paso2_copy.limpiar_encabezados(leer("corpus.txt"), cancelado) is None
+
+
+@pytest.mark.parametrize("region", ["santiago", "iquique"])
+def test_separacion_igual_a_la_version_base(region):
+    # separado_<region>.txt sale de paso2_copy.py anterior a separadores.py (benchmarks/bench_separadores.py)
+    texto = paso2_copy.pre_separar_remates_fusionados(leer("limpio.txt"), region)
+    assert paso2_copy.insertar_separadores(texto, region) == leer(f"separado_{region}.txt")
+
+
+@pytest.mark.parametrize("caso", leer("casos_separadores.json"), ids=lambda c: repr(c["texto"])[:40])
+def test_separacion_casos_cortos_igual_a_la_version_base(caso):
+    for region in ("santiago", "iquique"):
+        texto = paso2_copy.pre_separar_remates_fusionados(caso["texto"], region)
+        assert paso2_copy.insertar_separadores(texto, region) == caso[region], region
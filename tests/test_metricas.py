@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+
+def test_contexto_agrupa_rutas_con_punto_y_de_hilos_worker():
+    metricas.iniciar_corrida()
+
+    def worker():
+        with metricas.etapa("paso3_ocr.tira"):
+            metricas.llamada_externa("google_vision")
+
+    def edicion(etiqueta):
+        with metricas.contexto(f"lote.{etiqueta}"), metricas.etapa(f"lote.{etiqueta}"):
+            with metricas.etapa("paso1"):
+                metricas.contar("paso1.espera_pagina", items=1)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.submit(metricas.heredar(worker)) for _ in range(2))
+            hilo = threading.Thread(target=metricas.heredar(worker))
+            hilo.start()
+            hilo.join()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(edicion, ["01_santiago", "02_valparaiso"]))
+    metricas.contar("lote.union", items=2)
+
+    etapas = metricas.resumen()["etapas"]
+    for etiqueta in ("01_santiago", "02_valparaiso"):
+        assert etapas[f"lote.{etiqueta}"]["ejecuciones"] == 1
+        assert etapas[f"lote.{etiqueta}.paso1"]["ejecuciones"] == 1
+        assert etapas[f"lote.{etiqueta}.paso1.espera_pagina"]["items"] == 1
+        assert etapas[f"lote.{etiqueta}.paso3_ocr.tira"]["externas"] == {"google_vision": 3}
+    assert set(etapas) == {f"lote.{e}{s}" for e in ("01_santiago", "02_valparaiso")
+                           for s in ("", ".paso1", ".paso1.espera_pagina", ".paso3_ocr.tira")} | {"lote.union"}
+
+
+def test_sin_contexto_las_rutas_no_cambian():
+    metricas.iniciar_corrida()
+    with metricas.etapa("paso1"):
+        metricas.heredar(lambda: metricas.contar("paso1.login", items=1))()
+    assert set(metricas.resumen()["etapas"]) == {"paso1", "paso1.login"}
@@ -0,0 +1,146 @@
+import logging
+import threading
+
+import pytest
+
+import paso1_copy
+
+logger = logging.getLogger("test_motor_pdf")
+
+
+def pdf_con_paginas(*textos):
+    """PDF mínimo con una línea de texto (Helvetica) por página."""
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    hijos = []
+    for texto in textos:
+        flujo = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET".encode("latin-1")
+        objetos.append(f"<< /Length {len(flujo)} >>\nstream\n{flujo.decode('latin-1')}\nendstream")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>")
+        hijos.append(f"{len(objetos)} 0 R")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(hijos)}] /Count {len(hijos)} >>"
+
+    salida = b"%PDF-1.4\n"
+    offsets = []
+    for i, objeto in enumerate(objetos, 1):
+        offsets.append(len(salida))
+        salida += f"{i} 0 obj\n{objeto}\nendobj\n".encode("latin-1")
+    xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return salida
+
+
+class Visor:
+    """Driver falso: entrega en orden las URLs de PDF que 'pidió' el visor."""
+
+    def __init__(self, urls):
+        self.urls = list(urls)
+
+    def execute_script(self, script, *args):
+        assert script == paso1_copy.JS_SIGUIENTE_PDF
+        return self.urls.pop(0) if self.urls else None
+
+    def execute_async_script(self, *args):
+        return None
+
+    def set_script_timeout(self, segundos):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def motor_pdf(monkeypatch):
+    monkeypatch.setattr(paso1_copy, "_pdf_local", threading.local())
+    monkeypatch.setattr(paso1_copy, "ESPERA_PDF_S", 0.3)
+
+
+def servir(monkeypatch, pdfs):
+    descargas = []
+
+    def descargar(driver, url, logger):
+        descargas.append(url)
+        return pdfs[url]
+
+    monkeypatch.setattr(paso1_copy, "descargar_pdf", descargar)
+    return descargas
+
+
+def textos(fragmentos):
+    return None if fragmentos is None else " ".join(f["text"] for f in fragmentos)
+
+
+def test_pdf_por_pagina_sin_pedido_nuevo_cae_al_textlayer(monkeypatch):
+    servir(monkeypatch, {"p1.pdf": pdf_con_paginas("pagina uno"), "p3.pdf": pdf_con_paginas("pagina tres")})
+    visor = Visor(["p1.pdf"])
+
+    assert textos(paso1_copy.fragmentos_pdf(visor, 1, logger)) == "pagina uno"
+    # La página 2 no pidió PDF: no se reutiliza el de la página 1
+    assert paso1_copy.fragmentos_pdf(visor, 2, logger) is None
+    visor.urls.append("p3.pdf")
+    assert textos(paso1_copy.fragmentos_pdf(visor, 3, logger)) == "pagina tres"
+
+
+def test_pdf_multipagina_se_reutiliza_sin_esperar(monkeypatch):
+    descargas = servir(monkeypatch, {"edicion.pdf": pdf_con_paginas("pagina uno", "pagina dos", "pagina tres")})
+    visor = Visor(["edicion.pdf"])
+
+    assert textos(paso1_copy.fragmentos_pdf(visor, 1, logger)) == "pagina uno"
+    assert textos(paso1_copy.fragmentos_pdf(visor, 2, logger)) == "pagina dos"
+    assert textos(paso1_copy.fragmentos_pdf(visor, 3, logger)) == "pagina tres"
+    assert descargas == ["edicion.pdf"]
+
+
+class VisorConSalto:
+    """
+    Driver falso con la lógica de JS_SIGUIENTE_PDF y JS_IR_A_PAGINA: cada página
+    que muestra el visor agrega la URL de su PDF a los recursos cargados.
+    """
+
+    def __init__(self):
+        self.recursos, self.vistos, self.pagina = [], [], 1
+
+    def mostrar(self, page_num):
+        self.pagina = page_num
+        self.recursos.append(f"p{page_num}.pdf")
+
+    def execute_script(self, script, *args):
+        if script == paso1_copy.JS_SIGUIENTE_PDF:
+            for url in self.recursos:
+                if url not in self.vistos:
+                    self.vistos.append(url)
+                    return url
+            return None
+        assert script == paso1_copy.JS_IR_A_PAGINA
+        num, _, *descartar_pdfs = args
+        if any(descartar_pdfs):
+            self.vistos += [url for url in self.recursos if url not in self.vistos]
+        self.mostrar(num)
+        return True
+
+    def find_elements(self, *args):
+        return []
+
+
+def test_salto_directo_en_modo_pdf_no_usa_el_pdf_de_la_pagina_1(monkeypatch, tmp_path):
+    import cache_paginas
+    import sesiones
+
+    pdfs = {f"p{n}.pdf": pdf_con_paginas(f"pagina {n}") for n in range(1, 6)}
+    servir(monkeypatch, pdfs)
+    visor = VisorConSalto()
+    monkeypatch.setattr(paso1_copy, "MODO_CAPTURA", "pdf")
+    monkeypatch.setattr(cache_paginas, "CARPETA_CACHE", str(tmp_path / "cache_paginas"))
+    monkeypatch.setattr(paso1_copy, "_crear_driver", lambda logger, headless=False: (visor, ""))
+    monkeypatch.setattr(paso1_copy, "_cerrar_driver", lambda driver, perfil: None)
+    monkeypatch.setattr(sesiones, "aplicar_cookies", lambda *args: None)
+    # Al activar el HD el visor carga el PDF de la página 1; avanzar carga el de la siguiente
+    monkeypatch.setattr(paso1_copy, "activar_modo_hd", lambda *args: visor.mostrar(1))
+    monkeypatch.setattr(paso1_copy, "avanzar_pagina", lambda *args: visor.mostrar(visor.pagina + 1) or True)
+    monkeypatch.setattr(paso1_copy, "procesar_fragmentos", lambda frags, *args: textos(frags))
+
+    resultados = paso1_copy.procesar_paginas_worker(1, [], "URL", [4, 5], 7, threading.Event(), logger)
+
+    assert resultados == {4: "pagina 4", 5: "pagina 5"}
+    assert textos(cache_paginas.leer_pagina("URL", 4)) == "pagina 4"
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+import preextractor
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "preextractor", "remates.json")
+
+with open(FIXTURE, encoding="utf-8") as f:
+    REMATES = json.load(f)
+
+
+@pytest.mark.parametrize("remate", REMATES, ids=lambda r: str(r["id_remate"]))
+def test_direccion_es_la_de_la_propiedad(remate):
+    # direccion null en el fixture: el texto no trae una dirección de la propiedad segura
+    assert preextractor.extraer(remate["remate"]).get("direccion") == remate["direccion"]
+
+
+@pytest.mark.parametrize("remate", REMATES, ids=lambda r: str(r["id_remate"]))
+def test_nunca_llena_la_direccion_del_tribunal(remate):
+    campos = preextractor.extraer(remate["remate"])
+    for campo in ("direccion", "nombre_propiedad"):
+        valor = campos.get(campo, "")
+        assert "1409" not in valor and "1140" not in valor and "San Martín" not in valor, campo
+
+
+def test_direccion_junto_a_juzgado_se_descarta():
+    texto = "Juzgado de Letras de Talagante, ubicado en calle Balmaceda 1020, rematará la casa de calle Sur 12."
+    assert "direccion" not in preextractor.extraer(texto)
+    assert preextractor.extraer("La casa ubicada en calle Sur 12, comuna de Talagante.")["direccion"] == "calle Sur 12"
+
+
+@pytest.mark.parametrize("remate", REMATES, ids=lambda r: str(r["id_remate"]))
+def test_registro_confiable_igual_al_revisado(remate):
+    # registro en el fixture: revisado a mano contra el texto; null => debe ir a la API
+    campos = preextractor.extraer(remate["remate"])
+    assert preextractor.registro_confiable(remate["remate"], campos) == remate["registro"]
+
+
+def test_montos_que_no_cuadran_van_a_la_api():
+    remate = next(r for r in REMATES if r["registro"] and r["registro"]["postura_minima_uf"] != "0")
+    texto = remate["remate"].replace(" UF.", " UF, equivalentes a $270.000.000.", 1)
+    assert texto != remate["remate"]
+    assert preextractor.registro_confiable(texto, preextractor.extraer(texto)) is None
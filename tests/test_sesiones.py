@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+import sesiones
+from valpoOCR import paso1_regional
+
+URL = "https://www.mercuriovalpo.cl/impresa/2026/01/01/papel/"
+logger = logging.getLogger("test_sesiones")
+
+
+class Elemento:
+    def is_displayed(self):
+        return True
+
+
+class Visor:
+    """Driver falso: `visibles` son los selectores CSS que muestra la página tras aplicar las cookies."""
+
+    def __init__(self, visibles):
+        self.visibles = set(visibles)
+        self.cookies_borradas = False
+
+    def find_element(self, by, selector):
+        if selector not in self.visibles:
+            raise NoSuchElementException(selector)
+        return Elemento()
+
+    def find_elements(self, by, selector):
+        return [Elemento()] if selector in self.visibles else []
+
+    def delete_all_cookies(self):
+        self.cookies_borradas = True
+
+
+@pytest.fixture(autouse=True)
+def sesion_guardada(tmp_path, monkeypatch):
+    monkeypatch.setattr(sesiones, "CARPETA_SESIONES", str(tmp_path / "sesiones"))
+    monkeypatch.setattr(sesiones, "aplicar_cookies", lambda *args: None)
+    monkeypatch.setattr(paso1_regional, "ESPERA_VALIDAR_SESION_S", 0.3)
+    sesiones.guardar_sesion(URL, "usuario", [{"name": "sid", "value": "1"}])
+
+
+def test_sesion_con_el_diario_visible_se_reutiliza():
+    visor = Visor({paso1_regional.SELECTOR_IMAGEN_PAGINA})
+    assert paso1_regional.reutilizar_sesion(visor, URL, "usuario", logger)
+    assert sesiones.cargar_sesion(URL, "usuario")
+
+
+@pytest.mark.parametrize("visibles", [
+    set(),  # la página no cargó: que no aparezca el modal no prueba la sesión
+    {paso1_regional.SELECTOR_MODAL_LOGIN},
+    {paso1_regional.SELECTOR_MODAL_LOGIN, paso1_regional.SELECTOR_IMAGEN_PAGINA},
+])
+def test_sesion_sin_el_diario_visible_se_descarta(visibles):
+    visor = Visor(visibles)
+    assert not paso1_regional.reutilizar_sesion(visor, URL, "usuario", logger)
+    assert visor.cookies_borradas
+    assert sesiones.cargar_sesion(URL, "usuario") is None
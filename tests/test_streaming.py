@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+
+import pytest
+
+import paso1_copy
+import paso2_copy
+
+PALABRAS = ("casa depto ubicado comuna Santiago rol 1234 mínimo $ 45.000.000 - fojas inscrita Conservador "
+            "Bienes Raíces N° Departamento Piso 12:30 horas .. Secretaría juan@x.cl , . : remat- Of "
+            "REMATE EXTRACTO JUZGADO CIVIL 1616 [CODE:1612] [CODE:1640] VIGÉSIMO PARTIDOR La Actuaria").split(" ")
+
+
+def paginas_al_azar(rng):
+    paginas = []
+    for n in range(1, rng.randint(2, 6)):
+        lineas = []
+        for _ in range(rng.randint(0, 25)):
+            lineas.append(" ".join(rng.choice(PALABRAS) for _ in range(rng.randint(0, 8))))
+            if rng.random() < 0.1:
+                lineas.append("")
+        paginas.append((n, "\n".join(lineas)))
+    return paginas
+
+
+def separar_completo(paginas, ruta_cortado, cancel_event):
+    # Mismo camino que limpiar_encabezados_y_guardar sobre el TXT completo
+    texto = "".join(f"--- Página {n} ---\n\n{t}\n\n" for n, t in paginas)
+    texto = paso2_copy.limpiar_encabezados(paso2_copy.recortar_remates(texto, ruta_cortado), cancel_event)
+    texto = paso2_copy.pre_separar_remates_fusionados(paso2_copy.limpieza(texto), "santiago")
+    return paso2_copy.insertar_separadores(texto, "santiago")
+
+
+def separar_stream(paginas, ruta_cortado, cancel_event):
+    tramos = (f"--- Página {n} ---\n\n{t}\n\n" for n, t in paginas)
+    cortados = paso2_copy.recortar_remates_stream(tramos, ruta_cortado)
+    return "\n\n".join(paso2_copy.separar_remates_stream(cortados, "santiago", cancel_event))
+
+
+def test_stream_igual_al_txt_completo(tmp_path):
+    rng = random.Random(0)
+    ruta = str(tmp_path / "cortados.txt")
+    cancel_event = threading.Event()
+    for _ in range(500):
+        paginas = paginas_al_azar(rng)
+        assert separar_stream(paginas, ruta, cancel_event) == separar_completo(paginas, ruta, cancel_event), paginas
+
+
+def test_remate_que_cruza_pagina_queda_unido(tmp_path):
+    paginas = [
+        (1, "1616\nREMATE Juzgado Civil depto ubicado en\ncomuna de Santiago, mínimo\n"),
+        (2, "$ 45.000.000 - Secretaría.\nREMATE otro aviso"),
+    ]
+    parrafos = separar_stream(paginas, str(tmp_path / "c.txt"), threading.Event()).split("\n\n")
+    assert any("Santiago" in p and "45.000.000" in p for p in parrafos)
+
+
+def test_consumidor_que_falla_detiene_el_productor(tmp_path, monkeypatch):
+    cerrado = threading.Event()
+
+    def generar(url, paginas, columnas, cancel_event, workers, refrescar_cache, logger, headless=False):
+        try:
+            for n in range(1, paginas + 1):
+                if cancel_event.is_set():
+                    return
+                time.sleep(0.01)
+                yield n, f"texto {n}"
+        finally:
+            cerrado.set()
+
+    monkeypatch.setattr(paso1_copy, "_generar_paginas", generar)
+    cancel_event = threading.Event()
+    paginas = paso1_copy.iterar_paginas("url", 1000, 7, cancel_event, output_file=str(tmp_path / "bruto.txt"))
+    with pytest.raises(RuntimeError):
+        for n, _ in paginas:
+            if n == 3:
+                raise RuntimeError("falla del consumidor")
+    paginas.close()
+
+    assert cerrado.wait(2)
+    assert not cancel_event.is_set()
+
+
+def test_acumulado_sin_corte_seguro_se_corta_al_superar_el_tope(monkeypatch):
+    monkeypatch.setattr(paso2_copy, "MAX_CRUDO_STREAM", 2000)
+    procesados = []
+    original = paso2_copy._limpiar_y_separar
+
+    def limpiar_y_separar(texto, region, cancel_event):
+        procesados.append(len(texto))
+        return original(texto, region, cancel_event)
+
+    monkeypatch.setattr(paso2_copy, "_limpiar_y_separar", limpiar_y_separar)
+    rng = random.Random(1)
+    paginas = ["\n".join(" ".join(rng.choice(("casa", "depto", "comuna", "fojas")) for _ in range(8))
+                         for _ in range(30)) + "\n" for _ in range(20)]
+    parrafos = list(paso2_copy.separar_remates_stream(iter(paginas), "santiago", threading.Event()))
+
+    # Sin inicios de aviso no hay corte seguro: el acumulado no pasa del tope más una página
+    assert max(procesados) <= 2000 + max(map(len, paginas))
+    assert "".join(parrafos).split() == "".join(paginas).split()
@@ -0,0 +1,100 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+from valpoOCR import columnas, paso3_regional
+
+TONO_CON_ERROR = 7      # una columna de este tono hace fallar su imagen
+
+
+class ServidorVision(ThreadingHTTPServer):
+    """
+    Vision REST mínimo en memoria: POST /v1/images:annotate. Cada columna de la
+    prueba es un bloque de un solo tono de gris; la respuesta trae "col <tono>"
+    por cada bloque, de arriba abajo, más un encabezado de diario que
+    limpiar_basura_ocr debe sacar.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorVision)
+        self.solicitudes = []     # imágenes por solicitud
+        self.hilo = threading.Thread(target=self.serve_forever, daemon=True)
+        self.hilo.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def respuesta_imagen(solicitud):
+    contenido = np.frombuffer(base64.b64decode(solicitud["image"]["content"]), np.uint8)
+    imagen = cv2.imdecode(contenido, cv2.IMREAD_COLOR)
+    tonos = []
+    for tono in imagen[:, 0, 0]:
+        if tono != 255 and (not tonos or tonos[-1] != tono):
+            tonos.append(int(tono))
+    if TONO_CON_ERROR in tonos:
+        return {"error": {"code": 3, "message": "imagen inválida"}}
+    texto = "\n".join(f"col {tono}" for tono in tonos) + "\nEL SUR"
+    return {"textAnnotations": [{"description": texto}]}
+
+
+class ManejadorVision(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        if self.path.split("?")[0] != "/v1/images:annotate":
+            codigo, respuesta = 404, {"error": {"code": 404, "message": "no encontrado"}}
+        else:
+            self.server.solicitudes.append(len(cuerpo["requests"]))
+            codigo, respuesta = 200, {"responses": [respuesta_imagen(s) for s in cuerpo["requests"]]}
+        datos = json.dumps(respuesta).encode()
+        self.send_response(codigo)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    srv = ServidorVision()
+    monkeypatch.setenv("GOOGLE_VISION_ENDPOINT", srv.url)
+    # Sin credenciales de Google: con un endpoint http:// el cliente no las pide
+    monkeypatch.delenv("GOOGLE_APPLICATION_CREDENTIALS", raising=False)
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def paginas(tonos_por_pagina):
+    """{ruta_pagina: [Columna]} con una columna de un solo tono por cada valor."""
+    return {
+        f"pagina_{p}.png": [
+            columnas.crear(np.full((30, 40 + 5 * i, 3), tono, np.uint8), f"pagina_{p}.png", 0, i, f"col_{p}_{i}.png")
+            for i, tono in enumerate(tonos)
+        ]
+        for p, tonos in enumerate(tonos_por_pagina)
+    }
+
+
+@pytest.mark.parametrize("modo", ["batch", "individual"])
+def test_ocr_contra_vision_rest(servidor, tmp_path, modo):
+    ruta = tmp_path / "ocr.txt"
+
+    salida = paso3_regional.orquestador_ocr_valpo(
+        paginas([[10, 20, 30], [40, TONO_CON_ERROR, 60, 70]]), threading.Event(), "prueba",
+        ruta_txt_salida=str(ruta), modo=modo, tiras_por_chunk=2)
+
+    assert salida == str(ruta)
+    # Tiras de dos columnas; la tira con la imagen fallida queda sin texto
+    assert ruta.read_text(encoding="utf-8") == "col 10\ncol 20\ncol 30\ncol 60\ncol 70\n"
+    assert sum(servidor.solicitudes) == 4
+    assert len(servidor.solicitudes) == (1 if modo == "batch" else 4)
@@ -0,0 +1,72 @@
+# columnas.py
+# COLUMNA EN MEMORIA ENTRE LOS PASOS REGIONALES (2 -> 2.5 -> 3)
+#
+# Antes cada paso dejaba la columna en disco y el siguiente la volvía a leer:
+# JPEG en paso2, filtro_*.jpg en paso2.5, tira PNG en paso3 y de ahí a Vision,
+# cuatro codificaciones con pérdida por columna. Ahora viaja el array de numpy
+# con su página, bloque, índice y etiquetas (TAG1612, end, ...). Las imágenes
+# intermedias solo se escriben en modo debug (GUARDAR_IMAGENES_DEBUG o
+# guardar_imagenes=True) y la única codificación es la de la tira que va a Vision.
+# Los pasos siguen aceptando rutas en vez de Columna (se leen del disco).
+
+import os
+from dataclasses import dataclass, field
+import cv2
+import numpy as np
+
+GUARDAR_IMAGENES_DEBUG = False
+
+
+@dataclass
+class Columna:
+    imagen: np.ndarray
+    pagina: str                 # ruta de la página de origen
+    bloque: int = 0
+    indice: int = 0
+    nombre: str = ""            # nombre de archivo que tendría en disco (logs y debug)
+    etiquetas: set = field(default_factory=set)
+    ruta: str = None            # solo si se guardó en modo debug
+
+
+def guardar_imagenes_activo(guardar_imagenes=None) -> bool:
+    return GUARDAR_IMAGENES_DEBUG if guardar_imagenes is None else guardar_imagenes
+
+
+def crear(imagen, pagina, bloque, indice, nombre, carpeta_debug=None, etiquetas=()) -> Columna:
+    """
+    Columna nueva a partir de un recorte. El recorte se copia para no retener
+    la página o el bloque completo. Con carpeta_debug se guarda además en disco.
+    """
+    if not imagen.flags.owndata:
+        imagen = imagen.copy()
+    columna = Columna(imagen=imagen, pagina=pagina, bloque=bloque, indice=indice, nombre=nombre,
+                      etiquetas=set(etiquetas))
+    if carpeta_debug:
+        columna.ruta = os.path.join(carpeta_debug, nombre)
+        cv2.imwrite(columna.ruta, imagen)
+    return columna
+
+
+def derivar(columna, imagen, nombre, carpeta_debug=None, etiquetas=()):
+    """Columna nueva (recortada/filtrada) que conserva el origen de otra Columna o ruta."""
+    if isinstance(columna, Columna):
+        return crear(imagen, columna.pagina, columna.bloque, columna.indice, nombre, carpeta_debug,
+                     columna.etiquetas | set(etiquetas))
+    return crear(imagen, columna, 0, 0, nombre, carpeta_debug, etiquetas)
+
+
+def imagen_de(columna):
+    """Array BGR de una Columna, o leído del disco si es una ruta. None si no se pudo leer."""
+    if isinstance(columna, Columna):
+        return columna.imagen
+    return cv2.imread(columna)
+
+
+def nombre_de(columna) -> str:
+    return columna.nombre if isinstance(columna, Columna) else os.path.basename(columna)
+
+
+def tiene_etiqueta(columna, etiqueta: str) -> bool:
+    if isinstance(columna, Columna):
+        return etiqueta in columna.etiquetas
+    return etiqueta in columna
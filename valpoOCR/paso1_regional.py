@@ -2,6 +2,7 @@ import os
 import time
 import shutil
 import tempfile
+import uuid
 import requests
 from dotenv import load_dotenv
 from selenium import webdriver
@@ -14,11 +15,36 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 
 # Importamos el logger
 from logger import get_logger, log_section, dbg
+import sesiones
+import metricas
+
+# Tiempo que se espera a que el visor muestre la página (o el modal de login)
+# para decidir si una sesión está activa.
+ESPERA_VALIDAR_SESION_S = 5
+ESPERA_LOGIN_S = 20
+SELECTOR_MODAL_LOGIN = "div.modal-dialog"
+SELECTOR_IMAGEN_PAGINA = "img.img-page"
 
 
 # --- CONTROLADOR PRINCIPAL ---
 # CORRECCIÓN: Se agrega cancel_event
-def run_extractor_ocr(url: str, paginas: int, region: str, cancel_event):
+def _opciones_chrome(clean_profile_path, headless=False):
+    """Opciones de Chrome con el perfil temporal; headless para correr sin pantalla (cron/CI)."""
+    chrome_options = Options()
+    chrome_options.add_argument(f"--user-data-dir={clean_profile_path}")
+    chrome_options.add_argument("--incognito")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--disable-gpu")
+    else:
+        chrome_options.add_argument("--start-maximized")
+    chrome_options.add_argument("--log-level=3")
+    return chrome_options
+
+
+def run_extractor_ocr(url: str, paginas: int, region: str, cancel_event, output_dir: str = "temp_img_valpo",
+                      headless: bool = False):
     logger = get_logger("[paso1 REGIONAL]", log_dir="logs", log_file="paso1_regional.log")
     logger.info(f"🌊 Iniciando Extractor {region.upper()} (Modo OCR)...")
 
@@ -26,20 +52,15 @@ def run_extractor_ocr(url: str, paginas: int, region: str, cancel_event):
     USUARIO = os.getenv("USUARIO")
     PASSWORD = os.getenv("PASSWORD")
 
-    output_dir = "temp_img_valpo"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    chrome_options = Options()
-    clean_profile_path = os.path.join(tempfile.gettempdir(), "chrome_profile_valpo_clean")
+    # Perfil propio por corrida: en modo lote puede haber varios Chrome a la vez
+    clean_profile_path = os.path.join(tempfile.gettempdir(), f"chrome_profile_valpo_{uuid.uuid4().hex}")
     if os.path.exists(clean_profile_path):
         try: shutil.rmtree(clean_profile_path)
         except: pass 
-            
-    chrome_options.add_argument(f"--user-data-dir={clean_profile_path}")
-    chrome_options.add_argument("--incognito")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--log-level=3")
+    chrome_options = _opciones_chrome(clean_profile_path, headless)
     
     service = Service(log_path="logs/chromedriver_valpo.log")
     driver = None
@@ -47,24 +68,37 @@ def run_extractor_ocr(url: str, paginas: int, region: str, cancel_event):
 
     try:
         driver = webdriver.Chrome(service=service, options=chrome_options)
-        wait = WebDriverWait(driver, 20)
+        wait = WebDriverWait(driver, ESPERA_LOGIN_S)
 
         log_section(logger, "LOGIN")
         
         if cancel_event.is_set(): return None, None
 
-        driver.get(url)
-        try:
-            modal_selector = "div.modal-dialog"
-            wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, modal_selector)))
-            logger.info("🔐 Logueando...")
-            driver.find_element(By.CSS_SELECTOR, f"{modal_selector} input[placeholder*='correo']").send_keys(USUARIO)
-            driver.find_element(By.CSS_SELECTOR, f"{modal_selector} input[type='password']").send_keys(PASSWORD)
-            btn = driver.find_element(By.CSS_SELECTOR, f"{modal_selector} button[type='submit']")
-            driver.execute_script("arguments[0].click();", btn)
-            time.sleep(2)
-        except TimeoutException:
-            logger.warning("⚠️ Modal login no apareció (continuando...)")
+        with metricas.etapa("paso1.login"):
+            sesion_reutilizada = reutilizar_sesion(driver, url, USUARIO, logger)
+        if not sesion_reutilizada:
+            driver.get(url)
+            try:
+                modal_selector = SELECTOR_MODAL_LOGIN
+                wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, modal_selector)))
+                logger.info("🔐 Logueando...")
+                driver.find_element(By.CSS_SELECTOR, f"{modal_selector} input[placeholder*='correo']").send_keys(USUARIO)
+                driver.find_element(By.CSS_SELECTOR, f"{modal_selector} input[type='password']").send_keys(PASSWORD)
+                btn = driver.find_element(By.CSS_SELECTOR, f"{modal_selector} button[type='submit']")
+                driver.execute_script("arguments[0].click();", btn)
+                time.sleep(2)
+                # Solo se guardan cookies de una sesión que ya muestra el diario
+                try:
+                    wait.until(EC.invisibility_of_element_located((By.CSS_SELECTOR, modal_selector)))
+                except TimeoutException:
+                    pass
+                if sesion_activa_regional(driver, logger, timeout=ESPERA_LOGIN_S):
+                    sesiones.guardar_sesion(url, USUARIO, driver.get_cookies())
+                else:
+                    logger.warning("⚠️ El login no dejó el diario visible. No se guarda la sesión.")
+                    sesiones.invalidar_sesion(url, USUARIO)
+            except TimeoutException:
+                logger.warning("⚠️ Modal login no apareció (continuando...)")
         
         log_section(logger, "DESCARGA")
         for page_num in range(1, paginas + 1):
@@ -92,8 +126,55 @@ def run_extractor_ocr(url: str, paginas: int, region: str, cancel_event):
         if driver:
             try: driver.quit()
             except: pass
+        shutil.rmtree(clean_profile_path, ignore_errors=True)
+
+def sesion_activa_regional(driver, logger, timeout=ESPERA_VALIDAR_SESION_S):
+    """
+    True si el visor muestra la imagen de la página (solo visible con sesión
+    iniciada) y el modal de login no está visible. Que el modal no aparezca a
+    tiempo no basta: la página pudo no cargar.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.visibility_of_element_located((By.CSS_SELECTOR, SELECTOR_MODAL_LOGIN)),
+            EC.visibility_of_element_located((By.CSS_SELECTOR, SELECTOR_IMAGEN_PAGINA)),
+        ))
+    except TimeoutException:
+        return False
+
+    if any(el.is_displayed() for el in driver.find_elements(By.CSS_SELECTOR, SELECTOR_MODAL_LOGIN)):
+        return False
+    return any(el.is_displayed() for el in driver.find_elements(By.CSS_SELECTOR, SELECTOR_IMAGEN_PAGINA))
+
+
+def reutilizar_sesion(driver, url, usuario, logger):
+    """
+    Aplica las cookies guardadas de una ejecución anterior. Si con ellas el
+    visor queda con la sesión activa (sesion_activa_regional) se omite el
+    formulario; si no, las cookies guardadas se descartan. Retorna True si se
+    reutilizó.
+    """
+    cookies = sesiones.cargar_sesion(url, usuario)
+    if not cookies:
+        return False
+
+    logger.info("🍪 Probando sesión guardada...")
+    try:
+        sesiones.aplicar_cookies(driver, url, cookies, logger)
+        if sesion_activa_regional(driver, logger, timeout=ESPERA_VALIDAR_SESION_S):
+            logger.info("♻️ Sesión reutilizada. Se omite el login.")
+            return True
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo reutilizar la sesión guardada: {e}")
+
+    logger.info("🔐 La sesión guardada ya no es válida. Login normal.")
+    sesiones.invalidar_sesion(url, usuario)
+    driver.delete_all_cookies()
+    return False
+
 
 # --- FUNCIÓN DE DESCARGA (Opción 1: Headers Referer) ---
+@metricas.medir("paso1.descarga_imagen")
 def busquedaImagen(url, driver, page_num, output_dir, logger):
     """
     Busca la imagen y la guarda renombrándola con el número de secuencia (1.jpg, 2.jpg...).
@@ -125,6 +206,7 @@ def busquedaImagen(url, driver, page_num, output_dir, logger):
         }
 
         # Descargar
+        metricas.llamada_externa("http")
         response = session.get(img_url, headers=headers, stream=True)
         
         if response.status_code == 200:
@@ -135,6 +217,7 @@ def busquedaImagen(url, driver, page_num, output_dir, logger):
                 shutil.copyfileobj(response.raw, f)
             
             logger.info(f"   💾 Guardada: {filename}")
+            metricas.contar(items=1, bytes=os.path.getsize(file_path))
             return file_path
         else:
             logger.error(f"   ❌ Fallo descarga (Status {response.status_code})")
@@ -145,6 +228,7 @@ def busquedaImagen(url, driver, page_num, output_dir, logger):
         return None
 
 
+@metricas.medir("paso1.avance_pagina")
 def navegar_siguiente_pagina(driver, logger):
     """
     Avanza a la siguiente página usando el botón 'icon-next'.
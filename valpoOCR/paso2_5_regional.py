@@ -4,6 +4,8 @@ import pytesseract
 import re
 import sys
 from logger import get_logger
+import metricas
+from valpoOCR import columnas
 logger = get_logger("[paso2_5 REGIONAL]", log_dir="logs", log_file="paso2_5_regional.log")
 
 # --- CONFIGURACIÓN TESSERACT ---
@@ -20,19 +22,15 @@ if getattr(sys, 'frozen', False):
 else:
     pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-# --- VARIABLES DE ESTADO ---
-ESTADO = {
-    "recolectando": False,
-    "codigo_cierre_encontrado": False,
-    "inicio_detectado_en_pagina": False # NUEVO: Bandera para activar el fallback
-}
+metricas.envolver_llamadas(pytesseract, ["image_to_string", "image_to_data"], "tesseract")
 
+# --- VARIABLES DE ESTADO ---
+# Una copia por llamada a ejecutar_filtrado (en modo lote corren varias ediciones a la vez)
 def reiniciar_estado():
-    global ESTADO
-    ESTADO = {
+    return {
         "recolectando": False,
         "codigo_cierre_encontrado": False,
-        "inicio_detectado_en_pagina": False
+        "inicio_detectado_en_pagina": False # NUEVO: Bandera para activar el fallback
     }
 
 def es_titulo_real(linea, codigo):
@@ -69,6 +67,7 @@ def es_titulo_real(linea, codigo):
             pass
     return True
 
+@metricas.medir("paso2_5.deteccion_inicio")
 def detectar_1612_valparaiso(img, patron_inicio, logger):
     """
     Mantiene el flujo original probado para Valparaíso y Antofagasta.
@@ -100,6 +99,7 @@ def detectar_1612_valparaiso(img, patron_inicio, logger):
     # Retornamos la imagen original en caso de fallo
     return False, 0, img
 
+@metricas.medir("paso2_5.deteccion_inicio")
 def detectar_1612_concepcion(img, patron_inicio, logger): #VOLVEMOS AL INICIO POR EL MOMENTO EL TEXTO PASA SIN FILTRAR
     """
     Detección robusta para diario El Sur (Concepción).
@@ -130,6 +130,7 @@ def detectar_1612_concepcion(img, patron_inicio, logger): #VOLVEMOS AL INICIO PO
     # Retornamos la imagen original en caso de fallo
     return False, 0, img
 
+@metricas.medir("paso2_5.deteccion_inicio")
 def detectar_1312_antofagasta(img, patron_inicio, logger, region):
     """
     Mantiene el flujo original probado para Valparaíso y Antofagasta.
@@ -162,6 +163,7 @@ def detectar_1312_antofagasta(img, patron_inicio, logger, region):
     # Retornamos la imagen original en caso de fallo
     return False, 0, img
 
+@metricas.medir("paso2_5.deteccion_inicio")
 def detectar_1312_iquique(img, patron_inicio, logger, region):
     """
     Estrategia de Micro-Cirugía Espacial para Iquique.
@@ -242,15 +244,21 @@ def detectar_1312_iquique(img, patron_inicio, logger, region):
         
     return False, 0, img
 
-def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
+def ejecutar_filtrado(diccionario_paginas, region, cancel_event, output_folder="temp_filtrados_valpo",
+                      guardar_imagenes=None):
+    """
+    Recibe {ruta_pagina: [columnas.Columna o ruta]} del paso 2 y retorna las
+    columnas de la sección de remates con el mismo formato, en memoria. Los
+    filtro_*.jpg solo se escriben en output_folder con guardar_imagenes (modo debug).
+    """
 
     logger.info(f"🕵️ Iniciando Paso 2.5: Filtrado Regional ({region.upper()})")
     
-    reiniciar_estado() # Limpia variables de control
+    ESTADO = reiniciar_estado() # Variables de control de esta corrida
     
-    output_folder = "temp_filtrados_valpo"
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    carpeta_debug = output_folder if columnas.guardar_imagenes_activo(guardar_imagenes) else None
+    if carpeta_debug and not os.path.exists(carpeta_debug):
+        os.makedirs(carpeta_debug)
 
     diccionario_filtrado = {}
     
@@ -290,17 +298,17 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
 
         logger.debug(f"📄 Procesando página: {base_name} ({len(lista_columnas)} columnas)")
 
-        for i, ruta_col in enumerate(lista_columnas):
+        for i, columna in enumerate(lista_columnas):
             if cancel_event.is_set(): return None
 
-            img = cv2.imread(ruta_col)
+            img = columnas.imagen_de(columna)
             if img is None: 
-                logger.warning(f"❌ No se pudo leer la imagen: {ruta_col}")
+                logger.warning(f"❌ No se pudo leer la imagen: {columnas.nombre_de(columna)}")
                 continue
             
             # --- FASE DE DETECCIÓN DE INICIO ---
             if not ESTADO["recolectando"]:
-                logger.debug(f"🔍 Analizando columna {i} para INICIO: {os.path.basename(ruta_col)}")
+                logger.debug(f"🔍 Analizando columna {i} para INICIO: {columnas.nombre_de(columna)}")
                 detectado = False
                 y_corte = 0
                 img_procesada = img 
@@ -318,21 +326,20 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
                     detectado, y_corte, img_procesada = detectar_1612_valparaiso(img, patron_inicio, logger)
 
                 if detectado:
-                    logger.info(f"   🟢 INICIO DETECTADO en {region.upper()}: {os.path.basename(ruta_col)}")
+                    logger.info(f"   🟢 INICIO DETECTADO en {region.upper()}: {columnas.nombre_de(columna)}")
                     ESTADO["recolectando"] = True
                     ESTADO["inicio_detectado_en_pagina"] = True
                     
                     # Usamos img_procesada
                     img_recortada = img_procesada[max(0, y_corte-5):, :]
                     nombre_out = f"filtro_{base_name}_{i}_TAG1612.jpg"
-                    ruta_out = os.path.join(output_folder, nombre_out)
-                    cv2.imwrite(ruta_out, img_recortada)
-                    columnas_validas_pagina.append(ruta_out)
-                    logger.debug(f"💾 Columna de inicio guardada en: {ruta_out}")
+                    columnas_validas_pagina.append(
+                        columnas.derivar(columna, img_recortada, nombre_out, carpeta_debug, etiquetas=["TAG1612"]))
+                    logger.debug(f"💾 Columna de inicio: {nombre_out}")
             
             # --- FASE DE RECOLECCIÓN Y CIERRE ---
             else:
-                logger.debug(f"📥 Recolectando columna {i}: {os.path.basename(ruta_col)}")
+                logger.debug(f"📥 Recolectando columna {i}: {columnas.nombre_de(columna)}")
                 
                 # CORRECCIÓN 2: Eliminado el aumento forzado en recolección normal
                 img_trabajo = img
@@ -341,7 +348,8 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
                 y_fin = img_trabajo.shape[0] 
                 
                 # Para el cierre seguimos usando el OCR estándar
-                texto_cierre_ocr = pytesseract.image_to_string(img_trabajo, config='--psm 6')
+                with metricas.etapa("paso2_5.deteccion_fin"):
+                    texto_cierre_ocr = pytesseract.image_to_string(img_trabajo, config='--psm 6')
                 lines_plain = texto_cierre_ocr.split('\n')
                 
                 for linea in lines_plain:
@@ -356,7 +364,7 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
                         codigo = match_fin.group(1)
                         if es_titulo_real(linea_strip, codigo):
                             encontrado_fin = True
-                            logger.info(f"   🔴 FIN DETECTADO ({linea_strip}) en: {os.path.basename(ruta_col)}")
+                            logger.info(f"   🔴 FIN DETECTADO ({linea_strip}) en: {columnas.nombre_de(columna)}")
                             break
 
                 if encontrado_fin:
@@ -366,18 +374,16 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
                     img_recortada = img_trabajo[:y_fin, :]
                     if img_recortada.shape[0] > 10: 
                         nombre_out = f"filtro_{base_name}_{i}_end.jpg"
-                        ruta_out = os.path.join(output_folder, nombre_out)
-                        cv2.imwrite(ruta_out, img_recortada)
-                        columnas_validas_pagina.append(ruta_out)
-                        logger.debug(f"💾 Columna de fin guardada en: {ruta_out}")
+                        columnas_validas_pagina.append(
+                            columnas.derivar(columna, img_recortada, nombre_out, carpeta_debug, etiquetas=["end"]))
+                        logger.debug(f"💾 Columna de fin: {nombre_out}")
                     break 
 
                 else:
                     # Guardamos la columna intermedia (original)
                     nombre_out = f"filtro_{base_name}_{i}_cont.jpg"
-                    ruta_out = os.path.join(output_folder, nombre_out)
-                    cv2.imwrite(ruta_out, img_trabajo)
-                    columnas_validas_pagina.append(ruta_out)
+                    columnas_validas_pagina.append(
+                        columnas.derivar(columna, img_trabajo, nombre_out, carpeta_debug, etiquetas=["cont"]))
 
         # --- FALLBACK PARA CONCEPCIÓN: SI NO ENCONTRÓ NADA EN LA PÁGINA ---
         if region == "concepcion" and not ESTADO["inicio_detectado_en_pagina"]:
@@ -386,17 +392,15 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
             
             columnas_validas_pagina = [] # Reiniciamos para llenar con todo
             
-            for i, ruta_col in enumerate(lista_columnas):
+            for i, columna in enumerate(lista_columnas):
                 if cancel_event.is_set(): return None
-                img = cv2.imread(ruta_col)
+                img = columnas.imagen_de(columna)
                 if img is None: continue
                 
-                # CORRECCIÓN 3: Eliminado el resize X4. Se guarda la imagen tal cual.
+                # CORRECCIÓN 3: Eliminado el resize X4. Se pasa la imagen tal cual.
                 nombre_out = f"filtro_{base_name}_{i}_FALLBACK_RAW.jpg"
-                ruta_out = os.path.join(output_folder, nombre_out)
-                cv2.imwrite(ruta_out, img) # Guarda original
-                
-                columnas_validas_pagina.append(ruta_out)
+                columnas_validas_pagina.append(
+                    columnas.derivar(columna, img, nombre_out, carpeta_debug, etiquetas=["FALLBACK_RAW"]))
                 logger.debug(f"💾 Fallback guardado: {nombre_out}")
 
         if columnas_validas_pagina:
@@ -404,4 +408,5 @@ def ejecutar_filtrado(diccionario_paginas, region, cancel_event):
             total_cols_salida += len(columnas_validas_pagina)
 
     logger.info(f"✅ Filtrado estructural terminado. Salida: {total_cols_salida} columnas.")
+    metricas.contar("paso2_5", items=sum(len(c) for c in diccionario_paginas.values()), columnas_salida=total_cols_salida)
     return diccionario_filtrado
\ No newline at end of file
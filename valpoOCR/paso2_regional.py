@@ -5,6 +5,8 @@ import numpy as np
 # Se eliminó matplotlib para evitar errores de hilo al cerrar
 from scipy.signal import savgol_filter, find_peaks
 from logger import get_logger
+import metricas
+from valpoOCR import columnas
 logger = get_logger("[paso2 REGIONAL]", log_dir="logs", log_file="paso2_regional.log")
 
 import sys
@@ -26,14 +28,20 @@ else:
     # Ajusta esta ruta si tu instalación local es distinta
     pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Cada llamada a Tesseract se cuenta como llamada externa de la etapa activa
+metricas.envolver_llamadas(pytesseract, ["image_to_string", "image_to_data"], "tesseract")
+
 # Configuración de parámetros
 custom_config = r'--oem 3 --psm 6 -l spa'
 
 
-def procesar_remates_valpo(cancel_event, entrada_datos, region):
+def procesar_remates_valpo(cancel_event, entrada_datos, region, output_folder: str = "temp_cortes_regional",
+                           guardar_imagenes=None):
     """
     Función principal llamada por main.py.
     Actúa como despachador (Dispatcher) según la región.
+    Retorna {ruta_pagina: [columnas.Columna]}; los JPEG de cada columna solo se
+    escriben en output_folder con guardar_imagenes (modo debug).
     """
     
     # Normalizamos la región para evitar errores por mayúsculas
@@ -52,10 +60,10 @@ def procesar_remates_valpo(cancel_event, entrada_datos, region):
         logger.warning("⚠️ No hay imágenes para procesar.")
         return {}
 
-    # Carpeta de salida dinámica o fija según prefieras, usamos la misma base temp
-    output_folder = "temp_cortes_regional"
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    # Carpeta de salida (en modo lote, una por edición), solo en modo debug
+    carpeta_debug = output_folder if columnas.guardar_imagenes_activo(guardar_imagenes) else None
+    if carpeta_debug and not os.path.exists(carpeta_debug):
+        os.makedirs(carpeta_debug)
 
     # DICCIONARIO DE RESULTADOS
     diccionario_resultados = {}
@@ -74,19 +82,19 @@ def procesar_remates_valpo(cancel_event, entrada_datos, region):
             # --- SELECTOR DE PIPELINE ---
             if region_key == "antofagasta":
                 # Lógica para Antofagasta
-                recortes_generados = _pipeline_antofagasta(ruta_img, output_folder, logger, cancel_event)
+                recortes_generados = _pipeline_antofagasta(ruta_img, carpeta_debug, logger, cancel_event)
             elif region_key == "iquique":
                 # Lógica para Iquique
-                recortes_generados = _pipeline_iquique(ruta_img, output_folder, logger, cancel_event)
+                recortes_generados = _pipeline_iquique(ruta_img, carpeta_debug, logger, cancel_event)
             elif region_key == "concepcion":
                 # Lógica nueva integrada para Concepción
-                recortes_generados = _pipeline_concepcion(ruta_img, output_folder, logger, cancel_event)
+                recortes_generados = _pipeline_concepcion(ruta_img, carpeta_debug, logger, cancel_event)
             elif region_key == "temuco":
                 # Lógica para El Austral de Temuco (Reutiliza pipeline estándar de Valparaíso)
-                recortes_generados = _pipeline_valparaiso(ruta_img, output_folder, logger, cancel_event) # Reutiliza pipeline estándar de Valparaíso
+                recortes_generados = _pipeline_valparaiso(ruta_img, carpeta_debug, logger, cancel_event) # Reutiliza pipeline estándar de Valparaíso
             else:
                 # Lógica original (Valparaíso / Default)
-                recortes_generados = _pipeline_valparaiso(ruta_img, output_folder, logger, cancel_event)
+                recortes_generados = _pipeline_valparaiso(ruta_img, carpeta_debug, logger, cancel_event)
             
             # Si retorna None es porque se canceló dentro del pipeline
             if recortes_generados is None and cancel_event.is_set():
@@ -94,6 +102,7 @@ def procesar_remates_valpo(cancel_event, entrada_datos, region):
 
             if recortes_generados:
                 diccionario_resultados[ruta_img].extend(recortes_generados)
+                metricas.contar("paso2", items=len(recortes_generados), paginas=1)
                 logger.info(f"   ✅ Se extrajeron {len(recortes_generados)} columnas.")
             else:
                 logger.warning(f"   ⚠️ No se detectaron bloques válidos en: {ruta_img}")
@@ -314,13 +323,14 @@ def fase1_segmentar_columnas_completo(img_limpia, p_ocr, h_factor, h_gap, r_acti
 # PIPELINE ORIGINAL (VALPARAÍSO)
 # ==========================================
 
-def _pipeline_valparaiso(ruta_img, output_folder, logger, cancel_event):
+@metricas.medir("paso2.pipeline_valparaiso")
+def _pipeline_valparaiso(ruta_img, carpeta_debug, logger, cancel_event):
     """
     Pipeline estándar:
     1. Detectar bloque (Filtro Tesseract 'REMATE'...)
     2. Limpiar
     3. Segmentar Columnas
-    4. Guardar
+    4. Entregar columnas en memoria (en disco solo en modo debug)
     """
     p_borrado = 10
     p_ocr = 10
@@ -340,7 +350,7 @@ def _pipeline_valparaiso(ruta_img, output_folder, logger, cancel_event):
     dilated = cv2.dilate(binary, kernel, iterations=2)
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    rutas_columnas_guardadas = []
+    columnas_generadas = []
     base_name = os.path.splitext(os.path.basename(ruta_img))[0]
     
     # Ordenar contornos de arriba a abajo
@@ -382,21 +392,20 @@ def _pipeline_valparaiso(ruta_img, output_folder, logger, cancel_event):
                     return None 
                     
                 col_filename = f"{base_name}_blk{idx_c}_col{i}.jpg"
-                col_path = os.path.join(output_folder, col_filename)
-                cv2.imwrite(col_path, col_img)
-                rutas_columnas_guardadas.append(col_path)
+                columnas_generadas.append(columnas.crear(col_img, ruta_img, idx_c, i, col_filename, carpeta_debug))
 
     if bloques_encontrados == 0:
         logger.debug("No se encontraron bloques con palabras clave en esta imagen (Pipeline Valpo).")
 
-    return rutas_columnas_guardadas
+    return columnas_generadas
 
 
 # ==========================================
 # PIPELINE (ANTOFAGASTA)
 # ==========================================
 
-def _pipeline_antofagasta(ruta_img, output_folder, logger, cancel_event):
+@metricas.medir("paso2.pipeline_antofagasta")
+def _pipeline_antofagasta(ruta_img, carpeta_debug, logger, cancel_event):
     """
     Pipeline específico para Antofagasta:
     1. Copia imagen a lienzo blanco.
@@ -485,7 +494,7 @@ def _pipeline_antofagasta(ruta_img, output_folder, logger, cancel_event):
         img_salida[y:y+h, x:x+w] = img_filtrada[y:y+h, x:x+w]
 
     # === PASO 4: PROCESAMIENTO FINAL Y GUARDADO ===
-    rutas_columnas_guardadas = []
+    columnas_generadas = []
     base_name = os.path.splitext(os.path.basename(ruta_img))[0]
     
     # Ordenamos bloques por Y para mantener orden de lectura
@@ -508,18 +517,17 @@ def _pipeline_antofagasta(ruta_img, output_folder, logger, cancel_event):
         if len(cols) > 0:
             for i_col, col_img in enumerate(cols):
                 col_filename = f"{base_name}_ant_blk{i_blk}_col{i_col}.jpg"
-                col_path = os.path.join(output_folder, col_filename)
-                cv2.imwrite(col_path, col_img)
-                rutas_columnas_guardadas.append(col_path)
+                columnas_generadas.append(columnas.crear(col_img, ruta_img, i_blk, i_col, col_filename, carpeta_debug))
 
-    return rutas_columnas_guardadas
+    return columnas_generadas
 
 
 # ==========================================
 # PIPELINE (CONCEPCIÓN - 3 Pasos de Seguridad)
 # ==========================================
 
-def _pipeline_concepcion(ruta_img, output_folder, logger, cancel_event):
+@metricas.medir("paso2.pipeline_concepcion")
+def _pipeline_concepcion(ruta_img, carpeta_debug, logger, cancel_event):
     """
     Pipeline integrado para Concepción:
     Aplica lógica de 3 pasos de seguridad: 
@@ -633,7 +641,7 @@ def _pipeline_concepcion(ruta_img, output_folder, logger, cancel_event):
         img_salida[y:y+h, x:x+w] = img_filtrada[y:y+h, x:x+w]
 
     # Procesamiento final de columnas (Desde img_salida, que es la más pura)
-    rutas_columnas_guardadas = []
+    columnas_generadas = []
     base_name = os.path.splitext(os.path.basename(ruta_img))[0]
 
     # Ordenamos para asegurar orden de lectura (arriba a abajo)
@@ -660,17 +668,16 @@ def _pipeline_concepcion(ruta_img, output_folder, logger, cancel_event):
         if len(cols) > 0:
             for i_col, col_img in enumerate(cols):
                 col_filename = f"{base_name}_conc_blk{i_blk}_col{i_col}.jpg"
-                col_path = os.path.join(output_folder, col_filename)
-                cv2.imwrite(col_path, col_img)
-                rutas_columnas_guardadas.append(col_path)
+                columnas_generadas.append(columnas.crear(col_img, ruta_img, i_blk, i_col, col_filename, carpeta_debug))
 
-    return rutas_columnas_guardadas
+    return columnas_generadas
 
 # ==========================================
 # PIPELINE (IQUIQUE)
 # ==========================================
 
-def _pipeline_iquique(ruta_img, output_folder, logger, cancel_event):
+@metricas.medir("paso2.pipeline_iquique")
+def _pipeline_iquique(ruta_img, carpeta_debug, logger, cancel_event):
     """
     Pipeline específico para Iquique:
     Mismo flujo robusto de Antofagasta, pero elimina encabezados conflictivos
@@ -759,7 +766,7 @@ def _pipeline_iquique(ruta_img, output_folder, logger, cancel_event):
         img_salida[y:y+h, x:x+w] = img_filtrada[y:y+h, x:x+w]
 
     # === PASO 4: PROCESAMIENTO FINAL Y GUARDADO ===
-    rutas_columnas_guardadas = []
+    columnas_generadas = []
     base_name = os.path.splitext(os.path.basename(ruta_img))[0]
     
     # Ordenamos bloques por Y para mantener orden de lectura
@@ -782,8 +789,6 @@ def _pipeline_iquique(ruta_img, output_folder, logger, cancel_event):
         if len(cols) > 0:
             for i_col, col_img in enumerate(cols):
                 col_filename = f"{base_name}_iqi_blk{i_blk}_col{i_col}.jpg"
-                col_path = os.path.join(output_folder, col_filename)
-                cv2.imwrite(col_path, col_img)
-                rutas_columnas_guardadas.append(col_path)
+                columnas_generadas.append(columnas.crear(col_img, ruta_img, i_blk, i_col, col_filename, carpeta_debug))
 
-    return rutas_columnas_guardadas
\ No newline at end of file
+    return columnas_generadas
\ No newline at end of file
@@ -1,13 +1,17 @@
 import cv2
 import os
 import io
+import time
 import numpy as np
 from google.cloud import vision
-from PIL import Image
+from google.auth.credentials import AnonymousCredentials
+import metricas
+from valpoOCR import columnas
 from logger import get_logger
 logger = get_logger("[paso3 REGIONAL]", log_dir="logs", log_file="paso3_regional.log")
 from dotenv import load_dotenv
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- CONFIGURACIÓN GOOGLE CLOUD VISION ---
 load_dotenv()
@@ -15,8 +19,15 @@ if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
     print("⚠️ ADVERTENCIA: No se detectó 'GOOGLE_APPLICATION_CREDENTIALS' en el .env")
 
 LIMITE_MB = 9 * 1024 * 1024 
+TIRAS_POR_CHUNK = 2        # columnas apiladas en cada imagen que va a Vision
+MAX_TIRAS_EN_VUELO = 8     # llamadas simultáneas a Vision (todas las páginas comparten el pool)
+MODO_OCR = "batch"         # "batch": varias tiras por solicitud (batch_annotate_images) | "individual": una por solicitud
+IMAGENES_POR_LOTE = 16     # tiras por solicitud en modo batch
+LIMITE_IMAGENES_POR_SOLICITUD = 16          # tope de la API para batch_annotate_images síncrono
+MAX_BYTES_POR_LOTE = 28 * 1024 * 1024       # bajo el límite de ~40 MB por solicitud (base64 incluido)
 
 # CORRECCIÓN: Agregar cancel_event
+@metricas.medir("paso3_ocr.limpieza")
 def limpiar_basura_ocr(texto_crudo, logger, cancel_event):
     if not texto_crudo:
         return ""
@@ -70,42 +81,55 @@ def limpiar_basura_ocr(texto_crudo, logger, cancel_event):
 
     return "\n".join(lineas_limpias)
 
-def comprimir_imagen_si_es_necesario(path_imagen, logger):
+@metricas.medir("paso3_ocr.compresion")
+def codificar_tira(tira, logger):
+    """
+    Codifica la tira una sola vez, directo al buffer de la solicitud: PNG si
+    cabe en LIMITE_MB, si no JPEG bajando la calidad. Retorna (extension, bytes) o (None, None).
+    """
     try:
-        peso_actual = os.path.getsize(path_imagen)
-        nombre_archivo = os.path.basename(path_imagen)
-
-        if peso_actual <= LIMITE_MB:
-            logger.info(f"     ✅ Imagen lista para GCV ({peso_actual/1024/1024:.2f} MB). Se usa original.")
-            return nombre_archivo, open(path_imagen, 'rb')
-
-        logger.info(f"     ⚠️ Imagen excede 9MB ({peso_actual/1024/1024:.2f} MB). Optimizando...")
-        
-        with Image.open(path_imagen) as img:
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            img_buffer = io.BytesIO()
-            calidad = 95
-            while True:
-                img_buffer.seek(0); img_buffer.truncate(0)
-                img.save(img_buffer, format='JPEG', optimize=True, quality=calidad)
-                size_bytes = img_buffer.tell()
-                if size_bytes < LIMITE_MB: break
-                if calidad > 10: calidad -= 5
-                else: break
-            img_buffer.seek(0)
-            return nombre_archivo.replace(".png", ".jpg"), img_buffer
+        ok, buffer = cv2.imencode(".png", tira)
+        if not ok:
+            raise ValueError("cv2.imencode no pudo codificar la tira")
+        if len(buffer) <= LIMITE_MB:
+            logger.info(f"     ✅ Imagen lista para GCV ({len(buffer)/1024/1024:.2f} MB).")
+            return ".png", buffer.tobytes()
+
+        logger.info(f"     ⚠️ Imagen excede 9MB ({len(buffer)/1024/1024:.2f} MB). Optimizando...")
+        calidad = 95
+        while True:
+            ok, buffer = cv2.imencode(".jpg", tira, [cv2.IMWRITE_JPEG_QUALITY, calidad, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+            if len(buffer) < LIMITE_MB or calidad <= 10: break
+            calidad -= 5
+        return ".jpg", buffer.tobytes()
     except Exception as e:
         logger.error(f"     ❌ Error preparando imagen: {e}")
         return None, None
 
-def detectar_texto_google_vision(archivo_tuple, logger):
+def crear_cliente_vision():
+    """
+    Un cliente de Vision para toda la corrida (es thread-safe). Con
+    GOOGLE_VISION_ENDPOINT (p.ej. http://127.0.0.1:8080) usa transporte REST
+    contra ese endpoint: sirve para probar contra un Vision falso local. Si el
+    endpoint es http:// (sin TLS) no se piden credenciales de Google.
+    """
+    endpoint = os.getenv("GOOGLE_VISION_ENDPOINT")
+    if endpoint:
+        credenciales = AnonymousCredentials() if endpoint.startswith("http://") else None
+        return vision.ImageAnnotatorClient(credentials=credenciales, transport="rest",
+                                           client_options={"api_endpoint": endpoint})
+    return vision.ImageAnnotatorClient()
+
+@metricas.medir("paso3_ocr.google_vision")
+def detectar_texto_google_vision(archivo_tuple, logger, client=None):
     filename, file_obj = archivo_tuple
     if not file_obj: return None
     try:
-        client = vision.ImageAnnotatorClient()
+        client = client or vision.ImageAnnotatorClient()
         content = file_obj.read()
         image = vision.Image(content=content)
+        metricas.llamada_externa("google_vision")
+        metricas.contar(items=1, bytes=len(content))
         response = client.text_detection(image=image)
         if response.error.message:
             logger.error(f"     ❌ Google API Error: {response.error.message}")
@@ -120,111 +144,297 @@ def detectar_texto_google_vision(archivo_tuple, logger):
         if file_obj and not file_obj.closed:
             file_obj.close()
 
-# CORRECCIÓN: Agregar cancel_event
-def procesar_pagina_por_lotes(base_name, lista_columnas, output_folder, logger, cancel_event):
-    texto_pagina = ""
-    imgs_obj = []
-    metadata_tags = [] 
-
-    for ruta in lista_columnas:
-        if cancel_event.is_set(): return None
-        img = cv2.imread(ruta)
+@metricas.medir("paso3_ocr.google_vision_lote")
+def detectar_texto_google_vision_lote(contenidos, logger, client):
+    """
+    Varias imágenes (bytes) en una sola solicitud batch_annotate_images.
+    Retorna un texto por imagen, en el mismo orden (None si esa imagen falló).
+    """
+    try:
+        solicitudes = [
+            vision.AnnotateImageRequest(
+                image=vision.Image(content=contenido),
+                features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)],
+            )
+            for contenido in contenidos
+        ]
+        metricas.llamada_externa("google_vision")
+        metricas.contar(items=len(contenidos), bytes=sum(len(c) for c in contenidos))
+        response = client.batch_annotate_images(requests=solicitudes)
+    except Exception as e:
+        logger.error(f"     ❌ Excepción en Google Vision (lote de {len(contenidos)}): {e}")
+        return [None] * len(contenidos)
+
+    textos = []
+    for respuesta in response.responses:
+        if respuesta.error.message:
+            logger.error(f"     ❌ Google API Error: {respuesta.error.message}")
+            textos.append(None)
+        elif respuesta.text_annotations:
+            textos.append(respuesta.text_annotations[0].description.strip())
+        else:
+            textos.append("")
+    if len(textos) != len(contenidos):
+        logger.error(f"     ❌ Google Vision devolvió {len(textos)} respuestas para {len(contenidos)} imágenes.")
+        return [None] * len(contenidos)
+    return textos
+
+def armar_tareas_pagina(indice_pagina, base_name, lista_columnas, chunk_size=TIRAS_POR_CHUNK):
+    """Divide las columnas de una página en tiras de chunk_size (cada tira = una imagen para Vision)."""
+    return [
+        {
+            "pagina": indice_pagina,
+            "parte": idx_chunk,
+            "base_name": base_name,
+            "columnas": lista_columnas[x:x + chunk_size],
+        }
+        for idx_chunk, x in enumerate(range(0, len(lista_columnas), chunk_size))
+    ]
+
+def _armar_tira(chunk_imgs):
+    # Columnas una bajo otra, rellenadas a blanco al mismo ancho y separadas por 20px
+    ancho_max = max(img.shape[1] for img in chunk_imgs)
+    processed_chunk = []
+    separador = np.ones((20, ancho_max, 3), dtype=np.uint8) * 255 
+
+    for img in chunk_imgs:
+        h, w = img.shape[:2]
+        if w < ancho_max:
+            borde = np.ones((h, ancho_max - w, 3), dtype=np.uint8) * 255
+            img_ajustada = np.hstack((img, borde))
+        else:
+            img_ajustada = img
+        processed_chunk.append(img_ajustada)
+        processed_chunk.append(separador)
+
+    with metricas.etapa("paso3_ocr.armado_tiras"):
+        return cv2.vconcat(processed_chunk[:-1])
+
+@metricas.medir("paso3_ocr.preparacion")
+def preparar_tira(tarea, carpeta_debug, logger, cancel_event):
+    """
+    Arma la tira con las columnas (Columna en memoria o ruta) y la codifica para
+    Vision: {"contenido": bytes o None, "tags": [...], "cargadas": n}. None si
+    se canceló. Con carpeta_debug guarda además los mismos bytes en disco.
+    """
+    if cancel_event.is_set(): return None
+    chunk_imgs, current_tags = [], []
+    for columna in tarea["columnas"]:
+        img = columnas.imagen_de(columna)
         if img is not None:
-            imgs_obj.append(img)
-            if "TAG1612" in ruta: metadata_tags.append("[CODE:1612]")
-            else: metadata_tags.append(None)
+            chunk_imgs.append(img)
+            current_tags.append("[CODE:1612]" if columnas.tiene_etiqueta(columna, "TAG1612") else None)
 
-    if not imgs_obj: return texto_pagina + "(No se pudieron cargar columnas)\n\n"
+    preparada = {"contenido": None, "tags": current_tags, "cargadas": len(chunk_imgs)}
+    if not chunk_imgs: return preparada
 
-    chunk_size = 2
-    chunks_img = [imgs_obj[x:x+chunk_size] for x in range(0, len(imgs_obj), chunk_size)]
-    chunks_tags = [metadata_tags[x:x+chunk_size] for x in range(0, len(metadata_tags), chunk_size)]
-    
-    logger.info(f"   🧩 Dividido en {len(chunks_img)} tiras.")
-
-    for idx_chunk, chunk_imgs in enumerate(chunks_img):
-        if cancel_event.is_set(): return None
-        current_tags = chunks_tags[idx_chunk]
-        
-        try:
-            ancho_max = max(img.shape[1] for img in chunk_imgs)
-            processed_chunk = []
-            separador = np.ones((20, ancho_max, 3), dtype=np.uint8) * 255 
-
-            for img in chunk_imgs:
-                h, w = img.shape[:2]
-                if w < ancho_max:
-                    borde = np.ones((h, ancho_max - w, 3), dtype=np.uint8) * 255
-                    img_ajustada = np.hstack((img, borde))
-                else:
-                    img_ajustada = img
-                processed_chunk.append(img_ajustada)
-                processed_chunk.append(separador)
-
-            tira_lote = cv2.vconcat(processed_chunk[:-1])
-            nombre_tira = f"{base_name}_parte_{idx_chunk+1}.png"
-            ruta_tira = os.path.join(output_folder, nombre_tira)
-            cv2.imwrite(ruta_tira, tira_lote)
-
-            logger.info(f"   📡 Enviando parte {idx_chunk+1} a Google Cloud Vision...")
-            nombre_archivo, archivo_listo = comprimir_imagen_si_es_necesario(ruta_tira, logger)
-            
-            if archivo_listo:
-                texto_chunk = detectar_texto_google_vision((nombre_archivo, archivo_listo), logger)
-                
-                if texto_chunk:
-                    # CORRECCIÓN: Pasar cancel_event
-                    texto_limpio = limpiar_basura_ocr(texto_chunk, logger, cancel_event)
-                    if texto_limpio is None: return None
-                    
-                    for tag in current_tags:
-                        if tag:
-                            logger.info(f"      🏷️ Inyectando marcador: {tag}")
-                            texto_chunk = f"{tag}\n{texto_chunk}"
-                            break 
-                    
-                    texto_pagina += texto_chunk + "\n"
-                    logger.info("      ✅ Texto detectado con éxito.")
-                else:
-                    logger.warning("      ⚠️ No se detectó texto (Google devolvió vacío).")
-            else:
-                logger.error("      ❌ Falló preparación de imagen.")
-
-        except Exception as e:
-            logger.error(f"   ❌ Error en parte {idx_chunk+1}: {e}")
-
-    return texto_pagina
+    try:
+        tira_lote = _armar_tira(chunk_imgs)
+        extension, contenido = codificar_tira(tira_lote, logger)
+        if contenido is None:
+            logger.error("      ❌ Falló preparación de imagen.")
+            return preparada
+        if carpeta_debug:
+            with open(os.path.join(carpeta_debug, f"{tarea['base_name']}_parte_{tarea['parte']+1}{extension}"), "wb") as f:
+                f.write(contenido)
+        preparada["contenido"] = contenido
+    except Exception as e:
+        logger.error(f"   ❌ Error en {tarea['base_name']} parte {tarea['parte']+1}: {e}")
+    return preparada
+
+def texto_de_tira(tarea, preparada, texto_chunk, logger, cancel_event):
+    """
+    Limpia la respuesta de Vision de una tira e inyecta el marcador [CODE:1612]
+    si alguna de sus columnas lo tenía. Retorna (texto, columnas_cargadas), o None si se canceló.
+    """
+    if not texto_chunk:
+        logger.warning(f"      ⚠️ No se detectó texto en {tarea['base_name']} parte {tarea['parte']+1} (Google devolvió vacío).")
+        return "", preparada["cargadas"]
+
+    # CORRECCIÓN: Pasar cancel_event
+    texto_limpio = limpiar_basura_ocr(texto_chunk, logger, cancel_event)
+    if texto_limpio is None: return None
+
+    for tag in preparada["tags"]:
+        if tag:
+            logger.info(f"      🏷️ Inyectando marcador: {tag}")
+            texto_limpio = f"{tag}\n{texto_limpio}"
+            break 
+
+    logger.info(f"      ✅ Texto detectado con éxito ({tarea['base_name']} parte {tarea['parte']+1}).")
+    return texto_limpio + "\n", preparada["cargadas"]
+
+@metricas.medir("paso3_ocr.tira")
+def procesar_tira(tarea, carpeta_debug, logger, cancel_event, client=None, latencias=None):
+    """Modo individual: una tira = una solicitud a Vision. Retorna (texto, columnas_cargadas) o None si se canceló."""
+    preparada = preparar_tira(tarea, carpeta_debug, logger, cancel_event)
+    if preparada is None: return None
+    if preparada["contenido"] is None: return "", preparada["cargadas"]
+
+    logger.info(f"   📡 Enviando {tarea['base_name']} parte {tarea['parte']+1} a Google Cloud Vision...")
+    t0 = time.perf_counter()
+    texto_chunk = detectar_texto_google_vision((tarea["base_name"], io.BytesIO(preparada["contenido"])), logger, client)
+    if latencias is not None: latencias.append(time.perf_counter() - t0)
+    return texto_de_tira(tarea, preparada, texto_chunk, logger, cancel_event)
+
+def procesar_lote(lote, logger, cancel_event, client, latencias=None):
+    """
+    Modo batch: [(clave, tarea, preparada)] en una sola solicitud. Cada
+    respuesta vuelve a su tira por posición. Retorna {clave: (texto, columnas_cargadas)} o None si se canceló.
+    """
+    if cancel_event.is_set(): return None
+    logger.info(f"   📡 Enviando lote de {len(lote)} tiras a Google Cloud Vision...")
+    t0 = time.perf_counter()
+    textos = detectar_texto_google_vision_lote([preparada["contenido"] for _, _, preparada in lote], logger, client)
+    if latencias is not None: latencias.append(time.perf_counter() - t0)
+
+    salida = {}
+    for (clave, tarea, preparada), texto_chunk in zip(lote, textos):
+        resultado = texto_de_tira(tarea, preparada, texto_chunk, logger, cancel_event)
+        if resultado is None: return None
+        salida[clave] = resultado
+    return salida
+
+def unir_texto_pagina(resultados_tiras):
+    """Texto de una página a partir de sus tiras [(texto, columnas_cargadas)] en orden."""
+    if not any(cargadas for _, cargadas in resultados_tiras):
+        return "(No se pudieron cargar columnas)\n\n"
+    return "".join(texto for texto, _ in resultados_tiras)
+
+# CORRECCIÓN: Agregar cancel_event
+@metricas.medir("paso3_ocr.pagina")
+def procesar_pagina_por_lotes(base_name, lista_columnas, output_folder, logger, cancel_event, client=None):
+    """Una página de forma secuencial (el orquestador reparte las tiras de todas las páginas en paralelo)."""
+    client = client or crear_cliente_vision()
+    carpeta_debug = output_folder if columnas.guardar_imagenes_activo() else None
+    if carpeta_debug: os.makedirs(carpeta_debug, exist_ok=True)
+    tareas = armar_tareas_pagina(0, base_name, lista_columnas)
+    logger.info(f"   🧩 Dividido en {len(tareas)} tiras.")
+    resultados_tiras = []
+    for tarea in tareas:
+        resultado = procesar_tira(tarea, carpeta_debug, logger, cancel_event, client)
+        if resultado is None: return None
+        resultados_tiras.append(resultado)
+    return unir_texto_pagina(resultados_tiras)
+
+def _ocr_individual(tareas, carpeta_debug, logger, cancel_event, client, max_en_vuelo, latencias):
+    resultados = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, max_en_vuelo))
+    try:
+        futuros = {
+            executor.submit(metricas.heredar(procesar_tira), tarea, carpeta_debug, logger, cancel_event, client, latencias): clave
+            for clave, tarea in tareas.items()
+        }
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            if cancel_event.is_set() or resultado is None:
+                return None
+            resultados[futuros[futuro]] = resultado
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return resultados
+
+def _ocr_batch(tareas, carpeta_debug, logger, cancel_event, client, max_en_vuelo, latencias, imagenes_por_lote):
+    # Las tiras se preparan en un pool y, a medida que quedan listas, se
+    # juntan en lotes (por cantidad y por bytes) que van a un segundo pool.
+    resultados = {}
+    imagenes_por_lote = max(1, min(imagenes_por_lote, LIMITE_IMAGENES_POR_SOLICITUD))
+    pool_preparacion = ThreadPoolExecutor(max_workers=max(1, max_en_vuelo))
+    pool_vision = ThreadPoolExecutor(max_workers=max(1, max_en_vuelo))
+    try:
+        preparaciones = {
+            pool_preparacion.submit(metricas.heredar(preparar_tira), tarea, carpeta_debug, logger, cancel_event): clave
+            for clave, tarea in tareas.items()
+        }
+        lotes, lote, bytes_lote = [], [], 0
+        for futuro in as_completed(preparaciones):
+            preparada = futuro.result()
+            if cancel_event.is_set() or preparada is None:
+                return None
+            clave = preparaciones[futuro]
+            if preparada["contenido"] is None:
+                resultados[clave] = ("", preparada["cargadas"])
+                continue
+            if lote and (len(lote) >= imagenes_por_lote or bytes_lote + len(preparada["contenido"]) > MAX_BYTES_POR_LOTE):
+                lotes.append(pool_vision.submit(metricas.heredar(procesar_lote), lote, logger, cancel_event, client, latencias))
+                lote, bytes_lote = [], 0
+            lote.append((clave, tareas[clave], preparada))
+            bytes_lote += len(preparada["contenido"])
+        if lote:
+            lotes.append(pool_vision.submit(metricas.heredar(procesar_lote), lote, logger, cancel_event, client, latencias))
+
+        for futuro in as_completed(lotes):
+            salida = futuro.result()
+            if cancel_event.is_set() or salida is None:
+                return None
+            resultados.update(salida)
+    finally:
+        pool_preparacion.shutdown(wait=False, cancel_futures=True)
+        pool_vision.shutdown(wait=False, cancel_futures=True)
+    return resultados
 
 # CORRECCIÓN: Agregar cancel_event
-def orquestador_ocr_valpo(diccionario_paginas, cancel_event,region, output_folder="temp_tiras_valpo"):
+def orquestador_ocr_valpo(diccionario_paginas, cancel_event,region, output_folder="temp_tiras_valpo", ruta_txt_salida=None,
+                          max_en_vuelo=MAX_TIRAS_EN_VUELO, client=None, modo=MODO_OCR,
+                          tiras_por_chunk=TIRAS_POR_CHUNK, imagenes_por_lote=IMAGENES_POR_LOTE, guardar_imagenes=None):
+    """
+    OCR de todas las páginas: las tiras de todas las páginas van a un solo pool
+    (a lo más max_en_vuelo solicitudes a Vision a la vez, con un único cliente) y el
+    texto se rearma en orden de página y de tira. client permite inyectar un
+    Vision falso en pruebas.
+
+    modo="batch" manda hasta imagenes_por_lote tiras por solicitud
+    (batch_annotate_images); modo="individual", una tira por solicitud.
+    tiras_por_chunk es cuántas columnas se apilan en cada tira.
+    diccionario_paginas trae {ruta_pagina: [columnas.Columna o ruta]}; las
+    tiras solo se guardan en output_folder con guardar_imagenes (modo debug).
+    """
     logger = get_logger(f"paso3_{region}", log_dir="logs", log_file=f"paso3_{region}.log")
     logger.info(f"🏗️ Iniciando Paso 3: Unificación + Google Cloud Vision {region}")
 
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    carpeta_debug = output_folder if columnas.guardar_imagenes_activo(guardar_imagenes) else None
+    if carpeta_debug and not os.path.exists(carpeta_debug):
+        os.makedirs(carpeta_debug)
 
-    texto_completo_final = ""
-    ruta_txt_salida = os.path.abspath(f"remates_{region}_ocr.txt")
+    ruta_txt_salida = os.path.abspath(ruta_txt_salida or f"remates_{region}_ocr.txt")
     total_paginas = len(diccionario_paginas)
 
+    tareas_por_pagina = []
     for i, (ruta_pagina, lista_columnas) in enumerate(diccionario_paginas.items()):
-        if cancel_event.is_set():
-            logger.info("🛑 Proceso cancelado por usuario.")
-            return None
-
         if not lista_columnas: continue
         base_name = os.path.splitext(os.path.basename(ruta_pagina))[0]
-        logger.info(f"⚡ Procesando página {i+1}/{total_paginas}: {base_name}")
-        
-        # CORRECCIÓN: Pasar cancel_event
-        texto_extraido_pagina = procesar_pagina_por_lotes(base_name, lista_columnas, output_folder, logger, cancel_event)
-        
-        if texto_extraido_pagina is None: return None # Cancelado
+        tareas = armar_tareas_pagina(i, base_name, lista_columnas, tiras_por_chunk)
+        logger.info(f"⚡ Página {i+1}/{total_paginas}: {base_name} | 🧩 {len(tareas)} tiras.")
+        tareas_por_pagina.append(tareas)
+
+    tareas = {(tarea["pagina"], tarea["parte"]): tarea for tareas_pagina in tareas_por_pagina for tarea in tareas_pagina}
+    logger.info(f"📡 {len(tareas)} tiras a Google Cloud Vision en modo {modo} (hasta {max_en_vuelo} solicitudes en vuelo).")
+
+    client = client or crear_cliente_vision()
+    latencias = []  # segundos por solicitud a Vision
+    t0 = time.perf_counter()
+    if modo == "batch":
+        resultados = _ocr_batch(tareas, carpeta_debug, logger, cancel_event, client, max_en_vuelo, latencias, imagenes_por_lote)
+    else:
+        resultados = _ocr_individual(tareas, carpeta_debug, logger, cancel_event, client, max_en_vuelo, latencias)
+    if resultados is None:
+        logger.info("🛑 Proceso cancelado por usuario.")
+        return None
 
-        texto_completo_final += texto_extraido_pagina
+    if latencias:
+        logger.info(f"📊 Vision ({modo}): {len(latencias)} solicitudes para {len(tareas)} tiras en {time.perf_counter() - t0:.1f}s | "
+                    f"latencia media {sum(latencias) / len(latencias):.2f}s, máx {max(latencias):.2f}s")
+    metricas.anotar(modo_ocr=modo, tiras_por_chunk=tiras_por_chunk, imagenes_por_lote=imagenes_por_lote)
+    metricas.contar("paso3_ocr", items=len(tareas_por_pagina), tiras=len(tareas), solicitudes_vision=len(latencias),
+                    latencia_vision_ms=round(sum(latencias) * 1000))
+
+    texto_completo_final = "".join(
+        unir_texto_pagina([resultados[(tarea["pagina"], tarea["parte"])] for tarea in tareas_pagina])
+        for tareas_pagina in tareas_por_pagina
+    )
 
     with open(ruta_txt_salida, "w", encoding="utf-8") as f:
         f.write(texto_completo_final)
     
     logger.info(f"💾 Texto guardado en: {ruta_txt_salida}")
-    return ruta_txt_salida
\ No newline at end of file
+    return ruta_txt_salida